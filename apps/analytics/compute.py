@@ -10,7 +10,8 @@ import logging
 from datetime import datetime, timedelta, timezone, date
 from decimal import Decimal
 
-from shopify_graphql import shopify_gql, gid_numeric
+from shopify_graphql import gid_numeric
+from order_feed import OrderFeedError, OrderPager, bulk_orders
 import db
 
 logger = logging.getLogger(__name__)
@@ -55,6 +56,13 @@ def ingest_orders(since_date: str = None, full_backfill: bool = False):
     """
     Pull Shopify orders and write daily sales snapshots.
 
+    A full backfill reads the orders through one bulk export (falling back to
+    paging if the export can't run). Incremental runs page with a cursor
+    checkpoint: each page writes the days it has finished, so a failed page
+    stops the run with everything before it saved, and the next run with the
+    same `since` resumes from there. last_order_ingest only advances on a
+    complete run.
+
     Args:
         since_date: ISO date string to pull from (e.g., '2025-12-23')
         full_backfill: if True, pull 90 days regardless of last run
@@ -70,96 +78,116 @@ def ingest_orders(since_date: str = None, full_backfill: bool = False):
     # Include AUTHORIZED (not-yet-captured) orders, not just PAID — capture happens
     # around fulfillment, so paid-only blanks the most recent 1-3 days. Voided/expired
     # are skipped per-order below; the daily re-sum overwrites, so they drop out on re-sync.
-    from customers import COUNTED_FINANCIAL_STATUSES
     query_filter = f'created_at:>="{since}"'
-    cursor = None
-    total_orders = 0
-    daily_sales = {}  # (date_str, variant_id) -> {units, revenue}
-
-    while True:
-        variables = {"first": 50, "query": query_filter}
-        if cursor:
-            variables["after"] = cursor
+    total_orders = written = 0
+    complete = True
 
+    bulk_done = False
+    if full_backfill:
         try:
-            data = shopify_gql(ORDERS_QUERY, variables)
+            daily_sales = {}  # (date_str, variant_id) -> {units, revenue}
+            for node in bulk_orders(query_filter):
+                total_orders += _add_order_sales(daily_sales, node)
+            written = _write_daily_sales(daily_sales)
+            bulk_done = True
         except Exception as e:
-            logger.error(f"GraphQL error fetching orders: {e}")
-            break
-
-        edges = data.get("data", {}).get("orders", {}).get("edges", [])
-        if not edges:
-            break
-
-        for edge in edges:
-            node = edge["node"]
-            if node.get("displayFinancialStatus") not in COUNTED_FINANCIAL_STATUSES:
-                continue
-            order_date = node["createdAt"][:10]  # YYYY-MM-DD
-            total_orders += 1
-
-            for li_edge in node.get("lineItems", {}).get("edges", []):
-                li = li_edge["node"]
-                variant = li.get("variant")
-                if not variant or not variant.get("id"):
-                    continue
-
-                variant_id = int(gid_numeric(variant["id"]))
-                qty = li.get("quantity", 0) or 0
-                # Net of ALL discounts (line + allocated order/cart codes), not list price —
-                # discountedTotalSet only nets line-level discounts, so margin would be
-                # overstated by the cart-code portion. discountAllocations covers both.
-                original = float(li.get("originalTotalSet", {}).get("shopMoney", {}).get("amount", 0))
-                disc = sum(float((da.get("allocatedAmountSet") or {}).get("shopMoney", {}).get("amount") or 0)
-                           for da in (li.get("discountAllocations") or []))
-                revenue = round(original - disc, 2)
-
-                key = (order_date, variant_id)
-                if key not in daily_sales:
-                    daily_sales[key] = {"units": 0, "revenue": 0.0}
-                daily_sales[key]["units"] += qty
-                daily_sales[key]["revenue"] += revenue
-
-        page_info = data.get("data", {}).get("orders", {}).get("pageInfo", {})
-        if not page_info.get("hasNextPage"):
-            break
-        cursor = page_info.get("endCursor")
+            logger.warning(f"Bulk order export failed ({e}) — falling back to paging")
+            total_orders = 0
+
+    if not bulk_done:
+        pager = OrderPager("ingest_orders", ORDERS_QUERY, query_filter)
+        daily_sales = {}
+        last_cursor = {}  # date_str -> cursor of the last order seen that day
+        try:
+            for edges in pager:
+                for edge in edges:
+                    total_orders += _add_order_sales(daily_sales, edge["node"])
+                    last_cursor[edge["node"]["createdAt"][:10]] = edge.get("cursor")
+                # Orders arrive oldest first, so every day before the newest one
+                # seen is complete: write those and checkpoint past them.
+                newest = max(last_cursor)
+                finished = sorted(d for d in last_cursor if d < newest)
+                if finished:
+                    done = set(finished)
+                    written += _write_daily_sales(
+                        {k: v for k, v in daily_sales.items() if k[0] in done})
+                    daily_sales = {k: v for k, v in daily_sales.items() if k[0] not in done}
+                    pager.checkpoint(last_cursor[finished[-1]])
+                    for d in finished:
+                        del last_cursor[d]
+            written += _write_daily_sales(daily_sales)
+            pager.done()
+        except OrderFeedError as e:
+            logger.error(f"Order ingest stopped early, will resume next run: {e}")
+            complete = False
+
+    if complete:
+        # Update last run timestamp
+        now = datetime.now(timezone.utc).isoformat()
+        db.execute("""
+            INSERT INTO analytics_meta (key, value, updated_at)
+            VALUES ('last_order_ingest', %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
+        """, (now,))
 
+    logger.info(f"Ingested {total_orders} orders → {written} daily sales records")
+    return {"orders": total_orders, "records": written, "complete": complete}
+
+
+def _add_order_sales(daily_sales: dict, node: dict) -> int:
+    """Fold one order's line items into daily_sales. Returns 1 if the order
+    counts as a sale, else 0."""
+    from customers import COUNTED_FINANCIAL_STATUSES
+    if node.get("displayFinancialStatus") not in COUNTED_FINANCIAL_STATUSES:
+        return 0
+    order_date = node["createdAt"][:10]  # YYYY-MM-DD
+
+    for li_edge in node.get("lineItems", {}).get("edges", []):
+        li = li_edge["node"]
+        variant = li.get("variant")
+        if not variant or not variant.get("id"):
+            continue
+
+        variant_id = int(gid_numeric(variant["id"]))
+        qty = li.get("quantity", 0) or 0
+        # Net of ALL discounts (line + allocated order/cart codes), not list price —
+        # discountedTotalSet only nets line-level discounts, so margin would be
+        # overstated by the cart-code portion. discountAllocations covers both.
+        original = float(li.get("originalTotalSet", {}).get("shopMoney", {}).get("amount", 0))
+        disc = sum(float((da.get("allocatedAmountSet") or {}).get("shopMoney", {}).get("amount") or 0)
+                   for da in (li.get("discountAllocations") or []))
+        revenue = round(original - disc, 2)
+
+        key = (order_date, variant_id)
+        if key not in daily_sales:
+            daily_sales[key] = {"units": 0, "revenue": 0.0}
+        daily_sales[key]["units"] += qty
+        daily_sales[key]["revenue"] += revenue
+    return 1
+
+
+def _write_daily_sales(daily_sales: dict) -> int:
+    """Upsert (sale_date, variant) totals into sku_daily_sales. Returns rows written."""
     # Capture COGS at ingest time and FREEZE it — cost AT SALE, never today's cost.
     # inventory_product_cache.unit_cost is the weighted-average COGS maintained by
     # ingestion; captured during the daily run it ≈ the cost on the sale date. Frozen via
     # COALESCE on conflict so it NEVER drifts as inventory appreciates (the whole reason a
     # fixed period's margin must stay stable over time). margins.py reads this, not live cost.
-    variant_ids = list({vid for (_, vid) in daily_sales.keys()})
-    cost_map = {}
-    if variant_ids:
-        for r in db.query("""SELECT shopify_variant_id, unit_cost FROM inventory_product_cache
-                             WHERE shopify_variant_id = ANY(%s)""", (variant_ids,)):
-            cost_map[r["shopify_variant_id"]] = r["unit_cost"]
-
-    # Write to sku_daily_sales (upsert)
-    written = 0
-    for (sale_date, variant_id), vals in daily_sales.items():
-        db.execute("""
-            INSERT INTO sku_daily_sales (sale_date, shopify_variant_id, units_sold, revenue, unit_cost)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (sale_date, shopify_variant_id) DO UPDATE SET
-                units_sold = EXCLUDED.units_sold,
-                revenue = EXCLUDED.revenue,
-                unit_cost = COALESCE(sku_daily_sales.unit_cost, EXCLUDED.unit_cost)
-        """, (sale_date, variant_id, vals["units"], vals["revenue"], cost_map.get(variant_id)))
-        written += 1
-
-    # Update last run timestamp
-    now = datetime.now(timezone.utc).isoformat()
-    db.execute("""
-        INSERT INTO analytics_meta (key, value, updated_at)
-        VALUES ('last_order_ingest', %s, CURRENT_TIMESTAMP)
-        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
-    """, (now,))
-
-    logger.info(f"Ingested {total_orders} orders → {written} daily sales records")
-    return {"orders": total_orders, "records": written}
+    # The cost is joined in by the upsert itself; rows go out execute_values-paged.
+    return db.execute_values_batch("""
+        INSERT INTO sku_daily_sales (sale_date, shopify_variant_id, units_sold, revenue, unit_cost)
+        SELECT v.sale_date, v.shopify_variant_id, v.units_sold, v.revenue,
+               (SELECT c.unit_cost FROM inventory_product_cache c
+                WHERE c.shopify_variant_id = v.shopify_variant_id LIMIT 1)
+        FROM (VALUES %s) AS v(sale_date, shopify_variant_id, units_sold, revenue)
+        ON CONFLICT (sale_date, shopify_variant_id) DO UPDATE SET
+            units_sold = EXCLUDED.units_sold,
+            revenue = EXCLUDED.revenue,
+            unit_cost = COALESCE(sku_daily_sales.unit_cost, EXCLUDED.unit_cost)
+    """, [
+        (sale_date, variant_id, vals["units"], round(vals["revenue"], 2))
+        for (sale_date, variant_id), vals in daily_sales.items()
+    ], template="(%s::date, %s::bigint, %s::integer, %s::numeric)")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -170,6 +198,11 @@ def recompute_analytics():
     """
     Recompute sku_analytics from sku_daily_sales + inventory_product_cache.
     Call after order ingestion.
+
+    The whole computation is one INSERT ... SELECT: sales aggregates, OOS
+    days from sku_daily_inventory and current inventory state are joined
+    per variant, the velocity metrics derived in SQL, and every row upserted
+    in the same statement — a couple of round trips regardless of catalog size.
     """
     today = date.today()
     d90 = today - timedelta(days=90)
@@ -178,115 +211,97 @@ def recompute_analytics():
 
     logger.info("Recomputing SKU analytics...")
 
-    # Aggregate sales by variant, excluding drop event days
-    # drop_events table records which variants had drops on which dates
-    # (populated by the future drop planner — empty until then)
-    rows = db.query("""
-        SELECT
-            s.shopify_variant_id,
-            SUM(CASE WHEN s.sale_date >= %s THEN s.units_sold ELSE 0 END) AS units_90d,
-            SUM(CASE WHEN s.sale_date >= %s THEN s.units_sold ELSE 0 END) AS units_30d,
-            SUM(CASE WHEN s.sale_date >= %s THEN s.units_sold ELSE 0 END) AS units_7d,
-            SUM(CASE WHEN s.sale_date >= %s THEN s.revenue ELSE 0 END) AS revenue_90d,
-            SUM(s.units_sold) AS total_sold_all_time,
-            MIN(s.sale_date) AS first_sale_date,
-            MAX(s.sale_date) AS last_sale_date
-        FROM sku_daily_sales s
-        WHERE NOT EXISTS (
-              SELECT 1 FROM drop_events de
-              WHERE de.shopify_variant_id = s.shopify_variant_id
-                AND de.drop_date = s.sale_date
-          )
-        GROUP BY s.shopify_variant_id
-    """, (d90, d30, d7, d90))
-
-    if not rows:
-        logger.info("No sales data found")
-        return {"updated": 0}
-
-    # Get current inventory state
-    cache_rows = db.query("""
-        SELECT shopify_variant_id, shopify_product_id, tcgplayer_id,
-               title, shopify_price, shopify_qty
-        FROM inventory_product_cache
-    """)
-    cache_map = {r["shopify_variant_id"]: r for r in cache_rows}
-
-    updated = 0
-    for row in rows:
-        vid = row["shopify_variant_id"]
-        cache = cache_map.get(vid, {})
-
-        units_90d = int(row["units_90d"] or 0)
-        units_30d = int(row["units_30d"] or 0)
-        units_7d = int(row["units_7d"] or 0)
-        revenue_90d = float(row["revenue_90d"] or 0)
-        total_all_time = int(row["total_sold_all_time"] or 0)
-        first_sale = row["first_sale_date"]
-        last_sale = row["last_sale_date"]
-
-        first_sale = row["first_sale_date"]
-        current_qty = int(cache.get("shopify_qty") or 0)
-        current_price = float(cache.get("shopify_price") or 0)
-
-        # Average sale price
-        avg_sale_price = revenue_90d / units_90d if units_90d > 0 else current_price
-
-        # Out of stock days: best available estimate
-        # 1. Use daily inventory snapshots if we have them (most accurate)
-        # 2. Proxy: if current qty=0 and we have a last sale date, days since last sale = OOS days
-        oos_row = db.query_one("""
-            SELECT COUNT(*) AS oos_days
-            FROM sku_daily_inventory
-            WHERE shopify_variant_id = %s AND snapshot_date >= %s AND qty = 0
-        """, (vid, d90))
-        oos_days = int(oos_row["oos_days"]) if oos_row else 0
-
-        # Proxy for items with no/limited snapshot data
-        if oos_days == 0 and current_qty == 0 and last_sale:
-            # Currently OOS: days since last sale = minimum OOS estimate
-            days_since_last_sale = max(0, (today - last_sale).days)
-            oos_days = min(days_since_last_sale, 90)
-
-        # Days active: how long has this item been selling? (capped at 90)
-        if first_sale:
-            days_active = max(1, (today - first_sale).days)
-        else:
-            days_active = 90
-        days_active = min(days_active, 90)
-
-        # OOS days can't exceed days_active (snapshot data could span before first_sale)
-        oos_days = min(oos_days, days_active - 1)
-
-        # Selling days: subtract OOS days to get TRUE rate when in stock
-        # If OOS data hasn't accumulated yet (oos_days=0), use days_active as-is
-        selling_days = max(1, days_active - oos_days)
-
-        # Actual daily sell rate based on days we had stock, not calendar days
-        daily_rate = units_90d / selling_days if selling_days > 0 else 0
-
-        # Days of inventory: how long until current stock sells out at this rate?
-        days_of_inventory = current_qty / daily_rate if daily_rate > 0 else 9999
-
-        # avg_days_to_sell: average interval between sales (when in stock)
-        avg_days = selling_days / units_90d if units_90d > 0 else None
-
-        # Velocity score = days of inventory (lower = faster)
-        velocity = round(days_of_inventory, 1)
-
-        # Price trend: compare avg sale price to current price
-        price_trend = 0.0
-        if avg_sale_price > 0 and current_price > 0:
-            price_trend = round((current_price - avg_sale_price) / avg_sale_price * 100, 2)
-
-        db.execute("""
+    with db.transaction() as cur:
+        cur.execute("""
+            WITH sales AS (
+                -- Aggregate sales by variant, excluding drop event days.
+                -- drop_events records which variants had drops on which dates
+                -- (populated by the future drop planner — empty until then).
+                SELECT
+                    s.shopify_variant_id,
+                    SUM(CASE WHEN s.sale_date >= %s THEN s.units_sold ELSE 0 END) AS units_90d,
+                    SUM(CASE WHEN s.sale_date >= %s THEN s.units_sold ELSE 0 END) AS units_30d,
+                    SUM(CASE WHEN s.sale_date >= %s THEN s.units_sold ELSE 0 END) AS units_7d,
+                    SUM(CASE WHEN s.sale_date >= %s THEN s.revenue ELSE 0 END) AS revenue_90d,
+                    SUM(s.units_sold) AS total_sold_all_time,
+                    MIN(s.sale_date) AS first_sale_date,
+                    MAX(s.sale_date) AS last_sale_date
+                FROM sku_daily_sales s
+                WHERE NOT EXISTS (
+                      SELECT 1 FROM drop_events de
+                      WHERE de.shopify_variant_id = s.shopify_variant_id
+                        AND de.drop_date = s.sale_date
+                  )
+                GROUP BY s.shopify_variant_id
+            ),
+            snapshot_oos AS (
+                SELECT shopify_variant_id, COUNT(*) AS oos_days
+                FROM sku_daily_inventory
+                WHERE snapshot_date >= %s AND qty = 0
+                GROUP BY shopify_variant_id
+            ),
+            base AS (
+                SELECT
+                    s.*,
+                    c.shopify_product_id,
+                    c.tcgplayer_id,
+                    COALESCE(c.title, '')                 AS title,
+                    COALESCE(c.shopify_qty, 0)            AS current_qty,
+                    COALESCE(c.shopify_price, 0)::numeric AS current_price,
+                    -- Average sale price (current price when nothing sold in 90d)
+                    CASE WHEN s.units_90d > 0 THEN s.revenue_90d::numeric / s.units_90d
+                         ELSE COALESCE(c.shopify_price, 0)::numeric END AS avg_sale_price,
+                    -- Days active: how long has this item been selling? (1..90)
+                    LEAST(GREATEST(COALESCE(%s::date - s.first_sale_date, 90), 1), 90) AS days_active,
+                    -- Out of stock days: best available estimate
+                    -- 1. daily inventory snapshots if we have them (most accurate)
+                    -- 2. proxy: currently OOS with no snapshot data → days since
+                    --    last sale (capped at 90)
+                    CASE WHEN COALESCE(o.oos_days, 0) = 0 AND COALESCE(c.shopify_qty, 0) = 0
+                              AND s.last_sale_date IS NOT NULL
+                         THEN LEAST(GREATEST(%s::date - s.last_sale_date, 0), 90)
+                         ELSE COALESCE(o.oos_days, 0) END AS oos_estimate
+                FROM sales s
+                LEFT JOIN inventory_product_cache c ON c.shopify_variant_id = s.shopify_variant_id
+                LEFT JOIN snapshot_oos o ON o.shopify_variant_id = s.shopify_variant_id
+            ),
+            selling AS (
+                -- OOS days can't exceed days_active (snapshot data could span
+                -- before first_sale). Selling days = days we actually had stock.
+                SELECT b.*,
+                       LEAST(b.oos_estimate, b.days_active - 1) AS oos_days,
+                       GREATEST(1, b.days_active - LEAST(b.oos_estimate, b.days_active - 1)) AS selling_days
+                FROM base b
+            ),
+            metrics AS (
+                -- Actual daily sell rate based on days we had stock, not calendar days
+                SELECT sd.*, sd.units_90d::numeric / sd.selling_days AS daily_rate
+                FROM selling sd
+            )
             INSERT INTO sku_analytics (
                 shopify_variant_id, shopify_product_id, tcgplayer_id, title,
                 units_sold_90d, units_sold_30d, units_sold_7d, total_sold_all_time,
                 avg_days_to_sell, out_of_stock_days, first_seen_date,
                 current_qty, current_price, avg_sale_price,
                 price_trend_pct, last_sale_at, velocity_score, computed_at
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,CURRENT_TIMESTAMP)
+            )
+            SELECT
+                m.shopify_variant_id, m.shopify_product_id, m.tcgplayer_id, m.title,
+                m.units_90d, m.units_30d, m.units_7d, m.total_sold_all_time,
+                -- avg_days_to_sell: average interval between sales (when in stock)
+                CASE WHEN m.units_90d > 0 THEN m.selling_days::numeric / m.units_90d END,
+                m.oos_days, m.first_sale_date,
+                m.current_qty, m.current_price, ROUND(m.avg_sale_price, 2),
+                -- Price trend: current price vs average sale price, in percent
+                CASE WHEN m.avg_sale_price > 0 AND m.current_price > 0
+                     THEN ROUND((m.current_price - m.avg_sale_price) / m.avg_sale_price * 100, 2)
+                     ELSE 0 END,
+                m.last_sale_date,
+                -- Velocity score = days of inventory at the current rate (lower = faster)
+                CASE WHEN m.daily_rate > 0 THEN ROUND(m.current_qty / m.daily_rate, 1)
+                     ELSE 9999 END,
+                CURRENT_TIMESTAMP
+            FROM metrics m
             ON CONFLICT (shopify_variant_id) DO UPDATE SET
                 shopify_product_id = EXCLUDED.shopify_product_id,
                 tcgplayer_id = EXCLUDED.tcgplayer_id,
@@ -305,40 +320,30 @@ def recompute_analytics():
                 last_sale_at = EXCLUDED.last_sale_at,
                 velocity_score = EXCLUDED.velocity_score,
                 computed_at = CURRENT_TIMESTAMP
-        """, (
-            vid, cache.get("shopify_product_id"), cache.get("tcgplayer_id"),
-            cache.get("title", ""),
-            units_90d, units_30d, units_7d, total_all_time,
-            avg_days, oos_days, first_sale,
-            current_qty, current_price, round(avg_sale_price, 2),
-            price_trend, last_sale, velocity,
-        ))
-        updated += 1
-
-    # Zero out SKUs that had all their sales excluded (e.g., drop-only items)
-    # These variants exist in sku_analytics but weren't in the query results
-    updated_vids = {row["shopify_variant_id"] for row in rows}
-    zeroed = 0
-    stale_rows = db.query("""
-        SELECT shopify_variant_id FROM sku_analytics
-        WHERE units_sold_90d > 0 AND shopify_variant_id NOT IN (
-            SELECT DISTINCT shopify_variant_id FROM sku_daily_sales s
-            WHERE s.sale_date >= %s
-              AND NOT EXISTS (
-                  SELECT 1 FROM drop_events de
-                  WHERE de.shopify_variant_id = s.shopify_variant_id AND de.drop_date = s.sale_date
-              )
-        )
-    """, (d90,))
-    for sr in stale_rows:
-        db.execute("""
+        """, (d90, d30, d7, d90, d90, today, today))
+        updated = cur.rowcount
+
+        if not updated:
+            logger.info("No sales data found")
+            return {"updated": 0}
+
+        # Zero out SKUs that had all their sales excluded (e.g., drop-only items)
+        # These variants exist in sku_analytics but weren't in the query results
+        cur.execute("""
             UPDATE sku_analytics SET
                 units_sold_90d = 0, units_sold_30d = 0, units_sold_7d = 0,
                 avg_days_to_sell = NULL, velocity_score = 0, avg_sale_price = NULL,
                 computed_at = CURRENT_TIMESTAMP
-            WHERE shopify_variant_id = %s
-        """, (sr["shopify_variant_id"],))
-        zeroed += 1
+            WHERE units_sold_90d > 0 AND shopify_variant_id NOT IN (
+                SELECT DISTINCT shopify_variant_id FROM sku_daily_sales s
+                WHERE s.sale_date >= %s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM drop_events de
+                      WHERE de.shopify_variant_id = s.shopify_variant_id AND de.drop_date = s.sale_date
+                  )
+            )
+        """, (d90,))
+        zeroed = cur.rowcount
 
     logger.info(f"Updated {updated} SKU analytics records, zeroed {zeroed} drop-only SKUs")
     return {"updated": updated, "zeroed": zeroed}
@@ -360,21 +365,14 @@ def snapshot_inventory():
         logger.info(f"Inventory snapshot for {today} already exists, skipping")
         return {"date": str(today), "skipped": True}
 
-    # Snapshot current quantities from the product cache
-    rows = db.query("""
-        SELECT shopify_variant_id, shopify_qty
+    # Snapshot current quantities from the product cache in one statement
+    count = db.execute("""
+        INSERT INTO sku_daily_inventory (snapshot_date, shopify_variant_id, qty)
+        SELECT %s, shopify_variant_id, COALESCE(shopify_qty, 0)
         FROM inventory_product_cache
         WHERE shopify_variant_id IS NOT NULL
-    """)
-
-    count = 0
-    for r in rows:
-        db.execute("""
-            INSERT INTO sku_daily_inventory (snapshot_date, shopify_variant_id, qty)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (snapshot_date, shopify_variant_id) DO NOTHING
-        """, (today, r["shopify_variant_id"], int(r["shopify_qty"] or 0)))
-        count += 1
+        ON CONFLICT (snapshot_date, shopify_variant_id) DO NOTHING
+    """, (today,))
 
     logger.info(f"Inventory snapshot: {count} variants captured for {today}")
     return {"date": str(today), "variants": count}
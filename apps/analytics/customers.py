@@ -12,7 +12,9 @@ import logging
 from datetime import datetime, timedelta, timezone, date
 from decimal import Decimal
 
-from shopify_graphql import shopify_gql, gid_numeric
+from shopify_graphql import gid_numeric
+from shopify_fanout import fan_out
+from order_feed import OrderPager, bulk_orders, clear_checkpoints
 import db
 
 logger = logging.getLogger(__name__)
@@ -25,6 +27,9 @@ COUNTED_FINANCIAL_STATUSES = {
     "PAID", "AUTHORIZED", "PARTIALLY_PAID", "PARTIALLY_REFUNDED", "REFUNDED",
 }
 
+# Order sync pages date windows of this size concurrently (see _sync_windows)
+CUSTOMER_SYNC_WINDOW_DAYS = 30
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # GraphQL — richer than the velocity query, includes customer + fulfillment
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -91,137 +96,180 @@ def sync_customer_orders(full_backfill: bool = False, since_override: str = None
 
     # No financial_status filter here — we classify in code (see COUNTED_FINANCIAL_STATUSES)
     # so AUTHORIZED orders count immediately and voids can be removed on re-sync.
-    query_filter = f'created_at:>="{since}"'
-    cursor = None
     total_orders = 0
     skipped_no_customer = 0
+    complete = False
 
-    while True:
-        variables = {"first": 50, "query": query_filter}
-        if cursor:
-            variables["after"] = cursor
-
+    # A full backfill reads everything in one bulk export (see order_feed).
+    if full_backfill:
         try:
-            data = shopify_gql(CUSTOMER_ORDERS_QUERY, variables)
+            for node in bulk_orders(f'created_at:>="{since}"'):
+                counted, anonymous = _store_customer_order(node)
+                total_orders += counted
+                skipped_no_customer += anonymous
+            complete = True
         except Exception as e:
-            logger.error(f"GraphQL error fetching customer orders: {e}")
-            break
+            # Upserts are idempotent, so paging over the same range is safe.
+            logger.warning(f"Bulk customer order export failed ({e}) — falling back to paging")
+
+    if not complete:
+        # Split the range into date windows paged concurrently; the last window
+        # is open-ended so nothing created "today" is missed. Each window
+        # checkpoints its cursor, so a failed window resumes next run.
+        windows = _sync_windows(since)
+        total_orders = skipped_no_customer = 0
+        complete = True
+        # Each window's upserts hold a pooled DB connection; 4 stays well
+        # inside db.init_pool's default maxconn alongside the app's own use.
+        for window, result, err in fan_out(_sync_order_window, windows, workers=4):
+            if err is not None:
+                logger.error(f"Customer order sync failed for {window}: {err}")
+                complete = False
+                continue
+            total_orders += result[0]
+            skipped_no_customer += result[1]
+
+    if complete:
+        clear_checkpoints("customer_orders")
+        # Update last sync timestamp — only once every window made it, so a
+        # failed run is retried over the same range (resuming from checkpoints).
+        now = datetime.now(timezone.utc).isoformat()
+        db.execute("""
+            INSERT INTO analytics_meta (key, value, updated_at)
+            VALUES ('last_customer_sync', %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
+        """, (now,))
 
-        edges = data.get("data", {}).get("orders", {}).get("edges", [])
-        if not edges:
-            break
+    logger.info(f"Synced {total_orders} customer orders ({skipped_no_customer} skipped, no customer)")
+    return {"orders": total_orders, "skipped": skipped_no_customer, "complete": complete}
+
+
+def _sync_windows(since: str) -> list[str]:
+    """Shopify order search filters covering created_at >= since, in
+    CUSTOMER_SYNC_WINDOW_DAYS slices."""
+    start = datetime.fromisoformat(since[:10]).date()
+    today = datetime.now(timezone.utc).date()
+    filters = []
+    while start + timedelta(days=CUSTOMER_SYNC_WINDOW_DAYS) <= today:
+        end = start + timedelta(days=CUSTOMER_SYNC_WINDOW_DAYS)
+        filters.append(f'created_at:>="{start}" created_at:<"{end}"')
+        start = end
+    filters.append(f'created_at:>="{start}"')
+    return filters
+
+
+def _sync_order_window(query_filter: str) -> tuple[int, int]:
+    """Page one window of orders into customer_orders, checkpointing after
+    each page. Returns (orders stored, orders without a customer); raises
+    OrderFeedError if a page can't be fetched."""
+    pager = OrderPager("customer_orders", CUSTOMER_ORDERS_QUERY, query_filter)
+    total_orders = 0
+    skipped_no_customer = 0
 
+    for edges in pager:
         for edge in edges:
-            node = edge["node"]
-            customer = node.get("customer")
-            anonymous = not customer or not customer.get("id")
-            if anonymous:
-                skipped_no_customer += 1
-                customer_id = 0  # sentinel for POS walk-ins / guest checkouts
-            else:
-                customer_id = int(gid_numeric(customer["id"]))
-
-            order_id = int(gid_numeric(node["id"]))
-            fin_status = node.get("displayFinancialStatus")
-
-            # Skip non-sales (voided / expired / pending). If one was counted earlier
-            # while AUTHORIZED and has since voided, remove the stale row.
-            if fin_status not in COUNTED_FINANCIAL_STATUSES:
-                db.execute("DELETE FROM customer_orders WHERE order_id = %s", (order_id,))
-                continue
+            counted, anonymous = _store_customer_order(edge["node"])
+            total_orders += counted
+            skipped_no_customer += anonymous
+        pager.checkpoint(edges[-1].get("cursor"))
+
+    pager.done()
+    return total_orders, skipped_no_customer
+
+
+def _store_customer_order(node: dict) -> tuple[bool, bool]:
+    """Upsert (or, for non-sales, delete) one order's customer_orders row.
+    Returns (counted as a sale, anonymous)."""
+    customer = node.get("customer")
+    anonymous = not customer or not customer.get("id")
+    if anonymous:
+        customer_id = 0  # sentinel for POS walk-ins / guest checkouts
+    else:
+        customer_id = int(gid_numeric(customer["id"]))
+
+    order_id = int(gid_numeric(node["id"]))
+    fin_status = node.get("displayFinancialStatus")
+
+    # Skip non-sales (voided / expired / pending). If one was counted earlier
+    # while AUTHORIZED and has since voided, remove the stale row.
+    if fin_status not in COUNTED_FINANCIAL_STATUSES:
+        db.execute("DELETE FROM customer_orders WHERE order_id = %s", (order_id,))
+        return False, anonymous
+
+    order_date = node["createdAt"][:10]
+    gross_total = float((node.get("currentTotalPriceSet") or {}).get("shopMoney", {}).get("amount") or 0)
+    tax_amount = float((node.get("currentTotalTaxSet") or {}).get("shopMoney", {}).get("amount") or 0)
+    net_payment = float((node.get("netPaymentSet") or {}).get("shopMoney", {}).get("amount") or 0)
+    refund_amount = float((node.get("totalRefundedSet") or {}).get("shopMoney", {}).get("amount") or 0)
+
+    # net_amount = NET SALES: ex-tax, shipping kept, net of refunds.
+    # currentTotalPrice already nets return-refunds (so currentTotal - refund would
+    # double-count, pushing refunded orders negative). netPayment is the true kept
+    # amount for captured orders; it's $0 for not-yet-captured AUTHORIZED/PARTIALLY_PAID,
+    # so use the full order total for those. Then strip tax (a pass-through we remit).
+    kept = gross_total if fin_status in ("AUTHORIZED", "PARTIALLY_PAID") else net_payment
+    order_total = round(gross_total, 2)
+    net_amount = round(kept - tax_amount, 2)
+
+    fulfillment_status = node.get("displayFulfillmentStatus")
+    channel = "pos" if anonymous else "online"
+
+    # Delivery method = the TRUE in-store vs shipped signal.
+    # SHIPPING = shipped; RETAIL = walk-in POS; PICK_UP = online hold picked up in store.
+    # (The pos/online `channel` above mislabels in-store RETAIL orders as 'online'
+    #  because they carry a customer record — delivery_method is authoritative.)
+    fo_edges = node.get("fulfillmentOrders", {}).get("edges", [])
+    delivery_method = None
+    if fo_edges:
+        dm = fo_edges[0]["node"].get("deliveryMethod")
+        if dm:
+            delivery_method = dm.get("methodType")
+
+    # Extract line items summary
+    items = []
+    item_count = 0
+    for li_edge in node.get("lineItems", {}).get("edges", []):
+        li = li_edge["node"]
+        qty = li.get("quantity", 0) or 0
+        item_count += qty
+        variant = li.get("variant")
+        items.append({
+            "sku": li.get("sku") or None,
+            "variant_id": int(gid_numeric(variant["id"])) if variant and variant.get("id") else None,
+            "title": li.get("title", ""),
+            "qty": qty,
+            "price": float(li.get("originalTotalSet", {}).get("shopMoney", {}).get("amount", 0)),
+        })
 
-            order_date = node["createdAt"][:10]
-            gross_total = float((node.get("currentTotalPriceSet") or {}).get("shopMoney", {}).get("amount") or 0)
-            tax_amount = float((node.get("currentTotalTaxSet") or {}).get("shopMoney", {}).get("amount") or 0)
-            net_payment = float((node.get("netPaymentSet") or {}).get("shopMoney", {}).get("amount") or 0)
-            refund_amount = float((node.get("totalRefundedSet") or {}).get("shopMoney", {}).get("amount") or 0)
-
-            # net_amount = NET SALES: ex-tax, shipping kept, net of refunds.
-            # currentTotalPrice already nets return-refunds (so currentTotal - refund would
-            # double-count, pushing refunded orders negative). netPayment is the true kept
-            # amount for captured orders; it's $0 for not-yet-captured AUTHORIZED/PARTIALLY_PAID,
-            # so use the full order total for those. Then strip tax (a pass-through we remit).
-            kept = gross_total if fin_status in ("AUTHORIZED", "PARTIALLY_PAID") else net_payment
-            order_total = round(gross_total, 2)
-            net_amount = round(kept - tax_amount, 2)
-
-            fulfillment_status = node.get("displayFulfillmentStatus")
-            channel = "pos" if anonymous else "online"
-
-            # Delivery method = the TRUE in-store vs shipped signal.
-            # SHIPPING = shipped; RETAIL = walk-in POS; PICK_UP = online hold picked up in store.
-            # (The pos/online `channel` above mislabels in-store RETAIL orders as 'online'
-            #  because they carry a customer record — delivery_method is authoritative.)
-            fo_edges = node.get("fulfillmentOrders", {}).get("edges", [])
-            delivery_method = None
-            if fo_edges:
-                dm = fo_edges[0]["node"].get("deliveryMethod")
-                if dm:
-                    delivery_method = dm.get("methodType")
-
-            # Extract line items summary
-            items = []
-            item_count = 0
-            for li_edge in node.get("lineItems", {}).get("edges", []):
-                li = li_edge["node"]
-                qty = li.get("quantity", 0) or 0
-                item_count += qty
-                variant = li.get("variant")
-                items.append({
-                    "sku": li.get("sku") or None,
-                    "variant_id": int(gid_numeric(variant["id"])) if variant and variant.get("id") else None,
-                    "title": li.get("title", ""),
-                    "qty": qty,
-                    "price": float(li.get("originalTotalSet", {}).get("shopMoney", {}).get("amount", 0)),
-                })
-
-            db.execute("""
-                INSERT INTO customer_orders (
-                    customer_id, order_id, order_gid, order_name,
-                    order_date, order_total, refund_amount, net_amount,
-                    channel, fulfillment_status, delivery_method, created_at_ts,
-                    item_count, items
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                ON CONFLICT (customer_id, order_id) DO UPDATE SET
-                    refund_amount = EXCLUDED.refund_amount,
-                    net_amount = EXCLUDED.net_amount,
-                    fulfillment_status = EXCLUDED.fulfillment_status,
-                    delivery_method = EXCLUDED.delivery_method,
-                    item_count = EXCLUDED.item_count,
-                    items = EXCLUDED.items
-            """, (
-                customer_id, order_id, node["id"], node.get("name"),
-                order_date, order_total, refund_amount, net_amount,
-                channel,
-                fulfillment_status,
-                delivery_method,
-                node["createdAt"],
-                item_count,
-                json.dumps(items),
-            ))
-            total_orders += 1
-
-            if anonymous:
-                continue  # no customer to stub
-
-            # Also upsert minimal customer info for the summary
-            _upsert_customer_stub(customer_id, customer)
-
-        page_info = data.get("data", {}).get("orders", {}).get("pageInfo", {})
-        if not page_info.get("hasNextPage"):
-            break
-        cursor = page_info.get("endCursor")
-
-    # Update last sync timestamp
-    now = datetime.now(timezone.utc).isoformat()
     db.execute("""
-        INSERT INTO analytics_meta (key, value, updated_at)
-        VALUES ('last_customer_sync', %s, CURRENT_TIMESTAMP)
-        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
-    """, (now,))
+        INSERT INTO customer_orders (
+            customer_id, order_id, order_gid, order_name,
+            order_date, order_total, refund_amount, net_amount,
+            channel, fulfillment_status, delivery_method, created_at_ts,
+            item_count, items
+        ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        ON CONFLICT (customer_id, order_id) DO UPDATE SET
+            refund_amount = EXCLUDED.refund_amount,
+            net_amount = EXCLUDED.net_amount,
+            fulfillment_status = EXCLUDED.fulfillment_status,
+            delivery_method = EXCLUDED.delivery_method,
+            item_count = EXCLUDED.item_count,
+            items = EXCLUDED.items
+    """, (
+        customer_id, order_id, node["id"], node.get("name"),
+        order_date, order_total, refund_amount, net_amount,
+        channel,
+        fulfillment_status,
+        delivery_method,
+        node["createdAt"],
+        item_count,
+        json.dumps(items),
+    ))
 
-    logger.info(f"Synced {total_orders} customer orders ({skipped_no_customer} skipped, no customer)")
-    return {"orders": total_orders, "skipped": skipped_no_customer}
+    if not anonymous:
+        # Also upsert minimal customer info for the summary
+        _upsert_customer_stub(customer_id, customer)
+    return True, anonymous
 
 
 def _upsert_customer_stub(customer_id: int, customer: dict):
@@ -0,0 +1,173 @@
+"""
+Shopify order feed for the analytics jobs.
+
+ingest_orders and sync_customer_orders both read orders in the shape the
+paged `orders` query returns (lineItems / fulfillmentOrders as
+{"edges": [{"node": ...}]}). This module produces that shape two ways:
+
+  bulk_orders(query_filter)
+      One bulkOperationRunQuery over every matching order, its JSONL result
+      streamed and re-assembled order by order. Runs server-side outside the
+      GraphQL cost budget, so a year of orders takes minutes instead of
+      thousands of 50-order pages. Used for full backfills; raises
+      BulkOperationError if the export can't run (callers fall back to paging).
+
+  OrderPager(name, query, query_filter)
+      Pages `query` 50 orders at a time with a resumable cursor checkpoint in
+      analytics_meta. Iterating yields each page's edges; the caller marks
+      progress with pager.checkpoint(edge["cursor"]) once everything up to
+      that order is written, and pager.done() when the run finishes. A page
+      that still fails after shopify_gql's retries raises OrderFeedError
+      instead of quietly ending the run, and the next run with the same
+      filter resumes right after the last checkpoint.
+"""
+
+import json
+import hashlib
+import logging
+
+from shopify_graphql import shopify_gql
+from shopify_bulk import iter_bulk_jsonl, run_bulk_query
+import db
+
+logger = logging.getLogger(__name__)
+
+# Union of the fields ingest_orders and sync_customer_orders read. Bulk queries
+# take no page sizes; nested connections come back as __parentId-tagged lines.
+BULK_ORDERS_QUERY = """
+{
+  orders(query: %s, sortKey: CREATED_AT) {
+    edges {
+      node {
+        id
+        name
+        createdAt
+        displayFinancialStatus
+        displayFulfillmentStatus
+        customer { id email firstName lastName }
+        currentTotalPriceSet { shopMoney { amount } }
+        currentTotalTaxSet { shopMoney { amount } }
+        netPaymentSet { shopMoney { amount } }
+        totalRefundedSet { shopMoney { amount } }
+        fulfillmentOrders { edges { node { id deliveryMethod { methodType } } } }
+        lineItems {
+          edges { node {
+            id
+            sku
+            variant { id }
+            title
+            quantity
+            originalTotalSet { shopMoney { amount } }
+            discountAllocations { allocatedAmountSet { shopMoney { amount } } }
+          }}
+        }
+      }
+    }
+  }
+}
+"""
+
+_PAGE_SIZE = 50
+
+
+class OrderFeedError(RuntimeError):
+    """A page of orders could not be fetched; the run stopped at the last checkpoint."""
+
+
+def _gql_data(query: str, variables=None) -> dict:
+    return shopify_gql(query, variables).get("data") or {}
+
+
+def bulk_orders(query_filter: str):
+    """
+    Yield every order matching `query_filter` (oldest first) from a bulk
+    export, each re-assembled into the paged query's node shape. Only the
+    order being assembled is held in memory.
+    """
+    url = run_bulk_query(_gql_data, BULK_ORDERS_QUERY % json.dumps(query_filter))
+    order = None
+    for obj in iter_bulk_jsonl(url):
+        parent = obj.pop("__parentId", None)
+        if parent is None:
+            if order is not None:
+                yield order
+            order = obj
+            order["lineItems"] = {"edges": []}
+            order["fulfillmentOrders"] = {"edges": []}
+        elif order is not None and parent == order["id"]:
+            kind = "lineItems" if "/LineItem/" in obj.get("id", "") else "fulfillmentOrders"
+            order[kind]["edges"].append({"node": obj})
+    if order is not None:
+        yield order
+
+
+def _checkpoint_key(name: str, query_filter: str) -> str:
+    # analytics_meta.key is VARCHAR(100); filters can be long, so hash them.
+    return f"order_feed:{name}:{hashlib.sha1(query_filter.encode('utf-8')).hexdigest()[:16]}"
+
+
+def clear_checkpoints(name: str) -> None:
+    """Drop every checkpoint `name` has left behind (e.g. from failed windows
+    of an earlier run whose filters won't recur)."""
+    db.execute("DELETE FROM analytics_meta WHERE starts_with(key, %s)", (f"order_feed:{name}:",))
+
+
+class OrderPager:
+    """Cursor-paged orders with a resumable checkpoint; see module docstring.
+    `query` takes $first / $after / $query and returns orders.edges with a
+    per-edge cursor plus pageInfo."""
+
+    def __init__(self, name: str, query: str, query_filter: str):
+        self.name = name
+        self.query = query
+        self.query_filter = query_filter
+        self._key = _checkpoint_key(name, query_filter)
+
+    def _resume_cursor(self) -> str | None:
+        row = db.query_one("SELECT value FROM analytics_meta WHERE key = %s", (self._key,))
+        if not row or not row.get("value"):
+            return None
+        try:
+            state = json.loads(row["value"])
+        except ValueError:
+            return None
+        if state.get("filter") != self.query_filter:
+            return None
+        return state.get("cursor")
+
+    def checkpoint(self, cursor: str | None) -> None:
+        """Record that every order up to and including `cursor` is written."""
+        if not cursor:
+            return
+        db.execute("""
+            INSERT INTO analytics_meta (key, value, updated_at)
+            VALUES (%s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = CURRENT_TIMESTAMP
+        """, (self._key, json.dumps({"filter": self.query_filter, "cursor": cursor})))
+
+    def done(self) -> None:
+        """The run finished; the next one starts from the top."""
+        db.execute("DELETE FROM analytics_meta WHERE key = %s", (self._key,))
+
+    def __iter__(self):
+        cursor = self._resume_cursor()
+        if cursor:
+            logger.info(f"[{self.name}] resuming {self.query_filter} from checkpoint")
+        while True:
+            variables = {"first": _PAGE_SIZE, "query": self.query_filter}
+            if cursor:
+                variables["after"] = cursor
+            try:
+                data = _gql_data(self.query, variables)
+            except Exception as e:
+                raise OrderFeedError(f"[{self.name}] order page failed for "
+                                     f"{self.query_filter}: {e}") from e
+
+            orders = data.get("orders") or {}
+            edges = orders.get("edges") or []
+            if edges:
+                yield edges
+            page_info = orders.get("pageInfo") or {}
+            if not edges or not page_info.get("hasNextPage"):
+                return
+            cursor = page_info.get("endCursor")
@@ -14,9 +14,11 @@ partition per month, created on demand here). Partitions older than
 RETENTION_DAYS are dropped each run, which keeps the nightly INSERT fast (it
 only ever touches the small current-month partition) and bounds table growth.
 
-Must run BEFORE the nightly scrydex sync overwrites the cache. In practice the
-analytics pipeline runs first, snapshots yesterday's prices (still in the
-cache), then scrydex_nightly.py updates the cache with today's prices.
+Source: yesterday's prices. Normally that means running BEFORE the nightly
+scrydex sync overwrites the cache in place. When the sync runs in generation
+swap mode (shared/scrydex_generation.py) and has already swapped today, the
+previous generation is still intact in scrydex_price_cache_prev and the
+snapshot reads that instead, so ordering no longer matters.
 """
 
 import logging
@@ -28,6 +30,8 @@ logger = logging.getLogger(__name__)
 
 RETENTION_DAYS = 90
 
+PREV_GENERATION_TABLE = "scrydex_price_cache_prev"
+
 
 def _month_floor(d):
     return d.replace(day=1)
@@ -79,6 +83,24 @@ def _drop_old_partitions(keep_days=RETENTION_DAYS):
     return dropped
 
 
+def _snapshot_source(today):
+    """The live cache, or the retained previous generation if the nightly
+    already swapped a new one in today (its prices are then today's, not
+    yesterday's)."""
+    row = db.query_one("""
+        SELECT to_regclass(%s) IS NOT NULL
+               AND to_regclass('scrydex_cache_generation') IS NOT NULL AS ready
+    """, (PREV_GENERATION_TABLE,))
+    if not row or not row["ready"]:
+        return "scrydex_price_cache"
+    swapped = db.query_one("""
+        SELECT 1 FROM scrydex_cache_generation
+        WHERE status = 'swapped' AND finished_at::date = %s
+        LIMIT 1
+    """, (today,))
+    return PREV_GENERATION_TABLE if swapped else "scrydex_price_cache"
+
+
 def snapshot_scrydex_prices():
     """
     Snapshot current scrydex_price_cache (NM/raw only) into scrydex_price_history.
@@ -98,8 +120,9 @@ def snapshot_scrydex_prices():
 
     # Make sure this month's partition exists, then bulk copy NM/raw rows into it.
     _ensure_month_partition(today)
+    source = _snapshot_source(today)
 
-    result = db.execute("""
+    result = db.execute(f"""
         INSERT INTO scrydex_price_history (
             snapshot_date, scrydex_id, tcgplayer_id, expansion_id, expansion_name,
             product_type, product_name, variant, condition, price_type,
@@ -109,7 +132,7 @@ def snapshot_scrydex_prices():
             %s, scrydex_id, tcgplayer_id, expansion_id, expansion_name,
             product_type, product_name, variant, condition, price_type,
             grade_company, grade_value, market_price, low_price
-        FROM scrydex_price_cache
+        FROM {source}
         WHERE market_price IS NOT NULL
           AND condition = 'NM'
           AND price_type = 'raw'
@@ -117,7 +140,7 @@ def snapshot_scrydex_prices():
     """, (today,))
 
     inserted = result if isinstance(result, int) else 0
-    logger.info(f"Price history snapshot: {inserted} rows for {today}")
+    logger.info(f"Price history snapshot: {inserted} rows for {today} from {source}")
 
     # Retention: drop partitions past the window.
     _drop_old_partitions()
@@ -261,6 +261,30 @@ def _detect_expansion(tcgplayer_id: int, title: str, scrydex_map: dict) -> tuple
     return expansion_id, set_name, era
 
 
+_CLASSIFY_BATCH = 1000
+
+_UPSERT_TAXONOMY_SQL = """
+    INSERT INTO product_taxonomy (
+        shopify_variant_id, shopify_product_id, tcgplayer_id, title,
+        ip, product_type, form_factor, expansion_id, set_name, era,
+        classified_at, updated_at
+    ) VALUES %s
+    ON CONFLICT (shopify_variant_id) DO UPDATE SET
+        shopify_product_id = EXCLUDED.shopify_product_id,
+        tcgplayer_id = EXCLUDED.tcgplayer_id,
+        title = EXCLUDED.title,
+        ip = EXCLUDED.ip,
+        product_type = EXCLUDED.product_type,
+        form_factor = EXCLUDED.form_factor,
+        expansion_id = EXCLUDED.expansion_id,
+        set_name = EXCLUDED.set_name,
+        era = EXCLUDED.era,
+        classified_at = EXCLUDED.classified_at,
+        updated_at = EXCLUDED.updated_at
+    WHERE product_taxonomy.manual_override = FALSE
+"""
+
+
 def classify_taxonomy():
     """
     Classify all SKUs in inventory_product_cache into product_taxonomy.
@@ -269,18 +293,6 @@ def classify_taxonomy():
     """
     logger.info("Classifying product taxonomy...")
 
-    # Get all inventory variants
-    rows = db.query("""
-        SELECT shopify_variant_id, shopify_product_id, tcgplayer_id,
-               title, tags, is_damaged, era
-        FROM inventory_product_cache
-        WHERE shopify_variant_id IS NOT NULL
-    """)
-
-    if not rows:
-        logger.info("No inventory rows to classify")
-        return {"classified": 0}
-
     # Pre-fetch scrydex expansion data (one query instead of per-SKU)
     scrydex_map = _build_scrydex_map()
     logger.info(f"Loaded {len(scrydex_map)} scrydex expansion mappings")
@@ -292,65 +304,63 @@ def classify_taxonomy():
     override_set = {r["shopify_variant_id"] for r in overrides}
 
     now = datetime.now(timezone.utc)
-    classified = 0
-
-    for row in rows:
-        vid = row["shopify_variant_id"]
-        if vid in override_set:
-            continue
-
-        title = row["title"] or ""
-        tags = row["tags"] or ""
-        tcg_id = row["tcgplayer_id"]
-
-        ip = _detect_ip(title, tags)
-        # Non-TCG retail (board games / supplies / apparel) is identified by its
-        # Shopify product-type tag, which is more authoritative than the title
-        # regex. Fall back to title-based form factor for everything else.
-        tag_class = _detect_from_tags(tags)
-        if tag_class:
-            product_type, form_factor = tag_class
-        else:
-            form_factor = _detect_form_factor(title)
-            product_type = _detect_product_type(form_factor)
-            # The catalog holds no raw singles (those live in raw_cards). A non-graded
-            # item the regex defaulted to single_card but that's tagged 'sealed' is
-            # really sealed the regex did not recognize (odd-named starter decks, mini
-            # tins, exclusives, bundles). Slabs (form_factor='slab') are left alone, and
-            # board games / accessories were already caught by the tag rules above.
-            if form_factor == "single_card" and re.search(r"\bsealed\b", tags, re.IGNORECASE):
-                product_type = "sealed"
-                form_factor = None
-        # set_name/expansion_id come from the Scrydex lookup (by tcgplayer_id); era is
-        # the authoritative custom.era metafield mirrored into the cache — NEVER inferred.
-        expansion_id, set_name, _ = _detect_expansion(tcg_id, title, scrydex_map)
-        era = row.get("era")
-
-        db.execute("""
-            INSERT INTO product_taxonomy (
-                shopify_variant_id, shopify_product_id, tcgplayer_id, title,
-                ip, product_type, form_factor, expansion_id, set_name, era,
-                classified_at, updated_at
-            ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            ON CONFLICT (shopify_variant_id) DO UPDATE SET
-                shopify_product_id = EXCLUDED.shopify_product_id,
-                tcgplayer_id = EXCLUDED.tcgplayer_id,
-                title = EXCLUDED.title,
-                ip = EXCLUDED.ip,
-                product_type = EXCLUDED.product_type,
-                form_factor = EXCLUDED.form_factor,
-                expansion_id = EXCLUDED.expansion_id,
-                set_name = EXCLUDED.set_name,
-                era = EXCLUDED.era,
-                classified_at = EXCLUDED.classified_at,
-                updated_at = EXCLUDED.updated_at
-            WHERE product_taxonomy.manual_override = FALSE
-        """, (
-            vid, row["shopify_product_id"], tcg_id, title,
-            ip, product_type, form_factor, expansion_id, set_name, era,
-            now, now,
-        ))
-        classified += 1
+    seen = classified = 0
+
+    # Stream the cache in batches and upsert each batch as one statement, so
+    # memory stays at one batch however large the catalog grows.
+    for batch in db.stream_batches("""
+        SELECT shopify_variant_id, shopify_product_id, tcgplayer_id,
+               title, tags, is_damaged, era
+        FROM inventory_product_cache
+        WHERE shopify_variant_id IS NOT NULL
+    """, batch_size=_CLASSIFY_BATCH):
+        values = [_classify_row(row, scrydex_map, now) for row in batch
+                  if row["shopify_variant_id"] not in override_set]
+        seen += len(batch)
+        classified += len(values)
+        db.execute_values_batch(_UPSERT_TAXONOMY_SQL, values, page_size=_CLASSIFY_BATCH)
+
+    if not seen:
+        logger.info("No inventory rows to classify")
+        return {"classified": 0}
 
     logger.info(f"Classified {classified} SKUs ({len(override_set)} manual overrides skipped)")
     return {"classified": classified, "overrides_skipped": len(override_set)}
+
+
+def _classify_row(row, scrydex_map: dict, now) -> tuple:
+    """One product_taxonomy VALUES tuple for an inventory cache row."""
+    vid = row["shopify_variant_id"]
+
+    title = row["title"] or ""
+    tags = row["tags"] or ""
+    tcg_id = row["tcgplayer_id"]
+
+    ip = _detect_ip(title, tags)
+    # Non-TCG retail (board games / supplies / apparel) is identified by its
+    # Shopify product-type tag, which is more authoritative than the title
+    # regex. Fall back to title-based form factor for everything else.
+    tag_class = _detect_from_tags(tags)
+    if tag_class:
+        product_type, form_factor = tag_class
+    else:
+        form_factor = _detect_form_factor(title)
+        product_type = _detect_product_type(form_factor)
+        # The catalog holds no raw singles (those live in raw_cards). A non-graded
+        # item the regex defaulted to single_card but that's tagged 'sealed' is
+        # really sealed the regex did not recognize (odd-named starter decks, mini
+        # tins, exclusives, bundles). Slabs (form_factor='slab') are left alone, and
+        # board games / accessories were already caught by the tag rules above.
+        if form_factor == "single_card" and re.search(r"\bsealed\b", tags, re.IGNORECASE):
+            product_type = "sealed"
+            form_factor = None
+    # set_name/expansion_id come from the Scrydex lookup (by tcgplayer_id); era is
+    # the authoritative custom.era metafield mirrored into the cache — NEVER inferred.
+    expansion_id, set_name, _ = _detect_expansion(tcg_id, title, scrydex_map)
+    era = row.get("era")
+
+    return (
+        vid, row["shopify_product_id"], tcg_id, title,
+        ip, product_type, form_factor, expansion_id, set_name, era,
+        now, now,
+    )
@@ -44,6 +44,7 @@ def make_session():
 SESSION = make_session()
 
 from requests.exceptions import ConnectionError, Timeout
+from concurrent.futures import ThreadPoolExecutor
 
 def _respect_rate_limit(resp):
     # Shopify sends X-Request-Id, X-Shopify-Shop-Api-Call-Limit: "N/80"
@@ -98,7 +99,17 @@ def graphql_query(query, variables=None):
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
-    _, data = _req_json("POST", url, json=payload)
+    for attempt in range(1, 6):
+        _, data = _req_json("POST", url, json=payload)
+        throttled = any((e.get("extensions") or {}).get("code") == "THROTTLED"
+                        for e in (data.get("errors") or []) if isinstance(e, dict))
+        if not throttled or attempt == 5:
+            return data
+        # Wait exactly until the bucket holds this query's cost again.
+        cost = (data.get("extensions") or {}).get("cost") or {}
+        status = cost.get("throttleStatus") or {}
+        missing = (cost.get("requestedQueryCost") or 100) - (status.get("currentlyAvailable") or 0)
+        time.sleep(max(missing, 0) / (status.get("restoreRate") or 50) + random.random() * 0.2)
     return data
 
 def get_collections():
@@ -349,12 +360,6 @@ def curated_random_carousel_blocks(index_json_string):
     return json.dumps(index_data, indent=2)
 
 def update_featured_picks(collection_id, product_ids):
-    url = f"https://{SHOPIFY_DOMAIN}/admin/api/2024-04/graphql.json"
-    headers = {
-        "X-Shopify-Access-Token": ACCESS_TOKEN,
-        "Content-Type": "application/json"
-    }
-
     gid_collection = f"gid://shopify/Collection/{collection_id}"
     gid_products = product_ids
 
@@ -385,52 +390,60 @@ def update_featured_picks(collection_id, product_ids):
         ]
     }
 
-    response = requests.post(url, headers=headers, json={"query": mutation, "variables": variables})
-    response.raise_for_status()
-
-    data = response.json()
+    # Through graphql_query so concurrent collection syncs share its
+    # pooled session and THROTTLED handling.
+    data = graphql_query(mutation, variables)
     errors = data.get("data", {}).get("metafieldsSet", {}).get("userErrors", [])
     if errors:
         print(f"❌ GraphQL metafield error: {errors}")
     else:
         print(f"✨ Updated featured picks for collection {collection_id}")
 
+# Collections are independent; sync this many at once (THROTTLED responses
+# are waited out in graphql_query).
+FEATURED_PICKS_WORKERS = int(os.environ.get("FEATURED_PICKS_WORKERS", "4"))
+
+
 def sync_featured_picks_for_all_collections(smart_collections):
-    for collection in smart_collections:
-        collection_id = collection["id"]
-        title = collection["title"]
+    with ThreadPoolExecutor(max_workers=FEATURED_PICKS_WORKERS) as pool:
+        list(pool.map(_sync_featured_picks, smart_collections))
+    print(f"✨ Featured picks synced for {len(smart_collections)} collections")
+
+
+def _sync_featured_picks(collection):
+    collection_id = collection["id"]
+    title = collection["title"]
 
+    try:
+        products = get_products_in_collection_graphql(collection_id)
+    except Exception as e:
+        print(f"⚠️ Skipping {title} due to product fetch error: {e}")
+        return
+    # Filter in-stock products
+    in_stock = []
+    for p in products:
         try:
-            products = get_products_in_collection_graphql(collection_id)
+            available = p["variants"]["edges"][0]["node"]["availableForSale"]
         except Exception as e:
-            print(f"⚠️ Skipping {title} due to product fetch error: {e}")
-            continue
-        # Filter in-stock products
-        in_stock = []
-        for p in products:
-            try:
-                available = p["variants"]["edges"][0]["node"]["availableForSale"]
-            except Exception as e:
-                available = False
+            available = False
 
-            print(f"   - {p['title']} → {available}")
+        print(f"   - {p['title']} → {available}")
 
-            if available:
-                in_stock.append(p)
-        if not in_stock:
-            print(f"🚫 No in-stock items for {title}")
-            continue
+        if available:
+            in_stock.append(p)
+    if not in_stock:
+        print(f"🚫 No in-stock items for {title}")
+        return
 
-        # Pick up to 6 featured items
-        random.shuffle(in_stock)
-        featured = in_stock[:6]
-        featured_ids = [p["id"] for p in featured]
+    # Pick up to 6 featured items
+    random.shuffle(in_stock)
+    featured = in_stock[:6]
+    featured_ids = [p["id"] for p in featured]
 
-        try:
-            update_featured_picks(collection_id, featured_ids)
-        except Exception as e:
-            print(f"❌ Failed to update featured picks for {title}: {e}")
-    print(f"✨ Updated featured picks for collection {collection_id}")
+    try:
+        update_featured_picks(collection_id, featured_ids)
+    except Exception as e:
+        print(f"❌ Failed to update featured picks for {title}: {e}")
 
 def get_theme_id():
     url = f"https://{SHOPIFY_DOMAIN}/admin/api/2024-04/themes.json"
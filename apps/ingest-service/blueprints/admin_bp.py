@@ -179,7 +179,12 @@ def shopify_status():
     last_sync = None
     if configured:
         try:
-            row = db.query_one("SELECT COUNT(*) as cnt, MAX(last_synced) as last_sync FROM inventory_product_cache")
+            # Rows are only rewritten when they change, so MAX(last_synced)
+            # is the last change; the last refresh is in the meta row.
+            row = db.query_one("""
+                SELECT (SELECT COUNT(*) FROM inventory_product_cache) AS cnt,
+                       (SELECT last_refreshed_at FROM inventory_cache_meta LIMIT 1) AS last_sync
+            """)
             if row:
                 cache_count = row["cnt"]
                 last_sync = row["last_sync"].isoformat() if row["last_sync"] else None
@@ -2162,7 +2162,7 @@ def _push_raw_item(item: dict) -> dict:
 
 
 def _variant_cache_image(tcg_id, scrydex_id, variant):
-    """Resolve the variant-correct cache image, mirroring kiosk _resolve_cache_image.
+    """Resolve the variant-correct cache image, mirroring kiosk _resolve_cache_images.
 
     The image is variant-specific. One Piece (and most TCGs) share ONE scrydex_id
     across every printing (base foil, alt art, manga, ...) but give each its own
@@ -5718,6 +5718,12 @@ def health():
     })
 
 
+@app.route("/health/db")
+def health_db():
+    """Connection pool metrics; behind the login gate, unlike /health."""
+    return jsonify(db.pool_stats())
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=int(os.getenv("PORT", 8080)), debug=True)
 
@@ -13,6 +13,11 @@ Env vars:
     PF_DRY_RUN              — "1" to prevent Shopify writes (default: 0)
     REMOVE_BG_API_KEY       — Optional: remove.bg key for image processing
     SECRET_KEY              — Flask session secret
+    SHOPIFY_WEBHOOK_SECRET  — HMAC key for /inventory/webhooks/shopify/*
+    SHOPIFY_CACHE_WEBHOOKS  — "true" once those webhooks are subscribed: full
+                              cache refreshes become a daily reconciliation
+    SHOPIFY_WEBHOOK_WORKERS — Background threads applying webhook cache
+                              patches (default: 2)
 """
 
 import os
@@ -49,6 +54,8 @@ register_auth_hooks(
     # (scanning sealed UPCs onto Shopify variants). Everything else stays
     # manager+owner.
     role_overrides={"/inventory/barcode-bind": None},
+    # Shopify webhooks authenticate with their HMAC, not a session.
+    skip_jwt_prefixes=("/inventory/webhooks/",),
 )
 
 @app.before_request
@@ -95,6 +102,7 @@ from routes.bulk_edit import bp as bulk_edit_bp  # noqa: E402
 from routes.barcode_bind import bp as barcode_bind_bp  # noqa: E402
 from routes.bulk_add import bp as bulk_add_bp  # noqa: E402
 from routes.slab_crack import bp as slab_crack_bp  # noqa: E402
+from routes.shopify_webhooks import bp as shopify_webhooks_bp  # noqa: E402
 app.register_blueprint(inventory_bp)
 app.register_blueprint(breakdown_bp)
 app.register_blueprint(ai_bp)
@@ -102,6 +110,7 @@ app.register_blueprint(bulk_edit_bp)
 app.register_blueprint(barcode_bind_bp)
 app.register_blueprint(bulk_add_bp)
 app.register_blueprint(slab_crack_bp)
+app.register_blueprint(shopify_webhooks_bp)
 
 # Shared breakdown-cache blueprint (replaces cache CRUD, search, store-prices in breakdown.py)
 from breakdown_routes import create_breakdown_blueprint
@@ -145,6 +154,12 @@ def health():
     return {"status": "ok", "service": "inventory"}, 200
 
 
+@app.route("/health/db")
+def health_db():
+    """Connection pool metrics; behind the same JWT gate as the rest of the app."""
+    return db.pool_stats(), 200
+
+
 # ─── Startup ───────────────────────────────────────────────────────────────────
 
 if __name__ == "__main__":
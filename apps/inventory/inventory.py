@@ -68,12 +68,28 @@ def _get_last_sync_str() -> str:
     except Exception:
         return "Unknown"
 
-def _load_inventory() -> list[dict]:
+# Sortable columns → ORDER BY expression. Text sorts case-insensitively; NULL
+# prices / quantities sort last ascending and first descending.
+_SORT_SQL = {
+    "name":           "LOWER(c.title)",
+    "shopify_qty":    "c.shopify_qty",
+    "shopify_price":  "c.shopify_price",
+    "shopify_value":  "ROUND(c.shopify_qty * c.shopify_price, 2)",
+    "physical_count": "COALESCE(o.physical_count, 0)",
+    "notes":          "LOWER(COALESCE(o.notes, ''))",
+}
+
+def _iter_inventory(sort_col=None, sort_dir="asc"):
     """
-    Load the full inventory from inventory_product_cache + inventory_overrides.
-    Returns list of dicts with all display columns.
+    Stream the inventory from inventory_product_cache + inventory_overrides,
+    ordered by title or by `sort_col`. Yields dicts with all display columns.
+    Sorting happens in SQL so callers can keep just the rows they render
+    instead of materializing the whole catalog on every page view.
     """
-    rows = db.query("""
+    order = "c.title"
+    if sort_col in _SORT_SQL:
+        order = f"{_SORT_SQL[sort_col]} {'DESC' if sort_dir == 'desc' else 'ASC'}, c.title"
+    return db.stream(f"""
         SELECT
             c.shopify_product_id,
             c.shopify_variant_id,
@@ -89,9 +105,29 @@ def _load_inventory() -> list[dict]:
             COALESCE(o.notes, '')                           AS notes
         FROM inventory_product_cache c
         LEFT JOIN inventory_overrides o ON o.shopify_variant_id = c.shopify_variant_id
-        ORDER BY c.title
+        ORDER BY {order}
     """)
-    return [dict(r) for r in rows]
+
+def _load_page(limit, *, sort_col=None, sort_dir="asc", **filters):
+    """
+    One pass over the streamed inventory: returns (total_rows, totals, page)
+    where totals cover every row matching `filters` and page holds the first
+    `limit` of them in display order.
+    """
+    total_rows = 0
+    totals = {"count": 0, "shopify_qty": 0, "physical_count": 0, "shopify_value": 0}
+    page = []
+    for r in _iter_inventory(sort_col, sort_dir):
+        total_rows += 1
+        if not _matches(r, **filters):
+            continue
+        totals["count"] += 1
+        totals["shopify_qty"] += r.get("shopify_qty") or 0
+        totals["physical_count"] += r.get("physical_count") or 0
+        totals["shopify_value"] += (r.get("shopify_qty") or 0) * (r.get("shopify_price") or 0)
+        if len(page) < limit:
+            page.append(r)
+    return total_rows, totals, page
 
 def _save_override(variant_id: int, physical_count=None, notes=None):
     """Upsert physical_count / notes for a variant."""
@@ -164,7 +200,7 @@ def export_csv():
     if cm:
         cm.check_and_refresh_if_stale()
 
-    rows = _load_inventory()
+    rows = _iter_inventory()
 
     q          = (request.args.get("q") or "").strip().lower()
     in_stock   = request.args.get("in_stock") == "1"
@@ -189,22 +225,26 @@ def export_csv():
                     headers={"Content-Disposition": f"attachment; filename={filename}"})
 
 
-def _apply_filters(rows, *, q=None, in_stock=False, tag_any=None, status="all", qty_mismatch=False):
-    if status != "all":
-        rows = [r for r in rows if (r["shopify_status"] != "draft") == (status == "published")
-                or (status == "draft" and r["shopify_status"] == "draft")]
-    if q:
-        rows = [r for r in rows if q in (r.get("name") or "").lower()]
-    if in_stock:
-        rows = [r for r in rows if (r.get("shopify_qty") or 0) > 0]
+def _matches(r, *, q=None, in_stock=False, tag_any=None, status="all", qty_mismatch=False):
+    if status != "all" and not ((r["shopify_status"] != "draft") == (status == "published")
+                                or (status == "draft" and r["shopify_status"] == "draft")):
+        return False
+    if q and q not in (r.get("name") or "").lower():
+        return False
+    if in_stock and (r.get("shopify_qty") or 0) <= 0:
+        return False
     if tag_any:
-        def has_all(r):
-            tags_str = (r.get("shopify_tags") or "").lower()
-            return all(t in tags_str for t in tag_any)
-        rows = [r for r in rows if has_all(r)]
-    if qty_mismatch:
-        rows = [r for r in rows if r.get("physical_count", 0) != (r.get("shopify_qty") or 0)]
-    return rows
+        tags_str = (r.get("shopify_tags") or "").lower()
+        if not all(t in tags_str for t in tag_any):
+            return False
+    if qty_mismatch and r.get("physical_count", 0) == (r.get("shopify_qty") or 0):
+        return False
+    return True
+
+
+def _apply_filters(rows, **filters):
+    """Lazily filter an iterable of inventory rows (see _matches)."""
+    return (r for r in rows if _matches(r, **filters))
 
 
 @bp.route("/", methods=["GET", "POST"])
@@ -221,8 +261,6 @@ def index():
         mode = request.form.get("mode", "save")
         updates = request.form.to_dict(flat=True)
 
-        rows = _load_inventory()
-
         # Build index: row_index → row
         limit = int(request.args.get("limit", 400))
         q         = (request.args.get("q") or "").strip().lower()
@@ -233,10 +271,9 @@ def index():
         sort_col  = request.args.get("sort")
         sort_dir  = request.args.get("dir", "asc")
 
-        filtered = _apply_filters(rows, q=q, in_stock=in_stock, tag_any=tag_any,
-                                  status=status, qty_mismatch=qty_mm)
-        filtered = _sort_rows(filtered, sort_col, sort_dir)
-        page = filtered[:limit]
+        _, _, page = _load_page(limit, sort_col=sort_col, sort_dir=sort_dir,
+                                q=q, in_stock=in_stock, tag_any=tag_any,
+                                status=status, qty_mismatch=qty_mm)
 
         changed_rows = []
 
@@ -328,8 +365,6 @@ def index():
         return redirect(request.full_path or "/inventory")
 
     # ── GET (render) ─────────────────────────────────────────────────────────
-    rows = _load_inventory()
-
     q         = (request.args.get("q") or "").strip().lower()
     in_stock  = request.args.get("in_stock") == "1"
     tag_any   = [t.lower() for t in request.args.getlist("tag")]
@@ -339,20 +374,10 @@ def index():
     sort_dir  = request.args.get("dir", "asc")
     limit     = int(request.args.get("limit", 400))
 
-    total_rows = len(rows)
-    filtered   = _apply_filters(rows, q=q, in_stock=in_stock, tag_any=tag_any,
-                                 status=status, qty_mismatch=qty_mm)
-    filtered   = _sort_rows(filtered, sort_col, sort_dir)
-    page       = filtered[:limit]
-
-    totals = {
-        "count":         len(filtered),
-        "shopify_qty":   sum((r.get("shopify_qty") or 0) for r in filtered),
-        "physical_count": sum((r.get("physical_count") or 0) for r in filtered),
-        "shopify_value": sum(
-            (r.get("shopify_qty") or 0) * (r.get("shopify_price") or 0) for r in filtered
-        ),
-    }
+    total_rows, totals, page = _load_page(
+        limit, sort_col=sort_col, sort_dir=sort_dir,
+        q=q, in_stock=in_stock, tag_any=tag_any, status=status, qty_mismatch=qty_mm,
+    )
 
     meta = {
         "last_sync":  _get_last_sync_str(),
@@ -380,33 +405,18 @@ def index():
     )
 
 
-def _sort_rows(rows, sort_col, sort_dir):
-    SORTABLE = {"name", "shopify_qty", "shopify_price", "shopify_value", "physical_count", "notes"}
-    if sort_col not in SORTABLE:
-        return rows
-
-    def key(r):
-        v = r.get(sort_col)
-        if v is None:
-            return (1, 0, "")
-        if isinstance(v, (int, float)):
-            return (0, v, "")
-        return (0, 0, str(v).lower())
-
-    return sorted(rows, key=key, reverse=(sort_dir == "desc"))
-
-
 @bp.route("/push_prices", methods=["POST"])
 @requires_auth
 def push_prices():
-    rows = _load_inventory()
+    rows = db.stream("""
+        SELECT shopify_variant_id, shopify_price FROM inventory_product_cache
+        WHERE shopify_variant_id IS NOT NULL AND shopify_price IS NOT NULL
+        ORDER BY title
+    """, tuples=True)
     pushed = failed = 0
     for row in rows:
-        vid = row.get("shopify_variant_id")
-        price = row.get("shopify_price")
-        if vid and price is not None:
-            ok = _update_shopify_price(int(vid), float(price))
-            pushed += ok; failed += not ok
+        ok = _update_shopify_price(int(row.shopify_variant_id), float(row.shopify_price))
+        pushed += ok; failed += not ok
     label = "DRY RUN" if DRY_RUN else "LIVE"
     flash(f"💸 {label}: pushed prices for {pushed} variant(s){' (some failed)' if failed else ''}.",
           "success" if not failed else "warning")
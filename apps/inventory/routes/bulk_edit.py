@@ -24,6 +24,8 @@ from flask import Blueprint, request, jsonify, g
 
 import db
 import requests
+from shopify_batch import BatchWriter
+from shopify_throttle import gql_post
 
 logger = logging.getLogger(__name__)
 
@@ -127,17 +129,18 @@ def _shopify_headers():
     }
 
 
-def _gql(query: str, variables: dict = None) -> dict:
+def _gql(query: str, variables: dict = None, *, raise_user_errors: bool = True) -> dict:
     url = f"https://{SHOPIFY_STORE}/admin/api/{SHOPIFY_VERSION}/graphql.json"
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
-    resp = requests.post(url, headers=_shopify_headers(), json=payload, timeout=30)
-    resp.raise_for_status()
-    body = resp.json()
+    # Operator-driven edits: interactive priority on the shared cost bucket.
+    body = gql_post(url, _shopify_headers(), payload, timeout=30, priority="interactive")
     if "errors" in body:
         raise RuntimeError(f"GraphQL errors: {body['errors']}")
     data = body.get("data", {})
+    if not raise_user_errors:
+        return data
     # Surface userErrors from first mutation (if any)
     for v in data.values():
         if isinstance(v, dict):
@@ -162,21 +165,24 @@ def _variant_gid(vid) -> str:
     return f"gid://shopify/ProductVariant/{vid}"
 
 
-def _apply_tags_add(product_id, current_tags: str, new_tags: list[str]) -> tuple[str, str]:
+def _apply_tags_add(product_id, current_tags: str, new_tags: list[str],
+                    writer: BatchWriter = None, ref=None) -> tuple[str, str]:
+    """With a writer the mutation is only queued; _commit_cache applies the
+    cache update once the batch reports success."""
     existing = {t.strip() for t in (current_tags or "").split(",") if t.strip()}
     merged = sorted(existing | {t.strip() for t in new_tags if t.strip()}, key=str.lower)
     new_value = ", ".join(merged)
     if DRY_RUN:
         return current_tags or "", new_value
+    if writer is not None:
+        writer.add_tags(product_id, new_tags, ref=ref)
+        return current_tags or "", new_value
     _gql("""
         mutation tagsAdd($id: ID!, $tags: [String!]!) {
           tagsAdd(id: $id, tags: $tags) { userErrors { field message } }
         }
     """, {"id": _product_gid(product_id), "tags": new_tags})
-    db.execute(
-        "UPDATE inventory_product_cache SET tags=%s WHERE shopify_product_id=%s",
-        (new_value, product_id),
-    )
+    _commit_cache("tags", product_id, None, new_value)
     return current_tags or "", new_value
 
 
@@ -233,10 +239,20 @@ def _apply_product_field(product_id, field: str, old_value, new_value) -> tuple[
     return str(old_value or ""), str(new_value or "")
 
 
-def _apply_variant_price(product_id, variant_id, field: str, old_value, new_value) -> tuple[str, str]:
-    """Set price or compareAtPrice via productVariantsBulkUpdate."""
+def _apply_variant_price(product_id, variant_id, field: str, old_value, new_value,
+                         writer: BatchWriter = None, ref=None) -> tuple[str, str]:
+    """Set price or compareAtPrice via productVariantsBulkUpdate (queued on
+    `writer` when given, like _apply_tags_add)."""
     if DRY_RUN:
         return str(old_value or ""), str(new_value or "")
+    if writer is not None:
+        if field == "price":
+            writer.set_variant_price(product_id, variant_id, new_value, ref=ref)
+        elif field == "compare_at_price":
+            writer.set_variant_price(product_id, variant_id, compare_at_price=new_value or None, ref=ref)
+        else:
+            raise ValueError(f"Unknown variant price field: {field}")
+        return str(old_value or ""), str(new_value or "")
     variant_input = {"id": _variant_gid(variant_id)}
     if field == "price":
         variant_input["price"] = f"{float(new_value):.2f}"
@@ -254,12 +270,22 @@ def _apply_variant_price(product_id, variant_id, field: str, old_value, new_valu
         }
     """, {"productId": _product_gid(product_id), "variants": [variant_input]})
 
-    if field == "price":
+    _commit_cache(field, product_id, variant_id, new_value)
+    return str(old_value or ""), str(new_value or "")
+
+
+def _commit_cache(field: str, product_id, variant_id, new_value) -> None:
+    """Mirror a successful Shopify write into inventory_product_cache."""
+    if field == "tags":
+        db.execute(
+            "UPDATE inventory_product_cache SET tags=%s WHERE shopify_product_id=%s",
+            (new_value, product_id),
+        )
+    elif field == "price":
         db.execute(
             "UPDATE inventory_product_cache SET shopify_price=%s WHERE shopify_variant_id=%s",
             (float(new_value), variant_id),
         )
-    return str(old_value or ""), str(new_value or "")
 
 
 def _apply_variant_weight(variant_id, old_value, new_weight_oz: float) -> tuple[str, str]:
@@ -274,11 +300,16 @@ def _apply_variant_weight(variant_id, old_value, new_weight_oz: float) -> tuple[
 
 # ─── Core operation dispatcher ─────────────────────────────────────────────────
 
-def _dispatch(op: dict, row: dict) -> tuple[str, str, str]:
+# Op kinds that can be queued on a BatchWriter instead of sent one by one.
+BATCHABLE_KINDS = ("tags_add", "price", "compare_at_price")
+
+
+def _dispatch(op: dict, row: dict, writer: BatchWriter = None, ref=None) -> tuple[str, str, str]:
     """
     Apply one operation to one row.
     Returns (field_label, old_value_str, new_value_str).
-    Raises on failure.
+    Raises on failure. With a writer, BATCHABLE_KINDS are only queued —
+    the caller flushes it and records the outcome per `ref`.
     """
     kind = op["kind"]
     pid = row["shopify_product_id"]
@@ -286,7 +317,7 @@ def _dispatch(op: dict, row: dict) -> tuple[str, str, str]:
 
     if kind == "tags_add":
         tags = [t.strip() for t in op.get("tags", []) if t.strip()]
-        old, new = _apply_tags_add(pid, row.get("tags") or "", tags)
+        old, new = _apply_tags_add(pid, row.get("tags") or "", tags, writer, ref)
         return "tags", old, new
 
     if kind == "tags_remove":
@@ -304,11 +335,13 @@ def _dispatch(op: dict, row: dict) -> tuple[str, str, str]:
         return kind, old, new
 
     if kind == "price":
-        old, new = _apply_variant_price(pid, vid, "price", row.get("shopify_price"), op["value"])
+        old, new = _apply_variant_price(pid, vid, "price", row.get("shopify_price"), op["value"],
+                                        writer, ref)
         return "price", old, new
 
     if kind == "compare_at_price":
-        old, new = _apply_variant_price(pid, vid, "compare_at_price", None, op["value"])
+        old, new = _apply_variant_price(pid, vid, "compare_at_price", None, op["value"],
+                                        writer, ref)
         return "compare_at_price", old, new
 
     raise ValueError(f"Unknown op kind: {kind}")
@@ -474,32 +507,61 @@ def api_execute():
     failed = 0
     errors = []
 
+    def log_ok(r, field, old_v, new_v):
+        nonlocal ok
+        db.execute("""
+            INSERT INTO bulk_edit_log
+            (batch_id, shopify_product_id, shopify_variant_id, title,
+             field, old_value, new_value, status, user_email)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,'ok',%s)
+        """, (batch_id, r["shopify_product_id"], r["shopify_variant_id"],
+              r["title"], field, old_v, new_v, email))
+        ok += 1
+
+    def log_failed(r, op, err):
+        nonlocal failed
+        err = err[:500]
+        db.execute("""
+            INSERT INTO bulk_edit_log
+            (batch_id, shopify_product_id, shopify_variant_id, title,
+             field, old_value, new_value, status, error, user_email)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,'failed',%s,%s)
+        """, (batch_id, r["shopify_product_id"], r["shopify_variant_id"],
+              r["title"], op.get("kind"), None, None, err, email))
+        failed += 1
+        errors.append({"variant_id": r["shopify_variant_id"],
+                       "title": r["title"], "error": err})
+
+    # Price / compare-at / tags_add writes are queued and sent grouped by
+    # product in a few aliased requests. tags_add stays immediate when the
+    # same batch also removes tags, so add/remove keep their order.
+    kinds = {op.get("kind") for op in ops}
+    batchable = set(BATCHABLE_KINDS) - ({"tags_add"} if "tags_remove" in kinds else set())
+    writer = BatchWriter(lambda q, v: _gql(q, v, raise_user_errors=False))
+    queued = []   # ref -> (row, op, field, old, new)
+
     for r in rows:
         for op in ops:
             try:
+                if op.get("kind") in batchable and not DRY_RUN:
+                    field, old_v, new_v = _dispatch(op, r, writer, ref=len(queued))
+                    queued.append((r, op, field, old_v, new_v))
+                    continue
                 field, old_v, new_v = _dispatch(op, r)
-                db.execute("""
-                    INSERT INTO bulk_edit_log
-                    (batch_id, shopify_product_id, shopify_variant_id, title,
-                     field, old_value, new_value, status, user_email)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,'ok',%s)
-                """, (batch_id, r["shopify_product_id"], r["shopify_variant_id"],
-                      r["title"], field, old_v, new_v, email))
-                ok += 1
+                log_ok(r, field, old_v, new_v)
             except Exception as e:
-                err = str(e)[:500]
-                db.execute("""
-                    INSERT INTO bulk_edit_log
-                    (batch_id, shopify_product_id, shopify_variant_id, title,
-                     field, old_value, new_value, status, error, user_email)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,'failed',%s,%s)
-                """, (batch_id, r["shopify_product_id"], r["shopify_variant_id"],
-                      r["title"], op.get("kind"), None, None, err, email))
-                failed += 1
-                errors.append({"variant_id": r["shopify_variant_id"],
-                               "title": r["title"], "error": err})
+                log_failed(r, op, str(e))
                 logger.exception(f"Bulk edit failed variant={r['shopify_variant_id']} op={op}")
 
+    for res in writer.flush():
+        r, op, field, old_v, new_v = queued[res["ref"]]
+        if res["ok"]:
+            _commit_cache(field, r["shopify_product_id"], r["shopify_variant_id"], new_v)
+            log_ok(r, field, old_v, new_v)
+        else:
+            log_failed(r, op, res["error"] or "failed")
+            logger.warning(f"Bulk edit failed variant={r['shopify_variant_id']} op={op}: {res['error']}")
+
     return jsonify({
         "batch_id": batch_id,
         "ok": ok,
@@ -0,0 +1,93 @@
+"""
+routes/shopify_webhooks.py — Shopify webhook receivers that keep
+inventory_product_cache current without full re-pulls.
+
+Subscribe (Shopify Admin → Notifications → Webhooks, JSON) to:
+    products/create, products/update  → /inventory/webhooks/shopify/products
+    products/delete                   → /inventory/webhooks/shopify/products-delete
+    inventory_levels/update           → /inventory/webhooks/shopify/inventory-levels
+    orders/paid                       → /inventory/webhooks/shopify/orders-paid
+
+Every body is HMAC-verified against SHOPIFY_WEBHOOK_SECRET before it is
+read. Verified deliveries are acknowledged straight away and the cache patch
+(which calls back into Shopify) runs on a small background pool, so a slow
+Admin API never pushes us past Shopify's 5-second delivery timeout. Handlers
+re-read the touched products from Shopify (see
+CacheManager.refresh_products), so duplicate and out-of-order deliveries are
+harmless; a patch that fails is logged and picked up by the next full
+refresh. Set SHOPIFY_CACHE_WEBHOOKS=true on every service sharing the cache
+so their staleness checks stop triggering full refreshes.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, request, jsonify
+
+from webhook_verify import verify_shopify_hmac
+from routes.inventory import _get_cache_manager
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint("shopify_webhooks", __name__, url_prefix="/inventory/webhooks/shopify")
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SHOPIFY_WEBHOOK_WORKERS", "2")),
+    thread_name_prefix="shopify-webhook",
+)
+
+
+def _verified_payload():
+    """Parsed JSON body, or None if the HMAC doesn't match."""
+    raw = request.get_data()
+    if not verify_shopify_hmac(raw, request.headers.get("X-Shopify-Hmac-Sha256", "")):
+        return None
+    try:
+        return json.loads(raw.decode("utf-8") or "{}")
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def _apply(apply, cm, payload, topic):
+    try:
+        n = apply(cm, payload)
+    except Exception as e:
+        logger.exception(f"webhook {topic} failed: {e}")
+        return
+    logger.info(f"webhook {topic}: {n} cache row(s) touched")
+
+
+def _handle(apply):
+    payload = _verified_payload()
+    if payload is None:
+        return jsonify({"error": "unauthorized"}), 401
+    cm = _get_cache_manager()
+    if cm is None:
+        # Shopify not configured on this instance — nothing to patch.
+        return jsonify({"ok": True, "skipped": "no cache manager"})
+    topic = request.headers.get("X-Shopify-Topic", request.path)
+    _executor.submit(_apply, apply, cm, payload, topic)
+    return jsonify({"ok": True, "queued": True})
+
+
+@bp.route("/products", methods=["POST"])
+def products_changed():
+    return _handle(lambda cm, p: cm.refresh_products([p.get("id")]))
+
+
+@bp.route("/products-delete", methods=["POST"])
+def products_deleted():
+    return _handle(lambda cm, p: cm.delete_product(p["id"]) if p.get("id") else 0)
+
+
+@bp.route("/inventory-levels", methods=["POST"])
+def inventory_levels_changed():
+    return _handle(lambda cm, p: cm.apply_inventory_level(p["inventory_item_id"])
+                   if p.get("inventory_item_id") else 0)
+
+
+@bp.route("/orders-paid", methods=["POST"])
+def orders_paid():
+    return _handle(lambda cm, p: cm.apply_order(p))
@@ -16,16 +16,20 @@ import re
 import hmac
 import hashlib
 import base64
+import functools
 import logging
 import secrets
 import time
 import threading
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests as _requests
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, Response, render_template, redirect, g
+from flask import (Flask, request, jsonify, Response, render_template, redirect, g,
+                   has_request_context)
 
 import db
+import http_pool
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
@@ -138,6 +142,10 @@ SHOPIFY_STOREFRONT_URL = os.environ.get("SHOPIFY_STOREFRONT_URL", "https://pack-
 # Feature flag: disable Champion checkout (browse-only mode)
 KIOSK_CHECKOUT_ENABLED = os.environ.get("KIOSK_CHECKOUT_ENABLED", "false").lower() == "true"
 
+# Serve /api/browse from the kiosk_tiles index (shared/026_kiosk_tiles.sql)
+# when the request has no row-level filters. Off → always aggregate live.
+KIOSK_TILE_INDEX = os.environ.get("KIOSK_TILE_INDEX", "true").lower() == "true"
+
 # Access key — legacy in-store gate (kept as fallback during cookie migration)
 KIOSK_ACCESS_KEY = os.environ.get("KIOSK_ACCESS_KEY", "")
 
@@ -166,6 +174,8 @@ SLAB_TAG   = "slab"
 # Evolution Black Star Promos" still starts with "Mega Evolution" → Mega
 # Evolution era. Order within each era doesn't matter; eras are tried in
 # the order most-recent-first so newer sets always win when prefixes nest.
+# Queries read the result from kiosk_set_eras; _sync_set_eras() pushes edits
+# here to the database the first time each process uses it.
 ERA_PREFIXES = {
     "Mega Evolution": [
         "Mega Evolution",   # base set + Mega Evolution Black Star Promos
@@ -329,8 +339,61 @@ GAME_FILTER_SCHEMA = {
 }
 
 
-def _resolve_cache_image(tcg, variant, sid):
-    """Resolve the correct cache image for a card, variant-aware.
+# Per-process LRU of image resolutions, shared by /api/browse and /api/card.
+# Keyed on (tcgplayer_id, normalized variant, scrydex_id); misses (None) are
+# cached too. The TTL lets the nightly Scrydex sync's new images show up.
+_IMAGE_CACHE_MAX = int(os.environ.get("KIOSK_IMAGE_CACHE_MAX", "5000"))
+_IMAGE_CACHE_TTL = 3600
+_image_cache: "OrderedDict[tuple, tuple[float, dict | None]]" = OrderedDict()
+_image_cache_lock = threading.Lock()
+
+# One pass of the resolution order below for every key at once. Each branch
+# is an index probe on (tcgplayer_id, variant_norm) / (scrydex_id, variant)
+# (shared/027_scrydex_variant_norm.sql); the lowest step that matches wins.
+_RESOLVE_IMAGES_SQL = """
+    SELECT k.i, img.img_l, img.img_m, img.img_s
+    FROM unnest(%s::bigint[], %s::text[], %s::text[], %s::text[])
+         WITH ORDINALITY AS k(tcg, nvar, shadow, sid, i)
+    LEFT JOIN LATERAL (
+        SELECT img_l, img_m, img_s FROM (
+            (SELECT 1 AS step, image_large AS img_l, image_medium AS img_m,
+                    image_small AS img_s
+             FROM scrydex_price_cache
+             WHERE tcgplayer_id = k.tcg AND image_large IS NOT NULL
+               AND variant_norm = k.nvar
+             LIMIT 1)
+            UNION ALL
+            (SELECT 2, image_large, image_medium, image_small
+             FROM scrydex_price_cache
+             WHERE tcgplayer_id = k.tcg AND image_large IS NOT NULL
+               AND ((k.shadow = 'first' AND variant_norm LIKE '%%firstedition%%')
+                 OR (k.shadow = 'other' AND variant_norm LIKE '%%shadowless%%'
+                                        AND variant_norm NOT LIKE '%%firstedition%%'))
+             LIMIT 1)
+            UNION ALL
+            (SELECT 3, MIN(image_large), MIN(image_medium), MIN(image_small)
+             FROM scrydex_price_cache
+             WHERE tcgplayer_id = k.tcg AND image_large IS NOT NULL
+             HAVING COUNT(DISTINCT image_large) = 1)
+            UNION ALL
+            (SELECT 4, MAX(image_large), MAX(image_medium), MAX(image_small)
+             FROM scrydex_price_cache
+             WHERE scrydex_id = k.sid
+             HAVING COUNT(*) > 0)
+        ) c
+        ORDER BY step
+        LIMIT 1
+    ) img ON TRUE
+"""
+
+
+def _image_key(tcg, variant, sid) -> tuple:
+    # Same folding as scrydex_price_cache.variant_norm.
+    return (tcg or None, re.sub(r"[^a-z0-9]", "", (variant or "").lower()), sid or None)
+
+
+def _resolve_cache_images(keys) -> dict:
+    """Resolve the correct cache image for many cards at once, variant-aware.
 
     The image is variant-specific, but the right key depends on the game:
       - One Piece (and most TCGs) give every variant its own tcgplayer_id, so
@@ -339,80 +402,91 @@ def _resolve_cache_image(tcg, variant, sid):
       - Pokemon Base Set 1st-Ed vs Unlimited Shadowless (and MTG prerelease
         stamps) share ONE tcgplayer_id but have different art — there the
         variant disambiguates.
-    So: exact (tcgplayer_id, normalized variant) first, then any image for the
-    tcgplayer_id, then scrydex_id as a last resort. Returns a dict with
-    img_l/img_m/img_s or None. Variant strings are normalized (lowercase, strip
+    So: exact (tcgplayer_id, normalized variant) first, then the Base Set
+    shadowless tiebreak, then any image for the tcgplayer_id, then scrydex_id
+    as a last resort. Variant strings are normalized (lowercase, strip
     non-alphanumerics) so raw_cards "Unlimitedshadowless" matches cache
     "unlimitedShadowless".
+
+    Base Set shadowless tiebreak: "1st Edition" and "Shadowless" share one
+    tcgplayer_id with different art (1st Ed = stamped no-shadow, Shadowless =
+    no-stamp no-shadow "2nd run"; true Unlimited has its own tcg_id). Operator
+    labels ("Shadowless", "Shadowless Holofoil") don't string-match the cache's
+    clunky "unlimitedShadowless" / "firstEditionShadowless" names, so resolve
+    by edition signal: 1st Ed is always explicitly labeled, so a 1st-ed label
+    takes the firstEdition image; any other shadowless takes the non-1st-ed one.
+    The tcg-level fallback only fires when the tcg_id is unambiguous (one
+    distinct image) — never pick arbitrarily among differing art.
+
+    `keys` is an iterable of (tcgplayer_id, variant, scrydex_id). Returns
+    {key: {img_l, img_m, img_s} or None}. Cached keys skip the database; the
+    rest resolve in a single query.
     """
-    sx = None
-    nvar = "".join(ch for ch in (variant or "").lower() if ch.isalnum())
-    if tcg:
-        # 1) exact (tcgplayer_id, normalized variant)
-        sx = db.query_one("""
-            SELECT image_large AS img_l, image_medium AS img_m,
-                   image_small AS img_s
-            FROM scrydex_price_cache
-            WHERE tcgplayer_id = %s AND image_large IS NOT NULL
-              AND regexp_replace(lower(coalesce(variant,'')),'[^a-z0-9]','','g')
-                  = regexp_replace(lower(coalesce(%s,'')),'[^a-z0-9]','','g')
-            LIMIT 1
-        """, (tcg, variant))
-        # 2) Base Set shadowless tiebreak. "1st Edition" and "Shadowless" share
-        #    one tcgplayer_id with different art (1st Ed = stamped no-shadow,
-        #    Shadowless = no-stamp no-shadow "2nd run"; true Unlimited has its
-        #    own tcg_id). Operator labels ("Shadowless", "Shadowless Holofoil")
-        #    don't string-match the cache's clunky "unlimitedShadowless" /
-        #    "firstEditionShadowless" names, so resolve by edition signal:
-        #    1st Ed is always explicitly labeled, so a 1st-ed label takes the
-        #    firstEdition image; any other shadowless takes the non-1st-ed one.
-        if not sx and "shadowless" in nvar:
-            if "firstedition" in nvar or nvar.startswith(("1st", "first")):
-                sx = db.query_one("""
-                    SELECT image_large AS img_l, image_medium AS img_m,
-                           image_small AS img_s
-                    FROM scrydex_price_cache
-                    WHERE tcgplayer_id = %s AND image_large IS NOT NULL
-                      AND regexp_replace(lower(variant),'[^a-z0-9]','','g')
-                          LIKE '%%firstedition%%'
-                    LIMIT 1
-                """, (tcg,))
+    out: dict = {}
+    missing: dict[tuple, list] = {}
+    now = time.monotonic()
+    with _image_cache_lock:
+        for key in keys:
+            ck = _image_key(*key)
+            hit = _image_cache.get(ck)
+            if hit and now - hit[0] < _IMAGE_CACHE_TTL:
+                _image_cache.move_to_end(ck)
+                out[key] = hit[1]
+            elif ck[0] or ck[2]:
+                missing.setdefault(ck, []).append(key)
             else:
-                sx = db.query_one("""
-                    SELECT image_large AS img_l, image_medium AS img_m,
-                           image_small AS img_s
-                    FROM scrydex_price_cache
-                    WHERE tcgplayer_id = %s AND image_large IS NOT NULL
-                      AND regexp_replace(lower(variant),'[^a-z0-9]','','g')
-                          LIKE '%%shadowless%%'
-                      AND regexp_replace(lower(variant),'[^a-z0-9]','','g')
-                          NOT LIKE '%%firstedition%%'
-                    LIMIT 1
-                """, (tcg,))
-        # 3) tcg-level image, but ONLY when the tcg_id is unambiguous (one
-        #    distinct image) — never pick arbitrarily among differing art.
-        if not sx:
-            sx = db.query_one("""
-                SELECT MIN(image_large) AS img_l, MIN(image_medium) AS img_m,
-                       MIN(image_small) AS img_s
-                FROM scrydex_price_cache
-                WHERE tcgplayer_id = %s AND image_large IS NOT NULL
-                HAVING COUNT(DISTINCT image_large) = 1
-            """, (tcg,))
-    if not sx and sid:
-        sx = db.query_one("""
-            SELECT MAX(image_large) AS img_l, MAX(image_medium) AS img_m,
-                   MAX(image_small) AS img_s
-            FROM scrydex_price_cache WHERE scrydex_id = %s
-        """, (sid,))
-    return sx
+                out[key] = None
+    if not missing:
+        return out
+
+    cks = list(missing)
+    shadow = []
+    for _, nvar, _ in cks:
+        if "shadowless" not in nvar:
+            shadow.append(None)
+        elif "firstedition" in nvar or nvar.startswith(("1st", "first")):
+            shadow.append("first")
+        else:
+            shadow.append("other")
+    rows = db.query_prepared("kiosk_resolve_images", _RESOLVE_IMAGES_SQL, (
+        [ck[0] for ck in cks], [ck[1] for ck in cks], shadow, [ck[2] for ck in cks],
+    ))
+    resolved = {ck: None for ck in cks}
+    for r in rows:
+        if r["img_l"] or r["img_m"] or r["img_s"]:
+            resolved[cks[r["i"] - 1]] = {"img_l": r["img_l"], "img_m": r["img_m"],
+                                         "img_s": r["img_s"]}
+    with _image_cache_lock:
+        for ck, sx in resolved.items():
+            _image_cache[ck] = (now, sx)
+            _image_cache.move_to_end(ck)
+            for key in missing[ck]:
+                out[key] = sx
+        while len(_image_cache) > _IMAGE_CACHE_MAX:
+            _image_cache.popitem(last=False)
+    return out
+
+
+def _variant_counts(scrydex_ids) -> dict:
+    """{scrydex_id: number of distinct Scrydex variants} in one query."""
+    sids = [s for s in set(scrydex_ids) if s]
+    if not sids:
+        return {}
+    rows = db.query_prepared("kiosk_variant_counts", """
+        SELECT scrydex_id, COUNT(DISTINCT variant) AS n
+        FROM scrydex_price_cache WHERE scrydex_id = ANY(%s::text[])
+        GROUP BY scrydex_id
+    """, (sids,))
+    return {r["scrydex_id"]: int(r["n"]) for r in rows}
 
 
 def _classify_era(set_name: str) -> str:
     """Map a set_name to an era using case-insensitive prefix match.
     Anything unmatched (Base Set, Jungle, Fossil, Team Rocket, Gym, Neo,
     e-Card, EX series, Diamond & Pearl, Platinum, HGSS, Call of Legends,
-    JP-only sets, etc.) falls into 'Vintage'."""
+    JP-only sets, etc.) falls into 'Vintage'. kiosk_classify_era() in
+    shared/028_kiosk_set_eras.sql is the SQL twin; this one serves era
+    filters until kiosk_set_eras is usable (see _set_eras_ready)."""
     if not set_name:
         return "Vintage"
     sn = set_name.strip().lower()
@@ -423,6 +497,91 @@ def _classify_era(set_name: str) -> str:
     return "Vintage"
 
 
+def _sync_set_eras() -> bool:
+    """Mirror ERA_PREFIXES into kiosk_era_prefixes and reclassify every set in
+    kiosk_set_eras whose era changed (shared/028_kiosk_set_eras.sql); a no-op
+    when the rules already match. Returns False when migration 028 isn't
+    applied or the sync failed."""
+    rules = []
+    for priority, (era, prefixes) in enumerate(ERA_PREFIXES.items()):
+        for prefix in prefixes:
+            rules.append((prefix, era, priority))
+    try:
+        row = db.query_one("SELECT to_regclass('kiosk_set_eras') IS NOT NULL AS ok")
+        if not (row and row["ok"]):
+            logger.warning("kiosk_set_eras missing — era filters classify in Python")
+            return False
+        current = {(r["prefix"], r["era"], r["priority"])
+                   for r in db.query("SELECT prefix, era, priority FROM kiosk_era_prefixes")}
+        if current == set(rules):
+            return True
+        with db.transaction() as cur:
+            # Serialize with other kiosk workers booting at the same time.
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext('kiosk_era_prefixes'))")
+            cur.execute("DELETE FROM kiosk_era_prefixes")
+            db.execute_values_batch(
+                "INSERT INTO kiosk_era_prefixes (prefix, era, priority) VALUES %s "
+                "ON CONFLICT (prefix) DO NOTHING", rules)
+            cur.execute("""
+                INSERT INTO kiosk_set_eras (set_name, era)
+                SELECT DISTINCT set_name, kiosk_classify_era(set_name)
+                FROM raw_cards WHERE set_name IS NOT NULL
+                ON CONFLICT (set_name) DO UPDATE
+                    SET era = EXCLUDED.era, classified_at = NOW()
+                    WHERE kiosk_set_eras.era IS DISTINCT FROM EXCLUDED.era
+            """)
+            logger.info(f"era rules synced; {cur.rowcount} sets (re)classified")
+        return True
+    except Exception as e:
+        logger.warning(f"_sync_set_eras warning: {e}")
+        return False
+
+
+# kiosk_set_eras is only read once this process has synced ERA_PREFIXES into
+# it — the 028 backfill classifies with no rules, so before that every set
+# reads Vintage. Until then (migration not applied, or the sync failed) era
+# filters fall back to _classify_era, and the sync is retried every
+# _SET_ERAS_RECHECK seconds, so a migration applied after startup takes over
+# without a restart.
+_SET_ERAS_RECHECK = 300
+_set_eras_ok = False
+_set_eras_checked_at = float("-inf")
+_set_eras_lock = threading.Lock()
+
+
+def _set_eras_ready() -> bool:
+    global _set_eras_ok, _set_eras_checked_at
+    if _set_eras_ok:
+        return True
+    if time.monotonic() - _set_eras_checked_at < _SET_ERAS_RECHECK:
+        return False
+    with _set_eras_lock:
+        if not _set_eras_ok and time.monotonic() - _set_eras_checked_at >= _SET_ERAS_RECHECK:
+            _set_eras_checked_at = time.monotonic()
+            _set_eras_ok = _sync_set_eras()
+    return _set_eras_ok
+
+
+def _era_filter(era: str) -> tuple[str, list]:
+    """raw_cards / kiosk_tiles predicate on set_name for one era. Membership
+    avoids the loose-LIKE bugs (e.g. XY filter previously matched 'Prismatic
+    Evolutions' via the literal keyword 'Evolutions')."""
+    if _set_eras_ready():
+        return "set_name IN (SELECT set_name FROM kiosk_set_eras WHERE era = %s)", [era]
+    # Fallback: classify the in-stock set_names here.
+    all_sets = db.query(
+        "SELECT DISTINCT set_name FROM raw_cards "
+        "WHERE state IN ('STORED','DISPLAY') AND set_name IS NOT NULL"
+    )
+    era_sets = [r["set_name"] for r in all_sets if _classify_era(r["set_name"]) == era]
+    if not era_sets:
+        # Era selected but no in-stock sets for it — force empty result.
+        return "FALSE", []
+    return f"set_name IN ({','.join(['%s'] * len(era_sets))})", era_sets
+
+
+_set_eras_ready()
+
 
 @app.route("/")
 def index():
@@ -856,11 +1015,449 @@ def _build_meta_filter_subquery(game: str,
     return subq, [sx_game, *p]
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# Read-API response cache — ETag + in-memory copies keyed on inventory generation
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# Several iPads idling on the same default grid all poll the same handful of
+# URLs, and the answers only change when inventory does. Migration 029 bumps
+# kiosk_inventory_generation_seq on every statement that changes raw_cards,
+# holds, hold_items, inventory_product_cache or kiosk_set_eras (intake,
+# pushes, holds, scan-out, returns). @_generation_cached views:
+#   - tag every 200 with an ETag over (path, mode, normalized args, version)
+#     and answer a matching If-None-Match with 304 without running the view;
+#   - keep the response body in a per-process LRU and replay it while the
+#     version is unchanged.
+# The version also carries the Scrydex sync generation (images / variant
+# counts come from scrydex_price_cache) and a KIOSK_RESPONSE_CACHE_TTL wall-
+# clock bucket, which bounds how long a response computed mid-transaction
+# (generation already bumped, rows not yet committed) can be served.
+
+KIOSK_RESPONSE_CACHE_TTL = int(os.environ.get("KIOSK_RESPONSE_CACHE_TTL", "60"))
+KIOSK_RESPONSE_CACHE_MAX = int(os.environ.get("KIOSK_RESPONSE_CACHE_MAX", "1000"))
+# Lets Safari show the last grid instantly while it revalidates.
+_STALE_WHILE_REVALIDATE = 30
+# Args that never change the response: the legacy access key and jQuery-style
+# cache busters.
+_UNCACHED_ARGS = ("key", "_")
+
+_response_cache: "OrderedDict[tuple, tuple[str, bytes]]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+# How often to re-check that migration 029 is applied, so a kiosk started
+# before the migration turns caching on without a restart.
+_GENERATION_RECHECK = 300
+_generation_ready: bool | None = None
+_generation_checked_at = 0.0
+
+
+def _cache_version() -> str | None:
+    """Current inventory version string, or None when caching is off
+    (KIOSK_RESPONSE_CACHE_TTL=0, migration 029 not applied, or the read
+    failed). Read once per request."""
+    if KIOSK_RESPONSE_CACHE_TTL <= 0:
+        return None
+    if has_request_context():
+        if "cache_version" not in g:
+            g.cache_version = _read_cache_version()
+        return g.cache_version
+    return _read_cache_version()
+
+
+def _read_cache_version() -> str | None:
+    global _generation_ready, _generation_checked_at
+    try:
+        if time.monotonic() - _generation_checked_at > _GENERATION_RECHECK:
+            row = db.query_one(
+                "SELECT to_regclass('kiosk_inventory_generation_seq') IS NOT NULL AS ok")
+            ready = bool(row and row["ok"])
+            if not ready and _generation_ready is not False:
+                logger.warning("kiosk_inventory_generation_seq missing — read APIs uncached")
+            _generation_ready, _generation_checked_at = ready, time.monotonic()
+        if not _generation_ready:
+            return None
+        rows = db.query_prepared("kiosk_cache_version", """
+            SELECT (SELECT last_value FROM kiosk_inventory_generation_seq) AS inv,
+                   (SELECT last_value FROM scrydex_sync_generation_seq) AS sx
+        """)
+        row = rows[0]
+    except Exception as e:
+        logger.debug(f"inventory generation read failed: {e}")
+        return None
+    return f"{row['inv']}.{row['sx']}.{int(time.time()) // KIOSK_RESPONSE_CACHE_TTL}"
+
+
+def _generation_cached(view):
+    """Serve a read-only JSON view through the response cache (see above).
+    Only 200s are cached; responses vary by kiosk mode (Champions don't see
+    binder stock or sealed/slabs)."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        version = _cache_version()
+        if version is None:
+            return view(*args, **kwargs)
+        key = (request.path, g.get("kiosk_mode"),
+               tuple(sorted((k, v) for k, v in request.args.items(multi=True)
+                            if k not in _UNCACHED_ARGS)))
+        etag = hashlib.sha1(repr((key, version)).encode("utf-8")).hexdigest()[:24]
+
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        else:
+            with _response_cache_lock:
+                hit = _response_cache.get(key)
+                if hit and hit[0] == version:
+                    _response_cache.move_to_end(key)
+            if hit and hit[0] == version:
+                resp = Response(hit[1], status=200, mimetype="application/json")
+            else:
+                resp = app.make_response(view(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+                with _response_cache_lock:
+                    _response_cache[key] = (version, resp.get_data())
+                    _response_cache.move_to_end(key)
+                    while len(_response_cache) > KIOSK_RESPONSE_CACHE_MAX:
+                        _response_cache.popitem(last=False)
+        resp.set_etag(etag)
+        resp.headers["Cache-Control"] = (
+            f"private, max-age=0, stale-while-revalidate={_STALE_WHILE_REVALIDATE}")
+        resp.headers["Vary"] = "Cookie, X-Champion-Email, X-Kiosk-Key"
+        return resp
+    return wrapper
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Facet engine — one scan behind /api/games, /api/eras, /api/sets,
+# /api/illustrators and /api/filter-meta
+# ═══════════════════════════════════════════════════════════════════════════════
+#
+# A filter change on the iPad refreshes every pill / chip group at once, and
+# each of those endpoints used to rebuild its WHERE by hand and scan raw_cards
+# (filter-meta once per chip group, with the meta join). Now:
+#
+#   1. _facet_snapshot() scans the in-stock universe ONCE per KIOSK_FACET_TTL
+#      seconds: every available copy with the tile key, the row-level columns
+#      the filters read, and its scrydex_card_meta facet values (colors /
+#      card_type / domain / artist, per GAME_FILTER_SCHEMA).
+#   2. _facet_masks() applies the current selection to that snapshot in one
+#      pass, recording per row which filter groups it FAILS as a bitmask.
+#   3. Each facet counts rows whose mask is clear of every group but its own
+#      (mask & ~own == 0) — "all other filters applied" without a query per
+#      facet.
+#
+# Both the masks and each endpoint's payload are memoized on the snapshot per
+# normalized filter-state key, so the five requests behind one filter change
+# cost one scan at most and usually none.
+
+KIOSK_FACET_TTL = float(os.environ.get("KIOSK_FACET_TTL", "20"))
+
+# Filter groups (bits in a row's fail mask).
+_FG_Q         = 1 << 0
+_FG_CONDITION = 1 << 1
+_FG_PRICE     = 1 << 2
+_FG_ADDED     = 1 << 3
+_FG_SET       = 1 << 4
+_FG_ERA       = 1 << 5
+_FG_RARITY    = 1 << 6
+_FG_COLORS    = 1 << 7
+_FG_CARD_TYPE = 1 << 8
+_FG_DOMAIN    = 1 << 9
+_FG_ARTIST    = 1 << 10
+# Survive a game switch in the UI, so they bind every game's pill (see
+# /api/games); everything else binds only the active game.
+_FG_AGNOSTIC  = _FG_Q | _FG_CONDITION | _FG_PRICE | _FG_ADDED
+
+_FACET_META_KEYS = ("colors", "card_type", "domain", "artist")
+
+_facet_snap: dict | None = None
+_facet_lock = threading.Lock()
+
+
+def _facet_scan_sql(set_eras: bool) -> tuple[str, list]:
+    """The snapshot query. Facet fields differ per game (MTG colors live in
+    raw->'color_identity', OP's in the colors column, ...), so each comes out
+    as one jsonb column via a CASE over the game — arrays decode to lists,
+    text fields to str. Without `set_eras` the era column is NULL and
+    _facet_snapshot classifies in Python."""
+    params: list = []
+    sx_case = "CASE COALESCE(rc.game, 'pokemon')"
+    for code, sx in _GAME_TO_SCRYDEX_GAME.items():
+        sx_case += " WHEN %s THEN %s"
+        params += [code, sx]
+    sx_case += " ELSE COALESCE(rc.game, 'pokemon') END"
+    sx_params = list(params)
+
+    meta_cols = []
+    meta_params: list = []
+    for key in _FACET_META_KEYS:
+        whens = []
+        for code, schema in GAME_FILTER_SCHEMA.items():
+            if key in schema:
+                whens.append(f"WHEN %s THEN to_jsonb(m.{schema[key]['field']})")
+                meta_params.append(code)
+        expr = f"CASE COALESCE(rc.game, 'pokemon') {' '.join(whens)} END" if whens else "NULL::jsonb"
+        meta_cols.append(f"{expr} AS {key}")
+
+    if set_eras:
+        era_col = "COALESCE(se.era, 'Vintage')"
+        era_join = "LEFT JOIN kiosk_set_eras se ON se.set_name = rc.set_name"
+    else:
+        era_col, era_join = "NULL::text", ""
+
+    sql = f"""
+        SELECT COALESCE(rc.game, 'pokemon') AS game,
+               rc.card_name, rc.set_name, rc.tcgplayer_id,
+               CASE WHEN rc.variant IS NULL OR LOWER(rc.variant) IN ('normal','holofoil')
+                    THEN '' ELSE rc.variant END AS vkey,
+               rc.card_number, rc.condition, rc.current_price, rc.rarity,
+               EXTRACT(EPOCH FROM NOW() - rc.created_at)::float8 AS age_s,
+               {era_col} AS era,
+               m.scrydex_id IS NOT NULL AS has_meta,
+               {', '.join(meta_cols)}
+          FROM raw_cards rc
+          LEFT JOIN LATERAL (
+            SELECT scrydex_id FROM scrydex_price_cache
+             WHERE tcgplayer_id = rc.tcgplayer_id AND game = {sx_case}
+             LIMIT 1
+          ) pc ON TRUE
+          LEFT JOIN scrydex_card_meta m
+            ON m.game = {sx_case} AND m.scrydex_id = pc.scrydex_id
+          {era_join}
+         WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL
+    """
+    return sql, meta_params + sx_params + sx_params
+
+
+def _facet_snapshot() -> dict:
+    """The current in-stock snapshot: {"at", "version", "rows", "memo"}.
+    Rescans once it is older than KIOSK_FACET_TTL or the response-cache
+    version has moved on, so a response cached under a new version is never
+    built from an older scan. Concurrent requests wait on the one scan
+    instead of each starting their own."""
+    global _facet_snap
+    version = _cache_version()
+    with _facet_lock:
+        snap = _facet_snap
+        if (snap is None or time.monotonic() - snap["at"] > KIOSK_FACET_TTL
+                or (version is not None and snap["version"] != version)):
+            set_eras = _set_eras_ready()
+            sql, params = _facet_scan_sql(set_eras)
+            at = time.monotonic()
+            rows = list(db.stream(sql, tuple(params), tuples=True))
+            if not set_eras:
+                eras: dict = {}
+                for i, r in enumerate(rows):
+                    if r.set_name not in eras:
+                        eras[r.set_name] = _classify_era(r.set_name)
+                    rows[i] = r._replace(era=eras[r.set_name])
+            snap = {"at": at, "version": version, "rows": rows, "memo": {}}
+            _facet_snap = snap
+    return snap
+
+
+def _facet_memo(snap: dict, key: tuple, compute):
+    """compute() once per key for the life of `snap`."""
+    memo = snap["memo"]
+    if key not in memo:
+        memo[key] = compute()
+    return memo[key]
+
+
+def _read_filter_state() -> dict:
+    """The browse filter selection from request.args, normalized so that the
+    same selection always yields the same state (and memo key)."""
+    color_mode = (request.args.get("color_mode") or "any").strip().lower()
+    if color_mode not in ("any", "within", "exactly"):
+        color_mode = "any"
+    conditions = {c.strip().upper() for c in (request.args.get("condition") or "").split(",")}
+    added_days = request.args.get("added_days", type=int)
+    if added_days is not None and added_days <= 0:
+        added_days = None
+    if added_days is not None:
+        added_days = min(added_days, 365)
+    return {
+        "game":       (request.args.get("game") or "").strip().lower(),
+        "q":          (request.args.get("q") or "").strip().lower(),
+        "set":        (request.args.get("set") or "").strip(),
+        "era":        (request.args.get("era") or "").strip(),
+        "conditions": tuple(sorted(conditions & {"NM", "LP", "MP", "HP", "DMG"})),
+        "min_price":  request.args.get("min_price", type=float),
+        "max_price":  request.args.get("max_price", type=float),
+        "added_days": added_days,
+        "colors":     tuple(sorted(set(_multi_param("colors")))),
+        "color_mode": color_mode,
+        "card_types": tuple(sorted(set(_multi_param("card_type")))),
+        "domains":    tuple(sorted(set(_multi_param("domain")))),
+        "rarities":   tuple(sorted({r.lower() for r in _multi_param("card_rarity")})),
+        "artist":     (request.args.get("artist") or "").strip(),
+    }
+
+
+def _state_key(state: dict, *names: str) -> tuple:
+    names = names or tuple(sorted(state))
+    return tuple((n, state[n]) for n in names)
+
+
+def _meta_values(v) -> list:
+    """A facet field as a list of values: jsonb arrays as-is, text as [v]."""
+    if v is None:
+        return []
+    if isinstance(v, list):
+        return v
+    if isinstance(v, dict):
+        return list(v)
+    return [v]
+
+
+def _colors_match(value, colors, mode: str, game: str) -> bool:
+    """Python twin of the colors predicate in _build_meta_filter_subquery,
+    including the MTG "C" = empty color_identity sentinel."""
+    if not isinstance(value, list):
+        return False
+    is_mtg = game == "magic"
+    has_c = is_mtg and "C" in colors
+    chrom = {c for c in colors if c != "C"} if is_mtg else set(colors)
+    if mode in ("exactly", "within"):
+        if has_c and not chrom:
+            return len(value) == 0
+        if mode == "exactly":
+            return set(value) == chrom
+        return set(value) <= chrom and (has_c or len(value) > 0)
+    return bool(chrom.intersection(value)) or (has_c and len(value) == 0)
+
+
+def _facet_masks(snap: dict, state: dict) -> list[int]:
+    """Per snapshot row, the bitmask of filter groups in `state` it fails."""
+    def compute():
+        drift = time.monotonic() - snap["at"]
+        q = state["q"]
+        conditions = set(state["conditions"])
+        lo, hi = state["min_price"], state["max_price"]
+        max_age = state["added_days"] * 86400 - drift if state["added_days"] is not None else None
+        rarities = set(state["rarities"])
+        colors, color_mode = state["colors"], state["color_mode"]
+        card_types, domains = set(state["card_types"]), set(state["domains"])
+        artist, set_name, era = state["artist"], state["set"], state["era"]
+
+        masks = []
+        for r in snap["rows"]:
+            m = 0
+            if q and not (q in (r.card_name or "").lower() or q in (r.set_name or "").lower()
+                          or q in (r.card_number or "").lower()):
+                m |= _FG_Q
+            if conditions and r.condition not in conditions:
+                m |= _FG_CONDITION
+            if (lo is not None or hi is not None) and (
+                    r.current_price is None
+                    or (lo is not None and r.current_price < lo)
+                    or (hi is not None and r.current_price > hi)):
+                m |= _FG_PRICE
+            if max_age is not None and (r.age_s is None or r.age_s > max_age):
+                m |= _FG_ADDED
+            if set_name and r.set_name != set_name:
+                m |= _FG_SET
+            if era and (r.set_name is None or r.era != era):
+                m |= _FG_ERA
+            if rarities and (r.rarity or "").lower() not in rarities:
+                m |= _FG_RARITY
+            schema = GAME_FILTER_SCHEMA.get(r.game) or {}
+            if colors and "colors" in schema and not (
+                    r.has_meta and _colors_match(r.colors, colors, color_mode, r.game)):
+                m |= _FG_COLORS
+            if card_types and "card_type" in schema and not (
+                    r.has_meta and card_types.intersection(_meta_values(r.card_type))):
+                m |= _FG_CARD_TYPE
+            if domains and "domain" in schema and not (
+                    r.has_meta and domains.intersection(_meta_values(r.domain))):
+                m |= _FG_DOMAIN
+            if artist and "artist" in schema and not (r.has_meta and r.artist == artist):
+                m |= _FG_ARTIST
+            masks.append(m)
+        return masks
+    return _facet_memo(snap, ("masks", _state_key(state)), compute)
+
+
+def _tile_key(r) -> tuple:
+    # Same fold as the /api/browse tile GROUP BY.
+    return (r.game, r.card_name, r.set_name, r.tcgplayer_id, r.vkey)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # Browse API
 # ═══════════════════════════════════════════════════════════════════════════════
 
+_tiles_ready: bool | None = None
+
+
+def _tile_index_ready() -> bool:
+    """KIOSK_TILE_INDEX is on and migration 026 has created kiosk_tiles
+    (checked once per process)."""
+    global _tiles_ready
+    if not KIOSK_TILE_INDEX:
+        return False
+    if _tiles_ready is None:
+        try:
+            row = db.query_one("SELECT to_regclass('kiosk_tiles') IS NOT NULL AS ok")
+            _tiles_ready = bool(row and row["ok"])
+        except Exception:
+            _tiles_ready = False
+        if not _tiles_ready:
+            logger.warning("kiosk_tiles missing — /api/browse aggregates raw_cards live")
+    return _tiles_ready
+
+
+def _browse_tiles(*, game, q, set_name, era, added_days, sort, per_page, offset):
+    """
+    (total, rows) for a browse page read from kiosk_tiles. Only tile-level
+    filters apply here (game / search / set / era / recency); the rows carry
+    the live aggregation's columns, so _browse_response enriches both paths
+    the same way (Scrydex image fallback and n_variants are resolved at read
+    time, shared/030_kiosk_tiles_read_time_images.sql).
+    """
+    filters, params = [], []
+    if game:
+        filters.append("game = %s")
+        params.append(game)
+    if q:
+        filters.append("(card_name ILIKE %s OR set_name ILIKE %s OR card_numbers ILIKE %s)")
+        params += [f"%{q}%", f"%{q}%", f"%{q}%"]
+    if set_name:
+        filters.append("set_name = %s")
+        params.append(set_name)
+    if era:
+        clause, era_params = _era_filter(era)
+        filters.append(clause)
+        params += era_params
+    if added_days is not None:
+        filters.append("newest_at >= NOW() - %s::interval")
+        params.append(f"{added_days} days")
+    where = " AND ".join(filters) or "TRUE"
+
+    # Leading column of each ORDER BY matches an idx_kiosk_tiles_* index; the
+    # tail keeps paging stable across ties.
+    order_by = {
+        "name_asc":   "card_name ASC",
+        "price_asc":  "min_price ASC NULLS LAST",
+        "price_desc": "max_price DESC NULLS LAST",
+        "newest":     "newest_at DESC",
+    }.get(sort, "card_name ASC")
+
+    count_row = db.query_one(f"SELECT COUNT(*) AS total FROM kiosk_tiles WHERE {where}",
+                             tuple(params))
+    rows = db.query(f"""
+        SELECT card_name, set_name, tcgplayer_id, scrydex_id, variant_raw, variant_key,
+               image_url, available_qty, total_qty, min_price, max_price,
+               newest_at AS created_at, conditions
+        FROM kiosk_tiles
+        WHERE {where}
+        ORDER BY {order_by}, card_name, set_name, tcgplayer_id, variant_key, game
+        LIMIT %s OFFSET %s
+    """, tuple(params) + (per_page, offset))
+    return (count_row["total"] if count_row else 0), rows
+
+
 @app.route("/api/browse")
+@_generation_cached
 def browse():
     """
     Aggregated card listings.
@@ -915,12 +1512,16 @@ def browse():
     # "in display" info only, not as add-to-cart conditions.
     filters = ["state IN ('STORED', 'DISPLAY')", "current_hold_id IS NULL"]
     params  = []
+    # Filters that narrow individual copies (not whole tiles) can't be served
+    # from kiosk_tiles' per-tile aggregates; any of them means a live query.
+    row_level = False
 
     # Remote Champions can't have binder cards pulled — counter-only stock.
     # No-op for in-store mode, where binders are fully browsable.
     binder_excl = _champion_binder_exclude("raw_cards")
     if binder_excl:
         filters.append(binder_excl)
+        row_level = True
 
     if game:
         # Game filter is canonical (pokemon / onepiece / magic / lorcana /
@@ -943,30 +1544,21 @@ def browse():
             cph = ",".join(["%s"] * len(valid))
             filters.append(f"condition IN ({cph})")
             params += valid
+            row_level = True
     if min_price is not None:
         filters.append("current_price >= %s")
         params.append(min_price)
+        row_level = True
     if max_price is not None:
         filters.append("current_price <= %s")
         params.append(max_price)
+        row_level = True
     if era:
-        # Resolve era to the actual list of distinct set_names that classify
-        # to it. Filtering by membership avoids the loose-LIKE bugs (e.g. XY
-        # filter previously matched 'Prismatic Evolutions' via the literal
-        # keyword 'Evolutions'). Computed against the live DB so new sets
-        # show up automatically.
-        all_sets = db.query(
-            "SELECT DISTINCT set_name FROM raw_cards "
-            "WHERE state IN ('STORED','DISPLAY') AND set_name IS NOT NULL"
-        )
-        era_sets = [r["set_name"] for r in all_sets if _classify_era(r["set_name"]) == era]
-        if era_sets:
-            ph = ",".join(["%s"] * len(era_sets))
-            filters.append(f"set_name IN ({ph})")
-            params += era_sets
-        else:
-            # Era selected but no in-stock sets for it — force empty result.
-            filters.append("FALSE")
+        # Membership in the era's classified sets (kiosk_set_eras, kept
+        # current by trigger + _sync_set_eras; see _era_filter).
+        clause, era_params = _era_filter(era)
+        filters.append(clause)
+        params += era_params
 
     # Rarity (raw_cards.rarity, case-insensitive multi-select). Only meaningful
     # when game is set; otherwise the same label means different things across
@@ -975,6 +1567,7 @@ def browse():
         ph = ",".join(["%s"] * len(rarities))
         filters.append(f"LOWER(rarity) IN ({ph})")
         params += [r.lower() for r in rarities]
+        row_level = True
 
     # Game-aware advanced filters (colors / card_type) — push down via subquery
     # so it doesn't blow up rows for the count/aggregation logic that follows.
@@ -985,7 +1578,22 @@ def browse():
         if meta_clause:
             filters.append(meta_clause)
             params += meta_params
+            row_level = True
+
+    if not row_level and _tile_index_ready():
+        total, rows = _browse_tiles(
+            game=game, q=q, set_name=set_name, era=era,
+            added_days=added_days, sort=sort, per_page=per_page, offset=offset,
+        )
+    else:
+        total, rows = _browse_live(filters, params, sort, added_days, per_page, offset)
+    return _browse_response(rows, total, page, per_page)
 
+
+def _browse_live(filters, params, sort, added_days, per_page, offset):
+    """(total, rows) for a browse page aggregated straight from raw_cards —
+    the path for row-level filters (condition / price / rarity / card meta /
+    Champion binder exclusion) or when kiosk_tiles isn't there."""
     where = " AND ".join(filters)
 
     # Sort mapping
@@ -999,8 +1607,9 @@ def browse():
 
     # Group key folds NULL/normal/holofoil to one bucket so single-variant
     # cards don't fragment. Distinguishing variants (1st Ed vs Unlimited,
-    # reverseHolofoil, etc.) get their own tile.
-    group_key = ("card_name, set_name, tcgplayer_id, "
+    # reverseHolofoil, etc.) get their own tile. Same key as kiosk_tiles,
+    # game included.
+    group_key = ("game, card_name, set_name, tcgplayer_id, "
                  "CASE WHEN variant IS NULL OR LOWER(variant) IN ('normal','holofoil') "
                  "THEN '' ELSE variant END")
 
@@ -1061,7 +1670,7 @@ def browse():
             MAX(created_at) AS created_at,
             jsonb_object_agg(condition, cond_qty) FILTER (WHERE cond_qty > 0) AS conditions
         FROM (
-            SELECT card_name, set_name, tcgplayer_id, scrydex_id,
+            SELECT game, card_name, set_name, tcgplayer_id, scrydex_id,
                    variant AS variant_raw,
                    CASE WHEN variant IS NULL OR LOWER(variant) IN ('normal','holofoil')
                         THEN ''
@@ -1076,15 +1685,18 @@ def browse():
                    MAX(created_at) AS created_at
             FROM raw_cards
             WHERE {where}
-            GROUP BY card_name, set_name, tcgplayer_id, scrydex_id,
+            GROUP BY game, card_name, set_name, tcgplayer_id, scrydex_id,
                      variant_raw, variant_key, image_url, condition
         ) sub
-        GROUP BY card_name, set_name, tcgplayer_id, variant_key
+        GROUP BY game, card_name, set_name, tcgplayer_id, variant_key
         {having_sql}
         ORDER BY {order_by}
         LIMIT %s OFFSET %s
     """, tuple(params) + having_params + (per_page, offset))
+    return total, rows
+
 
+def _browse_response(rows, total, page, per_page):
     # Enrich each row with two things from scrydex_price_cache:
     #   1. Image fallback when raw_cards.image_url is missing (esp. JP cards
     #      that intaked without a TCGplayer image URL).
@@ -1093,6 +1705,15 @@ def browse():
     #      a variant badge — single-variant cards stay uncluttered, but a
     #      multi-variant card always gets the badge so the customer knows
     #      to check 1st Ed vs Unlimited.
+    # Both are resolved for the whole page at once (one COUNT query, one
+    # image query for LRU misses) so the cost doesn't grow with per_page —
+    # for kiosk_tiles rows too, so they follow Scrydex syncs.
+    variant_counts = _variant_counts(r["scrydex_id"] for r in rows)
+    images = _resolve_cache_images(
+        (r["tcgplayer_id"], r.get("variant_raw"), r["scrydex_id"])
+        for r in rows
+        if not r["image_url"] and (r["tcgplayer_id"] or r["scrydex_id"])
+    )
     cards = []
     for r in rows:
         sid = r["scrydex_id"]
@@ -1109,14 +1730,9 @@ def browse():
         # showed the alt-art image. Resolve the image by the variant-unique
         # tcgplayer_id first; fall back to scrydex_id only when tcg is null.
         if sid:
-            nrow = db.query_one("""
-                SELECT COUNT(DISTINCT variant) AS n
-                FROM scrydex_price_cache WHERE scrydex_id = %s
-            """, (sid,))
-            if nrow and nrow.get("n"):
-                n_variants = int(nrow["n"])
+            n_variants = variant_counts.get(sid) or n_variants
         if not image_url and (tcg or sid):
-            sx = _resolve_cache_image(tcg, r.get("variant_raw"), sid)
+            sx = images.get((tcg, r.get("variant_raw"), sid))
             if sx:
                 image_url = sx.get("img_l") or sx.get("img_m") or sx.get("img_s")
 
@@ -1268,6 +1884,7 @@ def _add_bucket_clause(where: list, params: list, bucket_keys: list[str],
 
 
 @app.route("/api/products")
+@_generation_cached
 def list_products():
     """
     Sealed + slab catalog. Reads inventory_product_cache (the live Shopify
@@ -1430,6 +2047,7 @@ def list_products():
 
 
 @app.route("/api/products/filter-meta")
+@_generation_cached
 def products_filter_meta():
     """
     Returns the filter buckets available for the sealed/slab catalog with
@@ -1563,24 +2181,23 @@ def products_filter_meta():
 
 
 @app.route("/api/sets")
+@_generation_cached
 def list_sets():
     era = (request.args.get("era") or "").strip()
     game = (request.args.get("game") or "").strip().lower()
-    where = ["state IN ('STORED','DISPLAY')", "set_name IS NOT NULL", "current_hold_id IS NULL"]
-    params: list = []
-    if game:
-        where.append("game = %s")
-        params.append(game)
-    rows = db.query(f"""
-        SELECT set_name, COUNT(*) AS qty FROM raw_cards
-        WHERE {' AND '.join(where)}
-        GROUP BY set_name
-        ORDER BY set_name ASC
-        LIMIT 500
-    """, tuple(params))
-    sets = [{"name": r["set_name"], "qty": r["qty"]} for r in rows]
-    if era:
-        sets = [s for s in sets if _classify_era(s["name"]) == era]
+    snap = _facet_snapshot()
+
+    def compute():
+        qty: dict[str, int] = {}
+        set_era: dict[str, str] = {}
+        for r in snap["rows"]:
+            if r.set_name is not None and (not game or r.game == game):
+                qty[r.set_name] = qty.get(r.set_name, 0) + 1
+                set_era[r.set_name] = r.era
+        names = sorted(qty, key=str.lower)[:500]
+        return [{"name": name, "qty": qty[name]} for name in names
+                if not era or set_era[name] == era]
+    sets = _facet_memo(snap, ("sets", game, era), compute)
     # Backward-compat: also return a flat name list for older callers
     return jsonify({"sets": sets, "names": [s["name"] for s in sets]})
 
@@ -1596,27 +2213,16 @@ def list_illustrators():
     schema = GAME_FILTER_SCHEMA.get(game) or {}
     if not game or "artist" not in schema:
         return jsonify({"illustrators": []})
-    sx_game = _GAME_TO_SCRYDEX_GAME.get(game, game)
-    field = schema["artist"]["field"]   # raw->>'artist'
-    rows = db.query(f"""
-        SELECT m.{field} AS name, COUNT(DISTINCT rc.tcgplayer_id) AS qty
-          FROM raw_cards rc
-          JOIN LATERAL (
-            SELECT scrydex_id FROM scrydex_price_cache
-             WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-             LIMIT 1
-          ) pc ON TRUE
-          JOIN scrydex_card_meta m
-            ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-         WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL
-           AND rc.game = %s
-           AND NULLIF(m.{field}, '') IS NOT NULL
-         GROUP BY m.{field}
-         ORDER BY qty DESC, name ASC
-    """, (sx_game, sx_game, game))
-    return jsonify({"illustrators": [
-        {"name": r["name"], "qty": int(r["qty"])} for r in rows
-    ]})
+    snap = _facet_snapshot()
+
+    def compute():
+        ids: dict[str, set] = {}
+        for r in snap["rows"]:
+            if r.game == game and r.has_meta and r.artist and r.tcgplayer_id is not None:
+                ids.setdefault(r.artist, set()).add(r.tcgplayer_id)
+        return [{"name": name, "qty": len(ids[name])}
+                for name in sorted(ids, key=lambda n: (-len(ids[n]), n))]
+    return jsonify({"illustrators": _facet_memo(snap, ("illustrators", game), compute)})
 
 
 @app.route("/api/eras")
@@ -1632,80 +2238,20 @@ def list_eras():
     Faceted: respects all the same filters as /api/browse EXCEPT era itself,
     so picking 'Rarity = IR' shrinks each era's count to 'IR cards in this
     era,' the way Rarity / Energy already shrink against each other.
+    Recency is tile-level here too: a tile counts when any of its copies is
+    inside the added_days window.
     """
-    where = ["state IN ('STORED', 'DISPLAY')", "set_name IS NOT NULL", "current_hold_id IS NULL",
-             "game = 'pokemon'"]
-    params: list = []
-
-    # Same filter param surface as /api/browse, minus `era`
-    q          = (request.args.get("q") or "").strip()
-    set_name   = (request.args.get("set") or "").strip()
-    conditions = [c.strip().upper() for c in (request.args.get("condition") or "").split(",") if c.strip()]
-    min_price  = request.args.get("min_price", type=float)
-    max_price  = request.args.get("max_price", type=float)
-    colors     = _multi_param("colors")
-    color_mode = (request.args.get("color_mode") or "any").strip().lower()
-    if color_mode not in ("any", "within", "exactly"):
-        color_mode = "any"
-    card_types = _multi_param("card_type")
-    rarities   = _multi_param("card_rarity")
-
-    if q:
-        where.append("(card_name ILIKE %s OR set_name ILIKE %s OR card_number ILIKE %s)")
-        params += [f"%{q}%", f"%{q}%", f"%{q}%"]
-    if set_name:
-        where.append("set_name = %s")
-        params.append(set_name)
-    if conditions:
-        valid = [c for c in conditions if c in ("NM", "LP", "MP", "HP", "DMG")]
-        if valid:
-            cph = ",".join(["%s"] * len(valid))
-            where.append(f"condition IN ({cph})")
-            params += valid
-    if min_price is not None:
-        where.append("current_price >= %s")
-        params.append(min_price)
-    if max_price is not None:
-        where.append("current_price <= %s")
-        params.append(max_price)
-    if rarities:
-        ph = ",".join(["%s"] * len(rarities))
-        where.append(f"LOWER(rarity) IN ({ph})")
-        params += [r.lower() for r in rarities]
-    # Recency: COUNT(DISTINCT tile) over copies filtered to the window equals
-    # the number of tiles that have a recent copy — same tile set the browse
-    # grid shows for the same added_days.
-    added_days = request.args.get("added_days", type=int)
-    if added_days is not None and 0 < added_days <= 365:
-        where.append("created_at >= NOW() - %s::interval")
-        params.append(f"{added_days} days")
-    artist = (request.args.get("artist") or "").strip()
-    meta_clause, meta_params = _build_meta_filter_subquery(
-        "pokemon", colors, color_mode, card_types, rarities, artist,
-    )
-    if meta_clause:
-        where.append(meta_clause)
-        params += meta_params
+    state = _read_filter_state()
+    snap = _facet_snapshot()
 
-    rows = db.query(f"""
-        SELECT set_name,
-               COUNT(DISTINCT (
-                   card_name,
-                   set_name,
-                   tcgplayer_id,
-                   CASE WHEN variant IS NULL OR LOWER(variant) IN ('normal','holofoil')
-                        THEN '' ELSE variant END
-               )) AS tiles
-        FROM raw_cards
-        WHERE {' AND '.join(where)}
-        GROUP BY set_name
-    """, tuple(params))
-    era_counts: dict = {}
-    for r in rows:
-        era = _classify_era(r["set_name"])
-        era_counts[era] = era_counts.get(era, 0) + int(r["tiles"])
-    eras = [{"name": k, "set_count": v} for k, v in sorted(era_counts.items())]
-    return jsonify({"eras": eras})
+    def compute():
+        masks = _facet_masks(snap, state)
+        tiles: dict[str, set] = {}
+        for r, m in zip(snap["rows"], masks):
+            if r.game == "pokemon" and r.set_name is not None and not (m & ~_FG_ERA):
+                tiles.setdefault(r.era, set()).add(_tile_key(r))
+        return [{"name": k, "set_count": len(v)} for k, v in sorted(tiles.items())]
+    return jsonify({"eras": _facet_memo(snap, ("eras", _state_key(state)), compute)})
 
 
 @app.route("/api/games")
@@ -1723,121 +2269,48 @@ def list_games():
     matches the grid it leads to. Game-AGNOSTIC filters (recency / condition /
     price / search) apply to every game's count and to the All total — these
     survive a game switch in the UI, so each pill honestly previews "how many
-    if you switch here". Game-SPECIFIC filters (colors / card_type / rarity /
-    era / set) bind ONLY to the active game, since switching clears them; that
-    keeps the active pill equal to the grid while leaving the others as a
-    clean cross-game preview.
+    if you switch here". Game-SPECIFIC filters (colors / card_type / domain /
+    rarity / era / set / illustrator) bind ONLY to the active game, since
+    switching clears them; that keeps the active pill equal to the grid while
+    leaving the others as a clean cross-game preview.
     """
-    tile = ("card_name, set_name, tcgplayer_id, "
-            "CASE WHEN variant IS NULL OR LOWER(variant) IN ('normal','holofoil') "
-            "THEN '' ELSE variant END")
-
-    # Canonical in-stock game list (unfiltered) so a pill never vanishes when
-    # a filter zeroes it out — it just reads (0) and stays clickable.
-    base_rows = db.query(f"""
-        SELECT COALESCE(game, 'pokemon') AS game,
-               COUNT(DISTINCT ({tile})) AS qty
-        FROM raw_cards
-        WHERE state IN ('STORED', 'DISPLAY') AND current_hold_id IS NULL
-        GROUP BY COALESCE(game, 'pokemon')
-        ORDER BY qty DESC
-    """)
-    game_order = [r["game"] for r in base_rows]
-
-    # ── Game-agnostic filters (apply to every game + the All total) ─────────
-    agn = ["state IN ('STORED', 'DISPLAY')", "current_hold_id IS NULL"]
-    agn_p: list = []
-    q = (request.args.get("q") or "").strip()
-    if q:
-        agn.append("(card_name ILIKE %s OR set_name ILIKE %s OR card_number ILIKE %s)")
-        agn_p += [f"%{q}%", f"%{q}%", f"%{q}%"]
-    conditions = [c.strip().upper() for c in (request.args.get("condition") or "").split(",") if c.strip()]
-    valid = [c for c in conditions if c in ("NM", "LP", "MP", "HP", "DMG")]
-    if valid:
-        agn.append(f"condition IN ({','.join(['%s'] * len(valid))})")
-        agn_p += valid
-    min_price = request.args.get("min_price", type=float)
-    max_price = request.args.get("max_price", type=float)
-    if min_price is not None:
-        agn.append("current_price >= %s"); agn_p.append(min_price)
-    if max_price is not None:
-        agn.append("current_price <= %s"); agn_p.append(max_price)
-    added_days = request.args.get("added_days", type=int)
-    if added_days is not None and 0 < added_days <= 365:
-        agn.append("created_at >= NOW() - %s::interval")
-        agn_p.append(f"{added_days} days")
-    agn_where = " AND ".join(agn)
-
-    rows = db.query(f"""
-        SELECT COALESCE(game, 'pokemon') AS game,
-               COUNT(DISTINCT ({tile})) AS qty
-        FROM raw_cards
-        WHERE {agn_where}
-        GROUP BY COALESCE(game, 'pokemon')
-    """, tuple(agn_p))
-    counts = {r["game"]: int(r["qty"]) for r in rows}
-
-    all_row = db.query_one(f"""
-        SELECT COUNT(DISTINCT ({tile})) AS qty
-        FROM raw_cards WHERE {agn_where}
-    """, tuple(agn_p))
-    all_qty = int((all_row or {}).get("qty") or 0)
-
-    # ── Active game also narrows by its game-specific filters → matches grid ─
-    active_game = (request.args.get("game") or "").strip().lower()
-    if active_game:
-        colors     = _multi_param("colors")
-        color_mode = (request.args.get("color_mode") or "any").strip().lower()
-        if color_mode not in ("any", "within", "exactly"):
-            color_mode = "any"
-        card_types = _multi_param("card_type")
-        rarities   = _multi_param("card_rarity")
-        era        = (request.args.get("era") or "").strip()
-        set_name   = (request.args.get("set") or "").strip()
-        artist     = (request.args.get("artist") or "").strip()
-
-        gw = list(agn) + ["game = %s"]
-        gp = list(agn_p) + [active_game]
-        if set_name:
-            gw.append("set_name = %s"); gp.append(set_name)
-        if era:
-            all_sets = db.query(
-                "SELECT DISTINCT set_name FROM raw_cards "
-                "WHERE state IN ('STORED','DISPLAY') AND set_name IS NOT NULL AND game = %s",
-                (active_game,))
-            era_sets = [r["set_name"] for r in all_sets if _classify_era(r["set_name"]) == era]
-            if era_sets:
-                gw.append(f"set_name IN ({','.join(['%s'] * len(era_sets))})"); gp += era_sets
-            else:
-                gw.append("FALSE")
-        if rarities:
-            gw.append(f"LOWER(rarity) IN ({','.join(['%s'] * len(rarities))})")
-            gp += [r.lower() for r in rarities]
-        meta_clause, meta_params = _build_meta_filter_subquery(
-            active_game, colors, color_mode, card_types, rarities, artist)
-        if meta_clause:
-            gw.append(meta_clause); gp += meta_params
-        row = db.query_one(f"""
-            SELECT COUNT(DISTINCT ({tile})) AS qty
-            FROM raw_cards WHERE {' AND '.join(gw)}
-        """, tuple(gp))
-        counts[active_game] = int((row or {}).get("qty") or 0)
-
-    label_map = {
-        "pokemon":   "Pokémon",
-        "onepiece":  "One Piece",
-        "magic":     "Magic",
-        "lorcana":   "Lorcana",
-        "riftbound": "Riftbound",
-        "yugioh":    "Yu-Gi-Oh!",
-        "other":     "Other",
-    }
-    games = [{
-        "code":  g,
-        "label": label_map.get(g, g.title()),
-        "qty":   counts.get(g, 0),
-    } for g in game_order]
-    return jsonify({"games": games, "all_qty": all_qty})
+    state = _read_filter_state()
+    active_game = state["game"]
+    snap = _facet_snapshot()
+
+    def compute():
+        masks = _facet_masks(snap, state)
+        # Canonical in-stock game list (unfiltered) so a pill never vanishes
+        # when a filter zeroes it out — it just reads (0) and stays clickable.
+        in_stock: dict[str, set] = {}
+        shown: dict[str, set] = {}
+        all_tiles: set = set()
+        for r, m in zip(snap["rows"], masks):
+            tile = _tile_key(r)
+            in_stock.setdefault(r.game, set()).add(tile)
+            if m & _FG_AGNOSTIC:
+                continue
+            all_tiles.add(tile)
+            if r.game == active_game and m:
+                continue
+            shown.setdefault(r.game, set()).add(tile)
+        game_order = sorted(in_stock, key=lambda g_: -len(in_stock[g_]))
+        label_map = {
+            "pokemon":   "Pokémon",
+            "onepiece":  "One Piece",
+            "magic":     "Magic",
+            "lorcana":   "Lorcana",
+            "riftbound": "Riftbound",
+            "yugioh":    "Yu-Gi-Oh!",
+            "other":     "Other",
+        }
+        games = [{
+            "code":  g_,
+            "label": label_map.get(g_, g_.title()),
+            "qty":   len(shown.get(g_, ())),
+        } for g_ in game_order]
+        return {"games": games, "all_qty": len(all_tiles)}
+    return jsonify(_facet_memo(snap, ("games", _state_key(state)), compute))
 
 
 @app.route("/api/filter-meta")
@@ -1851,6 +2324,9 @@ def filter_meta():
       &color_mode=any|exactly      (only meaningful with colors)
       &card_type=Creature,Sorcery  (current card_type selection — affects color and rarity counts)
       &card_rarity=Rare,Mythic     (current rarity selection — affects color and card_type counts)
+      plus the rest of the /api/browse filter surface (q, set, era, condition,
+      min_price / max_price, added_days, domain, artist), which narrows every
+      group.
 
     Each facet's counts are computed by applying ALL the OTHER selected
     filters and excluding the facet itself. So toggling within one group
@@ -1872,179 +2348,38 @@ def filter_meta():
     game = (request.args.get("game") or "").strip().lower()
     if not game or game not in GAME_FILTER_SCHEMA:
         return jsonify({"game": game, "filters": {}, "color_modes": []})
+    state = _read_filter_state()
+    snap = _facet_snapshot()
+    return jsonify(_facet_memo(snap, ("filter-meta", _state_key(state)),
+                               lambda: _filter_meta_payload(snap, state, game)))
 
-    schema = GAME_FILTER_SCHEMA[game]
-    sx_game = _GAME_TO_SCRYDEX_GAME.get(game, game)
-
-    # Read the current filter state.
-    sel_colors     = _multi_param("colors")
-    sel_color_mode = (request.args.get("color_mode") or "any").strip().lower()
-    if sel_color_mode not in ("any", "within", "exactly"):
-        sel_color_mode = "any"
-    sel_card_types = _multi_param("card_type")
-    sel_domains    = _multi_param("domain")
-    sel_rarities   = _multi_param("card_rarity")
-    sel_era        = (request.args.get("era") or "").strip()
-    sel_set        = (request.args.get("set") or "").strip()
-    sel_artist     = (request.args.get("artist") or "").strip()
-    sel_added_days = request.args.get("added_days", type=int)
-    if sel_added_days is not None and not (0 < sel_added_days <= 365):
-        sel_added_days = None
-
-    # Build a set of "extra WHERE clauses + params" snippets, then for each
-    # facet we'll OR-together the snippets it needs (i.e. all groups except
-    # itself). The clauses are written against the same JOIN shape used by
-    # _count_jsonb_facet / _count_rarity_facet below: rc + pc + m.
-    def colors_predicate(colors_set, mode: str) -> tuple[str, list]:
-        """Build the SQL predicate for an ARBITRARY color selection — used
-        both for the live filter (current selection) and for the per-chip
-        what-if counts shown on the colors facet."""
-        if not colors_set or "colors" not in schema:
-            return "", []
-        spec = schema["colors"]
-        field = "m." + spec["field"]
-        is_mtg = (game == "magic")
-        has_c  = is_mtg and ("C" in colors_set)
-        chrom  = [c for c in colors_set if c != "C"] if is_mtg else list(colors_set)
-        if mode == "exactly":
-            if has_c and not chrom:
-                return f"jsonb_array_length({field}) = 0", []
-            if not chrom:
-                return "", []
-            arr_lit_ph = ",".join(["%s"] * len(chrom))
-            return (
-                f"(SELECT COALESCE(array_agg(DISTINCT x ORDER BY x), ARRAY[]::text[]) "
-                f" FROM jsonb_array_elements_text({field}) AS x) "
-                f"= (SELECT COALESCE(array_agg(DISTINCT v ORDER BY v), ARRAY[]::text[]) "
-                f" FROM unnest(ARRAY[{arr_lit_ph}]) AS v)"
-            ), list(chrom)
-        if mode == "within":
-            # Subset containment (commander color identity). Colorless cards
-            # ([] <@ X is always true) are excluded unless C is picked.
-            if has_c and not chrom:
-                return f"jsonb_array_length({field}) = 0", []
-            if not chrom:
-                return "", []
-            within = f"{field} <@ to_jsonb(%s::text[])"
-            if not has_c:
-                within = f"({within} AND jsonb_array_length({field}) > 0)"
-            return within, [list(chrom)]
-        # any
-        any_parts: list[str] = []
-        params: list = []
-        if chrom:
-            any_parts.append(f"{field} ?| %s::text[]")
-            params.append(chrom)
-        if has_c:
-            any_parts.append(f"jsonb_array_length({field}) = 0")
-        if not any_parts:
-            return "", []
-        return "(" + " OR ".join(any_parts) + ")", params
-
-    def colors_clause() -> tuple[str, list]:
-        return colors_predicate(set(sel_colors), sel_color_mode)
-
-    def card_type_clause() -> tuple[str, list]:
-        if not sel_card_types or "card_type" not in schema:
-            return "", []
-        spec = schema["card_type"]
-        field = "m." + spec["field"]
-        if spec["type"] == "jsonb":
-            return f"{field} ?| %s::text[]", [list(sel_card_types)]
-        ph = ",".join(["%s"] * len(sel_card_types))
-        return f"{field} IN ({ph})", list(sel_card_types)
 
-    def domain_clause() -> tuple[str, list]:
-        if not sel_domains or "domain" not in schema:
-            return "", []
-        spec = schema["domain"]
-        field = "m." + spec["field"]
-        if spec["type"] == "jsonb":
-            return f"{field} ?| %s::text[]", [list(sel_domains)]
-        ph = ",".join(["%s"] * len(sel_domains))
-        return f"{field} IN ({ph})", list(sel_domains)
-
-    def rarity_clause() -> tuple[str, list]:
-        if not sel_rarities:
-            return "", []
-        ph = ",".join(["%s"] * len(sel_rarities))
-        return f"rc.rarity IN ({ph})", list(sel_rarities)
-
-    def era_clause() -> tuple[str, list]:
-        # Era resolves to the actual list of distinct in-stock set_names that
-        # classify into it (mirrors /api/browse). Without this, picking
-        # 'Scarlet & Violet' wouldn't shrink the Energy / Rarity counts to
-        # only what's actually in S&V.
-        if not sel_era:
-            return "", []
-        all_sets = db.query(
-            "SELECT DISTINCT set_name FROM raw_cards "
-            "WHERE state IN ('STORED','DISPLAY') AND set_name IS NOT NULL AND game = %s",
-            (game,)
-        )
-        era_sets = [r["set_name"] for r in all_sets if _classify_era(r["set_name"]) == sel_era]
-        if not era_sets:
-            return "FALSE", []
-        ph = ",".join(["%s"] * len(era_sets))
-        return f"rc.set_name IN ({ph})", era_sets
-
-    def set_clause() -> tuple[str, list]:
-        if not sel_set:
-            return "", []
-        return "rc.set_name = %s", [sel_set]
-
-    def artist_clause() -> tuple[str, list]:
-        # Illustrator narrows the other facets exactly like Set does.
-        if not sel_artist or "artist" not in schema:
-            return "", []
-        return f"m.{schema['artist']['field']} = %s", [sel_artist]
-
-    def added_clause() -> tuple[str, list]:
-        # Recency isn't a facet (no chips of its own) — it always applies to
-        # every other facet's counts so the numbers reflect the new-arrivals
-        # window the customer is browsing.
-        if sel_added_days is None:
-            return "", []
-        return "rc.created_at >= NOW() - %s::interval", [f"{sel_added_days} days"]
-
-    color_w,  color_p  = colors_clause()
-    cardt_w,  cardt_p  = card_type_clause()
-    domain_w, domain_p = domain_clause()
-    rarity_w, rarity_p = rarity_clause()
-    era_w,    era_p    = era_clause()
-    set_w,    set_p    = set_clause()
-    artist_w, artist_p = artist_clause()
-    added_w,  added_p  = added_clause()
-
-    def merged_extra(*pairs: tuple[str, list]) -> tuple[str, list]:
-        """AND together a subset of (where, params) pairs."""
-        parts, params = [], []
-        for w, p in pairs:
-            if w:
-                parts.append(w)
-                params.extend(p)
-        if not parts:
-            return "", []
-        return " AND " + " AND ".join(parts), params
+def _filter_meta_payload(snap: dict, state: dict, game: str) -> dict:
+    """/api/filter-meta's response for `game`, counted from one pass of
+    _facet_masks. Chip counts are distinct cards (tcgplayer_id) among copies
+    with Scrydex metadata."""
+    schema = GAME_FILTER_SCHEMA[game]
+    masks = _facet_masks(snap, state)
+    rows = [(r, m) for r, m in zip(snap["rows"], masks) if r.game == game]
 
-    # ── Colors facet (count of cards per color, given other filters) ────────
     out: dict = {
         "game": game,
         "color_modes": list(schema.get("colors", {}).get("modes", [])),
         "filters": {},
     }
 
+    def passing(own: int):
+        """Meta rows that pass every selected filter except group `own`."""
+        return (r for r, m in rows if not (m & ~own) and r.has_meta
+                and r.tcgplayer_id is not None)
+
+    # ── Colors facet (count of cards per color, given other filters) ────────
     if "colors" in schema:
         spec = schema["colors"]
-        # Other filters ⇒ card_type + rarity + era + set + artist + recency.
-        extra_w, extra_p = merged_extra((cardt_w, cardt_p), (rarity_w, rarity_p),
-                                        (era_w, era_p), (set_w, set_p),
-                                        (artist_w, artist_p), (added_w, added_p))
-        field = "m." + spec["field"]
         labels = spec.get("labels") or {}
-        counts: dict[str, int] = {}
-
-        if sel_color_mode in ("exactly", "within"):
+        ids: dict[str, set] = {v: set() for v in spec["options"]}
+        candidates = list(passing(_FG_COLORS))
+        if state["color_mode"] in ("exactly", "within"):
             # Per-chip count semantics in exactly / within mode:
             #   - ON chip  → count of cards matching the CURRENT set
             #     (matches what the result grid is showing). Tapping it would
@@ -2055,73 +2390,26 @@ def filter_meta():
             # The old "symmetric diff = toggle me" math made the only-selected
             # chip read its own count as the unfiltered total, because
             # toggling the only chip cleared the color predicate entirely.
-            current = set(sel_colors)
+            current = set(state["colors"])
             for v in spec["options"]:
                 pred_set = current if v in current else (current | {v})
-                pred_w, pred_p = colors_predicate(pred_set, sel_color_mode)
-                if not pred_set or not pred_w:
-                    counts[v] = 0
-                    continue
-                where_extra = f"{extra_w} AND {pred_w}" if extra_w else f" AND {pred_w}"
-                where_params = list(extra_p) + list(pred_p)
-                row = db.query_one(f"""
-                    SELECT COUNT(DISTINCT rc.tcgplayer_id) AS n
-                      FROM raw_cards rc
-                      JOIN LATERAL (
-                        SELECT scrydex_id FROM scrydex_price_cache
-                         WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-                         LIMIT 1
-                      ) pc ON TRUE
-                      JOIN scrydex_card_meta m
-                        ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-                     WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL
-                       AND rc.game = %s
-                           {where_extra}
-                """, (sx_game, sx_game, game, *where_params))
-                counts[v] = int((row or {}).get("n") or 0)
+                ids[v] = {r.tcgplayer_id for r in candidates
+                          if _colors_match(r.colors, pred_set, state["color_mode"], game)}
         else:
-            # any-mode: unfold color_identity into rows and group-count.
-            rows = db.query(f"""
-                SELECT elem AS k, COUNT(DISTINCT rc.tcgplayer_id) AS n
-                  FROM raw_cards rc
-                  JOIN LATERAL (
-                    SELECT scrydex_id FROM scrydex_price_cache
-                     WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-                     LIMIT 1
-                  ) pc ON TRUE
-                  JOIN scrydex_card_meta m
-                    ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-                  JOIN LATERAL jsonb_array_elements_text({field}) AS elem ON TRUE
-                 WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL AND rc.game = %s
-                       {extra_w}
-                 GROUP BY elem
-            """, (sx_game, sx_game, game, *extra_p))
-            counts = {r["k"]: int(r["n"]) for r in rows}
-
-            # MTG: a colorless card has color_identity=[] and never shows up
-            # in the lateral elements-of-array unfold above. Count it
-            # separately so the "C" chip reflects reality.
-            if game == "magic":
-                row = db.query_one(f"""
-                    SELECT COUNT(DISTINCT rc.tcgplayer_id) AS n
-                      FROM raw_cards rc
-                      JOIN LATERAL (
-                        SELECT scrydex_id FROM scrydex_price_cache
-                         WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-                         LIMIT 1
-                      ) pc ON TRUE
-                      JOIN scrydex_card_meta m
-                        ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-                     WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL AND rc.game = %s
-                       AND jsonb_array_length({field}) = 0
-                           {extra_w}
-                """, (sx_game, sx_game, game, *extra_p))
-                counts["C"] = int((row or {}).get("n") or 0)
-
+            # any-mode: a card counts toward every color in its identity.
+            # MTG: a colorless card has color_identity=[] — that is the "C"
+            # chip.
+            for r in candidates:
+                if not isinstance(r.colors, list):
+                    continue
+                for c in set(r.colors):
+                    ids.setdefault(c, set()).add(r.tcgplayer_id)
+                if game == "magic" and not r.colors:
+                    ids["C"].add(r.tcgplayer_id)
         out["filters"]["colors"] = {
             "label":   spec["label"],
             "options": [
-                {"value": v, "label": labels.get(v, v), "qty": counts.get(v, 0)}
+                {"value": v, "label": labels.get(v, v), "qty": len(ids.get(v, ()))}
                 for v in spec["options"]
             ],
         }
@@ -2129,45 +2417,15 @@ def filter_meta():
     # ── Card type + Domain facets (both text/jsonb chip groups over meta) ────
     # Each facet's counts apply every OTHER selected filter and exclude its own
     # selection, so toggling within a group doesn't collapse that group.
-    def _meta_chip_facet(key: str, *self_excluded: tuple[str, list]) -> None:
+    for key, own in (("card_type", _FG_CARD_TYPE), ("domain", _FG_DOMAIN)):
         if key not in schema:
-            return
+            continue
         spec = schema[key]
-        extra_w, extra_p = merged_extra(*self_excluded)
-        field = "m." + spec["field"]
-        if spec["type"] == "jsonb":
-            rows = db.query(f"""
-                SELECT elem AS k, COUNT(DISTINCT rc.tcgplayer_id) AS n
-                  FROM raw_cards rc
-                  JOIN LATERAL (
-                    SELECT scrydex_id FROM scrydex_price_cache
-                     WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-                     LIMIT 1
-                  ) pc ON TRUE
-                  JOIN scrydex_card_meta m
-                    ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-                  JOIN LATERAL jsonb_array_elements_text({field}) AS elem ON TRUE
-                 WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL AND rc.game = %s
-                       {extra_w}
-                 GROUP BY elem
-            """, (sx_game, sx_game, game, *extra_p))
-        else:
-            rows = db.query(f"""
-                SELECT {field} AS k, COUNT(DISTINCT rc.tcgplayer_id) AS n
-                  FROM raw_cards rc
-                  JOIN LATERAL (
-                    SELECT scrydex_id FROM scrydex_price_cache
-                     WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-                     LIMIT 1
-                  ) pc ON TRUE
-                  JOIN scrydex_card_meta m
-                    ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-                 WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL AND rc.game = %s
-                   AND {field} IS NOT NULL
-                       {extra_w}
-                 GROUP BY {field}
-            """, (sx_game, sx_game, game, *extra_p))
-        counts = {r["k"]: int(r["n"]) for r in rows}
+        ids = {}
+        for r in passing(own):
+            for v in set(_meta_values(getattr(r, key))):
+                ids.setdefault(v, set()).add(r.tcgplayer_id)
+        counts = {k: len(v) for k, v in ids.items()}
         if spec.get("options"):
             # Curated list (MTG/Pokemon/OP) — keep fixed order, show 0-qty too.
             options = [{"value": v, "label": v, "qty": counts.get(v, 0)}
@@ -2179,52 +2437,25 @@ def filter_meta():
                        for k in sorted(counts, key=lambda x: (-counts[x], x)) if k]
         out["filters"][key] = {"label": spec["label"], "options": options}
 
-    # card_type excludes its own selection; domain excludes its own.
-    _meta_chip_facet("card_type",
-                     (color_w, color_p), (domain_w, domain_p), (rarity_w, rarity_p),
-                     (era_w, era_p), (set_w, set_p), (artist_w, artist_p),
-                     (added_w, added_p))
-    _meta_chip_facet("domain",
-                     (color_w, color_p), (cardt_w, cardt_p), (rarity_w, rarity_p),
-                     (era_w, era_p), (set_w, set_p), (artist_w, artist_p),
-                     (added_w, added_p))
-
-    # ── Rarity facet (lives on raw_cards directly, no meta join needed for
-    # the rarity column itself — but we may still need meta JOIN if colors
-    # or card_type filters are active). Era/set live on raw_cards too, so
-    # they slot into either path without a meta JOIN. ──────────────────────
-    # Artist needs the meta join, so it rides with color/card_type/domain, not
-    # the rc-only (era/set/recency) group that can skip the join.
-    extra_w, extra_p = merged_extra((color_w, color_p), (cardt_w, cardt_p),
-                                    (domain_w, domain_p), (artist_w, artist_p))
-    rc_only_w, rc_only_p = merged_extra((era_w, era_p), (set_w, set_p),
-                                        (added_w, added_p))
-    if extra_w:
-        rarity_rows = db.query(f"""
-            SELECT rc.rarity AS k, COUNT(DISTINCT rc.tcgplayer_id) AS n
-              FROM raw_cards rc
-              JOIN LATERAL (
-                SELECT scrydex_id FROM scrydex_price_cache
-                 WHERE tcgplayer_id = rc.tcgplayer_id AND game = %s
-                 LIMIT 1
-              ) pc ON TRUE
-              JOIN scrydex_card_meta m
-                ON m.game = %s AND m.scrydex_id = pc.scrydex_id
-             WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL AND rc.game = %s
-               AND rc.rarity IS NOT NULL AND rc.rarity <> ''
-                   {extra_w}{rc_only_w}
-             GROUP BY rc.rarity
-             ORDER BY n DESC
-        """, (sx_game, sx_game, game, *extra_p, *rc_only_p))
+    # ── Rarity facet. Rarity lives on raw_cards, so with no meta-backed
+    # selection it counts copies over every row of the game; once a
+    # colors / card_type / domain / artist filter is on, only cards with
+    # metadata can match, and it counts distinct cards like the chips above.
+    meta_selected = any(state[sel] and key in schema for sel, key in (
+        ("colors", "colors"), ("card_types", "card_type"),
+        ("domains", "domain"), ("artist", "artist")))
+    counts = {}
+    if meta_selected:
+        ids = {}
+        for r in passing(_FG_RARITY):
+            if r.rarity:
+                ids.setdefault(r.rarity, set()).add(r.tcgplayer_id)
+        counts = {k: len(v) for k, v in ids.items()}
     else:
-        rarity_rows = db.query(f"""
-            SELECT rc.rarity AS k, COUNT(*) AS n FROM raw_cards rc
-             WHERE rc.state IN ('STORED','DISPLAY') AND rc.current_hold_id IS NULL AND rc.game = %s
-               AND rc.rarity IS NOT NULL AND rc.rarity <> ''
-                   {rc_only_w}
-             GROUP BY rc.rarity
-             ORDER BY n DESC
-        """, (game, *rc_only_p))
+        for r, m in rows:
+            if r.rarity and not (m & ~_FG_RARITY):
+                counts[r.rarity] = counts.get(r.rarity, 0) + 1
+    rarity_rows = sorted(counts.items(), key=lambda kv: -kv[1])
     # Pokemon: abbreviate the long names ("Special Illustration Rare" → "SIR"),
     # sort by collector tier (Common → Uncommon → Rare → ... → Promo) rather
     # than by qty. With 15+ Pokemon rarities the count order looks random —
@@ -2234,24 +2465,24 @@ def filter_meta():
     if game == "pokemon":
         from rarity import pokemon_tier_index, pokemon_chip_label
         rarity_options = [
-            {"value": r["k"], "label": pokemon_chip_label(r["k"]), "qty": int(r["n"])}
-            for r in rarity_rows
+            {"value": k, "label": pokemon_chip_label(k), "qty": n}
+            for k, n in rarity_rows
         ]
         rarity_options.sort(key=lambda o: pokemon_tier_index(o["value"]))
     else:
         rarity_options = [
-            {"value": r["k"], "label": r["k"], "qty": int(r["n"])}
-            for r in rarity_rows
+            {"value": k, "label": k, "qty": n}
+            for k, n in rarity_rows
         ]
     out["filters"]["rarity"] = {
         "label":   "Rarity",
         "options": rarity_options,
     }
-
-    return jsonify(out)
+    return out
 
 
 @app.route("/api/card")
+@_generation_cached
 def card_detail():
     """
     Individual copies of a specific card for the detail view.
@@ -2318,12 +2549,16 @@ def card_detail():
     # Image fallback to Scrydex cache when raw_cards.image_url is missing
     # (e.g. JP cards entered before TCGplayer images were available, or
     # Scrydex-only cards that never had a PPT image to begin with).
+    images = _resolve_cache_images(
+        (c.get("tcgplayer_id"), c.get("variant"), c.get("scrydex_id"))
+        for c in copies
+        if not c.get("image_url") and (c.get("scrydex_id") or c.get("tcgplayer_id"))
+    )
     out = []
     for c in copies:
         d = dict(c)
         if not d.get("image_url") and (d.get("scrydex_id") or d.get("tcgplayer_id")):
-            sx = _resolve_cache_image(d.get("tcgplayer_id"), d.get("variant"),
-                                      d.get("scrydex_id"))
+            sx = images.get((d.get("tcgplayer_id"), d.get("variant"), d.get("scrydex_id")))
             if sx:
                 d["image_url"] = sx.get("img_l") or sx.get("img_m") or sx.get("img_s")
         out.append(d)
@@ -2812,7 +3047,7 @@ def _shopify_rest(method, path, **kwargs):
     }
     for attempt in range(6):
         try:
-            r = _requests.request(method, url, headers=headers, timeout=30, **kwargs)
+            r = http_pool.request(method, url, headers=headers, timeout=30, **kwargs)
             if r.status_code == 429:
                 # Rate-limited. Wait Retry-After (Shopify usually returns
                 # a few seconds) then try again. Last attempt falls through
@@ -3708,6 +3943,16 @@ def health():
     return "ok"
 
 
+@app.route("/health/db")
+def health_db():
+    """Connection pool metrics (checked out, waits, longest hold). Manager+
+    only — /health stays the public liveness probe."""
+    err = _require_staff()
+    if err is not None:
+        return err
+    return jsonify(db.pool_stats())
+
+
 # ── Background cleanup: Champion holds + in-store hold lifecycle ─────────────
 def _expire_unclaimed_instore_requests():
     """In-store guest REQUESTED items unclaimed after INSTORE_HOLD_REQUEST_EXPIRY_MIN
@@ -31,6 +31,7 @@ BASE_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(BASE_DIR.parent / "shared"))
 import db as shared_db
 from price_auto_block import load_blocks
+from shopify_batch import BatchWriter, endpoint_gql
 
 
 _INSERT_RUN_SQL = """
@@ -139,7 +140,45 @@ def round_nice_price(price):
 
     return round(whole + pretty_decimal, 2)
 
+# Read the catalog from one Shopify Bulk Operations export instead of paging
+SHOPIFY_BULK_EXPORT = os.getenv("SHOPIFY_BULK_EXPORT", "").lower().strip() in ("true", "1", "yes")
+
+
+def _get_shopify_products_bulk():
+    """get_shopify_products via the shared client's bulk export. Same row
+    shape as the paged reader below; the JSONL result is streamed, so only
+    the flattened rows are held in memory. No status filter, like the paged
+    query."""
+    from shopify_client import ShopifyClient
+
+    client = ShopifyClient(SHOPIFY_TOKEN, SHOPIFY_STORE)
+    products = []
+    print("🛒 Fetching products from Shopify (bulk export)...")
+    url = client.run_products_bulk_export(query_filter=None)
+    for page, _ in client.iter_bulk_product_pages(url, batch_size=250):
+        for row in page:
+            products.append({
+                "product_gid": row["product_gid"],
+                "title": row["title"],
+                "handle": row["handle"],
+                "variant_id": str(row["variant_id"]),
+                "shopify_price": row["shopify_price"],
+                "shopify_inventory_item_id": row["inventory_item_id"],
+                "shopify_qty": row["shopify_qty"],
+                "sku": row["sku"],
+                "tcgplayer_id": str(row["tcgplayer_id"]) if row["tcgplayer_id"] is not None else None,
+                "tags": [t.strip() for t in row["tags_csv"].split(",") if t.strip()],
+            })
+    print(f"🔄 Processed {len(products)} items...")
+    return products
+
+
 def get_shopify_products(first=100):
+    if SHOPIFY_BULK_EXPORT:
+        try:
+            return _get_shopify_products_bulk()
+        except Exception as e:
+            print(f"⚠️ Bulk export failed ({e}) — falling back to paged fetch")
     query = """
     query getProducts($first: Int!, $cursor: String) {
       products(first: $first, after: $cursor) {
@@ -542,11 +581,15 @@ def safe_percent_diff(old_price: float, new_price: float):
         return ""   # or "n/a"
     return round(100 * (new_price - old_price) / old_price, 2)
 
-def process_product(product, blocked: set | None = None):
+def process_product(product, blocked: set | None = None, defer_write: bool = False):
     """Decide what to do with one Shopify variant. Returns the original
     product dict mutated with `action`, `reason`, and pricing fields the
     DB writer expects.
 
+    defer_write=True leaves the Shopify price write to the caller (the run
+    loop queues every "updated" row on a BatchWriter and flushes once per
+    batch — see _push_price_updates).
+
     Action taxonomy (see _classify_pre_scrape for full table):
       skip      -> tagged / block-listed / ignored-sku
       missing   -> no tcgplayer_id metafield (Shopify catalog issue)
@@ -596,7 +639,8 @@ def process_product(product, blocked: set | None = None):
             # OOS items can drop silently — no customers are watching them
             # and we want the price ready for next restock.
             print(f"  ⬇ OOS auto-update {product['title']}: ${current_price:.2f} → ${new_price:.2f} (qty=0)")
-            update_variant_price(product["product_gid"], product["variant_id"], new_price)
+            if not defer_write:
+                update_variant_price(product["product_gid"], product["variant_id"], new_price)
             product.update({
                 "action": "updated",
                 "tcg_price": tcg_price,
@@ -627,7 +671,8 @@ def process_product(product, blocked: set | None = None):
 
     elif new_price > current_price:
         print(f" Updating {product['title']} : {tcg_price} : {new_price}")
-        update_variant_price(product["product_gid"], product["variant_id"], new_price)
+        if not defer_write:
+            update_variant_price(product["product_gid"], product["variant_id"], new_price)
         product.update({
             "action": "updated",
             "tcg_price": tcg_price,
@@ -661,14 +706,34 @@ def _invalidate_inventory_cache():
             print(f"⚠️ Failed to notify {name} cache: {e}")
 
 
-def process_product_with_delay(product_and_index, blocked):
+def process_product_with_delay(product_and_index, blocked, defer_write=False):
     product, index = product_and_index
 
     # Scale delay as batch progresses to dodge TCGplayer's bot detection
     delay = random.uniform(2.5, 5.0) + (index / 700.0) * 2.5  # starts ~3s, ends ~5.5s
     time.sleep(delay)
 
-    return process_product(product, blocked=blocked)
+    return process_product(product, blocked=blocked, defer_write=defer_write)
+
+
+def _push_price_updates(writer: BatchWriter, counts: dict) -> None:
+    """Flush the queued price writes (grouped by product, a few aliased
+    mutations per request) and demote any row Shopify rejected from
+    "updated" to "error" so sealed_price_runs records what really happened."""
+    for res in writer.flush():
+        if res["ok"]:
+            continue
+        row = res["ref"]
+        print(f"❌ Shopify price update failed for {row.get('title')}: {res['error']}")
+        row.update({
+            "action": "error",
+            "reason": f"shopify price update failed: {res['error']}"[:500],
+            "apply_status": "pending",
+            "applied_at": None, "applied_price": None,
+            "uploaded_price": None, "new_price": None,
+        })
+        counts["updated"] = counts.get("updated", 0) - 1
+        counts["error"] = counts.get("error", 0) + 1
 
 
 def _classify_pre_scrape(product, blocked, ignored_skus):
@@ -755,6 +820,7 @@ def run_price_sync():
               f"rows (run={run_id[:8]})")
 
     products = to_scrape
+    writer = BatchWriter(endpoint_gql(GRAPHQL_ENDPOINT, HEADERS, priority="background"))
 
     try:
         print(f"🔄 Scrape candidates: {len(products)}")
@@ -765,7 +831,8 @@ def run_price_sync():
 
             with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
                 indexed_batch = [(product, batch_start + i) for i, product in enumerate(batch)]
-                futures = {executor.submit(process_product_with_delay, p, blocked): p[0] for p in indexed_batch}
+                futures = {executor.submit(process_product_with_delay, p, blocked, True): p[0]
+                           for p in indexed_batch}
                 completed = 0
                 for future in concurrent.futures.as_completed(futures):
                     try:
@@ -782,8 +849,13 @@ def run_price_sync():
 
                     counts[result_type] = counts.get(result_type, 0) + 1
                     pending_db.append(data)
+                    if result_type == "updated":
+                        writer.set_variant_price(data["product_gid"], data["variant_id"],
+                                                 data["new_price"], ref=data)
 
-            # Persist this batch (and any unflushed prior rows) before sleeping.
+            # Push this batch's price changes, then persist it (and any
+            # unflushed prior rows) before sleeping.
+            _push_price_updates(writer, counts)
             _flush_to_db(run_id, started_at, pending_db)
 
             if batch_start + len(batch) < len(products):
@@ -806,6 +878,7 @@ def run_price_sync():
         raise
     finally:
         print("🧹 Final flush (crash-safe)!")
+        _push_price_updates(writer, counts)
         _flush_to_db(run_id, started_at, pending_db)
         _invalidate_inventory_cache()
 
@@ -11,6 +11,7 @@ facing via kiosk and POS rings them up at current_price just like STORED.
      (scrydex_id, variant, condition, price_type='raw'), falling back to
      tcgplayer_id when no scrydex_id is bound. Scrydex IDs are more
      specific (TCG IDs can collide across variants or be orphaned).
+     All cards are resolved in one set-based query (_BULK_PRICE_SQL).
   3. Floor at cost_basis (never sell below cost).
   4. Charm-ceil round to a customer-friendly .99 price.
   5. Compare to raw_cards.current_price (delta = (old - suggested)/suggested):
@@ -18,6 +19,8 @@ facing via kiosk and POS rings them up at current_price just like STORED.
        delta < -AUTO_DELTA_PCT    -> auto-apply (raise — never miss a fast mover)
        delta >  AUTO_DELTA_PCT    -> flag_overpriced (review needed to drop)
   6. Persist every row to raw_card_price_runs for audit + per-row apply.
+     Audit rows and auto-applied prices are written in multi-row batches
+     after the scan, not one statement per card.
 
 No Shopify mutations — raw card listings are created on-demand at Champion
 checkout from the live raw_cards.current_price. Updating the DB is the
@@ -84,42 +87,45 @@ def charm_ceil_raw(price) -> float:
     return round(candidate, 2)
 
 
-_INSERT_RUN_SQL = """
+_INSERT_RUNS_SQL = """
     INSERT INTO raw_card_price_runs (
         run_id, started_at,
         raw_card_id, barcode, tcgplayer_id, scrydex_id, card_name, set_name,
         card_number, condition, variant, cost_basis,
         old_price, new_price, suggested_price, cache_market, cache_low,
         delta_pct, action, reason, apply_status, applied_at, applied_price
-    ) VALUES (
-        %s, %s,
-        %s, %s, %s, %s, %s, %s,
-        %s, %s, %s, %s,
-        %s, %s, %s, %s, %s,
-        %s, %s, %s, %s, %s, %s
-    )
+    ) VALUES %s
 """
 
 
-def _record(db_module, run_id: str, started_at: datetime, entry: dict):
+def _insert_runs(db_module, run_id: str, started_at: datetime, entries: list[dict]):
+    """Persist every scanned card's audit row in multi-row INSERTs. Raises on
+    failure, so a caller's db_module.transaction() rolls back with it."""
+    rows = [(
+        run_id, started_at,
+        e.get("raw_card_id"), e.get("barcode"),
+        e.get("tcgplayer_id"), e.get("scrydex_id"),
+        e.get("card_name"), e.get("set_name"),
+        e.get("card_number"), e.get("condition"),
+        e.get("variant"), e.get("cost_basis"),
+        e.get("old_price"), e.get("new_price"),
+        e.get("suggested_price"), e.get("cache_market"),
+        e.get("cache_low"), e.get("delta_pct"),
+        e.get("action"), e.get("reason"),
+        e.get("apply_status", "pending"),
+        e.get("applied_at"), e.get("applied_price"),
+    ) for e in entries]
+    db_module.execute_values_batch(_INSERT_RUNS_SQL, rows, page_size=1000)
+
+
+def _record_many(db_module, run_id: str, started_at: datetime, entries: list[dict]):
+    """_insert_runs for audit rows with no price change riding on them: a
+    failure is logged, not raised."""
     try:
-        db_module.execute(_INSERT_RUN_SQL, (
-            run_id, started_at,
-            entry.get("raw_card_id"), entry.get("barcode"),
-            entry.get("tcgplayer_id"), entry.get("scrydex_id"),
-            entry.get("card_name"), entry.get("set_name"),
-            entry.get("card_number"), entry.get("condition"),
-            entry.get("variant"), entry.get("cost_basis"),
-            entry.get("old_price"), entry.get("new_price"),
-            entry.get("suggested_price"), entry.get("cache_market"),
-            entry.get("cache_low"), entry.get("delta_pct"),
-            entry.get("action"), entry.get("reason"),
-            entry.get("apply_status", "pending"),
-            entry.get("applied_at"), entry.get("applied_price"),
-        ))
+        _insert_runs(db_module, run_id, started_at, entries)
     except Exception as e:
-        logger.warning(f"Failed to persist raw_card_price_runs row "
-                       f"for {entry.get('barcode')}: {e}")
+        logger.warning(f"Failed to persist {len(entries)} raw_card_price_runs rows "
+                       f"for run {run_id}: {e}")
 
 
 # Look up market_price for a (scrydex_id|tcgplayer_id, variant, condition) tuple.
@@ -243,7 +249,12 @@ def _lookup_cache_price(db_module, scrydex_id, tcgplayer_id, condition, variant)
     nm_hit = _lookup_one(db_module, scrydex_id, tcgplayer_id, "NM", variant)
     if not nm_hit or nm_hit.get("market_price") is None:
         return None
+    return _derive_nm_fallback(nm_hit, cond_upper)
+
 
+def _derive_nm_fallback(nm_hit: dict, cond_upper: str) -> dict | None:
+    """NM row × FALLBACK_MULTIPLIERS[cond] (JP_FALLBACK_MULTIPLIERS for JPY
+    rows). Shared by the per-card and the bulk lookup paths."""
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "shared"))
     is_jp = (nm_hit.get("currency") or "").upper() == "JPY"
     if is_jp:
@@ -274,13 +285,122 @@ def _lookup_cache_price(db_module, scrydex_id, tcgplayer_id, condition, variant)
     }
 
 
-def _apply_db_price(db_module, raw_card_id: str, new_price: float) -> None:
-    """Update raw_cards.current_price for one card."""
-    db_module.execute(
-        """UPDATE raw_cards
-              SET current_price = %s, last_price_update = NOW()
-            WHERE id = %s""",
-        (round(float(new_price), 2), raw_card_id),
+# Set-based version of _lookup_cache_price for the nightly run: every in-stock
+# raw card joined to its exact (condition, variant) cache row and, when that
+# misses on a non-NM card, its NM row — each Scrydex-first with TCG fallback,
+# exactly like _lookup_one. One statement replaces up to four queries per
+# card. Same variant fold, JPY conversion and mid-over-market JP basis as
+# _CACHE_LOOKUP_SQL_TEMPLATE; keep the two in lockstep. The NM × multiplier
+# arithmetic stays in Python (_derive_nm_fallback) so the multiplier tables
+# have one home.
+_VARIANT_KEY = """CASE WHEN {col} IS NULL
+                 OR regexp_replace(LOWER({col}), '[^a-z0-9]', '', 'g') IN ('normal','holofoil')
+               THEN ''
+               ELSE regexp_replace(LOWER({col}), '[^a-z0-9]', '', 'g')
+          END"""
+
+_BULK_HIT_COLS = """
+    CASE WHEN p.currency = 'JPY' AND p.mid_price IS NOT NULL
+         THEN ROUND(p.mid_price::numeric * %(jpy)s::numeric, 2)
+         WHEN p.currency = 'JPY'
+         THEN ROUND(p.market_price::numeric * %(jpy)s::numeric, 2)
+         ELSE p.market_price END AS market_price,
+    CASE WHEN p.currency = 'JPY' AND p.mid_price IS NOT NULL THEN 'mid_jpy'
+         WHEN p.currency = 'JPY' THEN 'market_jpy'
+         ELSE 'market' END AS price_basis,
+    CASE WHEN p.currency = 'JPY'
+         THEN ROUND(p.low_price::numeric * %(jpy)s::numeric, 2)
+         ELSE p.low_price END AS low_price,
+    p.currency, p.scrydex_id, p.tcgplayer_id, p.variant
+"""
+
+_BULK_LATERAL_TEMPLATE = """
+    LEFT JOIN LATERAL (
+        SELECT * FROM (
+            (SELECT 0 AS pri, {cols}
+               FROM scrydex_price_cache p
+              WHERE {guard} AND c.scrydex_id IS NOT NULL
+                AND p.scrydex_id = c.scrydex_id AND {match}
+              ORDER BY p.fetched_at DESC NULLS LAST LIMIT 1)
+            UNION ALL
+            (SELECT 1 AS pri, {cols}
+               FROM scrydex_price_cache p
+              WHERE {guard} AND c.tcgplayer_id IS NOT NULL
+                AND p.tcgplayer_id = c.tcgplayer_id AND {match}
+              ORDER BY p.fetched_at DESC NULLS LAST LIMIT 1)
+        ) u ORDER BY pri LIMIT 1
+    ) {alias} ON TRUE
+"""
+
+_BULK_MATCH = """p.product_type = 'card' AND p.price_type = 'raw'
+                AND UPPER(p.condition) = {cond}
+                AND """ + _VARIANT_KEY.format(col="p.variant") + """ = c.variant_key
+                AND p.market_price IS NOT NULL"""
+
+_BULK_PRICE_SQL = """
+    SELECT c.id, c.barcode, c.tcgplayer_id, c.scrydex_id, c.card_name,
+           c.set_name, c.card_number, c.condition, c.variant,
+           c.current_price, c.cost_basis, c.state,
+           ex.market_price AS ex_market_price, ex.price_basis AS ex_price_basis,
+           ex.low_price AS ex_low_price, ex.currency AS ex_currency,
+           ex.scrydex_id AS ex_scrydex_id, ex.tcgplayer_id AS ex_tcgplayer_id,
+           ex.variant AS ex_variant,
+           nm.market_price AS nm_market_price, nm.price_basis AS nm_price_basis,
+           nm.low_price AS nm_low_price, nm.currency AS nm_currency,
+           nm.scrydex_id AS nm_scrydex_id, nm.tcgplayer_id AS nm_tcgplayer_id,
+           nm.variant AS nm_variant
+    FROM (
+        SELECT id, barcode, tcgplayer_id, scrydex_id, card_name, set_name,
+               card_number, condition, variant, current_price, cost_basis,
+               state, """ + _VARIANT_KEY.format(col="variant") + """ AS variant_key
+        FROM raw_cards
+        WHERE state IN ('STORED', 'DISPLAY') AND current_hold_id IS NULL
+          AND is_graded = FALSE
+    ) c
+""" + _BULK_LATERAL_TEMPLATE.format(
+    alias="ex", cols=_BULK_HIT_COLS, guard="c.condition IS NOT NULL",
+    match=_BULK_MATCH.format(cond="UPPER(c.condition)"),
+) + _BULK_LATERAL_TEMPLATE.format(
+    alias="nm", cols=_BULK_HIT_COLS,
+    guard="ex.pri IS NULL AND UPPER(c.condition) <> 'NM'",
+    match=_BULK_MATCH.format(cond="'NM'"),
+) + """
+    ORDER BY c.card_name, c.set_name
+"""
+
+_HIT_FIELDS = ("market_price", "price_basis", "low_price", "currency",
+               "scrydex_id", "tcgplayer_id", "variant")
+
+
+def _bulk_cache_hit(card: dict) -> dict | None:
+    """Turn a _BULK_PRICE_SQL row's ex_*/nm_* columns into the same dict
+    _lookup_cache_price returns for that card."""
+    if card.get("ex_market_price") is not None:
+        hit = {f: card.get(f"ex_{f}") for f in _HIT_FIELDS}
+        hit["source"] = "exact"
+        return hit
+    if card.get("nm_market_price") is not None:
+        nm_hit = {f: card.get(f"nm_{f}") for f in _HIT_FIELDS}
+        return _derive_nm_fallback(nm_hit, (card.get("condition") or "").upper())
+    return None
+
+
+_APPLY_PRICES_SQL = """
+    UPDATE raw_cards r
+       SET current_price = v.price, last_price_update = NOW()
+      FROM (VALUES %s) AS v(id, price)
+     WHERE r.id = v.id
+"""
+
+
+def _apply_db_prices(db_module, updates: list[tuple]) -> None:
+    """Update raw_cards.current_price for [(raw_card_id, new_price)] in one
+    UPDATE ... FROM (VALUES ...) per page."""
+    db_module.execute_values_batch(
+        _APPLY_PRICES_SQL,
+        [(rid, round(float(price), 2)) for rid, price in updates],
+        template="(%s::uuid, %s::numeric)",
+        page_size=1000,
     )
 
 
@@ -311,16 +431,11 @@ def run(*, apply_auto: bool = True, db_module=None) -> dict:
     if blocked:
         logger.info(f"  {len(blocked)} cards on raw price-auto-block list")
 
-    cards = db_module.query("""
-        SELECT id, barcode, tcgplayer_id, scrydex_id, card_name, set_name,
-               card_number, condition, variant, current_price, cost_basis,
-               state
-        FROM raw_cards
-        WHERE state IN ('STORED', 'DISPLAY') AND current_hold_id IS NULL
-          AND is_graded = FALSE
-        ORDER BY card_name, set_name
-    """)
+    # Cards and their cache hits in one round-trip (see _BULK_PRICE_SQL).
+    cards = db_module.query(_BULK_PRICE_SQL, {"jpy": _JPY_USD_RATE})
     logger.info(f"  scanning {len(cards)} in-stock raw cards")
+    entries: list[dict] = []
+    pending_apply: list[dict] = []
 
     stats = {
         "run_id": run_id, "scanned": len(cards),
@@ -347,18 +462,16 @@ def run(*, apply_auto: bool = True, db_module=None) -> dict:
         if block_key and block_key in blocked:
             entry.update({"action": "skip", "reason": f"auto-block ({block_key})"})
             stats["skip"] += 1
-            _record(db_module, run_id, started_at, entry)
+            entries.append(entry)
             continue
 
         if not card["tcgplayer_id"] and not card["scrydex_id"]:
             entry.update({"action": "skip", "reason": "no scrydex_id or tcgplayer_id"})
             stats["skip"] += 1
-            _record(db_module, run_id, started_at, entry)
+            entries.append(entry)
             continue
 
-        cache = _lookup_cache_price(
-            db_module, card["scrydex_id"], card["tcgplayer_id"],
-            card["condition"], card["variant"])
+        cache = _bulk_cache_hit(card)
         if not cache or cache.get("market_price") is None:
             entry.update({
                 "action": "skip",
@@ -367,7 +480,7 @@ def run(*, apply_auto: bool = True, db_module=None) -> dict:
                            f"variant={card['variant']!r} cond={card['condition']!r}"),
             })
             stats["skip"] += 1
-            _record(db_module, run_id, started_at, entry)
+            entries.append(entry)
             continue
 
         market = float(cache["market_price"])
@@ -441,30 +554,27 @@ def run(*, apply_auto: bool = True, db_module=None) -> dict:
                 })
                 stats["skip"] += 1
             elif apply_auto:
-                try:
-                    _apply_db_price(db_module, entry["raw_card_id"], suggested)
-                    if delta_pct < -AUTO_DELTA_PCT:
-                        why = (f"auto-raised {abs(delta_pct):.1f}% to follow market; "
-                               f"${old:.2f} -> ${suggested:.2f}")
-                    elif small_dollar_drop:
-                        why = (f"auto-dropped ${drop_dollars:.2f} (within "
-                               f"${drop_threshold:.2f} charm tier); "
-                               f"${old:.2f} -> ${suggested:.2f}")
-                    else:
-                        why = (f"auto-applied {delta_pct:+.1f}% drift; "
-                               f"${old:.2f} -> ${suggested:.2f}")
-                    entry.update({
-                        "action": "auto_applied",
-                        "new_price": suggested,
-                        "applied_at": datetime.now(timezone.utc),
-                        "applied_price": suggested,
-                        "apply_status": "applied",
-                        "reason": source_note + why,
-                    })
-                    stats["auto_applied"] += 1
-                except Exception as e:
-                    entry.update({"action": "error", "reason": f"DB update failed: {e}"})
-                    stats["error"] += 1
+                # Written in bulk after the scan; a failed batch turns these
+                # entries into action=error below.
+                if delta_pct < -AUTO_DELTA_PCT:
+                    why = (f"auto-raised {abs(delta_pct):.1f}% to follow market; "
+                           f"${old:.2f} -> ${suggested:.2f}")
+                elif small_dollar_drop:
+                    why = (f"auto-dropped ${drop_dollars:.2f} (within "
+                           f"${drop_threshold:.2f} charm tier); "
+                           f"${old:.2f} -> ${suggested:.2f}")
+                else:
+                    why = (f"auto-applied {delta_pct:+.1f}% drift; "
+                           f"${old:.2f} -> ${suggested:.2f}")
+                entry.update({
+                    "action": "auto_applied",
+                    "new_price": suggested,
+                    "applied_price": suggested,
+                    "apply_status": "applied",
+                    "reason": source_note + why,
+                })
+                pending_apply.append(entry)
+                stats["auto_applied"] += 1
             else:
                 entry.update({
                     "action": "auto_applied",
@@ -473,7 +583,30 @@ def run(*, apply_auto: bool = True, db_module=None) -> dict:
                 })
                 stats["auto_applied"] += 1
 
-        _record(db_module, run_id, started_at, entry)
+        entries.append(entry)
+
+    if pending_apply:
+        applied_at = datetime.now(timezone.utc)
+        for e in pending_apply:
+            e["applied_at"] = applied_at
+        try:
+            # Applied prices and the run's audit rows commit together, so no
+            # price ever changes without its raw_card_price_runs row.
+            with db_module.transaction():
+                _apply_db_prices(db_module, [(e["raw_card_id"], e["new_price"])
+                                             for e in pending_apply])
+                _insert_runs(db_module, run_id, started_at, entries)
+        except Exception as exc:
+            logger.error(f"  bulk price apply rolled back for {len(pending_apply)} cards: {exc}")
+            for e in pending_apply:
+                e.update({"action": "error", "reason": f"DB update failed: {exc}",
+                          "new_price": None, "applied_price": None,
+                          "apply_status": "pending", "applied_at": None})
+            stats["error"] += len(pending_apply)
+            stats["auto_applied"] -= len(pending_apply)
+            _record_many(db_module, run_id, started_at, entries)
+    else:
+        _record_many(db_module, run_id, started_at, entries)
 
     logger.info(
         f"raw_card_updater done run_id={run_id} "
@@ -1657,13 +1657,16 @@ def sealed_run_bulk_apply(run_id):
     process_product: a $1.49 -> $0.99 drop is 33% but only 50¢, which
     is just charm-rounding noise — auto-apply, don't flag.
 
-    Each Shopify mutation runs sequentially (no fan-out) so one failure
+    The price writes go out through a shopify_batch.BatchWriter — grouped
+    by product, several aliased mutations per request — and each row's
+    own result decides whether it is marked applied, so one failure
     doesn't poison the rest; per-row results are reported back."""
     from flask import jsonify
     db = _shared_db()
-    from dailyrunner import update_variant_price
+    from dailyrunner import GRAPHQL_ENDPOINT, HEADERS
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "shared"))
     from price_rounding import charm_drop_auto_threshold
+    from shopify_batch import BatchWriter, endpoint_gql
 
     body = request.get_json(silent=True) or {}
     mode = (body.get("mode") or "pct").strip()
@@ -1714,11 +1717,19 @@ def sealed_run_bulk_apply(run_id):
                 rows.append(r)
         filter_label = "drop ≤ charm tier"
 
-    applied, failed = [], []
+    writer = BatchWriter(endpoint_gql(GRAPHQL_ENDPOINT, HEADERS, priority="interactive"))
     for r in rows:
+        writer.set_variant_price(r["product_gid"], r["variant_id"],
+                                 float(r["suggested_price"]), ref=r)
+
+    applied, failed = [], []
+    for res in writer.flush():
+        r = res["ref"]
         target = float(r["suggested_price"])
+        if not res["ok"]:
+            failed.append({"id": r["id"], "title": r["title"], "error": res["error"]})
+            continue
         try:
-            update_variant_price(r["product_gid"], r["variant_id"], target)
             db.execute("""
                 UPDATE sealed_price_runs
                    SET apply_status = 'applied', applied_at = NOW(),
@@ -29,15 +29,69 @@ def main() -> int:
         return 0
 
     sys.path.insert(0, str(BASE_DIR.parent / "shared"))
-    from scrydex_client import ScrydexClient
-    from scrydex_nightly import sync_expansion
+    from scrydex_nightly import bump_sync_generation
     import db as shared_db
+    import scrydex_generation
+
+    # SCRYDEX_SYNC_DELTA=true → only expansions whose adaptive re-sync
+    # interval has come due (see scrydex_nightly._resync_interval_days).
+    delta = os.getenv("SCRYDEX_SYNC_DELTA", "").lower().strip() in ("true", "1", "yes")
 
     shared_db.init_pool()
 
     games = [g.strip() for g in os.environ.get("SCRYDEX_GAMES", "pokemon").split(",") if g.strip()]
     grand_start = time.time()
     grand_totals = {"cards": 0, "sealed": 0, "prices": 0, "credits": 0}
+    synced = []  # [(game, run_started)] — generations are bumped once the cache is final
+
+    # SCRYDEX_GENERATION_SWAP=true → every game syncs into a shadow table that
+    # replaces the live cache in one rename once row counts check out.
+    generation_id = None
+    price_table = scrydex_generation.LIVE_TABLE
+    if scrydex_generation.enabled():
+        generation_id = scrydex_generation.begin_generation(shared_db)
+        price_table = scrydex_generation.NEXT_TABLE
+        print(f"🧬 Building cache generation {generation_id} in {price_table}")
+
+    try:
+        _sync_games(shared_db, games, scrydex_key, scrydex_team, delta=delta,
+                    price_table=price_table, grand_totals=grand_totals, synced=synced)
+    except BaseException as e:
+        if generation_id is not None:
+            scrydex_generation.abort_generation(shared_db, generation_id, f"sync crashed: {e}")
+        raise
+
+    if generation_id is not None:
+        problems = scrydex_generation.finish_generation(shared_db, generation_id)
+        if problems:
+            print(f"❌ Generation {generation_id} NOT swapped — {'; '.join(problems)}")
+        else:
+            print(f"🧬 Generation {generation_id} swapped in")
+
+    for game, run_started in synced:
+        bump_sync_generation(shared_db, game, run_started)
+
+    # Warm the mmapped price snapshot on this host so the morning updaters
+    # start on microsecond lookups (no-op unless PRICE_SNAPSHOT is set).
+    try:
+        import price_snapshot
+        if price_snapshot.refresh(shared_db):
+            print("📦 Price snapshot rebuilt")
+    except Exception as e:
+        print(f"⚠ Price snapshot refresh failed ({e}) — readers fall back to Postgres")
+
+    grand_elapsed = int(time.time() - grand_start)
+    print(f"✅ All games done in {grand_elapsed}s — {grand_totals['credits']} total credits")
+    return 0
+
+
+def _sync_games(shared_db, games, scrydex_key, scrydex_team, *,
+                delta, price_table, grand_totals, synced):
+    """Discover + sync every game's expansions into `price_table`. Adds to
+    grand_totals and appends (game, run_started) to `synced` per game."""
+    from scrydex_client import ScrydexClient
+    from scrydex_nightly import (sync_expansion, sync_expansions_pipelined,
+                                 due_expansion_ids, SYNC_WORKERS)
 
     for game in games:
         client = ScrydexClient(scrydex_key, scrydex_team, db=shared_db, game=game)
@@ -68,35 +122,55 @@ def main() -> int:
         except Exception as e:
             print(f"⚠ {game}: expansion discovery failed ({e}) — proceeding with known sets")
 
-        rows = shared_db.query(
-            "SELECT expansion_id FROM scrydex_sync_log WHERE game = %s AND active = TRUE", (game,))
-        expansion_ids = [r["expansion_id"] for r in rows]
+        if delta:
+            expansion_ids = due_expansion_ids(shared_db, game)
+        else:
+            rows = shared_db.query(
+                "SELECT expansion_id FROM scrydex_sync_log WHERE game = %s AND active = TRUE", (game,))
+            expansion_ids = [r["expansion_id"] for r in rows]
         if not expansion_ids:
-            print(f"⏭ {game}: no active expansions in sync_log")
+            print(f"⏭ {game}: no {'due' if delta else 'active'} expansions in sync_log")
             continue
 
-        print(f"🔄 {game}: {len(expansion_ids)} active expansions")
+        print(f"🔄 {game}: {len(expansion_ids)} {'due' if delta else 'active'} expansions")
         totals = {"cards": 0, "sealed": 0, "prices": 0, "credits": 0}
         failures = []
         t_start = time.time()
-
-        for i, eid in enumerate(expansion_ids):
-            try:
-                stats = sync_expansion(client, eid, shared_db)
-                for k in totals:
-                    totals[k] += stats.get(k, 0)
-                if (i + 1) % 20 == 0:
-                    print(f"  ... {i+1}/{len(expansion_ids)} done ({totals['credits']} credits)")
-            except Exception as e:
-                print(f"  ❌ {game}/{eid}: {e}")
-                failures.append((eid, str(e)))
-            time.sleep(0.05)
+        run_started = shared_db.query_one("SELECT NOW() AS ts")["ts"]
+
+        if SYNC_WORKERS > 1:
+            n_done = [0]
+
+            def _progress(eid, stats, err, _game=game, _n=len(expansion_ids)):
+                n_done[0] += 1
+                if err is not None:
+                    print(f"  ❌ {_game}/{eid}: {err}")
+                elif n_done[0] % 20 == 0:
+                    print(f"  ... {n_done[0]}/{_n} done")
+
+            pipe_totals, failures = sync_expansions_pipelined(
+                client, expansion_ids, shared_db, on_result=_progress,
+                price_table=price_table)
+            for k in totals:
+                totals[k] += pipe_totals.get(k, 0)
+        else:
+            for i, eid in enumerate(expansion_ids):
+                try:
+                    stats = sync_expansion(client, eid, shared_db, price_table)
+                    for k in totals:
+                        totals[k] += stats.get(k, 0)
+                    if (i + 1) % 20 == 0:
+                        print(f"  ... {i+1}/{len(expansion_ids)} done ({totals['credits']} credits)")
+                except Exception as e:
+                    print(f"  ❌ {game}/{eid}: {e}")
+                    failures.append((eid, str(e)))
+                time.sleep(0.05)
 
         if failures:
             print(f"  🔁 Retrying {len(failures)} failed expansions...")
             for eid, _orig in failures:
                 try:
-                    stats = sync_expansion(client, eid, shared_db)
+                    stats = sync_expansion(client, eid, shared_db, price_table)
                     for k in totals:
                         totals[k] += stats.get(k, 0)
                     print(f"    ✅ Retry OK: {game}/{eid}")
@@ -104,16 +178,13 @@ def main() -> int:
                     print(f"    ❌ Still failed: {game}/{eid}: {e}")
                 time.sleep(0.1)
 
+        synced.append((game, run_started))
         elapsed = int(time.time() - t_start)
         print(f"✅ {game} done in {elapsed}s — {totals['cards']} cards, "
               f"{totals['sealed']} sealed, {totals['credits']} credits")
         for k in grand_totals:
             grand_totals[k] += totals[k]
 
-    grand_elapsed = int(time.time() - grand_start)
-    print(f"✅ All games done in {grand_elapsed}s — {grand_totals['credits']} total credits")
-    return 0
-
 
 if __name__ == "__main__":
     try:
@@ -94,6 +94,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."
 
 import requests
 
+from shopify_batch import BatchWriter, endpoint_gql
+
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
 
@@ -317,6 +319,10 @@ def run(*, apply: bool = True, csv_path: str = None) -> list[dict]:
     results = []
     updated = 0
     flagged = 0
+    # Auto-adjust writes are queued and pushed after the loop, grouped by
+    # product; their run rows are recorded once the outcome is known.
+    writer = BatchWriter(endpoint_gql(GRAPHQL_ENDPOINT, HEADERS, priority="background"))
+    queued: list[dict] = []
 
     for slab in slabs:
         title = slab["title"]
@@ -407,17 +413,14 @@ def run(*, apply: bool = True, csv_path: str = None) -> list[dict]:
         elif small_dollar_drop:
             entry["suggested_price"] = charm_price
             if apply and slab["qty"] > 0:
-                try:
-                    update_variant_price(slab["product_gid"], slab["variant_gid"], charm_price)
-                    entry["action"] = "adjusted"
-                    entry["new_price"] = charm_price
-                    entry["reason"] = (f"auto-dropped ${drop_dollars:.2f} (within "
-                                       f"${drop_threshold:.2f} charm tier); "
-                                       f"${current:.2f} -> ${charm_price:.2f}")
-                    updated += 1
-                except Exception as e:
-                    entry["action"] = "error"
-                    entry["reason"] = f"price update failed: {e}"
+                writer.set_variant_price(slab["product_gid"], slab["variant_gid"], charm_price,
+                                         ref=entry)
+                entry["action"] = "adjusted"
+                entry["new_price"] = charm_price
+                entry["reason"] = (f"auto-dropped ${drop_dollars:.2f} (within "
+                                   f"${drop_threshold:.2f} charm tier); "
+                                   f"${current:.2f} -> ${charm_price:.2f}")
+                updated += 1
             else:
                 entry["action"] = "flag_overpriced"
                 entry["reason"] = (f"[DRY-RUN] would auto-drop ${drop_dollars:.2f} "
@@ -427,16 +430,13 @@ def run(*, apply: bool = True, csv_path: str = None) -> list[dict]:
             # Currently priced below target — auto-raise to chase the market
             entry["suggested_price"] = charm_price
             if apply and slab["qty"] > 0:
-                try:
-                    update_variant_price(slab["product_gid"], slab["variant_gid"], charm_price)
-                    entry["action"] = "adjusted"
-                    entry["new_price"] = charm_price
-                    entry["reason"] = (f"auto-raised {abs(delta_pct):.1f}% to follow market; "
-                                       f"${current:.2f} -> ${charm_price:.2f}")
-                    updated += 1
-                except Exception as e:
-                    entry["action"] = "error"
-                    entry["reason"] = f"price update failed: {e}"
+                writer.set_variant_price(slab["product_gid"], slab["variant_gid"], charm_price,
+                                         ref=entry)
+                entry["action"] = "adjusted"
+                entry["new_price"] = charm_price
+                entry["reason"] = (f"auto-raised {abs(delta_pct):.1f}% to follow market; "
+                                   f"${current:.2f} -> ${charm_price:.2f}")
+                updated += 1
             else:
                 entry["action"] = "flag_underpriced"
                 entry["reason"] = (f"[DRY-RUN] would auto-raise {abs(delta_pct):.1f}% "
@@ -444,9 +444,22 @@ def run(*, apply: bool = True, csv_path: str = None) -> list[dict]:
                 flagged += 1
 
         results.append(entry)
-        _record_run_row(db_module, run_id, started_at, entry)
+        if entry["action"] == "adjusted":
+            queued.append(entry)
+        else:
+            _record_run_row(db_module, run_id, started_at, entry)
         logger.info(f"  {title}: ${current:.2f} vs market ${market:.2f} ({comps_n} comps) → {entry['action']}")
 
+    for res in writer.flush():
+        if not res["ok"]:
+            entry = res["ref"]
+            entry["action"] = "error"
+            entry["reason"] = f"price update failed: {res['error']}"
+            entry.pop("new_price", None)
+            updated -= 1
+    for entry in queued:
+        _record_run_row(db_module, run_id, started_at, entry)
+
     logger.info(f"\nDone. run_id={run_id}  {len(slabs)} slabs, {updated} adjusted, {flagged} flagged")
 
     # Write CSV if requested
@@ -14,6 +14,8 @@ except Exception:
         sys.path.insert(0, ROOT)
     from integrations.klaviyo import upsert_profile
 import json
+from shopify_fanout import fan_out
+from shopify_throttle import gql_post
 
 load_dotenv()
 # ---- CONFIG ----
@@ -133,16 +135,10 @@ def shopify_gql(query: str, variables=None):
 
     for attempt in range(6):  # ~5 retries
         try:
-            resp = requests.post(
-                _GRAPHQL_ENDPOINT, headers=headers, json=payload, timeout=_PER_CALL_TIMEOUT
-            )
-            resp.raise_for_status()
-            data = resp.json()
+            # THROTTLED responses are paced/retried inside gql_post against
+            # the shop's cost bucket; only transport hiccups land below.
+            data = gql_post(_GRAPHQL_ENDPOINT, headers, payload, timeout=_PER_CALL_TIMEOUT)
             if data.get("errors"):
-                messages = " ".join(e.get("message", "") for e in data["errors"])
-                # Retry on throttling or remote hiccups
-                if "Throttled" in messages or "throttle" in messages.lower():
-                    raise requests.HTTPError("Throttled")
                 raise RuntimeError(f"GraphQL errors: {data['errors']}")
             return data
         except (requests.Timeout, requests.ConnectionError, requests.HTTPError):
@@ -807,13 +803,14 @@ def sweep_vips_page(*, page_size: int = 25, cursor: str | None = None):
     cs = data["data"]["customers"]
     ids = [e["node"]["id"] for e in cs["edges"]]
 
+    # Customers are independent: push them concurrently (bounded by the
+    # fan-out pool and the Shopify cost bucket) instead of one by one.
     processed = 0
-    for gid in ids:
-        try:
-            _push_vip_to_klaviyo(gid)
+    for gid, _, err in fan_out(_push_vip_to_klaviyo, ids):
+        if err is None:
             processed += 1
-        except Exception as e:
-            print(f"[VIP SWEEP] error gid={gid}: {e}", flush=True)
+        else:
+            print(f"[VIP SWEEP] error gid={gid}: {err}", flush=True)
 
     next_cursor = cs["pageInfo"]["endCursor"] if cs["pageInfo"]["hasNextPage"] else None
     return processed, next_cursor
@@ -13,7 +13,7 @@ Order screening service:
 from __future__ import annotations
 from datetime import datetime, timezone
 from typing import Optional
-import os, re, json, time
+import os, re, json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -32,6 +32,7 @@ EASTER_EGG_MIN_SPEND = float(os.environ.get("EASTER_EGG_MIN_SPEND", "75.00"))
 EASTER_EGG_PRODUCT_TAG = os.environ.get("EASTER_EGG_PRODUCT_TAG", "collection box")
 
 from shopify_graphql import shopify_gql, shopify_metafields_set, gid_numeric
+from shopify_fanout import prefetch_pages
 from klaviyo import upsert_profile
 
 # ═══════════════════════════════════════════════════════════════════════
@@ -485,15 +486,20 @@ def _apply_verification(order_gid: str, order_name: str, customer: dict,
 def _find_firsttime5_matches(current_order_gid, current_signals, max_pages=5):
     matches = []
     query_str = f'discount_code:"{FIRSTTIME5_CODE}"'
-    after = None
+    pages_left = [max_pages]
 
-    for _ in range(max_pages):
+    def fetch_page(after):
         data = shopify_gql(ORDERS_WITH_DISCOUNT_Q, {
             "first": 50, "after": after, "query": query_str,
         })
         orders = data.get("data", {}).get("orders", {})
-        edges = orders.get("edges", [])
+        pages_left[0] -= 1
+        more = orders.get("pageInfo", {}).get("hasNextPage") and pages_left[0] > 0
+        return orders.get("edges", []), (orders["pageInfo"]["endCursor"] if more else None)
 
+    # Next page is fetched while this one is scored; pacing is left to the
+    # shared cost bucket.
+    for edges in prefetch_pages(fetch_page):
         for edge in edges:
             node = edge["node"]
             if node["id"] == current_order_gid:
@@ -538,11 +544,6 @@ def _find_firsttime5_matches(current_order_gid, current_signals, max_pages=5):
                     "confidence": confidence,
                 })
 
-        if not orders.get("pageInfo", {}).get("hasNextPage"):
-            break
-        after = edges[-1]["cursor"]
-        time.sleep(0.1)
-
     return matches
 
 def check_firsttime5_abuse(order_gid: str) -> dict:
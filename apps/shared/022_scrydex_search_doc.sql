@@ -0,0 +1,95 @@
+-- ── Denormalized per-card search document for scrydex_price_cache ──
+-- PriceCache.search_cards / _search_card_ids used to OR nine
+-- `ILIKE '%tok%'` predicates per token across product_name,
+-- product_name_en, card_number, printed_number, expansion fields, variant
+-- and subtypes::text, then DISTINCT ON (scrydex_id) over every
+-- condition × variant × grade row. No per-column trigram index can serve
+-- an OR across nine columns, so every keystroke seq-scanned the whole
+-- multi-game cache.
+--
+-- scrydex_search_doc holds ONE row per (game, scrydex_id) with every
+-- searchable field folded into a single lower-cased `search_text`, so a
+-- token is one ILIKE against one GIN trigram index and multi-token
+-- queries AND together cheap bitmap scans. `variants` carries every
+-- variant name the card has (space-separated) so "Masterball" still
+-- qualifies a card via its pattern variant.
+--
+-- Maintained by scrydex_nightly.sync_expansion (SEARCH_DOC_SQL) right after
+-- the price upsert for that expansion. The INSERT ... SELECT at the bottom
+-- backfills from whatever is already cached; re-running it is safe.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS scrydex_search_doc (
+    game               TEXT NOT NULL,
+    scrydex_id         TEXT NOT NULL,
+    product_type       TEXT NOT NULL DEFAULT 'card',
+    tcgplayer_id       INTEGER,          -- first row by (condition, price_type), same as the old DISTINCT ON
+    product_name       TEXT,
+    product_name_en    TEXT,
+    card_number        TEXT,
+    printed_number     TEXT,
+    expansion_id       TEXT,
+    expansion_name     TEXT,
+    expansion_name_en  TEXT,
+    variants           TEXT,             -- space-separated Scrydex-native variant names
+    subtypes           TEXT,             -- subtypes::text from the cache (JSON array text)
+    search_text        TEXT GENERATED ALWAYS AS (
+        LOWER(
+            COALESCE(product_name, '')      || ' ' ||
+            COALESCE(product_name_en, '')   || ' ' ||
+            COALESCE(card_number, '')       || ' ' ||
+            COALESCE(printed_number, '')    || ' ' ||
+            COALESCE(expansion_id, '')      || ' ' ||
+            COALESCE(expansion_name, '')    || ' ' ||
+            COALESCE(expansion_name_en, '') || ' ' ||
+            COALESCE(variants, '')          || ' ' ||
+            COALESCE(subtypes, '')
+        )
+    ) STORED,
+    updated_at         TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (game, scrydex_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrydex_search_doc_trgm
+    ON scrydex_search_doc USING gin (search_text gin_trgm_ops);
+
+-- Exact printed-number hits ("P-075", "OP14-041") skip the trigram path.
+CREATE INDEX IF NOT EXISTS idx_scrydex_search_doc_printed_number
+    ON scrydex_search_doc (LOWER(printed_number));
+
+CREATE INDEX IF NOT EXISTS idx_scrydex_search_doc_expansion
+    ON scrydex_search_doc (game, expansion_id);
+
+-- Backfill. Same SELECT as scrydex_nightly.SEARCH_DOC_SQL minus the
+-- expansion filter.
+INSERT INTO scrydex_search_doc (
+    game, scrydex_id, product_type, tcgplayer_id,
+    product_name, product_name_en, card_number, printed_number,
+    expansion_id, expansion_name, expansion_name_en,
+    variants, subtypes, updated_at
+)
+SELECT game, scrydex_id,
+       MIN(product_type),
+       (ARRAY_AGG(tcgplayer_id ORDER BY condition, price_type))[1],
+       MAX(product_name), MAX(product_name_en),
+       MAX(card_number), MAX(printed_number),
+       MAX(expansion_id), MAX(expansion_name), MAX(expansion_name_en),
+       STRING_AGG(DISTINCT variant, ' '),
+       MAX(subtypes::text),
+       NOW()
+FROM scrydex_price_cache
+GROUP BY game, scrydex_id
+ON CONFLICT (game, scrydex_id) DO UPDATE SET
+    product_type      = EXCLUDED.product_type,
+    tcgplayer_id      = EXCLUDED.tcgplayer_id,
+    product_name      = EXCLUDED.product_name,
+    product_name_en   = EXCLUDED.product_name_en,
+    card_number       = EXCLUDED.card_number,
+    printed_number    = EXCLUDED.printed_number,
+    expansion_id      = EXCLUDED.expansion_id,
+    expansion_name    = EXCLUDED.expansion_name,
+    expansion_name_en = EXCLUDED.expansion_name_en,
+    variants          = EXCLUDED.variants,
+    subtypes          = EXCLUDED.subtypes,
+    updated_at        = NOW();
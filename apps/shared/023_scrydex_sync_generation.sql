@@ -0,0 +1,14 @@
+-- ── Sync-generation counter for the price snapshot ──
+-- price_snapshot.py mmaps a per-generation file of the raw card price slice
+-- and serves PriceCache's hot scalar lookups from it. Workers decide whether
+-- their file is current by comparing its generation to
+-- MAX(scrydex_sync_log.sync_generation).
+--
+-- Bumped once per full nightly run (scrydex_nightly.bump_sync_generation),
+-- not per expansion — otherwise every worker would rebuild its snapshot
+-- a few hundred times while a sync is in flight.
+
+CREATE SEQUENCE IF NOT EXISTS scrydex_sync_generation_seq;
+
+ALTER TABLE scrydex_sync_log
+    ADD COLUMN IF NOT EXISTS sync_generation BIGINT NOT NULL DEFAULT 0;
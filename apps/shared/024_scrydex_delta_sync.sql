@@ -0,0 +1,20 @@
+-- ── Delta sync bookkeeping on scrydex_sync_log ──
+-- scrydex_nightly.write_expansion hashes each expansion's fetched payload
+-- and skips every cache write when the hash matches the last run. With
+-- --delta (or SCRYDEX_SYNC_DELTA=true) the nightly only fetches expansions
+-- whose next_sync_at has come due; next_sync_at stretches for old sets whose
+-- prices stay quiet run after run (see _resync_interval_days).
+--
+-- The cache upserts themselves carry IS DISTINCT FROM guards, so an
+-- unchanged row is no longer rewritten. scrydex_price_cache.fetched_at now
+-- means "last time this row's data changed"; last_synced here is the
+-- per-expansion "last checked" timestamp (readers combine the two — see
+-- 031_scrydex_price_last_checked.sql).
+
+ALTER TABLE scrydex_sync_log ADD COLUMN IF NOT EXISTS content_hash     TEXT;
+ALTER TABLE scrydex_sync_log ADD COLUMN IF NOT EXISTS rows_changed     INTEGER;
+ALTER TABLE scrydex_sync_log ADD COLUMN IF NOT EXISTS unchanged_streak INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE scrydex_sync_log ADD COLUMN IF NOT EXISTS next_sync_at     TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_scrydex_sync_log_due
+    ON scrydex_sync_log (game, next_sync_at) WHERE active = TRUE;
@@ -0,0 +1,26 @@
+-- ── Generation swap for scrydex_price_cache ──
+-- With SCRYDEX_GENERATION_SWAP=true (or scrydex_nightly.py --swap) the
+-- nightly clones the live cache into scrydex_price_cache_next, syncs into
+-- that shadow, checks per-game row counts, and then renames the tables in
+-- one transaction:
+--
+--     scrydex_price_cache       → scrydex_price_cache_prev  (kept as history source)
+--     scrydex_price_cache_next  → scrydex_price_cache
+--
+-- Readers resolve the table by name, so they see either the whole previous
+-- catalog or the whole new one, never a half-synced mix. See
+-- scrydex_generation.py. analytics/price_history.snapshot_scrydex_prices
+-- reads _prev when a swap already happened today, so it no longer has to run
+-- before the sync.
+
+CREATE TABLE IF NOT EXISTS scrydex_cache_generation (
+    id          BIGSERIAL PRIMARY KEY,
+    status      TEXT NOT NULL DEFAULT 'building',   -- building | swapped | aborted
+    started_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    row_counts  JSONB,                              -- {"pokemon": {"live": n, "next": m}, ...}
+    note        TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_scrydex_cache_generation_status
+    ON scrydex_cache_generation (status, finished_at DESC);
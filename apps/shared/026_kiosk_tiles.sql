@@ -0,0 +1,240 @@
+-- ── Materialized browse tiles for the kiosk ──
+-- /api/browse used to re-aggregate every STORED/DISPLAY, unheld raw_card on
+-- each request (two-level GROUP BY + jsonb_object_agg, plus a separate
+-- COUNT(DISTINCT)) and then run per-tile image / variant-count lookups.
+-- kiosk_tiles holds that aggregate precomputed: one row per browse tile,
+-- i.e. per (game, card_name, set_name, tcgplayer_id, variant bucket), with
+-- the per-condition quantities, price range, newest copy, resolved image and
+-- n_variants. Browse pages become an indexed range scan over this table.
+--
+-- Kept current by statement-level triggers on raw_cards: any statement that
+-- changes a browse-relevant column refreshes the tiles of the touched
+-- (card_name, set_name) pairs in the same transaction, so every writer
+-- (intake push, holds, scan-out, returns, price runs) is covered without
+-- touching their code. Requests using row-level filters (condition, price
+-- range, rarity, per-game metadata, remote-Champion binder exclusion) still
+-- aggregate raw_cards live in the kiosk.
+--
+-- The variant bucket folds NULL / normal / holofoil into '' so single-variant
+-- cards don't fragment; distinguishing printings keep their own tile.
+
+CREATE OR REPLACE FUNCTION kiosk_variant_key(variant TEXT) RETURNS TEXT AS $$
+    SELECT CASE WHEN variant IS NULL OR LOWER(variant) IN ('normal', 'holofoil')
+                THEN '' ELSE variant END
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE TABLE IF NOT EXISTS kiosk_tiles (
+    game          TEXT,
+    card_name     TEXT NOT NULL,
+    set_name      TEXT NOT NULL,
+    tcgplayer_id  BIGINT,
+    variant_key   TEXT NOT NULL,
+    variant_raw   TEXT,
+    scrydex_id    TEXT,
+    card_numbers  TEXT,                 -- distinct card_numbers, space-joined (search)
+    image_url     TEXT,                 -- raw_cards image, else resolved from scrydex_price_cache
+    n_variants    INTEGER NOT NULL DEFAULT 1,
+    available_qty INTEGER NOT NULL,
+    total_qty     INTEGER NOT NULL,
+    min_price     NUMERIC(10, 2),
+    max_price     NUMERIC(10, 2),
+    newest_at     TIMESTAMP,
+    conditions    JSONB NOT NULL DEFAULT '{}'::jsonb,
+    refreshed_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Refresh lookups
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_card ON kiosk_tiles (card_name, set_name);
+CREATE INDEX IF NOT EXISTS idx_raw_cards_browse_card
+    ON raw_cards (card_name, set_name)
+    WHERE state IN ('STORED', 'DISPLAY') AND current_hold_id IS NULL;
+
+-- One index per browse sort mode, all-games and per-game
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_name        ON kiosk_tiles (card_name);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_game_name   ON kiosk_tiles (game, card_name);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_price       ON kiosk_tiles (min_price);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_game_price  ON kiosk_tiles (game, min_price);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_pricemax    ON kiosk_tiles (max_price DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_game_pricemax ON kiosk_tiles (game, max_price DESC NULLS LAST);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_newest      ON kiosk_tiles (newest_at DESC);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_game_newest ON kiosk_tiles (game, newest_at DESC);
+CREATE INDEX IF NOT EXISTS idx_kiosk_tiles_set         ON kiosk_tiles (set_name);
+
+-- Variant-aware image for a tile with no raw_cards image — same order as the
+-- kiosk's _resolve_cache_image: exact (tcgplayer_id, normalized variant);
+-- Base Set shadowless edition match; the tcgplayer_id's image when it is
+-- unambiguous; finally any image for the scrydex_id.
+CREATE OR REPLACE FUNCTION kiosk_resolve_image(p_tcg BIGINT, p_variant TEXT, p_sid TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    nvar TEXT := regexp_replace(lower(coalesce(p_variant, '')), '[^a-z0-9]', '', 'g');
+    img  TEXT;
+BEGIN
+    IF p_tcg IS NOT NULL THEN
+        SELECT coalesce(image_large, image_medium, image_small) INTO img
+        FROM scrydex_price_cache
+        WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+          AND regexp_replace(lower(coalesce(variant, '')), '[^a-z0-9]', '', 'g') = nvar
+        LIMIT 1;
+        IF img IS NULL AND nvar LIKE '%shadowless%' THEN
+            IF nvar LIKE '%firstedition%' OR nvar LIKE '1st%' OR nvar LIKE 'first%' THEN
+                SELECT coalesce(image_large, image_medium, image_small) INTO img
+                FROM scrydex_price_cache
+                WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+                  AND regexp_replace(lower(variant), '[^a-z0-9]', '', 'g') LIKE '%firstedition%'
+                LIMIT 1;
+            ELSE
+                SELECT coalesce(image_large, image_medium, image_small) INTO img
+                FROM scrydex_price_cache
+                WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+                  AND regexp_replace(lower(variant), '[^a-z0-9]', '', 'g') LIKE '%shadowless%'
+                  AND regexp_replace(lower(variant), '[^a-z0-9]', '', 'g') NOT LIKE '%firstedition%'
+                LIMIT 1;
+            END IF;
+        END IF;
+        IF img IS NULL THEN
+            SELECT coalesce(MIN(image_large), MIN(image_medium), MIN(image_small)) INTO img
+            FROM scrydex_price_cache
+            WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+            HAVING COUNT(DISTINCT image_large) = 1;
+        END IF;
+    END IF;
+    IF img IS NULL AND p_sid IS NOT NULL THEN
+        SELECT coalesce(MAX(image_large), MAX(image_medium), MAX(image_small)) INTO img
+        FROM scrydex_price_cache WHERE scrydex_id = p_sid;
+    END IF;
+    RETURN img;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Rebuild the tiles of the given (card_name, set_name) pairs; NULL arrays
+-- rebuild every tile. Pairs are locked (sorted, transaction-scoped) so
+-- concurrent writers to the same card serialize instead of double-inserting.
+CREATE OR REPLACE FUNCTION kiosk_tiles_refresh(p_names TEXT[], p_sets TEXT[])
+RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    IF p_names IS NULL THEN
+        LOCK TABLE kiosk_tiles IN EXCLUSIVE MODE;
+        DELETE FROM kiosk_tiles;
+    ELSE
+        PERFORM pg_advisory_xact_lock(hashtextextended('kiosk_tiles:' || k.card_name || E'\x1f' || k.set_name, 0))
+        FROM (SELECT DISTINCT card_name, set_name
+              FROM unnest(p_names, p_sets) AS u(card_name, set_name)
+              ORDER BY 1, 2) k;
+        DELETE FROM kiosk_tiles t
+        USING unnest(p_names, p_sets) AS u(card_name, set_name)
+        WHERE t.card_name = u.card_name AND t.set_name = u.set_name;
+    END IF;
+
+    INSERT INTO kiosk_tiles (
+        game, card_name, set_name, tcgplayer_id, variant_key, variant_raw,
+        scrydex_id, card_numbers, image_url, n_variants,
+        available_qty, total_qty, min_price, max_price, newest_at, conditions
+    )
+    SELECT
+        a.game, a.card_name, a.set_name, a.tcgplayer_id, a.variant_key, a.variant_raw,
+        a.scrydex_id, a.card_numbers,
+        coalesce(a.image_url, kiosk_resolve_image(a.tcgplayer_id, a.variant_raw, a.scrydex_id)),
+        coalesce(nullif((SELECT COUNT(DISTINCT sp.variant) FROM scrydex_price_cache sp
+                         WHERE sp.scrydex_id = a.scrydex_id), 0), 1),
+        a.available_qty, a.total_qty, a.min_price, a.max_price, a.newest_at, a.conditions
+    FROM (
+        SELECT
+            game, card_name, set_name, tcgplayer_id, variant_key,
+            MAX(variant_raw)                 AS variant_raw,
+            MAX(scrydex_id)                  AS scrydex_id,
+            string_agg(DISTINCT card_numbers, ' ') AS card_numbers,
+            MAX(image_url)                   AS image_url,
+            SUM(cond_qty)                    AS available_qty,
+            SUM(cond_qty)                    AS total_qty,
+            MIN(min_price)                   AS min_price,
+            MAX(max_price)                   AS max_price,
+            MAX(newest_at)                   AS newest_at,
+            coalesce(jsonb_object_agg(condition, cond_qty), '{}'::jsonb) AS conditions
+        FROM (
+            SELECT rc.game, rc.card_name, rc.set_name, rc.tcgplayer_id,
+                   kiosk_variant_key(rc.variant) AS variant_key,
+                   rc.condition,
+                   MAX(rc.variant)               AS variant_raw,
+                   MAX(rc.scrydex_id)            AS scrydex_id,
+                   string_agg(DISTINCT rc.card_number, ' ') AS card_numbers,
+                   MAX(rc.image_url)             AS image_url,
+                   COUNT(*)                      AS cond_qty,
+                   MIN(rc.current_price)         AS min_price,
+                   MAX(rc.current_price)         AS max_price,
+                   MAX(rc.created_at)            AS newest_at
+            FROM raw_cards rc
+            WHERE rc.state IN ('STORED', 'DISPLAY') AND rc.current_hold_id IS NULL
+              AND (p_names IS NULL OR (rc.card_name, rc.set_name) IN (
+                       SELECT u.card_name, u.set_name
+                       FROM unnest(p_names, p_sets) AS u(card_name, set_name)))
+            GROUP BY rc.game, rc.card_name, rc.set_name, rc.tcgplayer_id,
+                     kiosk_variant_key(rc.variant), rc.condition
+        ) per_condition
+        GROUP BY game, card_name, set_name, tcgplayer_id, variant_key
+    ) a;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level trigger: collect the (card_name, set_name) pairs whose
+-- browse-relevant columns changed and refresh them once per statement.
+CREATE OR REPLACE FUNCTION kiosk_tiles_sync() RETURNS trigger AS $$
+DECLARE
+    names TEXT[];
+    sets  TEXT[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(card_name), array_agg(set_name) INTO names, sets
+        FROM (SELECT DISTINCT card_name, set_name FROM new_rows) k;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(card_name), array_agg(set_name) INTO names, sets
+        FROM (SELECT DISTINCT card_name, set_name FROM old_rows) k;
+    ELSE
+        SELECT array_agg(card_name), array_agg(set_name) INTO names, sets
+        FROM (
+            SELECT o.card_name, o.set_name
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (o.state, o.current_hold_id, o.card_name, o.set_name, o.tcgplayer_id,
+                   o.game, o.variant, o.condition, o.current_price, o.created_at,
+                   o.image_url, o.scrydex_id, o.card_number)
+                  IS DISTINCT FROM
+                  (n.state, n.current_hold_id, n.card_name, n.set_name, n.tcgplayer_id,
+                   n.game, n.variant, n.condition, n.current_price, n.created_at,
+                   n.image_url, n.scrydex_id, n.card_number)
+            UNION
+            SELECT n.card_name, n.set_name
+            FROM old_rows o JOIN new_rows n ON n.id = o.id
+            WHERE (o.card_name, o.set_name) IS DISTINCT FROM (n.card_name, n.set_name)
+        ) k;
+    END IF;
+    IF names IS NOT NULL THEN
+        PERFORM kiosk_tiles_refresh(names, sets);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_kiosk_tiles_insert ON raw_cards;
+CREATE TRIGGER trg_kiosk_tiles_insert
+    AFTER INSERT ON raw_cards
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_tiles_sync();
+
+DROP TRIGGER IF EXISTS trg_kiosk_tiles_update ON raw_cards;
+CREATE TRIGGER trg_kiosk_tiles_update
+    AFTER UPDATE ON raw_cards
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_tiles_sync();
+
+DROP TRIGGER IF EXISTS trg_kiosk_tiles_delete ON raw_cards;
+CREATE TRIGGER trg_kiosk_tiles_delete
+    AFTER DELETE ON raw_cards
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_tiles_sync();
+
+-- Initial build
+SELECT kiosk_tiles_refresh(NULL, NULL);
@@ -0,0 +1,63 @@
+-- ── Normalized Scrydex variant for image resolution ──────────────────────────
+-- Kiosk image resolution matches raw_cards.variant against the cache's variant
+-- after folding both to lowercase alphanumerics ("Unlimited Shadowless" ↔
+-- "unlimitedShadowless"). Doing that with regexp_replace() on every cache row
+-- made each lookup a per-row function scan over the tcgplayer_id's rows and
+-- ruled out an index. The folded form is now a stored generated column with a
+-- (tcgplayer_id, variant_norm) index, so the kiosk's batched resolver (and
+-- kiosk_resolve_image, which feeds kiosk_tiles) are plain index probes.
+--
+-- Adding a STORED generated column rewrites scrydex_price_cache once; run
+-- outside the nightly Scrydex sync window.
+
+ALTER TABLE scrydex_price_cache
+    ADD COLUMN IF NOT EXISTS variant_norm TEXT
+    GENERATED ALWAYS AS (regexp_replace(lower(coalesce(variant, '')), '[^a-z0-9]', '', 'g')) STORED;
+
+-- Only rows with an image are ever candidates.
+CREATE INDEX IF NOT EXISTS idx_scrydex_cache_tcg_variant_norm
+    ON scrydex_price_cache(tcgplayer_id, variant_norm)
+    WHERE image_large IS NOT NULL;
+
+-- Same resolution order as 026, reading the stored column.
+CREATE OR REPLACE FUNCTION kiosk_resolve_image(p_tcg BIGINT, p_variant TEXT, p_sid TEXT)
+RETURNS TEXT AS $$
+DECLARE
+    nvar TEXT := regexp_replace(lower(coalesce(p_variant, '')), '[^a-z0-9]', '', 'g');
+    img  TEXT;
+BEGIN
+    IF p_tcg IS NOT NULL THEN
+        SELECT coalesce(image_large, image_medium, image_small) INTO img
+        FROM scrydex_price_cache
+        WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL AND variant_norm = nvar
+        LIMIT 1;
+        IF img IS NULL AND nvar LIKE '%shadowless%' THEN
+            IF nvar LIKE '%firstedition%' OR nvar LIKE '1st%' OR nvar LIKE 'first%' THEN
+                SELECT coalesce(image_large, image_medium, image_small) INTO img
+                FROM scrydex_price_cache
+                WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+                  AND variant_norm LIKE '%firstedition%'
+                LIMIT 1;
+            ELSE
+                SELECT coalesce(image_large, image_medium, image_small) INTO img
+                FROM scrydex_price_cache
+                WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+                  AND variant_norm LIKE '%shadowless%'
+                  AND variant_norm NOT LIKE '%firstedition%'
+                LIMIT 1;
+            END IF;
+        END IF;
+        IF img IS NULL THEN
+            SELECT coalesce(MIN(image_large), MIN(image_medium), MIN(image_small)) INTO img
+            FROM scrydex_price_cache
+            WHERE tcgplayer_id = p_tcg AND image_large IS NOT NULL
+            HAVING COUNT(DISTINCT image_large) = 1;
+        END IF;
+    END IF;
+    IF img IS NULL AND p_sid IS NOT NULL THEN
+        SELECT coalesce(MAX(image_large), MAX(image_medium), MAX(image_small)) INTO img
+        FROM scrydex_price_cache WHERE scrydex_id = p_sid;
+    END IF;
+    RETURN img;
+END;
+$$ LANGUAGE plpgsql STABLE;
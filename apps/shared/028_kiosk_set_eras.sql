@@ -0,0 +1,76 @@
+-- ── Set → era classification for kiosk era filters ───────────────────────────
+-- Picking an era in the kiosk used to SELECT DISTINCT every in-stock set_name,
+-- classify each one in Python and splice the matches into an IN (...) list —
+-- on every era-filtered request. Eras are a property of the set, so they are
+-- now classified once per set and stored here; era filters become
+--   set_name IN (SELECT set_name FROM kiosk_set_eras WHERE era = %s)
+-- which is two index lookups.
+--
+-- The rules stay in the kiosk (ERA_PREFIXES in kiosk/app.py). Before it first
+-- reads this table, each kiosk process mirrors them into kiosk_era_prefixes
+-- and reclassifies any set whose era changed, so editing the Python list is
+-- still the only step needed. Until then (or while this migration is not
+-- applied) the kiosk classifies eras in Python instead.
+-- New sets are classified by trigger the moment they first land in raw_cards.
+
+CREATE TABLE IF NOT EXISTS kiosk_era_prefixes (
+    prefix    TEXT PRIMARY KEY,          -- case-insensitive set_name prefix
+    era       TEXT NOT NULL,
+    priority  INTEGER NOT NULL           -- eras are tried lowest first
+);
+
+CREATE TABLE IF NOT EXISTS kiosk_set_eras (
+    set_name       TEXT PRIMARY KEY,
+    era            TEXT NOT NULL,
+    classified_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_kiosk_set_eras_era ON kiosk_set_eras (era, set_name);
+
+-- Era filters probe raw_cards by set_name over available stock.
+CREATE INDEX IF NOT EXISTS idx_raw_cards_browse_set
+    ON raw_cards (set_name)
+    WHERE state IN ('STORED', 'DISPLAY') AND current_hold_id IS NULL;
+
+-- Same rule as the kiosk's classifier: first era (by priority) with a prefix
+-- the trimmed, lowercased set_name starts with; anything unmatched is Vintage.
+CREATE OR REPLACE FUNCTION kiosk_classify_era(p_set_name TEXT) RETURNS TEXT AS $$
+    SELECT coalesce((
+        SELECT era FROM kiosk_era_prefixes
+        WHERE starts_with(lower(btrim(p_set_name)), lower(prefix))
+        ORDER BY priority
+        LIMIT 1
+    ), 'Vintage')
+$$ LANGUAGE sql STABLE;
+
+-- Statement-level: classify set_names this statement introduced.
+CREATE OR REPLACE FUNCTION kiosk_set_eras_sync() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO kiosk_set_eras (set_name, era)
+    SELECT s.set_name, kiosk_classify_era(s.set_name)
+    FROM (SELECT DISTINCT set_name FROM new_rows WHERE set_name IS NOT NULL) s
+    WHERE NOT EXISTS (SELECT 1 FROM kiosk_set_eras e WHERE e.set_name = s.set_name)
+    ON CONFLICT (set_name) DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_kiosk_set_eras_insert ON raw_cards;
+CREATE TRIGGER trg_kiosk_set_eras_insert
+    AFTER INSERT ON raw_cards
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_set_eras_sync();
+
+DROP TRIGGER IF EXISTS trg_kiosk_set_eras_update ON raw_cards;
+CREATE TRIGGER trg_kiosk_set_eras_update
+    AFTER UPDATE ON raw_cards
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_set_eras_sync();
+
+-- Existing sets. Until the kiosk has mirrored ERA_PREFIXES these all read
+-- Vintage; the kiosk doesn't read the table before its sync reclassifies them.
+INSERT INTO kiosk_set_eras (set_name, era)
+SELECT DISTINCT set_name, kiosk_classify_era(set_name)
+FROM raw_cards
+WHERE set_name IS NOT NULL
+ON CONFLICT (set_name) DO NOTHING;
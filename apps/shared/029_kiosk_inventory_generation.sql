@@ -0,0 +1,120 @@
+-- ── Inventory generation for kiosk response caching ─────────────────────────
+-- Every kiosk read API (/api/browse, /api/card, /api/sets, /api/products,
+-- /api/products/filter-meta) is a pure function of the request args, the
+-- caller's mode and what is on the shelf. "What is on the shelf" only moves
+-- when a statement actually changes one of the tables below — intake and
+-- pushes (raw_cards, inventory_product_cache), holds / scan-out / returns
+-- (holds, hold_items, raw_cards.current_hold_id) and era reclassification
+-- (kiosk_set_eras). Each such statement takes a new value from this
+-- sequence; the kiosk folds the current value (plus the Scrydex sync
+-- generation, for images) into its response-cache key and ETags, so repeat
+-- requests between changes are served from memory or answered 304.
+--
+-- A sequence rather than a counter row: nextval never blocks, so writers to
+-- raw_cards don't queue on one hot row. Statements that touch no rows (the
+-- hold-expiry sweep on a quiet minute) don't bump it.
+
+CREATE SEQUENCE IF NOT EXISTS kiosk_inventory_generation_seq;
+
+CREATE OR REPLACE FUNCTION kiosk_bump_inventory_generation() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        IF EXISTS (SELECT 1 FROM old_rows) THEN
+            PERFORM nextval('kiosk_inventory_generation_seq');
+        END IF;
+    ELSIF EXISTS (SELECT 1 FROM new_rows) THEN
+        PERFORM nextval('kiosk_inventory_generation_seq');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_raw_cards_generation_insert ON raw_cards;
+CREATE TRIGGER trg_raw_cards_generation_insert
+    AFTER INSERT ON raw_cards
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_raw_cards_generation_update ON raw_cards;
+CREATE TRIGGER trg_raw_cards_generation_update
+    AFTER UPDATE ON raw_cards
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_raw_cards_generation_delete ON raw_cards;
+CREATE TRIGGER trg_raw_cards_generation_delete
+    AFTER DELETE ON raw_cards
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_holds_generation_insert ON holds;
+CREATE TRIGGER trg_holds_generation_insert
+    AFTER INSERT ON holds
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_holds_generation_update ON holds;
+CREATE TRIGGER trg_holds_generation_update
+    AFTER UPDATE ON holds
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_holds_generation_delete ON holds;
+CREATE TRIGGER trg_holds_generation_delete
+    AFTER DELETE ON holds
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_hold_items_generation_insert ON hold_items;
+CREATE TRIGGER trg_hold_items_generation_insert
+    AFTER INSERT ON hold_items
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_hold_items_generation_update ON hold_items;
+CREATE TRIGGER trg_hold_items_generation_update
+    AFTER UPDATE ON hold_items
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_hold_items_generation_delete ON hold_items;
+CREATE TRIGGER trg_hold_items_generation_delete
+    AFTER DELETE ON hold_items
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_inventory_product_cache_generation_insert ON inventory_product_cache;
+CREATE TRIGGER trg_inventory_product_cache_generation_insert
+    AFTER INSERT ON inventory_product_cache
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_inventory_product_cache_generation_update ON inventory_product_cache;
+CREATE TRIGGER trg_inventory_product_cache_generation_update
+    AFTER UPDATE ON inventory_product_cache
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_inventory_product_cache_generation_delete ON inventory_product_cache;
+CREATE TRIGGER trg_inventory_product_cache_generation_delete
+    AFTER DELETE ON inventory_product_cache
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_kiosk_set_eras_generation_insert ON kiosk_set_eras;
+CREATE TRIGGER trg_kiosk_set_eras_generation_insert
+    AFTER INSERT ON kiosk_set_eras
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_kiosk_set_eras_generation_update ON kiosk_set_eras;
+CREATE TRIGGER trg_kiosk_set_eras_generation_update
+    AFTER UPDATE ON kiosk_set_eras
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
+
+DROP TRIGGER IF EXISTS trg_kiosk_set_eras_generation_delete ON kiosk_set_eras;
+CREATE TRIGGER trg_kiosk_set_eras_generation_delete
+    AFTER DELETE ON kiosk_set_eras
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION kiosk_bump_inventory_generation();
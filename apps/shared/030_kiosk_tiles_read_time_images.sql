@@ -0,0 +1,80 @@
+-- ── kiosk_tiles: Scrydex-derived fields move to read time ────────────────────
+-- 026 stored each tile's resolved Scrydex image and n_variants, but only the
+-- raw_cards triggers refreshed them — a nightly Scrydex sync or a cache
+-- generation swap (025) left tiles pointing at old images and counts until
+-- someone touched the card. Those two fields are now resolved when a page is
+-- served, by the same batched, LRU-cached lookups the live browse path uses
+-- (kiosk/app.py _resolve_cache_images / _variant_counts). kiosk_tiles keeps
+-- only what raw_cards determines; image_url is the raw_cards image, NULL when
+-- the kiosk should resolve one.
+--
+-- Also drops kiosk_resolve_image, which only the tile refresh called.
+-- Run after deploying the kiosk that no longer reads kiosk_tiles.n_variants.
+
+ALTER TABLE kiosk_tiles DROP COLUMN IF EXISTS n_variants;
+
+CREATE OR REPLACE FUNCTION kiosk_tiles_refresh(p_names TEXT[], p_sets TEXT[])
+RETURNS INTEGER AS $$
+DECLARE
+    n INTEGER;
+BEGIN
+    IF p_names IS NULL THEN
+        LOCK TABLE kiosk_tiles IN EXCLUSIVE MODE;
+        DELETE FROM kiosk_tiles;
+    ELSE
+        PERFORM pg_advisory_xact_lock(hashtextextended('kiosk_tiles:' || k.card_name || E'\x1f' || k.set_name, 0))
+        FROM (SELECT DISTINCT card_name, set_name
+              FROM unnest(p_names, p_sets) AS u(card_name, set_name)
+              ORDER BY 1, 2) k;
+        DELETE FROM kiosk_tiles t
+        USING unnest(p_names, p_sets) AS u(card_name, set_name)
+        WHERE t.card_name = u.card_name AND t.set_name = u.set_name;
+    END IF;
+
+    INSERT INTO kiosk_tiles (
+        game, card_name, set_name, tcgplayer_id, variant_key, variant_raw,
+        scrydex_id, card_numbers, image_url,
+        available_qty, total_qty, min_price, max_price, newest_at, conditions
+    )
+    SELECT
+        game, card_name, set_name, tcgplayer_id, variant_key,
+        MAX(variant_raw),
+        MAX(scrydex_id),
+        string_agg(DISTINCT card_numbers, ' '),
+        MAX(image_url),
+        SUM(cond_qty),
+        SUM(cond_qty),
+        MIN(min_price),
+        MAX(max_price),
+        MAX(newest_at),
+        coalesce(jsonb_object_agg(condition, cond_qty), '{}'::jsonb)
+    FROM (
+        SELECT rc.game, rc.card_name, rc.set_name, rc.tcgplayer_id,
+               kiosk_variant_key(rc.variant) AS variant_key,
+               rc.condition,
+               MAX(rc.variant)               AS variant_raw,
+               MAX(rc.scrydex_id)            AS scrydex_id,
+               string_agg(DISTINCT rc.card_number, ' ') AS card_numbers,
+               MAX(rc.image_url)             AS image_url,
+               COUNT(*)                      AS cond_qty,
+               MIN(rc.current_price)         AS min_price,
+               MAX(rc.current_price)         AS max_price,
+               MAX(rc.created_at)            AS newest_at
+        FROM raw_cards rc
+        WHERE rc.state IN ('STORED', 'DISPLAY') AND rc.current_hold_id IS NULL
+          AND (p_names IS NULL OR (rc.card_name, rc.set_name) IN (
+                   SELECT u.card_name, u.set_name
+                   FROM unnest(p_names, p_sets) AS u(card_name, set_name)))
+        GROUP BY rc.game, rc.card_name, rc.set_name, rc.tcgplayer_id,
+                 kiosk_variant_key(rc.variant), rc.condition
+    ) per_condition
+    GROUP BY game, card_name, set_name, tcgplayer_id, variant_key;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS kiosk_resolve_image(BIGINT, TEXT, TEXT);
+
+-- Rebuild so image_url no longer carries resolved Scrydex images.
+SELECT kiosk_tiles_refresh(NULL, NULL);
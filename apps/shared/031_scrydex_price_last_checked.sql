@@ -0,0 +1,15 @@
+-- ── Data age for scrydex_price_cache rows ────────────────────────────────────
+-- Since 024 the nightly only rewrites price rows whose data changed, so
+-- scrydex_price_cache.fetched_at is "last changed" and an unchanged row is
+-- never touched (no tuple, no WAL). "Last checked" is per expansion:
+-- scrydex_sync_log.last_synced, stamped every time write_expansion runs for
+-- it. Readers that show how old a price is use
+--     GREATEST(c.fetched_at, l.last_synced)
+-- joining scrydex_sync_log l ON (game, expansion_id) — see
+-- graded_pricing._fallback_from_cache.
+--
+-- An earlier revision of this migration added price_changed_at and had the
+-- nightly re-stamp fetched_at on every checked row, which rewrote the whole
+-- cache each run. Drop the column wherever that revision was applied.
+
+ALTER TABLE scrydex_price_cache DROP COLUMN IF EXISTS price_changed_at;
@@ -0,0 +1,17 @@
+-- ── scrydex_search_doc: stop copying cache-owned fields ──────────────────────
+-- 022 copied each card's tcgplayer_id into its search document, but only the
+-- nightly sync rebuilt documents. Links made straight on scrydex_price_cache
+-- (ingestion scrydex_link, ingest's tcgplayer_id backfill) never reached
+-- search, so a re-linked card kept resolving to its old TCGplayer product.
+-- PriceCache search now reads tcgplayer_id from the cache for the page of
+-- hits it returns, and the column goes.
+--
+-- Documents are also purged when their card leaves the cache:
+-- scrydex_nightly.refresh_search_docs deletes an expansion's orphans each
+-- time it rebuilds it, and the one-off DELETE below clears what 022 left.
+
+ALTER TABLE scrydex_search_doc DROP COLUMN IF EXISTS tcgplayer_id;
+
+DELETE FROM scrydex_search_doc d
+WHERE NOT EXISTS (SELECT 1 FROM scrydex_price_cache c
+                  WHERE c.game = d.game AND c.scrydex_id = d.scrydex_id);
@@ -4,6 +4,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import db; db.init_pool()
 from scrydex_client import ScrydexClient
+from scrydex_nightly import refresh_search_docs
 from psycopg2.extras import execute_batch
 
 client = ScrydexClient(os.getenv('SCRYDEX_API_KEY'), os.getenv('SCRYDEX_TEAM_ID'), db=db)
@@ -79,6 +80,7 @@ for i, exp in enumerate(all_exp):
                         ON CONFLICT (scrydex_id, variant, condition, price_type, grade_company_key, grade_value_key)
                         DO UPDATE SET market_price=EXCLUDED.market_price, low_price=EXCLUDED.low_price, fetched_at=NOW()
                     """, rows, page_size=500)
+                    refresh_search_docs(cur, 'pokemon', eid)
                 conn.commit()
             total_sealed += len(items)
 
@@ -27,17 +27,32 @@ Tool push cooldown: when your own tools push price/qty to Shopify, they call
   cm.record_tool_push() which sets last_tool_push_at in the meta table.
   The product_updated staleness signal is suppressed for 10 minutes after that,
   so your own edits don't thrash the cache. New orders are NEVER suppressed.
+
+Webhook mode (SHOPIFY_CACHE_WEBHOOKS=true): the service receives Shopify's
+  products/update, products/delete, inventory_levels/update and orders/paid
+  webhooks and patches just the affected products via refresh_products /
+  delete_product / apply_inventory_level / apply_order. Triggers 2 and 3 are
+  then off — the full refresh only runs as a reconciliation once the cache is
+  RECONCILE_HOURS old (plus initial / explicit invalidation).
 """
 
 import logging
+import os
 import threading
 from datetime import datetime, timezone
 
+from shopify_throttle import priority
+
 logger = logging.getLogger(__name__)
 
 PRICE_UPDATER_START = (3, 30)
 PRICE_UPDATER_DONE  = (8, 30)
 TOOL_PUSH_COOLDOWN_MINUTES = 10   # suppress product_updated signal after a tool push
+# Incremental cache patches from webhooks; full refresh becomes a reconciliation
+WEBHOOKS = os.getenv("SHOPIFY_CACHE_WEBHOOKS", "").lower().strip() in ("true", "1", "yes")
+RECONCILE_HOURS = 24
+# Full refreshes read a Shopify Bulk Operations export instead of paging
+BULK_REFRESH = os.getenv("SHOPIFY_BULK_REFRESH", "").lower().strip() in ("true", "1", "yes")
 
 
 class CacheManager:
@@ -233,6 +248,13 @@ class CacheManager:
     # ─── Staleness checks ─────────────────────────────────────────────────────
 
     def _check_staleness(self, meta: dict) -> list[str]:
+        if WEBHOOKS:
+            # Webhooks keep the cache current; only reconcile once a day.
+            last = meta["last_refreshed_at"]
+            if last.tzinfo is None:
+                last = last.replace(tzinfo=timezone.utc)
+            age_h = (datetime.now(timezone.utc) - last).total_seconds() / 3600
+            return ["reconcile"] if age_h >= RECONCILE_HOURS else []
         reasons = []
         if self._in_price_updater_window(meta["last_refreshed_at"]):
             reasons.append("price_updater_window")
@@ -298,9 +320,15 @@ class CacheManager:
                 logger.info(f"[{self._cache_table}] refresh started recently — skipping")
                 return
             self._last_refresh_started = now
-        t = threading.Thread(target=self._run_refresh, args=(reason,), daemon=True)
+        t = threading.Thread(target=self._run_background_refresh, args=(reason,), daemon=True)
         t.start()
 
+    def _run_background_refresh(self, reason: str) -> None:
+        # Full catalog pulls leave part of the GraphQL cost bucket to the
+        # interactive callers (kiosk, operator edits) sharing the token.
+        with priority("background"):
+            self._run_refresh(reason)
+
     def _run_refresh(self, reason: str) -> None:
         with self._refresh_lock:
             if self._refresh_in_progress:
@@ -318,35 +346,22 @@ class CacheManager:
             upserted = 0
             seen_keys: set[tuple] = set()  # (shopify_product_id, shopify_variant_id)
 
-            for page_products, _ in self.shopify.iter_products_pages(batch_size=100):
+            for page_products, _ in self._iter_catalog_pages():
                 rows_to_upsert = (
                     page_products if self.cache_all_products
                     else [p for p in page_products if p.get("tcgplayer_id")]
                 )
+                if not rows_to_upsert:
+                    continue
+                self._merge_page(rows_to_upsert)
+                upserted += len(rows_to_upsert)
                 for p in rows_to_upsert:
-                    self._upsert_product(p)
-                    upserted += 1
-                    seen_keys.add((str(p["shopify_product_id"]), str(p["variant_id"])))
+                    seen_keys.add((int(p["shopify_product_id"]), int(p["variant_id"])))
 
             # Purge rows for products that no longer exist in Shopify
             if seen_keys and self.table_prefix == "inventory_":
                 try:
-                    existing = self.db.query(
-                        f"SELECT shopify_product_id, shopify_variant_id FROM {self._cache_table}"
-                    )
-                    stale = [
-                        (r["shopify_product_id"], r["shopify_variant_id"])
-                        for r in existing
-                        if (str(r["shopify_product_id"]), str(r["shopify_variant_id"])) not in seen_keys
-                    ]
-                    if stale:
-                        for pid, vid in stale:
-                            self.db.execute(
-                                f"DELETE FROM {self._cache_table} "
-                                f"WHERE shopify_product_id = %s AND shopify_variant_id = %s",
-                                (pid, vid)
-                            )
-                        logger.info(f"[{self._cache_table}] purged {len(stale)} deleted product(s)")
+                    self._purge_unseen(seen_keys)
                 except Exception as e:
                     logger.warning(f"[{self._cache_table}] stale row purge failed: {e}")
 
@@ -362,34 +377,37 @@ class CacheManager:
         finally:
             self._refresh_in_progress = False
 
-    def _upsert_product(self, p: dict) -> None:
-        """Upsert one product row into the appropriate cache table."""
+    def _iter_catalog_pages(self):
+        """
+        Full-catalog pages for _run_refresh. With SHOPIFY_BULK_REFRESH=true the
+        catalog comes from one Bulk Operations export (no per-page GraphQL
+        cost, no per-product variant follow-ups); if the export can't run —
+        e.g. another service's bulk query holds the shop's slot — fall back
+        to cursor paging.
+        """
+        if BULK_REFRESH:
+            try:
+                url = self.shopify.run_products_bulk_export()
+                return self.shopify.iter_bulk_product_pages(url, batch_size=100)
+            except Exception as e:
+                logger.warning(f"[{self._cache_table}] bulk export unavailable ({e}) — paging instead")
+        return self.shopify.iter_products_pages(batch_size=100)
+
+    # Column order for _merge_page; _row_for builds tuples to match.
+    _INVENTORY_COLUMNS = (
+        "shopify_product_id", "shopify_variant_id", "title", "variant_label", "handle", "status",
+        "tags", "sku", "barcode", "shopify_price", "shopify_qty", "inventory_item_id",
+        "tcgplayer_id", "is_damaged", "committed", "unit_cost", "image_url", "era",
+    )
+    _INTAKE_COLUMNS = (
+        "tcgplayer_id", "shopify_product_id", "shopify_variant_id",
+        "title", "handle", "sku", "shopify_price", "shopify_qty",
+        "status", "is_damaged",
+    )
+
+    def _row_for(self, p: dict) -> tuple:
         if self.table_prefix == "inventory_":
-            self.db.execute(f"""
-                INSERT INTO {self._cache_table}
-                    (shopify_product_id, shopify_variant_id, title, variant_label, handle, status,
-                     tags, sku, barcode, shopify_price, shopify_qty, inventory_item_id,
-                     tcgplayer_id, is_damaged, committed, unit_cost, image_url, era, last_synced)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                ON CONFLICT (shopify_product_id, shopify_variant_id) DO UPDATE SET
-                    title             = EXCLUDED.title,
-                    variant_label     = EXCLUDED.variant_label,
-                    handle            = EXCLUDED.handle,
-                    status            = EXCLUDED.status,
-                    tags              = EXCLUDED.tags,
-                    sku               = EXCLUDED.sku,
-                    barcode           = EXCLUDED.barcode,
-                    shopify_price     = EXCLUDED.shopify_price,
-                    shopify_qty       = EXCLUDED.shopify_qty,
-                    inventory_item_id = EXCLUDED.inventory_item_id,
-                    tcgplayer_id      = EXCLUDED.tcgplayer_id,
-                    is_damaged        = EXCLUDED.is_damaged,
-                    committed         = EXCLUDED.committed,
-                    unit_cost         = EXCLUDED.unit_cost,
-                    image_url         = EXCLUDED.image_url,
-                    era               = EXCLUDED.era,
-                    last_synced       = CURRENT_TIMESTAMP
-            """, (
+            return (
                 p["shopify_product_id"], p["variant_id"],
                 p["title"], p.get("variant_label"), p["handle"], p.get("status", "ACTIVE"),
                 p.get("tags_csv", ""),
@@ -403,30 +421,138 @@ class CacheManager:
                 p.get("unit_cost"),
                 p.get("image_url"),
                 p.get("era"),
-            ))
+            )
+        # Intake/ingestion schema (keyed by tcgplayer_id)
+        return (
+            p["tcgplayer_id"], p["shopify_product_id"], p["variant_id"],
+            p["title"], p["handle"], p.get("sku"),
+            p["shopify_price"], p["shopify_qty"],
+            p.get("status", "ACTIVE"), p.get("is_damaged", False),
+        )
+
+    def _merge_page(self, products: list[dict]) -> None:
+        """
+        Upsert one Shopify page in a single transaction: stage the rows in a
+        session temp table, then merge with one INSERT ... SELECT ... ON
+        CONFLICT. Replaces a pooled connection + commit per variant. Inside
+        db.transaction() this joins the caller's transaction instead.
+        """
+        from psycopg2.extras import execute_values
+
+        if self.table_prefix == "inventory_":
+            columns = self._INVENTORY_COLUMNS
+            key = "shopify_product_id, shopify_variant_id"
         else:
-            # Intake/ingestion schema (keyed by tcgplayer_id)
-            self.db.execute(f"""
-                INSERT INTO {self._cache_table}
-                    (tcgplayer_id, shopify_product_id, shopify_variant_id,
-                     title, handle, sku, shopify_price, shopify_qty,
-                     status, is_damaged, last_synced)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-                ON CONFLICT (tcgplayer_id, shopify_variant_id) DO UPDATE SET
-                    title         = EXCLUDED.title,
-                    handle        = EXCLUDED.handle,
-                    sku           = EXCLUDED.sku,
-                    shopify_price = EXCLUDED.shopify_price,
-                    shopify_qty   = EXCLUDED.shopify_qty,
-                    status        = EXCLUDED.status,
-                    is_damaged    = EXCLUDED.is_damaged,
-                    last_synced   = CURRENT_TIMESTAMP
-            """, (
-                p["tcgplayer_id"], p["shopify_product_id"], p["variant_id"],
-                p["title"], p["handle"], p.get("sku"),
-                p["shopify_price"], p["shopify_qty"],
-                p.get("status", "ACTIVE"), p.get("is_damaged", False),
-            ))
+            columns = self._INTAKE_COLUMNS
+            key = "tcgplayer_id, shopify_variant_id"
+        cols = ", ".join(columns)
+        data_cols = [c for c in columns if c not in key.split(", ")]
+        updates = ",\n                    ".join(f"{c} = EXCLUDED.{c}" for c in data_cols)
+        changed = (f"({', '.join(f't.{c}' for c in data_cols)}) IS DISTINCT FROM "
+                   f"({', '.join(f'EXCLUDED.{c}' for c in data_cols)})")
+        stage = f"_stage_{self._cache_table}"
+
+        with self.db.get_cursor(commit=True) as cur:
+            # Typed like the cache table and emptied at every commit. Also
+            # emptied up front: inside an enclosing transaction the previous
+            # page's rows are still staged.
+            cur.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DELETE ROWS AS
+                SELECT {cols} FROM {self._cache_table} WITH NO DATA
+            """)
+            cur.execute(f"TRUNCATE {stage}")
+            execute_values(cur, f"INSERT INTO {stage} ({cols}) VALUES %s",
+                           [self._row_for(p) for p in products], page_size=500)
+            # DISTINCT ON: a repeated key would make ON CONFLICT touch the
+            # same row twice in one statement, which Postgres rejects.
+            # Unchanged rows are left alone — no dead tuples, and the kiosk's
+            # inventory generation (029) only moves when something did.
+            # last_synced is therefore "last changed"; when the cache was
+            # last refreshed lives in the *cache_meta table.
+            cur.execute(f"""
+                INSERT INTO {self._cache_table} AS t ({cols}, last_synced)
+                SELECT DISTINCT ON ({key}) {cols}, CURRENT_TIMESTAMP
+                FROM {stage}
+                ORDER BY {key}
+                ON CONFLICT ({key}) DO UPDATE SET
+                {updates},
+                last_synced = CURRENT_TIMESTAMP
+                WHERE {changed}
+            """)
+
+    def _purge_unseen(self, seen_keys: set[tuple]) -> None:
+        """One anti-join DELETE for every cached variant the full pass didn't see."""
+        pids = [k[0] for k in seen_keys]
+        vids = [k[1] for k in seen_keys]
+        with self.db.get_cursor(commit=True) as cur:
+            cur.execute(f"""
+                DELETE FROM {self._cache_table} c
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM unnest(%s::bigint[], %s::bigint[]) AS seen(pid, vid)
+                    WHERE seen.pid = c.shopify_product_id
+                      AND seen.vid = c.shopify_variant_id
+                )
+            """, (pids, vids))
+            purged = cur.rowcount
+        if purged:
+            logger.info(f"[{self._cache_table}] purged {purged} deleted product(s)")
+
+    # ─── Incremental (webhook) patches ────────────────────────────────────────
+
+    def refresh_products(self, product_ids) -> int:
+        """
+        Re-read each product from Shopify and patch its variants in place:
+        merge current rows, drop variants that no longer exist (or the whole
+        product if it was deleted/archived). Idempotent, so duplicate or
+        out-of-order webhook deliveries are harmless. Returns rows written.
+        """
+        written = 0
+        for pid in {int(str(p).rsplit("/", 1)[-1]) for p in product_ids if p}:
+            rows = self.shopify.fetch_product_rows(pid)
+            if rows is not None and not self.cache_all_products:
+                rows = [r for r in rows if r.get("tcgplayer_id")]
+            if not rows:
+                self.delete_product(pid)
+                continue
+            self._merge_page(rows)
+            written += len(rows)
+            self._delete_variants_except(pid, [r["variant_id"] for r in rows])
+        return written
+
+    def delete_product(self, product_id) -> int:
+        """Remove every cached variant of a product (products/delete)."""
+        pid = int(str(product_id).rsplit("/", 1)[-1])
+        return self._delete_variants_except(pid, [])
+
+    def _delete_variants_except(self, product_id: int, keep_variant_ids: list) -> int:
+        with self.db.get_cursor(commit=True) as cur:
+            cur.execute(f"""
+                DELETE FROM {self._cache_table}
+                WHERE shopify_product_id = %s
+                  AND NOT (shopify_variant_id = ANY(%s::bigint[]))
+            """, (product_id, [int(v) for v in keep_variant_ids]))
+            deleted = cur.rowcount
+        return deleted
+
+    def apply_inventory_level(self, inventory_item_id) -> int:
+        """
+        inventory_levels/update: refresh the product owning this inventory
+        item. The payload's `available` is per location while shopify_qty is
+        the variant total, so the product is re-read rather than patched from
+        the payload. Only the inventory cache tracks inventory_item_id.
+        """
+        if self.table_prefix != "inventory_":
+            return 0
+        rows = self.db.query(
+            f"SELECT DISTINCT shopify_product_id FROM {self._cache_table} WHERE inventory_item_id = %s",
+            (int(inventory_item_id),))
+        return self.refresh_products([r["shopify_product_id"] for r in rows])
+
+    def apply_order(self, order: dict) -> int:
+        """orders/paid: refresh every product on the order (qty + committed)."""
+        return self.refresh_products(
+            li.get("product_id") for li in (order.get("line_items") or []))
 
     # ─── cache_meta helpers ───────────────────────────────────────────────────
 
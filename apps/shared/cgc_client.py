@@ -43,7 +43,7 @@ import time
 import logging
 from typing import Optional
 
-import requests
+import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -138,7 +138,7 @@ def _fetch_population(collectible_id: str) -> Optional[dict]:
         return None
     url = CGC_POP_API_TPL.format(cid=collectible_id)
     try:
-        resp = requests.get(url, timeout=15, headers={
+        resp = http_pool.get(url, timeout=15, headers={
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                           "AppleWebKit/537.36 (KHTML, like Gecko) "
                           "Chrome/126.0.0.0 Safari/537.36",
@@ -1,23 +1,159 @@
 """
 Database connection pool and query helpers.
 Uses psycopg2 ThreadedConnectionPool for Railway PostgreSQL.
+
+Pool behaviour (BlockingPool):
+  - Size per service: init_pool(minconn=, maxconn=) or DB_POOL_MIN /
+    DB_POOL_MAX (defaults 2 / 10). Explicit arguments win over the env.
+  - A full pool makes the caller WAIT up to DB_POOL_TIMEOUT seconds
+    (default 30) for a connection instead of raising PoolError at once, so
+    a burst from background threads (cache refresh, push workers, enrich
+    jobs) queues gunicorn request threads instead of failing them.
+    PoolTimeout (a PoolError) is raised only if the wait runs out.
+  - Connections are pgbouncer-safe: no session state is set, TCP
+    keepalives keep idle pooled connections from being cut by the proxy,
+    and broken connections are discarded at checkout / return.
+  - pool_stats() reports checked-out count, peak, wait counts / times and
+    the longest current hold; waits over DB_POOL_SLOW_WAIT_MS are logged
+    with the stats so starvation shows up in the service log.
+
+transaction() runs several helper calls on one connection as one commit;
+query_prepared() reuses a server-side prepared statement per connection
+(opt-in, see its docstring).
+
+Large scans: stream() / stream_batches() read through a named (server-side)
+cursor, pulling DB_STREAM_ITERSIZE rows (default 2000) per round trip, so a
+whole-table job holds one batch in memory instead of the full result set.
 """
 
 import os
+import re
+import time
+import itertools
 import logging
+import threading
 from contextlib import contextmanager
 
 import psycopg2
-from psycopg2.pool import ThreadedConnectionPool
-from psycopg2.extras import RealDictCursor, execute_batch
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+from psycopg2.extras import RealDictCursor, NamedTupleCursor, execute_batch, execute_values
 
 logger = logging.getLogger(__name__)
 
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+SLOW_WAIT_MS = float(os.getenv("DB_POOL_SLOW_WAIT_MS", "500"))
+# Session-level PREPARE doesn't survive pgbouncer transaction pooling, so
+# statement reuse is opt-in for services on a direct / session-pooled URL.
+PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "").lower().strip() in ("true", "1", "yes")
+STREAM_ITERSIZE = int(os.getenv("DB_STREAM_ITERSIZE", "2000"))
+
+# libpq settings applied to every pooled connection.
+_CONNECT_KWARGS = {
+    "connect_timeout": 10,
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+    "application_name": (os.getenv("DB_APPLICATION_NAME")
+                         or os.getenv("RAILWAY_SERVICE_NAME") or "shared-db")[:63],
+}
+
+
+class _PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+
+
+class PoolTimeout(PoolError):
+    """No connection became free within DB_POOL_TIMEOUT."""
+
+
+class BlockingPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool whose getconn() waits for a free connection
+    (bounded by `timeout`) and keeps usage metrics for pool_stats()."""
+
+    def __init__(self, minconn, maxconn, *args, timeout: float = POOL_TIMEOUT, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._timeout = timeout
+        self._stats_lock = threading.Lock()
+        self._held: dict[int, float] = {}      # id(conn) -> checkout monotonic time
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._peak = 0
+        self._hold_max = 0.0
+        self._checkouts = 0
+
+    def getconn(self, key=None):
+        t0 = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            if not self._slots.acquire(timeout=self._timeout):
+                with self._stats_lock:
+                    self._timeouts += 1
+                raise PoolTimeout(f"no DB connection free after {self._timeout:.1f}s "
+                                  f"({self.maxconn} in use)")
+            waited = time.monotonic() - t0
+            with self._stats_lock:
+                self._waits += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            if waited * 1000 >= SLOW_WAIT_MS:
+                logger.warning(f"DB pool wait {waited * 1000:.0f}ms — {self.stats()}")
+        try:
+            conn = super().getconn(key)
+            if conn.closed:
+                super().putconn(conn, close=True)
+                conn = super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._stats_lock:
+            self._held[id(conn)] = time.monotonic()
+            self._checkouts += 1
+            self._peak = max(self._peak, len(self._held))
+        return conn
+
+    def putconn(self, conn, key=None, close=False):
+        with self._stats_lock:
+            started = self._held.pop(id(conn), None)
+            if started is not None:
+                self._hold_max = max(self._hold_max, time.monotonic() - started)
+        try:
+            super().putconn(conn, key, close=close or bool(conn.closed))
+        finally:
+            if started is not None:
+                self._slots.release()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._stats_lock:
+            holds = [now - t for t in self._held.values()]
+            return {
+                "max": self.maxconn,
+                "checked_out": len(holds),
+                "peak_checked_out": self._peak,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_avg_ms": round(1000 * self._wait_total / self._waits, 1) if self._waits else 0.0,
+                "wait_max_ms": round(1000 * self._wait_max, 1),
+                "timeouts": self._timeouts,
+                "longest_current_hold_s": round(max(holds), 2) if holds else 0.0,
+                "longest_hold_s": round(max([self._hold_max] + holds), 2),
+            }
+
+
 # Global pool — initialized on first use
-_pool: ThreadedConnectionPool = None
+_pool: BlockingPool = None
+_tx = threading.local()
 
 
-def init_pool(database_url: str = None, minconn: int = 2, maxconn: int = 10):
+def init_pool(database_url: str = None, minconn: int = None, maxconn: int = None):
     """Initialize the connection pool. Idempotent — safe to call from every
     Flask route or worker entrypoint; subsequent calls are no-ops once the
     pool is up. Without this guard each route would create a fresh
@@ -30,21 +166,34 @@ def init_pool(database_url: str = None, minconn: int = 2, maxconn: int = 10):
     url = database_url or os.getenv("DATABASE_URL")
     if not url:
         raise RuntimeError("DATABASE_URL not set")
-    _pool = ThreadedConnectionPool(minconn, maxconn, url)
-    logger.info(f"DB pool initialized (min={minconn}, max={maxconn})")
+    minconn = minconn if minconn is not None else int(os.getenv("DB_POOL_MIN", "2"))
+    maxconn = maxconn if maxconn is not None else int(os.getenv("DB_POOL_MAX", "10"))
+    _pool = BlockingPool(minconn, maxconn, url, connection_factory=_PooledConnection,
+                         **_CONNECT_KWARGS)
+    logger.info(f"DB pool initialized (min={minconn}, max={maxconn}, timeout={POOL_TIMEOUT:.0f}s)")
     return _pool
 
 
-def get_pool() -> ThreadedConnectionPool:
+def get_pool() -> BlockingPool:
     global _pool
     if _pool is None:
         init_pool()
     return _pool
 
 
+def pool_stats() -> dict:
+    """Pool metrics for health endpoints / logs ({} before init)."""
+    return _pool.stats() if _pool is not None else {}
+
+
 @contextmanager
 def get_conn():
-    """Get a connection from the pool, auto-return on exit."""
+    """Get a connection from the pool, auto-return on exit. Inside
+    transaction() this is the transaction's connection."""
+    conn = getattr(_tx, "conn", None)
+    if conn is not None:
+        yield conn
+        return
     pool = get_pool()
     conn = pool.getconn()
     try:
@@ -53,6 +202,44 @@ def get_conn():
         pool.putconn(conn)
 
 
+@contextmanager
+def transaction():
+    """
+    Run several statements on one connection and commit them together.
+    The db helpers (query / execute / execute_values_batch / get_cursor /
+    get_conn) called inside the block on this thread join the transaction
+    instead of checking out their own connection and committing.
+
+        with db.transaction() as cur:
+            cur.execute("DELETE FROM t WHERE ...")
+            db.execute_values_batch("INSERT INTO t VALUES %s", rows)
+
+    Commits on normal exit, rolls back if the block raises. Nested calls
+    join the outer transaction.
+    """
+    if getattr(_tx, "conn", None) is not None:
+        cur = _tx.conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            yield cur
+        finally:
+            cur.close()
+        return
+    pool = get_pool()
+    conn = pool.getconn()
+    _tx.conn = conn
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        yield cur
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _tx.conn = None
+        cur.close()
+        pool.putconn(conn)
+
+
 @contextmanager
 def get_cursor(commit: bool = False):
     """
@@ -66,14 +253,17 @@ def get_cursor(commit: bool = False):
         with get_cursor(commit=True) as cur:
             cur.execute("INSERT ...")
     """
+    in_tx = getattr(_tx, "conn", None) is not None
     with get_conn() as conn:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         try:
             yield cur
-            if commit:
+            if commit and not in_tx:
                 conn.commit()
         except Exception:
-            conn.rollback()
+            # Inside transaction() the outer block owns the rollback.
+            if not in_tx:
+                conn.rollback()
             raise
         finally:
             cur.close()
@@ -109,6 +299,95 @@ def execute_returning(sql: str, params: tuple = None) -> dict | None:
         return dict(row) if row else None
 
 
+# A %s placeholder and the explicit cast written after it, if any.
+_PLACEHOLDER = re.compile(r"(?<!%)%s((?:::\w+(?:\[\])?)?)")
+
+
+def query_prepared(name: str, sql: str, params: tuple = None) -> list[dict]:
+    """
+    query() for hot, fixed-shape statements. With DB_PREPARED_STATEMENTS=true
+    the statement is PREPAREd once per pooled connection under `name` and
+    EXECUTEd afterwards, so Postgres skips parse/plan on every call; with it
+    off (the default — session-level PREPARE breaks under pgbouncer's
+    transaction pooling) this is exactly query(sql, params). `sql` uses the
+    usual %s placeholders; `name` must be a stable identifier for `sql`.
+    A cast written on a placeholder (%s::bigint[]) is repeated on its EXECUTE
+    argument, so e.g. an all-NULL list still binds as the declared type.
+    """
+    if not PREPARED_STATEMENTS:
+        return query(sql, params)
+    params = tuple(params or ())
+    with get_cursor() as cur:
+        prepared = cur.connection.prepared_statements
+        if name not in prepared:
+            n = iter(range(1, len(params) + 1))
+            body = _PLACEHOLDER.sub(lambda m: f"${next(n)}{m.group(1)}", sql).replace("%%", "%")
+            cur.execute(f"PREPARE {name} AS {body}")
+            prepared.add(name)
+        if params:
+            args = ", ".join(f"%s{cast}" for cast in _PLACEHOLDER.findall(sql))
+            cur.execute(f"EXECUTE {name} ({args})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+        return cur.fetchall()
+
+
+_stream_ids = itertools.count(1)
+
+
+@contextmanager
+def _server_cursor(sql: str, params: tuple, itersize: int, tuples: bool):
+    """Named cursor over `sql` on a pooled (or the transaction's) connection.
+    Outside transaction() the read-only transaction the cursor lives in is
+    rolled back on exit, so the connection goes back to the pool clean."""
+    in_tx = getattr(_tx, "conn", None) is not None
+    with get_conn() as conn:
+        cur = conn.cursor(name=f"stream_{next(_stream_ids)}",
+                          cursor_factory=NamedTupleCursor if tuples else RealDictCursor)
+        cur.itersize = max(1, itersize)
+        try:
+            cur.execute(sql, params)
+            yield cur
+        finally:
+            try:
+                cur.close()
+            except psycopg2.Error:
+                pass
+            if not in_tx:
+                conn.rollback()
+
+
+def stream(sql: str, params: tuple = None, *, itersize: int = None, tuples: bool = False):
+    """
+    Iterate a SELECT's rows through a server-side cursor, fetching
+    `itersize` rows per round trip. Rows are RealDictRows, or namedtuples
+    with tuples=True (smaller, attribute access: row.shopify_variant_id).
+
+        for row in db.stream("SELECT ... FROM inventory_product_cache"):
+            ...
+
+    The connection stays checked out until the loop finishes (or the
+    generator is closed), so don't park a half-consumed stream. Other db
+    helpers called inside the loop use their own connections (or the
+    enclosing transaction()).
+    """
+    with _server_cursor(sql, params, itersize or STREAM_ITERSIZE, tuples) as cur:
+        yield from cur
+
+
+def stream_batches(sql: str, params: tuple = None, *, batch_size: int = None,
+                   tuples: bool = False):
+    """stream(), but yields lists of up to `batch_size` rows — for jobs that
+    write back one multi-row statement per batch."""
+    batch_size = batch_size or STREAM_ITERSIZE
+    with _server_cursor(sql, params, batch_size, tuples) as cur:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+
 def execute_many_batch(sql: str, params_list: list[tuple], page_size: int = 100) -> int:
     """Batch execute using psycopg2 execute_batch for performance."""
     with get_cursor(commit=True) as cur:
@@ -116,6 +395,25 @@ def execute_many_batch(sql: str, params_list: list[tuple], page_size: int = 100)
         return cur.rowcount
 
 
+def execute_values_batch(sql: str, params_list: list[tuple], template: str = None,
+                         page_size: int = 1000) -> int:
+    """Multi-row write via psycopg2 execute_values: `sql` carries a single
+    `VALUES %s` placeholder and each page of rows goes out as ONE statement
+    (execute_many_batch still sends one statement per row). Works for
+    INSERT ... VALUES %s, INSERT ... SELECT ... FROM (VALUES %s) and
+    UPDATE ... FROM (VALUES %s) alike. Returns rows affected across all
+    pages; the pages commit together."""
+    if not params_list:
+        return 0
+    total = 0
+    with get_cursor(commit=True) as cur:
+        for i in range(0, len(params_list), page_size):
+            page = params_list[i:i + page_size]
+            execute_values(cur, sql, page, template=template, page_size=len(page))
+            total += max(cur.rowcount, 0)
+    return total
+
+
 def close_pool():
     """Close all connections. Call on app shutdown."""
     global _pool
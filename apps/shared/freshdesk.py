@@ -13,6 +13,7 @@ import time
 import base64
 import logging
 import requests
+import http_pool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -54,7 +55,7 @@ def _request(method, endpoint, *, json_body=None, params=None, max_tries=3, retu
 
     for attempt in range(max_tries):
         try:
-            resp = requests.request(method, url, headers=headers, json=json_body, params=params, timeout=15)
+            resp = http_pool.request(method, url, headers=headers, json=json_body, params=params, timeout=15)
         except requests.exceptions.RequestException as e:
             logger.warning("Freshdesk %s %s failed (attempt %d): %s", method, endpoint, attempt + 1, e)
             time.sleep(min(1.0 * (attempt + 1), 3.0))
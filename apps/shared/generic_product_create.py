@@ -16,7 +16,7 @@ import re
 import time
 import logging
 import unicodedata
-import requests
+import http_pool
 from PIL import Image
 
 logger = logging.getLogger(__name__)
@@ -57,7 +57,7 @@ def _shopify_headers() -> dict:
 def _rest(method: str, path: str, **kwargs) -> dict:
     store = os.environ["SHOPIFY_STORE"]
     url = f"https://{store}/admin/api/{SHOPIFY_VERSION}{path}"
-    resp = requests.request(method, url, headers=_shopify_headers(), timeout=30, **kwargs)
+    resp = http_pool.request(method, url, headers=_shopify_headers(), timeout=30, **kwargs)
     resp.raise_for_status()
     return resp.json() if resp.text else {}
 
@@ -68,7 +68,7 @@ def _gql(query: str, variables: dict = None) -> dict:
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
-    resp = requests.post(url, headers=_shopify_headers(), json=payload, timeout=30)
+    resp = http_pool.post(url, headers=_shopify_headers(), json=payload, timeout=30)
     resp.raise_for_status()
     body = resp.json()
     if "errors" in body:
@@ -129,7 +129,7 @@ def _upload_image_to_shopify(slug: str, idx: int, img_bytes: bytes,
     target = staged["stagedUploadsCreate"]["stagedTargets"][0]
 
     form = {p["name"]: p["value"] for p in target["parameters"]}
-    s3 = requests.post(
+    s3 = http_pool.post(
         target["url"], data=form,
         files={"file": (filename, img_bytes, mime)},
         timeout=60,
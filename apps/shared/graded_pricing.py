@@ -655,6 +655,19 @@ def get_all_graded_comps(tcgplayer_id: int | None, db, *, days: int = 90,
     return company_map
 
 
+# fetched_at is when the row's data last changed; the nightly checks whole
+# expansions and stamps scrydex_sync_log.last_synced, so the later of the two
+# is how old the price is (031_scrydex_price_last_checked.sql).
+_CACHE_FALLBACK_SELECT = """
+    SELECT c.market_price, c.low_price, c.mid_price, c.high_price,
+           c.trend_1d_pct, c.trend_7d_pct, c.trend_30d_pct,
+           GREATEST(c.fetched_at, l.last_synced) AS fetched_at
+    FROM scrydex_price_cache c
+    LEFT JOIN scrydex_sync_log l
+      ON l.game = c.game AND l.expansion_id = c.expansion_id
+"""
+
+
 def _fallback_from_cache(tcgplayer_id, company: str, grade: str, db,
                          *, scrydex_id: str = None) -> Optional[dict]:
     """Read from scrydex_price_cache — unreliable for graded but better than nothing.
@@ -662,22 +675,18 @@ def _fallback_from_cache(tcgplayer_id, company: str, grade: str, db,
     TCGplayer mapping), else by tcgplayer_id."""
     grade = _normalize_grade(grade)
     if scrydex_id:
-        row = db.query_one("""
-            SELECT market_price, low_price, mid_price, high_price,
-                   trend_1d_pct, trend_7d_pct, trend_30d_pct, fetched_at
-            FROM scrydex_price_cache
-            WHERE scrydex_id = %s AND price_type = 'graded'
-              AND grade_company = %s AND grade_value = %s
-            ORDER BY fetched_at DESC LIMIT 1
+        row = db.query_one(f"""
+            {_CACHE_FALLBACK_SELECT}
+            WHERE c.scrydex_id = %s AND c.price_type = 'graded'
+              AND c.grade_company = %s AND c.grade_value = %s
+            ORDER BY c.fetched_at DESC LIMIT 1
         """, (scrydex_id, company, grade))
     elif tcgplayer_id:
-        row = db.query_one("""
-            SELECT market_price, low_price, mid_price, high_price,
-                   trend_1d_pct, trend_7d_pct, trend_30d_pct, fetched_at
-            FROM scrydex_price_cache
-            WHERE tcgplayer_id = %s AND price_type = 'graded'
-              AND grade_company = %s AND grade_value = %s
-            ORDER BY fetched_at DESC LIMIT 1
+        row = db.query_one(f"""
+            {_CACHE_FALLBACK_SELECT}
+            WHERE c.tcgplayer_id = %s AND c.price_type = 'graded'
+              AND c.grade_company = %s AND c.grade_value = %s
+            ORDER BY c.fetched_at DESC LIMIT 1
         """, (int(tcgplayer_id), company, grade))
     else:
         return None
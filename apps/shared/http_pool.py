@@ -0,0 +1,117 @@
+"""
+shared/http_pool.py — Keep-alive HTTP sessions shared by every outbound client.
+
+Module-level requests.get/post/request builds a throwaway Session per call,
+so each Shopify / Scrydex / PPT / PSA call paid a fresh TCP + TLS handshake
+(50–150 ms) — thousands of times in a nightly run, and once per call on
+every kiosk request. Clients in shared/ call the helpers here instead:
+
+    import http_pool
+    r = http_pool.get(url, headers=..., timeout=15)
+    r = http_pool.request("PUT", url, json=body, timeout=30)
+
+which route through one requests.Session per host (scheme://netloc). Each
+session's urllib3 pool keeps up to HTTP_POOL_MAXSIZE idle connections so the
+nightly's fetcher threads and gunicorn's worker threads reuse them instead of
+reconnecting; urllib3 pools are thread-safe, and sessions are never given
+cookies or default headers, so sharing them across threads is safe.
+
+Retries are configured once, on the adapter, and kept deliberately narrow
+so they don't stack on the clients' own retry loops:
+  - connection failures (request never reached the server) — any method;
+  - one read retry on idempotent methods (GET/HEAD/OPTIONS). A pooled
+    connection the server has since closed surfaces as RemoteDisconnected /
+    ProtocolError once the request is sent, which urllib3 counts as a read
+    error, so this is what makes stale keep-alive connections transparent.
+    It also repeats a GET that hit a read timeout, once;
+  - 502/503/504 on idempotent methods only, twice.
+Everything else (429 handling, 5xx on POST, backoff policy) stays with the
+caller, and the final response is returned rather than raised. A POST on a
+stale connection is not replayed — the caller sees the ConnectionError.
+
+Env:
+    HTTP_POOL_MAXSIZE   connections kept per host (default 16)
+"""
+
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+_RETRY = Retry(
+    total=3,
+    connect=3,
+    read=1,
+    status=2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+    backoff_factor=0.3,
+    raise_on_status=False,
+    respect_retry_after_header=True,
+)
+
+_sessions: dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def _new_session() -> requests.Session:
+    s = requests.Session()
+    # pool_block=False: a burst beyond maxsize opens an extra (unpooled)
+    # connection rather than waiting for one to free up.
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE,
+                          max_retries=_RETRY, pool_block=False)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+def session_for(url: str) -> requests.Session:
+    """The shared keep-alive session for `url`'s host."""
+    p = urlparse(url)
+    key = f"{p.scheme}://{p.netloc}"
+    s = _sessions.get(key)
+    if s is None:
+        with _lock:
+            s = _sessions.get(key)
+            if s is None:
+                s = _sessions[key] = _new_session()
+    return s
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """Drop-in for requests.request over the host's pooled session."""
+    return session_for(url).request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def patch(url: str, **kwargs) -> requests.Response:
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url: str, **kwargs) -> requests.Response:
+    return request("DELETE", url, **kwargs)
+
+
+def close_all() -> None:
+    """Close every pooled connection (e.g. after fork in a worker hook)."""
+    with _lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for s in sessions:
+        s.close()
@@ -6,7 +6,7 @@ Used by vip/ (tier transitions) and screening/ (verification flags).
 
 import os
 import time
-import requests
+import http_pool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -31,7 +31,7 @@ def _headers():
 
 def _patch_profile(profile_id: str, properties: dict, timeout=10):
     payload = {"data": {"type": "profile", "id": profile_id, "attributes": {"properties": properties}}}
-    r = requests.patch(f"{BASE}/profiles/{profile_id}/", json=payload, headers=_headers(), timeout=timeout)
+    r = http_pool.patch(f"{BASE}/profiles/{profile_id}/", json=payload, headers=_headers(), timeout=timeout)
     if r.status_code not in (200,):
         raise KlaviyoError(f"PATCH failed {r.status_code}: {r.text}")
     return r.json()
@@ -51,7 +51,7 @@ def upsert_profile(*, email=None, external_id=None, properties: dict, timeout=10
     payload = {"data": {"type": "profile", "attributes": attrs}}
 
     for attempt in range(4):
-        r = requests.post(f"{BASE}/profiles/", json=payload, headers=_headers(), timeout=timeout)
+        r = http_pool.post(f"{BASE}/profiles/", json=payload, headers=_headers(), timeout=timeout)
         if r.status_code in (200, 201):
             return r.json()
 
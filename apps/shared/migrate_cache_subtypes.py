@@ -36,6 +36,9 @@ sys.stdout.reconfigure(encoding="utf-8")
 
 import psycopg2
 
+sys.path.insert(0, str(ROOT / "shared"))
+from scrydex_nightly import refresh_search_docs  # noqa: E402
+
 conn = psycopg2.connect(os.environ["DATABASE_URL"])
 conn.autocommit = True  # DDL + CREATE INDEX CONCURRENTLY can't run in a txn block
 cur = conn.cursor()
@@ -64,6 +67,11 @@ for i, exp in enumerate(expansions, 1):
           AND c.subtypes IS DISTINCT FROM m.subtypes
     """, (exp,))
     total += cur.rowcount
+    if cur.rowcount:
+        # subtypes is part of the card search document (022).
+        cur.execute("SELECT DISTINCT game FROM scrydex_price_cache WHERE expansion_id = %s", (exp,))
+        for (game,) in cur.fetchall():
+            refresh_search_docs(cur, game, exp)
     if i % 25 == 0 or i == len(expansions):
         print(f"   {i}/{len(expansions)} expansions, {total} rows updated so far")
 print(f"   backfill complete: {total} rows")
@@ -41,6 +41,7 @@ from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional
 
 import requests
+import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -173,9 +174,9 @@ class PPTClient:
         for attempt in range(1, max_tries + 1):
             try:
                 logger.info(f"PPT {method} {url} params={params} body={json_body}")
-                r = (requests.get(url, headers=self.headers, params=params, timeout=15)
+                r = (http_pool.get(url, headers=self.headers, params=params, timeout=15)
                      if method == "GET" else
-                     requests.post(url, headers=self.headers, json=json_body, timeout=15))
+                     http_pool.post(url, headers=self.headers, json=json_body, timeout=15))
             except requests.exceptions.RequestException as e:
                 logger.warning(f"PPT request failed (attempt {attempt}): {e}")
                 time.sleep(min(1.0 * attempt, 3.0))
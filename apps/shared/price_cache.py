@@ -19,6 +19,8 @@ import re
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional
 
+import price_snapshot
+
 # Scrydex sends JP-marketplace rows in JPY and eBay graded rows in USD. Convert
 # inside every accessor so the scalar API always returns USD. Rate matches the
 # ingestion service's SCRYDEX_JPY_USD_RATE (same env var, same default).
@@ -37,6 +39,29 @@ _JPY_USD_RATE = Decimal(os.getenv("SCRYDEX_JPY_USD_RATE", "0.0066"))
 # per-token AND'd WHERE then drops the whole row.
 _TOKEN_SPLIT = re.compile(r"[\s\-_/'’(),]+")
 
+# Ranked card search over scrydex_search_doc. tcgplayer_id is looked up in the
+# cache for the page of hits only — the doc is rebuilt by the nightly sync, but
+# links (ingestion scrydex_link, ingest's backfill) update the cache directly
+# and must show up on the next search. First row by (condition, price_type),
+# as the pre-doc DISTINCT ON picked. Hits whose card has left the cache drop.
+_CARD_HITS_SQL = """
+    SELECT h.scrydex_id, t.tcgplayer_id, h.score
+    FROM (
+        SELECT d.game, d.scrydex_id, ({score_sql}) AS score
+        FROM scrydex_search_doc d
+        WHERE {where_clause}
+        ORDER BY score DESC, d.scrydex_id
+        LIMIT %s
+    ) h
+    JOIN LATERAL (
+        SELECT c.tcgplayer_id FROM scrydex_price_cache c
+        WHERE c.game = h.game AND c.scrydex_id = h.scrydex_id
+        ORDER BY c.condition, c.price_type
+        LIMIT 1
+    ) t ON TRUE
+    ORDER BY h.score DESC, h.scrydex_id
+"""
+
 logger = logging.getLogger(__name__)
 
 # Map Scrydex condition codes to PPT full names
@@ -178,6 +203,14 @@ class PriceCache:
         cache_cond = _normalize_condition(condition)
         variant = _to_native_variant(variant)
 
+        snap_rows = self._snapshot_rows(scrydex_id, tcgplayer_id)
+        if snap_rows is not None:
+            for v, cond, price in snap_rows:
+                if (cond == cache_cond and price is not None
+                        and (variant is None or v == variant)):
+                    return price
+            return None
+
         params: list = []
         where_parts = ["product_type = 'card'", "price_type = 'raw'",
                        "condition = %s", "market_price IS NOT NULL"]
@@ -222,6 +255,16 @@ class PriceCache:
             return {}
         variant = _to_native_variant(variant)
 
+        snap_rows = self._snapshot_rows(scrydex_id, tcgplayer_id)
+        if snap_rows is not None:
+            if variant is None:
+                variant = snap_rows[0][0]
+            out: dict = {}
+            for v, cond, price in snap_rows:
+                if v == variant and price is not None:
+                    out["DMG" if cond == "DM" else cond] = price
+            return out
+
         params: list = []
         where_parts = ["product_type = 'card'", "price_type = 'raw'",
                        "market_price IS NOT NULL"]
@@ -379,7 +422,10 @@ class PriceCache:
 
         if not rows:
             return None
+        return self._card_metadata_from_rows(rows)
 
+    def _card_metadata_from_rows(self, rows: list[dict]) -> dict:
+        """Shape `get_card_metadata`'s dict from one card's cache rows."""
         first = rows[0]
         variants_seen = []
         for r in rows:
@@ -451,6 +497,9 @@ class PriceCache:
         """Pick the primary variant for a card: holofoil > normal > whichever
         row comes first. Used when a caller doesn't specify a variant and we
         need to anchor a multi-condition or multi-grade query on one."""
+        snap_rows = self._snapshot_rows(scrydex_id, tcgplayer_id)
+        if snap_rows is not None:
+            return snap_rows[0][0]
         if scrydex_id:
             rows = self.db.query(f"""
                 SELECT variant FROM scrydex_price_cache
@@ -467,6 +516,21 @@ class PriceCache:
             """, (int(tcgplayer_id),))
         return rows[0]["variant"] if rows else None
 
+    def _snapshot_rows(self, scrydex_id=None, tcgplayer_id=None) -> Optional[list]:
+        """Raw card rows [(variant, condition, usd)] from the mmapped price
+        snapshot, in the same holofoil > normal > other order the SQL paths
+        use. None when the snapshot is off, stale, or lacks the card — the
+        caller then reads Postgres, so a card synced since the last
+        generation bump still resolves."""
+        snap = price_snapshot.get_snapshot(self.db)
+        if snap is None:
+            return None
+        rows = snap.raw_rows(
+            scrydex_id=scrydex_id,
+            tcgplayer_id=None if scrydex_id else int(tcgplayer_id),
+        )
+        return rows or None
+
     def get_card_view(
         self, *, scrydex_id: str = None, tcgplayer_id=None,
     ) -> Optional[dict]:
@@ -565,11 +629,14 @@ class PriceCache:
         / `get_condition_prices` on the returned scrydex_id."""
         hits = self._search_card_ids(query, set_name=set_name, limit=limit,
                                      all_games=all_games)
+        grouped = self._fetch_rows_by_scrydex_ids(
+            [h["scrydex_id"] for h in hits], "variant, condition, price_type")
         out = []
         for h in hits:
-            meta = self.get_card_metadata(scrydex_id=h["scrydex_id"])
-            if meta:
-                out.append(meta)
+            card_rows = [r for r in grouped.get(h["scrydex_id"], ())
+                         if r.get("product_type") == "card"]
+            if card_rows:
+                out.append(self._card_metadata_from_rows(card_rows))
         return out
 
     def search_sealed_native(
@@ -620,60 +687,52 @@ class PriceCache:
                           all_games=False) -> list:
         """Internal: run the card search query, return [{scrydex_id, tcgplayer_id}].
 
-        Tokens match across product_name / product_name_en / card_number /
-        printed_number / expansion_id / expansion_name / expansion_name_en /
-        scrydex_card_meta.subtypes. The *_en columns are critical for non-English
-        cards. subtypes catches Riftbound's `<Legend> - <Card>` Collectr labels
-        (e.g. "Darius - Hand of Noxus" — "Darius" lives in subtypes, not in
-        product_name). Mirrors the public `search_cards()` clause."""
+        Tokens match scrydex_search_doc.search_text — product_name /
+        product_name_en / card_number / printed_number / expansion_id /
+        expansion_name / expansion_name_en / variants / subtypes folded into
+        one trigram-indexed column (see 022_scrydex_search_doc.sql). The *_en
+        columns are critical for non-English cards. subtypes catches
+        Riftbound's `<Legend> - <Card>` Collectr labels (e.g. "Darius - Hand
+        of Noxus" — "Darius" lives in subtypes, not in product_name). Mirrors
+        the public `search_cards()` clause."""
         full_query = (query or "").strip()
-        where_parts: list = ["c.product_type = 'card'"]
-        params: list = []
-        if not all_games:
-            where_parts.append("c.game = %s")
-            params.append(self.game)
-
-        for forms in self._tokenize(query):
-            ors = []
-            for f in forms:
-                ors.append("(c.product_name ILIKE %s OR c.product_name_en ILIKE %s "
-                           "OR c.card_number ILIKE %s OR c.printed_number ILIKE %s "
-                           "OR c.expansion_id ILIKE %s "
-                           "OR c.expansion_name ILIKE %s OR c.expansion_name_en ILIKE %s "
-                           "OR c.subtypes::text ILIKE %s)")
-                p = f"%{f}%"
-                params.extend([p, p, p, p, p, p, p, p])
-            where_parts.append("(" + " OR ".join(ors) + ")")
-
+        where_clause, params = self._search_doc_where(query, all_games=all_games)
         if set_name:
-            where_parts.append("(c.expansion_name ILIKE %s OR c.expansion_name_en ILIKE %s)")
+            where_clause += " AND (d.expansion_name ILIKE %s OR d.expansion_name_en ILIKE %s)"
             params.extend([f"%{set_name}%", f"%{set_name}%"])
 
-        where_clause = " AND ".join(where_parts)
-
         score_sql = "0"
         score_params: list = []
         if full_query:
             score_sql = (
-                "(CASE WHEN LOWER(c.printed_number) = LOWER(%s) THEN 100 ELSE 0 END) + "
-                "(CASE WHEN c.printed_number ILIKE %s THEN 30 ELSE 0 END) + "
-                "(CASE WHEN c.printed_number ILIKE %s THEN 10 ELSE 0 END)"
+                "(CASE WHEN LOWER(d.printed_number) = LOWER(%s) THEN 100 ELSE 0 END) + "
+                "(CASE WHEN d.printed_number ILIKE %s THEN 30 ELSE 0 END) + "
+                "(CASE WHEN d.printed_number ILIKE %s THEN 10 ELSE 0 END)"
             )
             score_params = [full_query, f"{full_query}%", f"%{full_query}%"]
 
-        sql = f"""
-            SELECT scrydex_id, tcgplayer_id, score FROM (
-                SELECT DISTINCT ON (c.scrydex_id) c.scrydex_id, c.tcgplayer_id,
-                       ({score_sql}) AS score
-                FROM scrydex_price_cache c
-                WHERE {where_clause}
-                ORDER BY c.scrydex_id, c.condition, c.price_type
-            ) sub
-            ORDER BY score DESC, scrydex_id
-            LIMIT %s
-        """
+        sql = _CARD_HITS_SQL.format(score_sql=score_sql, where_clause=where_clause)
         return self.db.query(sql, tuple(score_params + params + [limit]))
 
+    def _search_doc_where(self, query: str, *, all_games: bool) -> tuple[str, list]:
+        """WHERE clause + params over scrydex_search_doc for a card search.
+
+        Each token group becomes one `search_text ILIKE` per form, OR'd within
+        the group and AND'd across groups — every predicate is servable by
+        idx_scrydex_search_doc_trgm. search_text is already lower-cased, so
+        the forms are too (ILIKE doesn't care, but the trigram lookup is
+        cheaper on an exact-case pattern)."""
+        where_parts: list[str] = ["d.product_type = 'card'"]
+        params: list = []
+        if not all_games:
+            where_parts.append("d.game = %s")
+            params.append(self.game)
+        for forms in self._tokenize(query):
+            where_parts.append(
+                "(" + " OR ".join(["d.search_text ILIKE %s"] * len(forms)) + ")")
+            params.extend(f"%{f.lower()}%" for f in forms)
+        return " AND ".join(where_parts), params
+
     # ════════════════════════════════════════════════════════════════
     # Legacy PPT-shaped API — deprecated, removed once no callers remain
     # ════════════════════════════════════════════════════════════════
@@ -817,59 +876,41 @@ class PriceCache:
         full_query = (query or "").strip()
         full_query_forms = [full_query] if full_query else []
 
-        where_parts: list[str] = ["c.product_type = 'card'"]
-        params: list = []
-        if not all_games:
-            where_parts.append("c.game = %s")
-            params.append(self.game)
-
-        # variant is included in the WHERE so a search like "Masterball" or
-        # "Mystery of the Fossils" qualifies via variant alone, not just name.
-        # Without it, Pattern variants (PE Masterball/Pokeball) can't pass
-        # the WHERE and never appear. subtypes catches Riftbound's
+        # variant is included in search_text so a search like "Masterball"
+        # or "Mystery of the Fossils" qualifies via variant alone, not just
+        # name. Without it, Pattern variants (PE Masterball/Pokeball) can't
+        # pass the WHERE and never appear. subtypes catches Riftbound's
         # `<Legend> - <CardName>` Collectr labels (e.g. "Darius - Hand of
         # Noxus" — "Darius" lives in scrydex_card_meta.subtypes, not in
         # product_name) and Pokemon character tags ("ex"/"V"/...) when
         # subtypes is populated.
-        for forms in self._tokenize(query):
-            ors = []
-            for f in forms:
-                ors.append("(c.product_name ILIKE %s OR c.product_name_en ILIKE %s "
-                           "OR c.card_number ILIKE %s OR c.printed_number ILIKE %s "
-                           "OR c.expansion_id ILIKE %s "
-                           "OR c.expansion_name ILIKE %s OR c.expansion_name_en ILIKE %s "
-                           "OR c.variant ILIKE %s "
-                           "OR c.subtypes::text ILIKE %s)")
-                p = f"%{f}%"
-                params.extend([p, p, p, p, p, p, p, p, p])
-            where_parts.append("(" + " OR ".join(ors) + ")")
+        where_clause, params = self._search_doc_where(query, all_games=all_games)
 
         # set_name used to be a hard WHERE filter, but Collectr's set names
         # don't always match Scrydex's (Collectr says "Mega Evolution" for ME01
         # but Scrydex calls it something else; "Pokemon 151" vs "SV: 151"; etc.)
         # so a hard filter killed real matches. It's a soft score boost now —
         # printed_number scoring still pins the right printing.
-        where_clause = " AND ".join(where_parts)
 
         # Relevance score: exact printed_number > printed_number prefix >
         # printed_number contains > set_name token match > anything else.
-        # Wrap in a subquery so we can DISTINCT ON (scrydex_id) for de-dup,
-        # then ORDER BY score. NOTE: parameter order matters — score
+        # scrydex_search_doc is already one row per scrydex_id, so no
+        # DISTINCT ON is needed. NOTE: parameter order matters — score
         # placeholders appear FIRST in the SQL (in the SELECT list), so they
         # must come first in the params tuple too.
         score_parts = ["0"]
         score_params: list = []
         if full_query:
             score_parts.append(
-                "(CASE WHEN LOWER(c.printed_number) = LOWER(%s) THEN 100 ELSE 0 END)"
+                "(CASE WHEN LOWER(d.printed_number) = LOWER(%s) THEN 100 ELSE 0 END)"
             )
             score_params.append(full_query)
             score_parts.append(
-                "(CASE WHEN c.printed_number ILIKE %s THEN 30 ELSE 0 END)"
+                "(CASE WHEN d.printed_number ILIKE %s THEN 30 ELSE 0 END)"
             )
             score_params.append(f"{full_query}%")
             score_parts.append(
-                "(CASE WHEN c.printed_number ILIKE %s THEN 10 ELSE 0 END)"
+                "(CASE WHEN d.printed_number ILIKE %s THEN 10 ELSE 0 END)"
             )
             score_params.append(f"%{full_query}%")
         if set_name:
@@ -878,15 +919,15 @@ class PriceCache:
             # partial matches like Collectr "Mega Evolution" against Scrydex
             # "Mega Evolution Base" / "Mega Evolution: Promo".
             score_parts.append(
-                "(CASE WHEN c.expansion_name ILIKE %s OR c.expansion_name_en ILIKE %s "
-                "OR c.expansion_id ILIKE %s THEN 50 ELSE 0 END)"
+                "(CASE WHEN d.expansion_name ILIKE %s OR d.expansion_name_en ILIKE %s "
+                "OR d.expansion_id ILIKE %s THEN 50 ELSE 0 END)"
             )
             score_params.extend([f"%{set_name}%", f"%{set_name}%", f"%{set_name}%"])
             for tok in (set_name or "").split():
                 if len(tok) < 2:
                     continue
                 score_parts.append(
-                    "(CASE WHEN c.expansion_name ILIKE %s OR c.expansion_name_en ILIKE %s "
+                    "(CASE WHEN d.expansion_name ILIKE %s OR d.expansion_name_en ILIKE %s "
                     "THEN 8 ELSE 0 END)"
                 )
                 score_params.extend([f"%{tok}%", f"%{tok}%"])
@@ -909,19 +950,19 @@ class PriceCache:
             if len(primary) < 2:
                 continue
             score_parts.append(
-                "(CASE WHEN c.product_name ILIKE %s OR c.product_name_en ILIKE %s "
+                "(CASE WHEN d.product_name ILIKE %s OR d.product_name_en ILIKE %s "
                 "THEN 25 ELSE 0 END)"
             )
             score_params.extend([f"%{primary}%", f"%{primary}%"])
             score_parts.append(
-                "(CASE WHEN c.variant ILIKE %s THEN 15 ELSE 0 END)"
+                "(CASE WHEN d.variants ILIKE %s THEN 15 ELSE 0 END)"
             )
             score_params.append(f"%{primary}%")
             # Subtype match — lower than name match but distinguishes the
             # right Darius/Kai'sa printing among many Riftbound rows the
             # token only matched via subtypes.
             score_parts.append(
-                "(CASE WHEN c.subtypes::text ILIKE %s THEN 12 ELSE 0 END)"
+                "(CASE WHEN d.subtypes ILIKE %s THEN 12 ELSE 0 END)"
             )
             score_params.append(f"%{primary}%")
             # Per-token printed_number / card_number boost for numeric tokens.
@@ -933,37 +974,19 @@ class PriceCache:
             # unpadded but Collectr can have either.
             if primary.isdigit():
                 pn_or = " OR ".join(
-                    ["c.printed_number = %s"] * len(forms)
-                    + ["c.card_number = %s"] * len(forms)
+                    ["d.printed_number = %s"] * len(forms)
+                    + ["d.card_number = %s"] * len(forms)
                 )
                 score_parts.append(f"(CASE WHEN {pn_or} THEN 60 ELSE 0 END)")
                 score_params.extend(forms + forms)
 
         score_sql = " + ".join(score_parts)
 
-        sql = f"""
-            SELECT scrydex_id, tcgplayer_id, score FROM (
-                SELECT DISTINCT ON (c.scrydex_id) c.scrydex_id, c.tcgplayer_id,
-                       ({score_sql}) AS score
-                FROM scrydex_price_cache c
-                WHERE {where_clause}
-                ORDER BY c.scrydex_id, c.condition, c.price_type
-            ) sub
-            ORDER BY score DESC, scrydex_id
-            LIMIT %s
-        """
+        sql = _CARD_HITS_SQL.format(score_sql=score_sql, where_clause=where_clause)
         sub_params = score_params + params + [limit]
 
         hits = self.db.query(sql, tuple(sub_params))
-        results = []
-        for row in hits:
-            card_rows = self.db.query("""
-                SELECT * FROM scrydex_price_cache
-                WHERE scrydex_id = %s ORDER BY variant, condition, price_type
-            """, (row["scrydex_id"],))
-            if card_rows:
-                results.append(self._build_card_dict(card_rows, row.get("tcgplayer_id")))
-        return results
+        return self._hydrate_card_hits(hits)
 
     def search_sealed_products(self, query: str, *, set_name: str = None, limit: int = 5,
                                 all_games: bool = False) -> list[dict]:
@@ -1006,15 +1029,7 @@ class PriceCache:
         params.append(limit * 3)
 
         hits = self.db.query(sql, tuple(params))
-        results = []
-        for row in hits:
-            card_rows = self.db.query("""
-                SELECT * FROM scrydex_price_cache
-                WHERE scrydex_id = %s AND variant = %s
-                ORDER BY condition
-            """, (row["scrydex_id"], row["variant"]))
-            if card_rows:
-                results.append(self._build_sealed_dict(card_rows, row.get("tcgplayer_id")))
+        results = self._hydrate_sealed_hits(hits)
 
         # Sort: base products first (shorter names, no bundle keywords), then bundles
         def _bundle_sort_key(item):
@@ -1024,6 +1039,51 @@ class PriceCache:
         results.sort(key=_bundle_sort_key)
         return results[:limit]
 
+    # ── Batched hydration for search hits ─────────────────
+
+    def _fetch_rows_by_scrydex_ids(self, scrydex_ids: list, order_by: str) -> dict:
+        """One round-trip for every hit: SELECT * for all scrydex_ids at once,
+        grouped in Python as {scrydex_id: [rows]} (row order per group follows
+        `order_by`). Replaces the old per-hit SELECT, which cost a search of
+        limit=8 nine queries before any dict was built."""
+        if not scrydex_ids:
+            return {}
+        rows = self.db.query(f"""
+            SELECT * FROM scrydex_price_cache
+            WHERE scrydex_id = ANY(%s)
+            ORDER BY scrydex_id, {order_by}
+        """, (list(scrydex_ids),))
+        grouped: dict[str, list[dict]] = {}
+        for r in rows:
+            grouped.setdefault(r["scrydex_id"], []).append(r)
+        return grouped
+
+    def _hydrate_card_hits(self, hits: list[dict]) -> list[dict]:
+        """Build PPT-shaped card dicts for search hits ({scrydex_id,
+        tcgplayer_id}), preserving hit order. Hits with no cache rows drop."""
+        sids = list(dict.fromkeys(h["scrydex_id"] for h in hits))
+        grouped = self._fetch_rows_by_scrydex_ids(
+            sids, "variant, condition, price_type")
+        results = []
+        for h in hits:
+            card_rows = grouped.get(h["scrydex_id"])
+            if card_rows:
+                results.append(self._build_card_dict(card_rows, h.get("tcgplayer_id")))
+        return results
+
+    def _hydrate_sealed_hits(self, hits: list[dict]) -> list[dict]:
+        """Build PPT-shaped sealed dicts for (scrydex_id, variant) search hits,
+        preserving hit order. Each dict is scoped to its hit's variant rows."""
+        sids = list(dict.fromkeys(h["scrydex_id"] for h in hits))
+        grouped = self._fetch_rows_by_scrydex_ids(sids, "variant, condition")
+        results = []
+        for h in hits:
+            card_rows = [r for r in grouped.get(h["scrydex_id"], ())
+                         if r.get("variant") == h.get("variant")]
+            if card_rows:
+                results.append(self._build_sealed_dict(card_rows, h.get("tcgplayer_id")))
+        return results
+
     # ── Build PPT-shaped dicts from cache rows ────────────
 
     def _build_card_dict(self, rows: list[dict], tcg_id: int = None) -> dict:
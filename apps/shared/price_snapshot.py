@@ -0,0 +1,378 @@
+"""
+price_snapshot.py — Memory-mapped snapshot of the raw card price slice.
+
+Every service asks scrydex_price_cache the same handful of questions in hot
+loops (raw_card_updater, the price-compare batch, kiosk card lookups):
+"raw price for this card at this condition", "all condition prices for its
+primary variant", "which variant is primary". Each one is a Postgres round-
+trip. This module answers them from a compact, array-backed file instead:
+
+    {PRICE_SNAPSHOT_DIR}/price_snapshot_{generation}.bin
+
+built from every product_type='card', price_type='raw' row (USD-converted
+at build time) and mmapped read-only by each worker, so gunicorn workers
+share the page cache instead of each holding a copy. Lookups are bisects
+over sorted arrays — no per-process dict is built on load.
+
+Invalidation rides on scrydex_sync_log.sync_generation (see
+023_scrydex_sync_generation.sql). The nightly sync bumps it once per full
+run; each process re-reads MAX(sync_generation) at most every
+PRICE_SNAPSHOT_CHECK_SECONDS and, on a change, builds (or picks up a sibling
+worker's) file for the new generation in a background thread. Until then
+`get_snapshot` returns None and PriceCache reads Postgres as before.
+
+Env:
+    PRICE_SNAPSHOT=true                 enable the read-through layer
+    PRICE_SNAPSHOT_DIR                  default /tmp/pf_price_snapshot
+    PRICE_SNAPSHOT_CHECK_SECONDS        default 60
+"""
+
+import array
+import bisect
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from decimal import Decimal
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PFSNAP01"
+# magic, generation, n_sids, n_rows, n_tcg, n_labels, label_blob_len, sid_blob_len
+_HEADER = struct.Struct("<8sqIIIIII")
+_NULL_PRICE = -1
+_CENT = Decimal("0.01")
+
+SNAPSHOT_DIR = os.getenv("PRICE_SNAPSHOT_DIR", "/tmp/pf_price_snapshot")
+_CHECK_INTERVAL = float(os.getenv("PRICE_SNAPSHOT_CHECK_SECONDS", "60"))
+# A build lock older than this is assumed to belong to a dead process.
+_STALE_LOCK_SECONDS = 600
+
+
+def enabled() -> bool:
+    return os.getenv("PRICE_SNAPSHOT", "").lower().strip() in ("true", "1", "yes")
+
+
+def current_generation(db) -> int:
+    """MAX(scrydex_sync_log.sync_generation) — 0 before the first bump."""
+    row = db.query_one(
+        "SELECT COALESCE(MAX(sync_generation), 0) AS gen FROM scrydex_sync_log")
+    return int(row["gen"]) if row else 0
+
+
+def snapshot_path(generation: int, directory: str = None) -> str:
+    return os.path.join(directory or SNAPSHOT_DIR, f"price_snapshot_{generation}.bin")
+
+
+def _pad8(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+# ════════════════════════════════════════════════════════════════
+# Reader
+# ════════════════════════════════════════════════════════════════
+
+class _SidIndex:
+    """Sequence view over the sorted scrydex_id blob so `bisect` can search it
+    in place. Decodes one id per probe (~18 probes for 300k cards)."""
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self._blob = blob
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+
+class PriceSnapshot:
+    """One opened snapshot file. Thread-safe for reads; never mutated."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mm)
+        (magic, self.generation, n_sids, n_rows, n_tcg, n_labels,
+         label_len, sid_len) = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: not a price snapshot")
+
+        pos = _HEADER.size + _pad8(_HEADER.size)
+
+        def take(fmt: str, count: int) -> memoryview:
+            nonlocal pos
+            size = struct.calcsize(fmt) * count
+            view = buf[pos:pos + size].cast(fmt)
+            pos += size + _pad8(size)
+            return view
+
+        sid_offsets = take("I", n_sids + 1)
+        self._sid_rows = take("I", n_sids + 1)
+        self._row_variant = take("H", n_rows)
+        self._row_cond = take("H", n_rows)
+        self._row_price = take("q", n_rows)
+        self._tcg_keys = take("q", n_tcg)
+        self._tcg_rows = take("I", n_tcg)
+        labels = bytes(buf[pos:pos + label_len]).decode("utf-8")
+        pos += label_len + _pad8(label_len)
+        self._labels = labels.split("\n") if n_labels else []
+        self._sids = _SidIndex(buf[pos:pos + sid_len], sid_offsets)
+        self.n_rows = n_rows
+
+    def _row(self, i: int) -> tuple:
+        cents = self._row_price[i]
+        price = None if cents == _NULL_PRICE else (Decimal(cents) * _CENT)
+        return (self._labels[self._row_variant[i]],
+                self._labels[self._row_cond[i]],
+                price)
+
+    def raw_rows(self, *, scrydex_id: str = None, tcgplayer_id: int = None) -> list:
+        """[(variant, condition, usd_price_or_None)] for a card, ordered the
+        way PriceCache's SQL orders them: holofoil > normal > other, then
+        fetched_at DESC. Empty list when the card isn't in the snapshot."""
+        if scrydex_id:
+            i = bisect.bisect_left(self._sids, scrydex_id)
+            if i >= len(self._sids) or self._sids[i] != scrydex_id:
+                return []
+            return [self._row(r) for r in range(self._sid_rows[i], self._sid_rows[i + 1])]
+        if tcgplayer_id is None:
+            return []
+        lo = bisect.bisect_left(self._tcg_keys, tcgplayer_id)
+        hi = bisect.bisect_right(self._tcg_keys, tcgplayer_id, lo)
+        return [self._row(self._tcg_rows[k]) for k in range(lo, hi)]
+
+
+# ════════════════════════════════════════════════════════════════
+# Builder
+# ════════════════════════════════════════════════════════════════
+
+# Mirrors price_cache._variant_ranking_case(): holofoil > normal > other.
+_VARIANT_RANK = {"holofoil": 0, "normal": 1}
+
+_BUILD_SQL = """
+    SELECT scrydex_id, tcgplayer_id, variant, condition, market_price, currency,
+           extract(epoch FROM fetched_at) AS fetched_epoch
+    FROM scrydex_price_cache
+    WHERE product_type = 'card' AND price_type = 'raw'
+    ORDER BY scrydex_id,
+             CASE variant WHEN 'holofoil' THEN 0 WHEN 'normal' THEN 1 ELSE 2 END,
+             fetched_at DESC NULLS LAST
+"""
+
+
+def build_snapshot(db, generation: int, directory: str = None) -> str:
+    """Stream the raw card slice out of Postgres and write the snapshot file
+    for `generation`. Returns the path. Written to a temp name and renamed,
+    so readers never see a partial file."""
+    from price_cache import _to_usd
+
+    directory = directory or SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+    t0 = time.time()
+
+    labels: dict[str, int] = {}
+    sids: list[str] = []
+    sid_start = array.array("I")
+    row_variant = array.array("H")
+    row_cond = array.array("H")
+    row_price = array.array("q")
+    row_tcg = array.array("q")
+    # Build-only: the tcgplayer_id index is ordered on these (see below).
+    row_rank = array.array("B")
+    row_fetched = array.array("d")
+
+    def label(s: str) -> int:
+        idx = labels.get(s)
+        if idx is None:
+            idx = labels[s] = len(labels)
+        return idx
+
+    # Named (server-side) cursor: a full-catalog pull must not materialize
+    # a million RealDictRows on a small worker.
+    with db.get_conn() as conn:
+        with conn.cursor(name="price_snapshot_build") as cur:
+            cur.itersize = 20000
+            cur.execute(_BUILD_SQL)
+            for sid, tcg, variant, cond, market, currency, fetched in cur:
+                if not sids or sids[-1] != sid:
+                    sids.append(sid)
+                    sid_start.append(len(row_price))
+                row_variant.append(label(variant or "normal"))
+                row_cond.append(label(cond or "NM"))
+                usd = _to_usd(market, currency)
+                row_price.append(_NULL_PRICE if usd is None else int(usd * 100))
+                row_tcg.append(tcg or 0)
+                row_rank.append(_VARIANT_RANK.get(variant, 2))
+                row_fetched.append(float("-inf") if fetched is None else float(fetched))
+        conn.rollback()
+    sid_start.append(len(row_price))
+
+    # Postgres ORDER BY follows the DB collation; readers bisect with Python
+    # str ordering. Re-sort the sid blocks by code point, keeping each
+    # block's internal (variant rank, fetched_at) order.
+    order = sorted(range(len(sids)), key=sids.__getitem__)
+    sorted_rows = array.array("I")
+    sid_rows = array.array("I", [0])
+    sid_offsets = array.array("I", [0])
+    sid_blob = bytearray()
+    for k in order:
+        sorted_rows.extend(range(sid_start[k], sid_start[k + 1]))
+        sid_rows.append(len(sorted_rows))
+        sid_blob += sids[k].encode("utf-8")
+        sid_offsets.append(len(sid_blob))
+    row_variant = array.array("H", (row_variant[r] for r in sorted_rows))
+    row_cond = array.array("H", (row_cond[r] for r in sorted_rows))
+    row_price = array.array("q", (row_price[r] for r in sorted_rows))
+    row_tcg = array.array("q", (row_tcg[r] for r in sorted_rows))
+    row_rank = array.array("B", (row_rank[r] for r in sorted_rows))
+    row_fetched = array.array("d", (row_fetched[r] for r in sorted_rows))
+
+    # tcgplayer_id → rows, ordered like the SQL tcgplayer_id lookups:
+    # variant rank, then fetched_at DESC NULLS LAST across every scrydex_id
+    # sharing the tcg — not grouped by card.
+    tcg_order = sorted((i for i in range(len(row_tcg)) if row_tcg[i]),
+                       key=lambda i: (row_tcg[i], row_rank[i], -row_fetched[i]))
+    tcg_keys = array.array("q", (row_tcg[i] for i in tcg_order))
+    tcg_rows = array.array("I", tcg_order)
+
+    label_blob = "\n".join(sorted(labels, key=labels.get)).encode("utf-8")
+
+    path = snapshot_path(generation, directory)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        header = _HEADER.pack(_MAGIC, generation, len(sids), len(row_price),
+                              len(tcg_keys), len(labels), len(label_blob),
+                              len(sid_blob))
+        for chunk in (header, sid_offsets, sid_rows, row_variant, row_cond,
+                      row_price, tcg_keys, tcg_rows, label_blob, sid_blob):
+            data = chunk if isinstance(chunk, (bytes, bytearray)) else chunk.tobytes()
+            f.write(data)
+            f.write(b"\0" * _pad8(len(data)))
+    os.replace(tmp, path)
+    logger.info(f"Price snapshot gen={generation}: {len(sids)} cards, "
+                f"{len(row_price)} rows → {path} in {time.time() - t0:.1f}s")
+    _prune_old(directory, keep=generation)
+    return path
+
+
+def _prune_old(directory: str, keep: int):
+    """Delete snapshot files for older generations. Workers still mmapping
+    one keep their pages until they swap — unlink doesn't yank the mapping."""
+    for name in os.listdir(directory):
+        if not (name.startswith("price_snapshot_") and name.endswith(".bin")):
+            continue
+        try:
+            gen = int(name[len("price_snapshot_"):-len(".bin")])
+        except ValueError:
+            continue
+        if gen < keep:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+# ════════════════════════════════════════════════════════════════
+# Process-wide handle
+# ════════════════════════════════════════════════════════════════
+
+_lock = threading.Lock()
+_snapshot: Optional[PriceSnapshot] = None
+_db_generation: Optional[int] = None
+_checked_at = 0.0
+_building = False
+
+
+def get_snapshot(db) -> Optional[PriceSnapshot]:
+    """The current-generation snapshot, or None when disabled, not yet built
+    for the latest sync generation, or the generation check fails. Callers
+    treat None as "read Postgres"."""
+    global _checked_at, _db_generation
+    if not enabled():
+        return None
+    if time.monotonic() - _checked_at < _CHECK_INTERVAL:
+        snap = _snapshot
+        return snap if snap is not None and snap.generation == _db_generation else None
+
+    with _lock:
+        if time.monotonic() - _checked_at >= _CHECK_INTERVAL:
+            _checked_at = time.monotonic()
+            try:
+                _db_generation = current_generation(db)
+            except Exception as e:
+                logger.warning(f"Price snapshot generation check failed: {e}")
+                _db_generation = None
+                return None
+            if _snapshot is None or _snapshot.generation != _db_generation:
+                _load_or_build(db, _db_generation)
+        snap = _snapshot
+        return snap if snap is not None and snap.generation == _db_generation else None
+
+
+def _load_or_build(db, generation: int):
+    """Open the file for `generation` if some worker already wrote it,
+    otherwise start a background build. Caller holds _lock."""
+    global _snapshot, _building
+    path = snapshot_path(generation)
+    if os.path.exists(path):
+        try:
+            _snapshot = PriceSnapshot(path)
+            logger.info(f"Price snapshot gen={generation} mapped ({_snapshot.n_rows} rows)")
+            return
+        except Exception as e:
+            logger.warning(f"Price snapshot {path} unreadable, rebuilding: {e}")
+    if _building:
+        return
+    _building = True
+    threading.Thread(target=_build_in_background, args=(db, generation),
+                     daemon=True, name="price-snapshot-build").start()
+
+
+def _build_in_background(db, generation: int):
+    global _snapshot, _building
+    lock_path = snapshot_path(generation) + ".lock"
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        # One builder per host: sibling gunicorn workers see the lock and
+        # pick the finished file up on their next generation check.
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if time.time() - os.path.getmtime(lock_path) < _STALE_LOCK_SECONDS:
+                return
+            os.remove(lock_path)
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        os.close(fd)
+        try:
+            path = build_snapshot(db, generation)
+        finally:
+            os.remove(lock_path)
+        snap = PriceSnapshot(path)
+        with _lock:
+            if _snapshot is None or snap.generation >= _snapshot.generation:
+                _snapshot = snap
+    except Exception as e:
+        logger.warning(f"Price snapshot build for gen={generation} failed: {e}")
+    finally:
+        with _lock:
+            _building = False
+
+
+def refresh(db) -> Optional[str]:
+    """Build the snapshot for the current generation in the foreground.
+    Called by the nightly sync entrypoints right after they bump the
+    generation so the price_updater host has a warm file before the
+    morning updaters run. No-op when the layer is disabled."""
+    if not enabled():
+        return None
+    generation = current_generation(db)
+    path = snapshot_path(generation)
+    if not os.path.exists(path):
+        path = build_snapshot(db, generation)
+    return path
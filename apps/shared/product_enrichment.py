@@ -25,11 +25,13 @@ import io
 import os
 import re
 import logging
-import requests
+import http_pool
 import time
 import unicodedata
 from PIL import Image
 
+from shopify_throttle import gql_post
+
 logger = logging.getLogger(__name__)
 
 # ─── Constants ────────────────────────────────────────────────────────────────
@@ -358,7 +360,7 @@ def infer_era(product_name: str, set_name: str) -> str | None:
 
 def _download_image(url: str) -> Image.Image:
     headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
-    r = requests.get(url, timeout=30, headers=headers)
+    r = http_pool.get(url, timeout=30, headers=headers)
     r.raise_for_status()
     return Image.open(io.BytesIO(r.content)).convert("RGBA")
 
@@ -374,7 +376,7 @@ def _remove_background_removebg(im: Image.Image) -> Image.Image:
 
     buf = io.BytesIO()
     im.save(buf, format="PNG")
-    resp = requests.post(
+    resp = http_pool.post(
         "https://api.remove.bg/v1.0/removebg",
         files={"image_file": ("image.png", buf.getvalue(), "image/png")},
         data={"size": "auto"},
@@ -456,9 +458,7 @@ def _gql(query: str, variables: dict = None) -> dict:
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
-    resp = requests.post(url, headers=_shopify_headers(), json=payload, timeout=30)
-    resp.raise_for_status()
-    body = resp.json()
+    body = gql_post(url, _shopify_headers(), payload, timeout=30)
     if "errors" in body:
         raise RuntimeError(f"GraphQL errors: {body['errors']}")
     return body.get("data", {})
@@ -467,7 +467,7 @@ def _gql(query: str, variables: dict = None) -> dict:
 def _rest(method: str, path: str, **kwargs) -> dict:
     store = os.environ["SHOPIFY_STORE"]
     url = f"https://{store}/admin/api/{SHOPIFY_VERSION}{path}"
-    resp = requests.request(method, url, headers=_shopify_headers(), timeout=30, **kwargs)
+    resp = http_pool.request(method, url, headers=_shopify_headers(), timeout=30, **kwargs)
     resp.raise_for_status()
     return resp.json()
 
@@ -501,7 +501,7 @@ def upload_product_image(product_name: str, png_bytes: bytes) -> str:
 
     # 2) POST to S3
     form = {p["name"]: p["value"] for p in target["parameters"]}
-    s3 = requests.post(target["url"], data=form,
+    s3 = http_pool.post(target["url"], data=form,
                        files={"file": (filename, png_bytes, "image/png")}, timeout=60)
     s3.raise_for_status()
 
@@ -25,9 +25,11 @@ import logging
 import unicodedata
 from typing import Optional
 
-import requests
+import http_pool
 from PIL import Image
 
+from shopify_throttle import gql_post
+
 logger = logging.getLogger(__name__)
 
 PSA_API_BASE  = "https://api.psacard.com/publicapi/cert"
@@ -67,7 +69,7 @@ def _psa_headers() -> dict:
 def _psa_get(url: str, stop_on_quota: bool = True) -> dict:
     """GET with retry on 5xx, stop on 429/529."""
     for attempt in range(3):
-        resp = requests.get(url, headers=_psa_headers(), timeout=20)
+        resp = http_pool.get(url, headers=_psa_headers(), timeout=20)
         if resp.status_code in (429, 529):
             if stop_on_quota:
                 raise PSAQuotaHit(f"PSA rate limited: HTTP {resp.status_code}")
@@ -344,10 +346,7 @@ def _gql(shopify_domain: str, shopify_token: str, query: str, variables: dict =
     payload = {"query": query}
     if variables:
         payload["variables"] = variables
-    r = requests.post(url, headers=_shopify_headers(shopify_token),
-                      json=payload, timeout=30)
-    r.raise_for_status()
-    return r.json()
+    return gql_post(url, _shopify_headers(shopify_token), payload, timeout=30)
 
 
 def _prewire_publications(product_gid: str, shopify_domain: str, shopify_token: str):
@@ -386,7 +385,7 @@ _CONTENT_SIZE = (950, 1600)
 
 
 def _download_image(url: str) -> Image.Image:
-    r = requests.get(url, timeout=30)
+    r = http_pool.get(url, timeout=30)
     r.raise_for_status()
     return Image.open(io.BytesIO(r.content)).convert("RGBA")
 
@@ -439,7 +438,7 @@ def _stage_upload_png(filename: str, data: bytes,
 
     form  = {p["name"]: p["value"] for p in target["parameters"]}
     files = {"file": (filename, data, "image/png")}
-    r = requests.post(target["url"], data=form, files=files, timeout=60)
+    r = http_pool.post(target["url"], data=form, files=files, timeout=60)
     r.raise_for_status()
     return target
 
@@ -586,7 +585,7 @@ def create_graded_listing(
         }
     }
 
-    r = requests.post(url, headers=_shopify_headers(shopify_token),
+    r = http_pool.post(url, headers=_shopify_headers(shopify_token),
                       json=payload, timeout=30)
     if not r.ok:
         # Shopify 422 errors are meaningless without the body — surface it
@@ -634,7 +633,7 @@ def add_graded_variant(
     image_ids = []
     for src in image_urls[:3]:
         try:
-            r = requests.post(f"{base}/products/{shopify_product_id}/images.json",
+            r = http_pool.post(f"{base}/products/{shopify_product_id}/images.json",
                               headers=hdrs, json={"image": {"src": src}}, timeout=20)
             r.raise_for_status()
             img = r.json().get("image", {})
@@ -657,7 +656,7 @@ def add_graded_variant(
     if image_ids:
         variant_payload["variant"]["image_id"] = image_ids[0]
 
-    r = requests.post(f"{base}/products/{shopify_product_id}/variants.json",
+    r = http_pool.post(f"{base}/products/{shopify_product_id}/variants.json",
                       headers=hdrs, json=variant_payload, timeout=20)
     if not r.ok:
         try:
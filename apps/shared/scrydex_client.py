@@ -46,11 +46,13 @@ Variant name mapping (Scrydex -> PPT display names):
 
 import os
 import time
+import threading
 import logging
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional
 
 import requests
+import http_pool
 
 logger = logging.getLogger(__name__)
 
@@ -199,9 +201,14 @@ class ScrydexClient:
             "X-Team-ID": team_id,
         }
         self.db = db
-        # Rate limiting — 100 req/sec hard limit
+        # Rate limiting — 100 req/sec hard limit. The lock makes the window
+        # safe to share across the nightly sync's concurrent fetchers.
         self._request_times: list[float] = []  # sliding window
+        self._rate_lock = threading.Lock()
         self._credits_remaining = None
+        # Wall-clock time until which Scrydex asked us (429 Retry-After) to
+        # hold off. Shared with the nightly fetchers via get_rate_limit_info.
+        self._retry_until = 0.0
         # Negative cache for known-failing URLs (5xx after retries exhausted).
         # Some Scrydex sealed/card pages return 500 persistently (broken on
         # their side); without this we'd burn ~3-4s of retries on every call.
@@ -212,15 +219,29 @@ class ScrydexClient:
         return {
             "minute_remaining": None,  # Scrydex doesn't have per-minute limits
             "daily_remaining": self._credits_remaining,
-            "retry_after": None,
+            "retry_after": self._retry_after_remaining(),
         }
 
+    def _retry_after_remaining(self) -> Optional[float]:
+        remaining = self._retry_until - time.time()
+        return remaining if remaining > 0 else None
+
+    @staticmethod
+    def _parse_retry_after(r) -> Optional[float]:
+        """Seconds from a Retry-After header; None when absent or an HTTP
+        date (Scrydex sends seconds)."""
+        try:
+            return max(float(r.headers.get("Retry-After")), 0.0)
+        except (TypeError, ValueError):
+            return None
+
     def should_throttle(self) -> bool:
         """Check if we're near the 100 req/sec hard limit."""
         now = time.time()
-        # Prune requests older than 1 second
-        self._request_times = [t for t in self._request_times if now - t < 1.0]
-        return len(self._request_times) >= 95  # leave 5 req/sec headroom
+        with self._rate_lock:
+            # Prune requests older than 1 second
+            self._request_times = [t for t in self._request_times if now - t < 1.0]
+            return len(self._request_times) >= 95  # leave 5 req/sec headroom
 
     # ── request engine ────────────────────────────────────────────
 
@@ -242,9 +263,10 @@ class ScrydexClient:
         last_err = None
         for attempt in range(1, max_tries + 1):
             try:
-                self._request_times.append(time.time())
+                with self._rate_lock:
+                    self._request_times.append(time.time())
                 logger.info(f"Scrydex {method} {url} params={params}")
-                r = requests.request(method, url, headers=self.headers,
+                r = http_pool.request(method, url, headers=self.headers,
                                      params=params, timeout=15)
             except requests.exceptions.RequestException as e:
                 logger.warning(f"Scrydex request failed (attempt {attempt}): {e}")
@@ -257,8 +279,13 @@ class ScrydexClient:
                 return r.json()
 
             if r.status_code == 429:
+                retry_after = self._parse_retry_after(r)
+                if retry_after is not None:
+                    with self._rate_lock:
+                        self._retry_until = max(self._retry_until,
+                                                time.time() + retry_after)
                 if attempt < max_tries:
-                    wait = min(2 ** attempt, 10)
+                    wait = retry_after if retry_after is not None else min(2 ** attempt, 10)
                     logger.warning(f"Scrydex 429 — sleeping {wait}s (attempt {attempt}/{max_tries})")
                     time.sleep(wait)
                     continue
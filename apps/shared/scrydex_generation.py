@@ -0,0 +1,244 @@
+"""
+scrydex_generation.py — Build the nightly price cache as a whole new
+generation and swap it in atomically.
+
+Without this, scrydex_nightly upserts scrydex_price_cache in place one
+expansion at a time, so for the length of a run readers see a catalog that
+is part today and part yesterday, and price_history has to copy yesterday's
+prices before the sync starts. With SCRYDEX_GENERATION_SWAP=true a run goes:
+
+    begin_generation   clone the live table into scrydex_price_cache_next
+    (sync)             write_expansion(..., price_table=NEXT_TABLE)
+    validate_generation per-game row counts: next must keep >= SWAP_MIN_RATIO of live
+    swap_generation    one transaction: live → _prev, next → live
+    abort_generation   on failed validation: drop next, un-skip the expansions
+
+Readers look the table up by name on every query, so after the swap they
+see the new catalog in full; a query that was waiting on the rename lock
+re-resolves the name and reads the new table too. _prev is kept until the
+next swap as the source for analytics/price_history.snapshot_scrydex_prices.
+
+Only scrydex_price_cache is generational. card meta, the tcg map and the
+expansion meta are still written straight to their live tables; they are
+descriptive and don't mix prices across days. Ad-hoc tcgplayer_id fixes
+made to the live cache while a generation is building (ingest / ingestion
+app) are lost when it swaps, so leave swap mode off while backfilling them.
+
+The swap waits at most SCRYDEX_SWAP_LOCK_TIMEOUT_MS for its ACCESS
+EXCLUSIVE lock, so a long-running reader can't queue every other reader
+behind it; it rolls back and retries, and after SCRYDEX_SWAP_LOCK_RETRIES
+attempts aborts the generation (see abort_generation) and fails the run.
+Indexes and constraints keep their canonical names across swaps (the
+clone's auto-generated names are renamed back), so migrations and
+ON CONSTRAINT clauses can keep naming them.
+
+Env:
+    SCRYDEX_GENERATION_SWAP=true    enable (run_scrydex_sync / scrydex_nightly --swap)
+    SCRYDEX_SWAP_MIN_RATIO          default 0.95
+    SCRYDEX_SWAP_LOCK_TIMEOUT_MS    default 5000
+    SCRYDEX_SWAP_LOCK_RETRIES       default 5
+"""
+
+import json
+import logging
+import os
+import re
+import time
+
+import psycopg2.errors
+
+logger = logging.getLogger(__name__)
+
+LIVE_TABLE = "scrydex_price_cache"
+NEXT_TABLE = "scrydex_price_cache_next"
+PREV_TABLE = "scrydex_price_cache_prev"
+
+SWAP_MIN_RATIO = float(os.getenv("SCRYDEX_SWAP_MIN_RATIO", "0.95"))
+SWAP_LOCK_TIMEOUT_MS = int(os.getenv("SCRYDEX_SWAP_LOCK_TIMEOUT_MS", "5000"))
+SWAP_LOCK_RETRIES = int(os.getenv("SCRYDEX_SWAP_LOCK_RETRIES", "5"))
+
+# "CREATE [UNIQUE] INDEX <name> ON <table> ..." — the index name and table
+# are what differ between the live table's indexes and the clone's.
+_INDEXDEF_HEAD = re.compile(r"^CREATE (UNIQUE )?INDEX \S+ ON \S+ ")
+
+
+def enabled() -> bool:
+    return os.getenv("SCRYDEX_GENERATION_SWAP", "").lower().strip() in ("true", "1", "yes")
+
+
+def _game_counts(cur, table: str) -> dict:
+    cur.execute(f"SELECT game, COUNT(*) FROM {table} GROUP BY game")
+    return {game: n for game, n in cur.fetchall()}
+
+
+def begin_generation(db) -> int:
+    """Drop any leftover shadow, clone the live cache into NEXT_TABLE and
+    open a scrydex_cache_generation row. Returns the generation id.
+
+    The clone carries the live table's indexes and unique key so the
+    nightly's ON CONFLICT upserts work unchanged against it, and shares its
+    id sequence so ids stay unique across generations."""
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS {NEXT_TABLE}")
+            cur.execute(f"CREATE TABLE {NEXT_TABLE} (LIKE {LIVE_TABLE} INCLUDING ALL)")
+            # Generated columns (grade_*_key) can't be inserted into.
+            cur.execute("""
+                SELECT column_name FROM information_schema.columns
+                WHERE table_name = %s AND is_generated = 'NEVER'
+                ORDER BY ordinal_position
+            """, (LIVE_TABLE,))
+            cols = ", ".join(r[0] for r in cur.fetchall())
+            cur.execute(f"INSERT INTO {NEXT_TABLE} ({cols}) SELECT {cols} FROM {LIVE_TABLE}")
+            copied = cur.rowcount
+            cur.execute(f"ANALYZE {NEXT_TABLE}")
+            cur.execute("INSERT INTO scrydex_cache_generation (status) VALUES ('building') RETURNING id")
+            generation = cur.fetchone()[0]
+        conn.commit()
+    logger.info(f"Cache generation {generation}: cloned {copied} rows into {NEXT_TABLE}")
+    return generation
+
+
+def validate_generation(db, generation: int, min_ratio: float = None) -> list:
+    """Compare per-game row counts of NEXT_TABLE against the live table.
+    Returns a list of problems (empty = safe to swap) and records the counts
+    on the generation row."""
+    min_ratio = SWAP_MIN_RATIO if min_ratio is None else min_ratio
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            live = _game_counts(cur, LIVE_TABLE)
+            nxt = _game_counts(cur, NEXT_TABLE)
+            counts = {g: {"live": live.get(g, 0), "next": nxt.get(g, 0)}
+                      for g in sorted(set(live) | set(nxt))}
+            cur.execute("UPDATE scrydex_cache_generation SET row_counts = %s::jsonb WHERE id = %s",
+                        (json.dumps(counts), generation))
+        conn.commit()
+
+    problems = []
+    if not nxt:
+        problems.append(f"{NEXT_TABLE} is empty")
+    for game, c in counts.items():
+        if c["live"] and c["next"] < c["live"] * min_ratio:
+            problems.append(f"{game}: {c['next']} rows vs {c['live']} live "
+                            f"(< {min_ratio:.0%})")
+    return problems
+
+
+def _indexes(cur, table: str) -> dict:
+    """{index definition with name and table stripped: [index names]}."""
+    cur.execute("""
+        SELECT c.relname, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        ORDER BY c.relname
+    """, (table,))
+    out: dict = {}
+    for name, indexdef in cur.fetchall():
+        out.setdefault(_INDEXDEF_HEAD.sub(r"CREATE \1INDEX ON t ", indexdef), []).append(name)
+    return out
+
+
+def _prev_name(name: str) -> str:
+    return f"{name[:58]}_prev"  # identifiers max out at 63 bytes
+
+
+def _swap_index_names(cur) -> None:
+    """Give NEXT_TABLE's indexes the live table's names and move the live
+    ones to *_prev. Renaming an index that backs a unique / primary key
+    constraint renames the constraint with it."""
+    live = _indexes(cur, LIVE_TABLE)
+    nxt = _indexes(cur, NEXT_TABLE)
+    pairs = [(old, new)
+             for key, old_names in live.items()
+             for old, new in zip(old_names, nxt.get(key, []))
+             if old != new]
+    for old, _ in pairs:
+        cur.execute(f'ALTER INDEX "{old}" RENAME TO "{_prev_name(old)}"')
+    for old, new in pairs:
+        cur.execute(f'ALTER INDEX "{new}" RENAME TO "{old}"')
+
+
+def swap_generation(db, generation: int) -> None:
+    """Atomically promote NEXT_TABLE to live; the old live table becomes
+    PREV_TABLE (the previous _prev is dropped). Retries when the table lock
+    isn't granted within SWAP_LOCK_TIMEOUT_MS; once the retries run out the
+    generation is aborted and LockNotAvailable re-raised."""
+    with db.get_conn() as conn:
+        for attempt in range(1, SWAP_LOCK_RETRIES + 1):
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"SET LOCAL lock_timeout = {SWAP_LOCK_TIMEOUT_MS}")
+                    cur.execute(f"LOCK TABLE {LIVE_TABLE}, {NEXT_TABLE} IN ACCESS EXCLUSIVE MODE")
+                    # The id sequence is owned by whichever table created it; hand it
+                    # to the incoming table before anything that owns it is dropped.
+                    cur.execute("SELECT pg_get_serial_sequence(%s, 'id')", (LIVE_TABLE,))
+                    seq = cur.fetchone()[0]
+                    if seq:
+                        cur.execute(f"ALTER SEQUENCE {seq} OWNED BY {NEXT_TABLE}.id")
+                    cur.execute(f"DROP TABLE IF EXISTS {PREV_TABLE}")
+                    _swap_index_names(cur)
+                    cur.execute(f"ALTER TABLE {LIVE_TABLE} RENAME TO {PREV_TABLE}")
+                    cur.execute(f"ALTER TABLE {NEXT_TABLE} RENAME TO {LIVE_TABLE}")
+                    cur.execute("""
+                        UPDATE scrydex_cache_generation
+                        SET status = 'swapped', finished_at = NOW()
+                        WHERE id = %s
+                    """, (generation,))
+                conn.commit()
+                break
+            except psycopg2.errors.LockNotAvailable:
+                conn.rollback()
+                if attempt == SWAP_LOCK_RETRIES:
+                    # Never leave the run half-done: the sync log already
+                    # claims these expansions are current.
+                    abort_generation(db, generation,
+                                     f"swap lock not granted after {SWAP_LOCK_RETRIES} "
+                                     f"attempts of {SWAP_LOCK_TIMEOUT_MS}ms")
+                    raise
+                logger.warning(f"Cache generation {generation}: swap lock not granted "
+                               f"in {SWAP_LOCK_TIMEOUT_MS}ms (attempt {attempt}/"
+                               f"{SWAP_LOCK_RETRIES}) — retrying")
+                time.sleep(min(2 ** attempt, 30))
+    logger.info(f"Cache generation {generation} swapped in")
+
+
+def abort_generation(db, generation: int, reason: str) -> None:
+    """Discard NEXT_TABLE. Expansions written during the run had their
+    scrydex_sync_log content hash / schedule advanced even though their rows
+    never went live, so reset those — the next run re-syncs them in full —
+    and rebuild their search documents from the live table."""
+    from scrydex_nightly import refresh_search_docs
+
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT started_at FROM scrydex_cache_generation WHERE id = %s",
+                        (generation,))
+            row = cur.fetchone()
+            cur.execute(f"DROP TABLE IF EXISTS {NEXT_TABLE}")
+            if row:
+                cur.execute("""
+                    UPDATE scrydex_sync_log
+                    SET content_hash = NULL, next_sync_at = NULL
+                    WHERE last_synced >= %s
+                    RETURNING game, expansion_id
+                """, (row[0],))
+                for game, expansion_id in cur.fetchall():
+                    refresh_search_docs(cur, game, expansion_id, LIVE_TABLE)
+            cur.execute("""
+                UPDATE scrydex_cache_generation
+                SET status = 'aborted', finished_at = NOW(), note = %s
+                WHERE id = %s
+            """, (reason[:1000], generation))
+        conn.commit()
+    logger.warning(f"Cache generation {generation} aborted: {reason}")
+
+
+def finish_generation(db, generation: int) -> list:
+    """validate → swap, or abort. Returns the validation problems (empty on
+    a successful swap)."""
+    problems = validate_generation(db, generation)
+    if problems:
+        abort_generation(db, generation, "; ".join(problems))
+    else:
+        swap_generation(db, generation)
+    return problems
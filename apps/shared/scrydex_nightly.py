@@ -3,21 +3,33 @@ Scrydex nightly sync — pulls all active expansions and upserts prices into
 scrydex_price_cache. After this runs, every price lookup is a local DB read.
 
 Usage:
-    python scrydex_nightly.py [--sets sv8,sv3pt5] [--all] [--dry-run]
+    python scrydex_nightly.py [--sets sv8,sv3pt5] [--all] [--delta] [--swap] [--dry-run] [--workers 4]
 
 Without args: syncs all expansions that have been pulled before (scrydex_sync_log).
 With --all: syncs every English expansion.
 With --sets: syncs only the specified expansion IDs.
+--delta skips expansions that aren't due yet: old sets whose prices stay
+quiet back off to a weekly re-sync (see _resync_interval_days).
+--swap builds the run into a shadow table and swaps it in atomically once
+per-game row counts check out (see scrydex_generation.py).
+--workers N (default 4) fetches N expansions concurrently under a shared
+request-rate cap while a single writer upserts finished ones; --workers 1
+is the old strictly-sequential loop.
 
 Designed to run as a Railway cron or via APScheduler alongside the Selenium
 price updater. ~500-800 credits per full run (197 sets × 2-4 pages each).
 """
 
+import io
 import os
 import sys
 import time
+import queue
+import hashlib
 import argparse
 import logging
+import threading
+from datetime import date
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -65,6 +77,31 @@ UPSERT_SQL = """
         currency          = EXCLUDED.currency,
         subtypes          = EXCLUDED.subtypes,
         fetched_at        = NOW()
+    -- Only rewrite rows whose data actually moved: unchanged prices cost no
+    -- WAL, no index churn, and keep fetched_at = "last changed".
+    WHERE (scrydex_price_cache.tcgplayer_id, scrydex_price_cache.expansion_name,
+           scrydex_price_cache.product_name, scrydex_price_cache.printed_number,
+           scrydex_price_cache.product_name_en, scrydex_price_cache.expansion_name_en,
+           scrydex_price_cache.language_code,
+           scrydex_price_cache.market_price, scrydex_price_cache.low_price,
+           scrydex_price_cache.mid_price, scrydex_price_cache.high_price,
+           scrydex_price_cache.trend_1d_pct, scrydex_price_cache.trend_7d_pct,
+           scrydex_price_cache.trend_30d_pct,
+           scrydex_price_cache.image_small, scrydex_price_cache.image_medium,
+           scrydex_price_cache.image_large,
+           scrydex_price_cache.currency, scrydex_price_cache.subtypes)
+      IS DISTINCT FROM
+          (EXCLUDED.tcgplayer_id, EXCLUDED.expansion_name,
+           EXCLUDED.product_name, EXCLUDED.printed_number,
+           EXCLUDED.product_name_en, EXCLUDED.expansion_name_en,
+           EXCLUDED.language_code,
+           EXCLUDED.market_price, EXCLUDED.low_price,
+           EXCLUDED.mid_price, EXCLUDED.high_price,
+           EXCLUDED.trend_1d_pct, EXCLUDED.trend_7d_pct,
+           EXCLUDED.trend_30d_pct,
+           EXCLUDED.image_small, EXCLUDED.image_medium,
+           EXCLUDED.image_large,
+           EXCLUDED.currency, EXCLUDED.subtypes)
 """
 
 MAP_SQL = """
@@ -74,6 +111,8 @@ MAP_SQL = """
         product_type = EXCLUDED.product_type,
         game = EXCLUDED.game,
         updated_at = NOW()
+    WHERE (scrydex_tcg_map.product_type, scrydex_tcg_map.game)
+          IS DISTINCT FROM (EXCLUDED.product_type, EXCLUDED.game)
 """
 
 CARD_META_SQL = """
@@ -122,6 +161,7 @@ CARD_META_SQL = """
         tags                       = EXCLUDED.tags,
         raw                        = EXCLUDED.raw,
         fetched_at                 = NOW()
+    WHERE scrydex_card_meta.raw IS DISTINCT FROM EXCLUDED.raw
 """
 
 EXPANSION_META_SQL = """
@@ -149,8 +189,140 @@ EXPANSION_META_SQL = """
         is_online_only  = EXCLUDED.is_online_only,
         raw             = EXCLUDED.raw,
         fetched_at      = NOW()
+    WHERE scrydex_expansion_meta.raw IS DISTINCT FROM EXCLUDED.raw
 """
 
+# ── COPY bulk load ──────────────────────────────────────────
+# write_expansion streams each batch with COPY into a session-local staging
+# table shaped like the target, then merges with ONE INSERT ... SELECT per
+# table reusing the ON CONFLICT clause of the row-at-a-time SQL above. A
+# 30k-row MTG expansion is three statements instead of 30k round trips.
+# Column order must match the tuples built by _collect_price_rows,
+# _collect_card_meta_row and fetch_expansion's map rows.
+PRICE_COLUMNS = (
+    "game", "scrydex_id", "tcgplayer_id", "expansion_id", "expansion_name",
+    "product_type", "product_name", "card_number", "printed_number", "rarity",
+    "variant", "condition", "price_type", "grade_company", "grade_value",
+    "market_price", "low_price", "mid_price", "high_price",
+    "trend_1d_pct", "trend_7d_pct", "trend_30d_pct",
+    "image_small", "image_medium", "image_large",
+    "product_name_en", "expansion_name_en", "language_code",
+    "currency", "subtypes",
+)
+PRICE_KEY = ("game, scrydex_id, variant, condition, price_type, "
+             "COALESCE(grade_company, ''), COALESCE(grade_value, '')")
+
+CARD_META_COLUMNS = (
+    "game", "scrydex_id",
+    "printed_number", "rarity_code", "artist", "flavor_text", "rules", "subtypes",
+    "hp", "supertype", "types", "national_pokedex_numbers", "evolves_from",
+    "attacks", "abilities", "weaknesses", "resistances",
+    "retreat_cost", "converted_retreat_cost", "legalities",
+    "card_type", "attribute", "colors", "life", "power", "printings", "tags",
+    "raw",
+)
+CARD_META_KEY = "game, scrydex_id"
+
+MAP_COLUMNS = ("scrydex_id", "tcgplayer_id", "product_type", "game")
+MAP_KEY = "scrydex_id, tcgplayer_id"
+
+
+def _copy_field(v) -> str:
+    """One value in COPY text format."""
+    if v is None:
+        return "\\N"
+    return (str(v).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _copy_merge(cur, table: str, columns: tuple, rows: list, *,
+                key: str, upsert_sql: str, stamp: str = "fetched_at",
+                target: str = None) -> None:
+    """COPY rows into a temp staging copy of `table` and merge them in one
+    statement. DISTINCT ON (key) ... _seq DESC keeps the last row per key,
+    matching what sequential upserts used to leave behind (ON CONFLICT can't
+    touch the same row twice in one statement).
+
+    `target` redirects the merge into a same-shaped table (the generation
+    shadow); it is aliased back to `table` so upsert_sql's qualified column
+    references still resolve."""
+    target = target or table
+    stage = f"_stage_{target}"
+    cols = ", ".join(columns)
+    # Temp tables are unlogged and per-session; ON COMMIT DELETE ROWS empties
+    # it for the next expansion on this pooled connection.
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {stage} ON COMMIT DELETE ROWS AS
+        SELECT {cols}, 0::bigint AS _seq FROM {target} WITH NO DATA
+    """)
+    buf = io.StringIO()
+    for seq, row in enumerate(rows):
+        buf.write("\t".join(_copy_field(v) for v in row))
+        buf.write(f"\t{seq}\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {stage} ({cols}, _seq) FROM STDIN", buf)
+    cur.execute(f"""
+        INSERT INTO {target} AS {table} ({cols}, {stamp})
+        SELECT DISTINCT ON ({key}) {cols}, NOW()
+        FROM {stage}
+        ORDER BY {key}, _seq DESC
+    """ + upsert_sql[upsert_sql.index("ON CONFLICT"):])
+
+
+# Rebuild scrydex_search_doc (022_scrydex_search_doc.sql) for one expansion
+# from the rows just upserted (format price_table first — the live cache, or
+# the shadow table during a generation build). One row per scrydex_id; PriceCache.search_cards
+# ranks against it instead of scanning every condition × variant row.
+# tcgplayer_id is not copied — search reads it from the cache (032).
+SEARCH_DOC_SQL = """
+    INSERT INTO scrydex_search_doc (
+        game, scrydex_id, product_type,
+        product_name, product_name_en, card_number, printed_number,
+        expansion_id, expansion_name, expansion_name_en,
+        variants, subtypes, updated_at
+    )
+    SELECT game, scrydex_id,
+           MIN(product_type),
+           MAX(product_name), MAX(product_name_en),
+           MAX(card_number), MAX(printed_number),
+           MAX(expansion_id), MAX(expansion_name), MAX(expansion_name_en),
+           STRING_AGG(DISTINCT variant, ' '),
+           MAX(subtypes::text),
+           NOW()
+    FROM {price_table}
+    WHERE game = %s AND expansion_id = %s
+    GROUP BY game, scrydex_id
+    ON CONFLICT (game, scrydex_id) DO UPDATE SET
+        product_type      = EXCLUDED.product_type,
+        product_name      = EXCLUDED.product_name,
+        product_name_en   = EXCLUDED.product_name_en,
+        card_number       = EXCLUDED.card_number,
+        printed_number    = EXCLUDED.printed_number,
+        expansion_id      = EXCLUDED.expansion_id,
+        expansion_name    = EXCLUDED.expansion_name,
+        expansion_name_en = EXCLUDED.expansion_name_en,
+        variants          = EXCLUDED.variants,
+        subtypes          = EXCLUDED.subtypes,
+        updated_at        = NOW()
+"""
+
+# Drop the expansion's documents for cards no longer in price_table.
+SEARCH_DOC_PURGE_SQL = """
+    DELETE FROM scrydex_search_doc d
+    WHERE d.game = %s AND d.expansion_id = %s
+      AND NOT EXISTS (SELECT 1 FROM {price_table} c
+                      WHERE c.game = d.game AND c.scrydex_id = d.scrydex_id)
+"""
+
+
+def refresh_search_docs(cur, game: str, expansion_id: str,
+                        price_table: str = "scrydex_price_cache") -> None:
+    """Bring one expansion's scrydex_search_doc rows in line with
+    price_table. Anything that inserts, deletes or renames cache rows outside
+    write_expansion should call this for the expansions it touched."""
+    cur.execute(SEARCH_DOC_SQL.format(price_table=price_table), (game, expansion_id))
+    cur.execute(SEARCH_DOC_PURGE_SQL.format(price_table=price_table), (game, expansion_id))
+
 
 def _extract_images(item: dict) -> tuple[str, str, str]:
     """Extract front-type image URLs from a Scrydex item or variant."""
@@ -364,14 +536,25 @@ def _collect_price_rows(item: dict, *, game: str, expansion_id: str, expansion_n
     return rows
 
 
-def sync_expansion(client, expansion_id: str, db) -> dict:
+def _await_slot(client, gate=None):
+    """Block until the shared token bucket and the client's own sliding
+    window both allow another Scrydex request."""
+    if gate is not None:
+        gate.acquire()
+    retry_after = client.get_rate_limit_info().get("retry_after")
+    if retry_after:
+        time.sleep(float(retry_after))
+    while client.should_throttle():
+        time.sleep(0.05)
+
+
+def fetch_expansion(client, expansion_id: str, gate=None) -> dict:
     """
-    Pull all cards + sealed for one expansion and batch-upsert into scrydex_price_cache.
-    Uses client.game to determine the API path and game column value.
-    Returns stats dict.
+    HTTP half of sync_expansion: page through cards + sealed for one expansion
+    and parse them into write batches. No DB access, so several of these can
+    run concurrently under one shared `gate` (see sync_expansions_pipelined).
+    Returns a dict for write_expansion.
     """
-    from psycopg2.extras import execute_batch
-
     game = client.game
     stats = {"cards": 0, "sealed": 0, "prices": 0, "credits": 0, "mapped": 0,
              "card_meta": 0, "expansion_meta": 0}
@@ -384,6 +567,7 @@ def sync_expansion(client, expansion_id: str, db) -> dict:
     # ── Cards ──────────────────────────────────────────────
     page = 1
     while True:
+        _await_slot(client, gate)
         resp = client._get(
             f"{client.base_url}/{game}/v1/expansions/{expansion_id}/cards",
             {"page": page, "page_size": 100, "include": "prices"}
@@ -431,6 +615,7 @@ def sync_expansion(client, expansion_id: str, db) -> dict:
     try:
         sealed_page = 1
         while True:
+            _await_slot(client, gate)
             resp = client._get(
                 f"{client.base_url}/{game}/v1/expansions/{expansion_id}/sealed",
                 {"page": sealed_page, "page_size": 100, "include": "prices"}
@@ -472,36 +657,277 @@ def sync_expansion(client, expansion_id: str, db) -> dict:
         # Some games don't have sealed endpoints — skip gracefully
         logger.debug(f"Sealed endpoint not available for {game}/{expansion_id}: {e}")
 
+    return {
+        "game": game,
+        "expansion_id": expansion_id,
+        "expansion_name": expansion_name,
+        "expansion_obj": expansion_obj_for_meta,
+        "price_batch": price_batch,
+        "map_batch": map_batch,
+        "card_meta_batch": card_meta_batch,
+        "stats": stats,
+    }
+
+
+def write_expansion(db, fetched: dict, price_table: str = "scrydex_price_cache") -> dict:
+    """DB half of sync_expansion: write one fetch_expansion result in a single
+    transaction. Prices go to `price_table` (scrydex_generation.NEXT_TABLE
+    while a generation is building). Returns the stats dict."""
+    game = fetched["game"]
+    expansion_id = fetched["expansion_id"]
+    expansion_name = fetched["expansion_name"]
+    price_batch = fetched["price_batch"]
+    map_batch = fetched["map_batch"]
+    card_meta_batch = fetched["card_meta_batch"]
+    stats = fetched["stats"]
+
+    content_hash = _content_hash(fetched)
+    release_date = _parse_release_date((fetched["expansion_obj"] or {}).get("release_date"))
+
     # ── Batch write ────────────────────────────────────────
     with db.get_conn() as conn:
         with conn.cursor() as cur:
+            cur.execute("""
+                SELECT content_hash, unchanged_streak FROM scrydex_sync_log
+                WHERE game = %s AND expansion_id = %s
+            """, (game, expansion_id))
+            prev = cur.fetchone()
+            unchanged = bool(prev and prev[0] == content_hash)
+            stats["unchanged"] = unchanged
+            stats["rows_changed"] = 0
+            if unchanged:
+                # Byte-identical payload to the last run — nothing to write.
+                map_batch = card_meta_batch = price_batch = []
             if map_batch:
-                execute_batch(cur, MAP_SQL, map_batch, page_size=500)
+                _copy_merge(cur, "scrydex_tcg_map", MAP_COLUMNS, map_batch,
+                            key=MAP_KEY, upsert_sql=MAP_SQL, stamp="updated_at")
             if card_meta_batch:
-                execute_batch(cur, CARD_META_SQL, card_meta_batch, page_size=200)
+                _copy_merge(cur, "scrydex_card_meta", CARD_META_COLUMNS, card_meta_batch,
+                            key=CARD_META_KEY, upsert_sql=CARD_META_SQL)
             # Expansion meta — one row per sync_expansion run
-            if expansion_obj_for_meta:
-                exp_row = _collect_expansion_meta_row(expansion_obj_for_meta, game=game)
+            if fetched["expansion_obj"] and not unchanged:
+                exp_row = _collect_expansion_meta_row(fetched["expansion_obj"], game=game)
                 if exp_row:
                     cur.execute(EXPANSION_META_SQL, exp_row)
                     stats["expansion_meta"] += 1
             if price_batch:
-                execute_batch(cur, UPSERT_SQL, price_batch, page_size=500)
+                _copy_merge(cur, "scrydex_price_cache", PRICE_COLUMNS, price_batch,
+                            key=PRICE_KEY, upsert_sql=UPSERT_SQL, target=price_table)
+                # The IS DISTINCT FROM guard leaves untouched rows alone, so
+                # rows stamped with this transaction's NOW() are exactly the
+                # ones that changed.
+                cur.execute(f"""
+                    SELECT COUNT(*) FROM {price_table}
+                    WHERE game = %s AND expansion_id = %s AND fetched_at = NOW()
+                """, (game, expansion_id))
+                stats["rows_changed"] = cur.fetchone()[0]
+                if stats["rows_changed"]:
+                    refresh_search_docs(cur, game, expansion_id, price_table)
+
+            changed_pct = (100.0 * stats["rows_changed"] / stats["prices"]
+                           if stats["prices"] else 0.0)
+            streak = (prev[1] or 0) + 1 if prev and changed_pct < VOLATILE_CHANGED_PCT else 0
+            interval_days = _resync_interval_days(release_date, streak, changed_pct)
+            stats["next_sync_days"] = interval_days
             # Sync log
             cur.execute("""
-                INSERT INTO scrydex_sync_log (game, expansion_id, expansion_name, card_count, last_synced, credits_used)
-                VALUES (%s, %s, %s, %s, NOW(), %s)
+                INSERT INTO scrydex_sync_log (game, expansion_id, expansion_name, card_count,
+                                              last_synced, credits_used, content_hash,
+                                              rows_changed, unchanged_streak, next_sync_at)
+                VALUES (%s, %s, %s, %s, NOW(), %s, %s, %s, %s,
+                        NOW() + make_interval(days => %s) - INTERVAL '2 hours')
                 ON CONFLICT (game, expansion_id) DO UPDATE SET
                     expansion_name = EXCLUDED.expansion_name,
                     card_count = EXCLUDED.card_count,
                     last_synced = NOW(),
-                    credits_used = EXCLUDED.credits_used
-            """, (game, expansion_id, expansion_name, stats["cards"], stats["credits"]))
+                    credits_used = EXCLUDED.credits_used,
+                    content_hash = EXCLUDED.content_hash,
+                    rows_changed = EXCLUDED.rows_changed,
+                    unchanged_streak = EXCLUDED.unchanged_streak,
+                    next_sync_at = EXCLUDED.next_sync_at
+            """, (game, expansion_id, expansion_name, stats["cards"], stats["credits"],
+                  content_hash, stats["rows_changed"], streak, interval_days))
         conn.commit()
 
     return stats
 
 
+# ── Delta sync policy ───────────────────────────────────────
+# Sets younger than DELTA_FRESH_SET_DAYS, and any set whose last sync changed
+# at least VOLATILE_CHANGED_PCT of its price rows, re-sync every night. Quiet
+# older sets back off one day per consecutive quiet run, capped at 3 days for
+# sets under two years old and DELTA_MAX_INTERVAL_DAYS beyond that.
+DELTA_FRESH_SET_DAYS = 180
+DELTA_MAX_INTERVAL_DAYS = 7
+VOLATILE_CHANGED_PCT = 5.0
+
+
+def _parse_release_date(value) -> date | None:
+    """Scrydex release_date ('2023/06/16' or ISO) → date, or None."""
+    if not value:
+        return None
+    text = str(value)[:10].replace("/", "-")
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def _resync_interval_days(release_date, unchanged_streak: int, changed_pct: float) -> int:
+    """Days until an expansion is due again under --delta."""
+    if release_date is None:
+        return 1
+    age_days = (date.today() - release_date).days
+    if age_days < DELTA_FRESH_SET_DAYS or changed_pct >= VOLATILE_CHANGED_PCT:
+        return 1
+    cap = 3 if age_days < 730 else DELTA_MAX_INTERVAL_DAYS
+    return max(1, min(cap, 1 + unchanged_streak))
+
+
+def _content_hash(fetched: dict) -> str:
+    """Stable digest of everything write_expansion would write. Row tuples
+    hold only str/int/float/None, so repr() is deterministic."""
+    h = hashlib.sha1()
+    for key in ("price_batch", "card_meta_batch", "map_batch"):
+        for row in sorted(fetched[key], key=repr):
+            h.update(repr(row).encode("utf-8"))
+        h.update(b"|")
+    h.update(repr(fetched["expansion_obj"]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def due_expansion_ids(db, game: str) -> list:
+    """Active expansions whose delta-sync interval has elapsed (never-synced
+    ones included)."""
+    rows = db.query("""
+        SELECT expansion_id FROM scrydex_sync_log
+        WHERE game = %s AND active = TRUE
+          AND (next_sync_at IS NULL OR next_sync_at <= NOW())
+        ORDER BY next_sync_at NULLS FIRST
+    """, (game,))
+    return [r["expansion_id"] for r in rows]
+
+
+def sync_expansion(client, expansion_id: str, db,
+                   price_table: str = "scrydex_price_cache") -> dict:
+    """
+    Pull all cards + sealed for one expansion and batch-upsert into scrydex_price_cache.
+    Uses client.game to determine the API path and game column value.
+    Returns stats dict.
+    """
+    return write_expansion(db, fetch_expansion(client, expansion_id), price_table)
+
+
+# Default fetch concurrency / request rate for sync_expansions_pipelined.
+# Scrydex's hard limit is 100 req/s per key, shared with every interactive
+# service, so the nightly run stays well under it.
+SYNC_WORKERS = int(os.getenv("SCRYDEX_SYNC_WORKERS", "4"))
+SYNC_RPS = float(os.getenv("SCRYDEX_SYNC_RPS", "20"))
+
+
+class _TokenBucket:
+    """Thread-safe token bucket shared by every fetch worker in a run."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = max(rate, 0.1)
+        self.capacity = burst or max(1, int(self.rate))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def sync_expansions_pipelined(client, expansion_ids: list, db, *,
+                              workers: int = None, rps: float = None,
+                              on_result=None,
+                              price_table: str = "scrydex_price_cache") -> tuple[dict, list]:
+    """
+    Sync many expansions with HTTP and DB work overlapped: `workers` fetcher
+    threads run fetch_expansion concurrently under one shared token bucket
+    (plus the client's own should_throttle window), and the calling thread
+    writes each finished expansion as it arrives. The hand-off queue is
+    bounded, so a slow DB back-pressures the fetchers instead of piling
+    parsed expansions up in memory.
+
+    on_result(expansion_id, stats, error) fires in the writer thread after
+    each expansion (error is None on success).
+
+    Returns (totals, failures) where failures is [(expansion_id, error_message)].
+    """
+    workers = max(1, workers or SYNC_WORKERS)
+    gate = _TokenBucket(rps or SYNC_RPS)
+    todo: queue.Queue = queue.Queue()
+    for eid in expansion_ids:
+        todo.put(eid)
+    done: queue.Queue = queue.Queue(maxsize=workers)
+
+    def _fetcher():
+        while True:
+            try:
+                eid = todo.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                done.put((eid, fetch_expansion(client, eid, gate=gate), None))
+            except Exception as e:
+                done.put((eid, None, e))
+
+    threads = [threading.Thread(target=_fetcher, daemon=True,
+                                name=f"scrydex-fetch-{i}")
+               for i in range(min(workers, len(expansion_ids)))]
+    for t in threads:
+        t.start()
+
+    totals = {"cards": 0, "sealed": 0, "prices": 0, "credits": 0, "mapped": 0}
+    failures = []
+    for _ in range(len(expansion_ids)):
+        eid, fetched, err = done.get()
+        stats = None
+        if err is None:
+            try:
+                stats = write_expansion(db, fetched, price_table)
+                for k in totals:
+                    totals[k] += stats.get(k, 0)
+            except Exception as e:
+                err = e
+        if err is not None:
+            failures.append((eid, str(err)))
+        if on_result:
+            on_result(eid, stats, err)
+
+    for t in threads:
+        t.join()
+    return totals, failures
+
+
+def bump_sync_generation(db, game: str, since) -> int:
+    """Stamp every expansion of `game` synced at/after `since` with a fresh
+    sync generation. Call once at the end of a full run; price_snapshot
+    readers rebuild when MAX(sync_generation) moves. Returns the generation."""
+    with db.get_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT nextval('scrydex_sync_generation_seq')")
+            generation = cur.fetchone()[0]
+            cur.execute("""
+                UPDATE scrydex_sync_log SET sync_generation = %s
+                WHERE game = %s AND last_synced >= %s
+            """, (generation, game, since))
+        conn.commit()
+    return generation
+
+
 def main():
     parser = argparse.ArgumentParser(description="Scrydex nightly price cache sync")
     parser.add_argument("--sets", help="Comma-separated expansion IDs")
@@ -511,9 +937,24 @@ def main():
     parser.add_argument("--language", default=None,
                         help="Language code filter for expansions (e.g., EN, JA). Omit for all languages.")
     parser.add_argument("--dry-run", action="store_true", help="Show plan only")
+    parser.add_argument("--delta", action="store_true",
+                        default=os.getenv("SCRYDEX_SYNC_DELTA", "").lower().strip() in ("true", "1", "yes"),
+                        help="Only sync expansions whose adaptive re-sync interval is due "
+                             "(default: SCRYDEX_SYNC_DELTA)")
+    parser.add_argument("--swap", action="store_true",
+                        default=os.getenv("SCRYDEX_GENERATION_SWAP", "").lower().strip() in ("true", "1", "yes"),
+                        help="Sync into a shadow generation and swap it in atomically "
+                             "(default: SCRYDEX_GENERATION_SWAP)")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS,
+                        help="Concurrent expansion fetchers (1 = sequential). "
+                             "Default: SCRYDEX_SYNC_WORKERS or 4")
+    parser.add_argument("--rps", type=float, default=SYNC_RPS,
+                        help="Shared Scrydex request rate cap for --workers > 1. "
+                             "Default: SCRYDEX_SYNC_RPS or 20")
     args = parser.parse_args()
 
     from scrydex_client import ScrydexClient
+    import scrydex_generation
     import db
 
     api_key = os.getenv("SCRYDEX_API_KEY")
@@ -533,6 +974,12 @@ def main():
         expansions = client.get_expansions(language_code=args.language)
         expansion_ids = [e["id"] for e in expansions]
         logger.info(f"Found {len(expansion_ids)} expansions" + (f" (language={args.language})" if args.language else " (all languages)"))
+    elif args.delta:
+        # Only expansions whose adaptive re-sync interval has come due
+        expansion_ids = due_expansion_ids(db, game)
+        if not expansion_ids:
+            logger.info(f"No {game} expansions due (--delta) — nothing to do")
+            return
     else:
         # Sync previously-pulled expansions (from scrydex_sync_log)
         rows = db.query("SELECT expansion_id FROM scrydex_sync_log WHERE game = %s AND active = TRUE", (game,))
@@ -553,19 +1000,84 @@ def main():
     totals = {"cards": 0, "sealed": 0, "prices": 0, "credits": 0, "mapped": 0}
     failures = []  # [(expansion_id, error_message)]
     t_start = time.time()
+    run_started = db.query_one("SELECT NOW() AS ts")["ts"]
 
-    for i, eid in enumerate(expansion_ids):
-        logger.info(f"[{i+1}/{len(expansion_ids)}] {game}/{eid}")
-        try:
-            stats = sync_expansion(client, eid, db)
-            for k in totals:
-                totals[k] += stats.get(k, 0)
-            logger.info(f"  {stats['cards']} cards, {stats['sealed']} sealed, "
-                        f"{stats['prices']} prices, {stats['credits']} credits")
-        except Exception as e:
-            logger.error(f"  FAILED: {e}")
-            failures.append((eid, str(e)))
-        time.sleep(0.05)
+    generation_id = None
+    price_table = scrydex_generation.LIVE_TABLE
+    if args.swap:
+        generation_id = scrydex_generation.begin_generation(db)
+        price_table = scrydex_generation.NEXT_TABLE
+    try:
+        _run_sync(args, client, db, game, expansion_ids, totals, failures, price_table)
+    except BaseException as e:
+        if generation_id is not None:
+            scrydex_generation.abort_generation(db, generation_id, f"sync crashed: {e}")
+        raise
+
+    if generation_id is not None:
+        problems = scrydex_generation.finish_generation(db, generation_id)
+        if problems:
+            logger.error(f"Generation {generation_id} NOT swapped: {'; '.join(problems)}")
+
+    generation = bump_sync_generation(db, game, run_started)
+    try:
+        import price_snapshot
+        price_snapshot.refresh(db)
+    except Exception as e:
+        logger.warning(f"Price snapshot refresh failed: {e}")
+
+    elapsed = int(time.time() - t_start)
+    print(f"\nDone [{game}] in {elapsed}s! (sync generation {generation})")
+    print(f"  Expansions:  {len(expansion_ids)}")
+    print(f"  Cards:       {totals['cards']}")
+    print(f"  Sealed:      {totals['sealed']}")
+    print(f"  Prices:      {totals['prices']}")
+    print(f"  Mappings:    {totals['mapped']}")
+    print(f"  Credits:     {totals['credits']}")
+
+    try:
+        usage = client.get_usage()
+        remaining = usage.get("data", {}).get("credits_remaining", "?")
+        print(f"  Credits left: {remaining}")
+    except Exception:
+        pass
+
+
+def _run_sync(args, client, db, game, expansion_ids, totals, failures, price_table):
+    """Fetch + write every expansion (pipelined or sequential), then retry
+    the failures once. Fills `totals` and `failures` in place."""
+    if args.workers > 1:
+        n_done = [0]
+
+        def _log_result(eid, stats, err):
+            n_done[0] += 1
+            prefix = f"[{n_done[0]}/{len(expansion_ids)}] {game}/{eid}"
+            if err is not None:
+                logger.error(f"{prefix} FAILED: {err}")
+            else:
+                logger.info(f"{prefix}: {stats['cards']} cards, {stats['sealed']} sealed, "
+                            f"{stats['prices']} prices, {stats['credits']} credits")
+
+        logger.info(f"Pipelined sync: {args.workers} fetchers, {args.rps:g} req/s")
+        pipe_totals, pipe_failures = sync_expansions_pipelined(
+            client, expansion_ids, db, workers=args.workers, rps=args.rps,
+            on_result=_log_result, price_table=price_table)
+        for k in totals:
+            totals[k] += pipe_totals.get(k, 0)
+        failures.extend(pipe_failures)
+    else:
+        for i, eid in enumerate(expansion_ids):
+            logger.info(f"[{i+1}/{len(expansion_ids)}] {game}/{eid}")
+            try:
+                stats = sync_expansion(client, eid, db, price_table)
+                for k in totals:
+                    totals[k] += stats.get(k, 0)
+                logger.info(f"  {stats['cards']} cards, {stats['sealed']} sealed, "
+                            f"{stats['prices']} prices, {stats['credits']} credits")
+            except Exception as e:
+                logger.error(f"  FAILED: {e}")
+                failures.append((eid, str(e)))
+            time.sleep(0.05)
 
     # ── Retry failures ─────────────────────────────────────
     if failures:
@@ -574,7 +1086,7 @@ def main():
         for eid, original_error in failures:
             logger.info(f"  Retry: {game}/{eid} (was: {original_error[:80]})")
             try:
-                stats = sync_expansion(client, eid, db)
+                stats = sync_expansion(client, eid, db, price_table)
                 for k in totals:
                     totals[k] += stats.get(k, 0)
                 logger.info(f"    OK: {stats['cards']} cards, {stats['sealed']} sealed")
@@ -592,22 +1104,6 @@ def main():
                 logger.warning(f"      2nd: {err2[:100]}")
             logger.warning(f"{'='*60}")
 
-    elapsed = int(time.time() - t_start)
-    print(f"\nDone [{game}] in {elapsed}s!")
-    print(f"  Expansions:  {len(expansion_ids)}")
-    print(f"  Cards:       {totals['cards']}")
-    print(f"  Sealed:      {totals['sealed']}")
-    print(f"  Prices:      {totals['prices']}")
-    print(f"  Mappings:    {totals['mapped']}")
-    print(f"  Credits:     {totals['credits']}")
-
-    try:
-        usage = client.get_usage()
-        remaining = usage.get("data", {}).get("credits_remaining", "?")
-        print(f"  Credits left: {remaining}")
-    except Exception:
-        pass
-
 
 if __name__ == "__main__":
     main()
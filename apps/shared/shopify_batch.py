@@ -0,0 +1,199 @@
+"""
+shared/shopify_batch.py — Coalesce variant price, tag and metafield writes
+into a handful of Shopify GraphQL requests.
+
+The price updaters and bulk edit used to send one productVariantsBulkUpdate
+(or tagsAdd) per variant, so pushing a few hundred price changes after a
+run meant a few hundred round trips. BatchWriter queues the writes and
+flush() sends them as:
+
+  - one productVariantsBulkUpdate per product, carrying every queued
+    variant of that product (price and/or compareAtPrice);
+  - one tagsAdd per product with the union of its queued tags;
+  - metafieldsSet calls of up to METAFIELDS_PER_CALL inputs;
+
+with up to ALIASES_PER_REQUEST of those mutations aliased into a single
+GraphQL document. Each queued item carries a caller `ref` (an audit row,
+a run-table id, ...) and flush() returns one result per item:
+
+    {"ref": ref, "ok": True/False, "error": None or message}
+
+userErrors are mapped back to the item they name (their `field` path
+carries the index into the variants / metafields list); an error without
+an index, or a failed request, fails every item in that mutation / request.
+
+    writer = BatchWriter(endpoint_gql(GRAPHQL_ENDPOINT, HEADERS))
+    writer.set_variant_price(product_gid, variant_gid, 12.99, ref=row)
+    for res in writer.flush():
+        ...
+
+Requests go through shopify_throttle.gql_post, so a big flush is paced
+against the cost bucket like every other caller.
+"""
+
+import logging
+
+from shopify_throttle import gql_post
+
+logger = logging.getLogger(__name__)
+
+ALIASES_PER_REQUEST = 20
+METAFIELDS_PER_CALL = 25      # Shopify's metafieldsSet limit
+
+
+def endpoint_gql(url: str, headers: dict, *, priority: str = None):
+    """A gql(query, variables) -> data callable for BatchWriter over a raw
+    endpoint + headers (for modules that don't hold a ShopifyClient)."""
+    def gql(query, variables=None):
+        body = gql_post(url, headers, {"query": query, "variables": variables or {}},
+                        timeout=60, priority=priority)
+        if body.get("errors"):
+            raise RuntimeError(f"GraphQL errors: {body['errors']}")
+        return body.get("data") or {}
+    return gql
+
+
+def _gid(kind: str, id_) -> str:
+    s = str(id_)
+    return s if s.startswith("gid://") else f"gid://shopify/{kind}/{s}"
+
+
+def _money(v):
+    return None if v is None else f"{float(v):.2f}"
+
+
+def _error_index(err: dict, list_field: str):
+    """Index into `list_field` named by a userError's field path, if any."""
+    field = err.get("field") or []
+    if len(field) >= 2 and field[0] == list_field:
+        try:
+            return int(field[1])
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class BatchWriter:
+    """Queue Shopify writes and send them grouped; see module docstring.
+
+    `gql` is any callable(query, variables) -> data dict that raises on
+    transport / top-level GraphQL errors — ShopifyClient._gql, a module's
+    own _gql helper, or endpoint_gql(...). Not thread-safe: queue from one
+    thread (or guard it), flush from one thread."""
+
+    def __init__(self, gql, *, aliases_per_request: int = ALIASES_PER_REQUEST):
+        self._gql = gql
+        self._per_request = max(1, aliases_per_request)
+        self._variants: dict[str, list] = {}   # product gid -> [(input, ref)]
+        self._tags: dict[str, list] = {}       # product gid -> [(tags, ref)]
+        self._metafields: list = []            # [(input, ref)]
+
+    def __len__(self):
+        return (sum(len(v) for v in self._variants.values())
+                + sum(len(v) for v in self._tags.values())
+                + len(self._metafields))
+
+    # ─── queueing ──────────────────────────────────────────────────────────
+
+    def set_variant_price(self, product_id, variant_id, price=None, *,
+                          compare_at_price=..., ref=None) -> None:
+        """Queue a price and/or compareAtPrice change. Pass
+        compare_at_price=None to clear it; leave it out to keep it."""
+        item = {"id": _gid("ProductVariant", variant_id)}
+        if price is not None:
+            item["price"] = _money(price)
+        if compare_at_price is not ...:
+            item["compareAtPrice"] = _money(compare_at_price) if compare_at_price else None
+        self._variants.setdefault(_gid("Product", product_id), []).append((item, ref))
+
+    def add_tags(self, product_id, tags, *, ref=None) -> None:
+        tags = [t.strip() for t in tags if t and t.strip()]
+        if tags:
+            self._tags.setdefault(_gid("Product", product_id), []).append((tags, ref))
+
+    def set_metafield(self, owner_id: str, namespace: str, key: str, value,
+                      type_: str = "single_line_text_field", *, ref=None) -> None:
+        self._metafields.append(({"ownerId": owner_id, "namespace": namespace,
+                                  "key": key, "value": str(value), "type": type_}, ref))
+
+    # ─── sending ───────────────────────────────────────────────────────────
+
+    def _calls(self):
+        """(field, args decl, selection, variables, items, list_field) per mutation."""
+        for product_gid, items in self._variants.items():
+            # A variant queued twice is sent once; later values win per field.
+            by_variant = {}
+            for inp, ref in items:
+                merged_inp, refs = by_variant.setdefault(inp["id"], ({}, []))
+                merged_inp.update(inp)
+                refs.append(ref)
+            merged = list(by_variant.values())
+            yield ("productVariantsBulkUpdate",
+                   {"productId": ("ID!", product_gid),
+                    "variants": ("[ProductVariantsBulkInput!]!", [m[0] for m in merged])},
+                   "productVariants { id } userErrors { field message }",
+                   [m[1] for m in merged], "variants")
+        for product_gid, items in self._tags.items():
+            union = sorted({t for tags, _ in items for t in tags}, key=str.lower)
+            yield ("tagsAdd",
+                   {"id": ("ID!", product_gid), "tags": ("[String!]!", union)},
+                   "userErrors { field message }",
+                   [[r for _, r in items]], None)
+        for i in range(0, len(self._metafields), METAFIELDS_PER_CALL):
+            chunk = self._metafields[i:i + METAFIELDS_PER_CALL]
+            yield ("metafieldsSet",
+                   {"metafields": ("[MetafieldsSetInput!]!", [inp for inp, _ in chunk])},
+                   "metafields { id } userErrors { field message }",
+                   [[ref] for _, ref in chunk], "metafields")
+
+    def _send(self, calls: list) -> list:
+        decls, fields, variables = [], [], {}
+        for n, (name, args, selection, _, _) in enumerate(calls):
+            arg_sql = []
+            for arg, (gql_type, value) in args.items():
+                var = f"{arg}{n}"
+                decls.append(f"${var}: {gql_type}")
+                arg_sql.append(f"{arg}: ${var}")
+                variables[var] = value
+            fields.append(f"m{n}: {name}({', '.join(arg_sql)}) {{ {selection} }}")
+        query = f"mutation Batch({', '.join(decls)}) {{\n  " + "\n  ".join(fields) + "\n}"
+
+        results = []
+        try:
+            data = self._gql(query, variables)
+        except Exception as e:
+            logger.warning(f"Shopify batch of {len(calls)} mutation(s) failed: {e}")
+            for _, _, _, groups, _ in calls:
+                results.extend({"ref": r, "ok": False, "error": str(e)}
+                               for g in groups for r in g)
+            return results
+
+        for n, (name, _, _, groups, list_field) in enumerate(calls):
+            errors = ((data or {}).get(f"m{n}") or {}).get("userErrors") or []
+            by_index, general = {}, []
+            for err in errors:
+                idx = _error_index(err, list_field) if list_field else None
+                if idx is not None and 0 <= idx < len(groups):
+                    by_index.setdefault(idx, []).append(err.get("message") or str(err))
+                else:
+                    general.append(err.get("message") or str(err))
+            for idx, refs in enumerate(groups):
+                msgs = general + by_index.get(idx, [])
+                for r in refs:
+                    results.append({"ref": r, "ok": not msgs,
+                                    "error": f"{name}: {'; '.join(msgs)}" if msgs else None})
+        return results
+
+    def flush(self) -> list[dict]:
+        """Send everything queued; returns one result per queued item and
+        leaves the writer empty."""
+        calls = list(self._calls())
+        self._variants, self._tags, self._metafields = {}, {}, []
+        results = []
+        for i in range(0, len(calls), self._per_request):
+            results.extend(self._send(calls[i:i + self._per_request]))
+        failed = sum(1 for r in results if not r["ok"])
+        if calls:
+            logger.info(f"Shopify batch: {len(results)} write(s) in {len(calls)} mutation(s), "
+                        f"{-(-len(calls) // self._per_request)} request(s), {failed} failed")
+        return results
@@ -0,0 +1,115 @@
+"""
+shared/shopify_bulk.py — Run a Shopify bulk operation and stream its result.
+
+Bulk operations (bulkOperationRunQuery) execute a query server-side over the
+whole shop — no page size, no cost budget — and publish the result as a JSONL
+file. Nested connection rows come out flat, each tagged with the gid of the
+object it belongs to in `__parentId` and listed after that parent:
+
+    url = run_bulk_query(gql, "{ orders(query: \"created_at:>=2025-01-01\") { edges { node { id } } } }")
+    for obj in iter_bulk_jsonl(url):
+        ...
+
+`gql` is the same callable(query, variables) -> data convention BatchWriter
+uses (ShopifyClient._gql, shopify_batch.endpoint_gql, ...). Only one bulk
+query runs per app + shop at a time; starting a second raises
+BulkOperationError, so callers that can page instead should fall back.
+"""
+
+import json
+import logging
+import time
+
+import http_pool
+
+logger = logging.getLogger(__name__)
+
+_RUN_MUTATION = """
+mutation($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+_CANCEL_MUTATION = """
+mutation($id: ID!) {
+  bulkOperationCancel(id: $id) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+_POLL_QUERY = """
+query($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation { id status errorCode objectCount url }
+  }
+}
+"""
+
+
+class BulkOperationError(RuntimeError):
+    """The bulk operation could not start or did not complete."""
+
+
+def run_bulk_query(gql, bulk_query: str, *, poll_interval: float = 3.0,
+                   timeout: float = 1800) -> str | None:
+    """
+    Start `bulk_query` as a bulk operation and block until Shopify finishes.
+    Returns the JSONL result URL, or None when the query matched nothing.
+    Raises BulkOperationError if the operation can't start (e.g. another
+    bulk query is already running on the shop), ends in any state other than
+    COMPLETED, or is still running after `timeout` seconds — in which case
+    it is cancelled first, so the shop's one bulk slot is free for a retry.
+    """
+    data = gql(_RUN_MUTATION, {"query": bulk_query})
+    result = data.get("bulkOperationRunQuery") or {}
+    if result.get("userErrors"):
+        raise BulkOperationError(f"bulkOperationRunQuery: {result['userErrors']}")
+    op_id = (result.get("bulkOperation") or {}).get("id")
+    if not op_id:
+        raise BulkOperationError("bulkOperationRunQuery returned no operation")
+    logger.info(f"Shopify bulk operation started: {op_id}")
+
+    deadline = time.monotonic() + timeout
+    while True:
+        op = gql(_POLL_QUERY, {"id": op_id}).get("node") or {}
+        status = op.get("status")
+        if status == "COMPLETED":
+            logger.info(f"Shopify bulk operation complete: {op.get('objectCount')} objects")
+            return op.get("url")
+        if status in ("FAILED", "CANCELED", "CANCELING", "EXPIRED"):
+            raise BulkOperationError(f"Bulk operation {op_id} ended {status} "
+                                     f"(errorCode={op.get('errorCode')})")
+        if time.monotonic() > deadline:
+            _cancel(gql, op_id)
+            raise BulkOperationError(f"Bulk operation {op_id} still {status} after {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+
+def _cancel(gql, op_id: str) -> None:
+    """Best-effort bulkOperationCancel; a failure is logged, not raised, so
+    the caller still sees the timeout."""
+    try:
+        result = gql(_CANCEL_MUTATION, {"id": op_id}).get("bulkOperationCancel") or {}
+        if result.get("userErrors"):
+            logger.warning(f"bulkOperationCancel {op_id}: {result['userErrors']}")
+        else:
+            logger.warning(f"Shopify bulk operation {op_id} timed out — cancelled")
+    except Exception as e:
+        logger.warning(f"bulkOperationCancel {op_id} failed: {e}")
+
+
+def iter_bulk_jsonl(url: str | None):
+    """Stream a bulk-operation result file, yielding one parsed object per
+    line. The file is never held in memory."""
+    if not url:
+        return
+    with http_pool.get(url, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        for line in resp.iter_lines():
+            if line:
+                yield json.loads(line)
@@ -12,10 +12,13 @@ Env vars (read by callers, not here):
 """
 
 import os
-import time
 import json
 import logging
-import requests
+import http_pool
+
+from shopify_batch import BatchWriter
+from shopify_bulk import BulkOperationError, iter_bulk_jsonl, run_bulk_query
+from shopify_throttle import gql_post
 
 logger = logging.getLogger(__name__)
 
@@ -147,12 +150,17 @@ def shopify_client_from_env() -> "ShopifyClient":
 
 
 def _extract_committed(variant: dict) -> int:
-    """Pull committed quantity from inventoryItem.inventoryLevels quantities."""
+    """Pull committed quantity from inventoryItem.inventoryLevels quantities
+    (or the single inventoryLevel that bulk exports select instead)."""
     try:
-        levels = (variant.get("inventoryItem") or {}).get("inventoryLevels", {}).get("edges", [])
-        if not levels:
-            return 0
-        for q in levels[0]["node"].get("quantities", []):
+        item = variant.get("inventoryItem") or {}
+        level = item.get("inventoryLevel")
+        if level is None:
+            levels = item.get("inventoryLevels", {}).get("edges", [])
+            if not levels:
+                return 0
+            level = levels[0]["node"]
+        for q in level.get("quantities", []):
             if q.get("name") == "committed":
                 return int(q.get("quantity", 0))
     except Exception:
@@ -160,6 +168,81 @@ def _extract_committed(variant: dict) -> int:
     return 0
 
 
+def _product_rows(node: dict, metafields: list[dict], variants: list[dict]) -> list[dict]:
+    """
+    Flatten one product into cache rows, one per variant. Shared by the paged
+    (iter_products_pages) and bulk-export (iter_bulk_product_pages) readers.
+
+    node:       product fields (id, title, handle, status, tags, featuredImage, era_mf)
+    metafields: tcg-namespace metafield nodes ({key, value})
+    variants:   variant nodes
+    """
+    # Extract TCGPlayer ID from metafields
+    tcg_id = None
+    for mf in metafields:
+        if mf.get("key") == "tcgplayer_id":
+            val = mf.get("value")
+            if isinstance(val, str) and val.startswith("["):
+                val = val.strip("[]").replace('"', "").replace("'", "")
+            try:
+                tcg_id = int(val) if val else None
+            except (ValueError, TypeError):
+                tcg_id = None
+            break
+
+    # Era is the authoritative custom.era metafield — read it, never infer.
+    era = (node.get("era_mf") or {}).get("value") or None
+
+    tags = node.get("tags", [])
+    tags_csv = ", ".join(tags) if isinstance(tags, list) else (tags or "")
+    image_url = ((node.get("featuredImage") or {}).get("url")) or None
+    is_damaged = (
+        "damaged" in [t.lower() for t in (tags if isinstance(tags, list) else [])]
+        or "[DAMAGED]" in node.get("title", "").upper()
+    )
+
+    def _variant_row(variant):
+        # Shopify variant.title is the joined option values
+        # ("Crimson", "Crimson / Small"). It's "Default Title" for
+        # single-variant products — treat that as no label so the
+        # store picker only shows real differentiators.
+        v_title = (variant.get("title") or "").strip()
+        variant_label = "" if v_title.lower() == "default title" else v_title
+        inv_item_id = None
+        unit_cost = None
+        if variant.get("inventoryItem"):
+            inv_item_id = variant["inventoryItem"]["id"].split("/")[-1]
+            cost_data = variant["inventoryItem"].get("unitCost")
+            if cost_data and cost_data.get("amount"):
+                try:
+                    unit_cost = float(cost_data["amount"])
+                except (ValueError, TypeError):
+                    pass
+        return {
+            "product_gid":        node["id"],
+            "shopify_product_id": int(node["id"].split("/")[-1]),
+            "title":              node["title"],
+            "handle":             node["handle"],
+            "status":             node.get("status", "ACTIVE"),
+            "variant_id":         int(variant["id"].split("/")[-1]),
+            "variant_label":      variant_label,
+            "shopify_price":      float(variant["price"]),
+            "shopify_qty":        variant["inventoryQuantity"],
+            "sku":                variant.get("sku"),
+            "barcode":            variant.get("barcode"),
+            "inventory_item_id":  inv_item_id,
+            "committed":          _extract_committed(variant),
+            "tcgplayer_id":       tcg_id,
+            "is_damaged":         is_damaged,
+            "tags_csv":           tags_csv,
+            "unit_cost":          unit_cost,
+            "image_url":          image_url,
+            "era":                era,
+        }
+
+    return [_variant_row(v) for v in variants]
+
+
 class ShopifyError(Exception):
     """Raised when Shopify API returns errors."""
     pass
@@ -186,10 +269,9 @@ class ShopifyClient:
         payload = {"query": query}
         if variables:
             payload["variables"] = variables
-        resp = requests.post(self.endpoint, headers=self.headers, json=payload, timeout=30)
-        logger.info(f"Shopify GraphQL: status={resp.status_code}")
-        resp.raise_for_status()
-        body = resp.json()
+        # Paced against the shop's query-cost bucket (shopify_throttle);
+        # THROTTLED responses are retried there once points restore.
+        body = gql_post(self.endpoint, self.headers, payload, timeout=30)
         if "errors" in body:
             logger.error(f"Shopify GraphQL errors: {body['errors']}")
             raise ShopifyError(f"GraphQL errors: {body['errors']}")
@@ -205,7 +287,7 @@ class ShopifyClient:
 
     def _rest(self, method: str, path: str, **kwargs) -> dict:
         url = f"https://{self.store}/admin/api/{self.api_version}{path}"
-        resp = requests.request(method, url, headers=self._rest_headers(), timeout=30, **kwargs)
+        resp = http_pool.request(method, url, headers=self._rest_headers(), timeout=30, **kwargs)
         resp.raise_for_status()
         return resp.json()
 
@@ -221,7 +303,7 @@ class ShopifyClient:
         signals = {}
 
         try:
-            r = requests.get(f"{base}/orders.json",
+            r = http_pool.get(f"{base}/orders.json",
                              params={"limit": 1, "status": "any", "fields": "order_number"},
                              headers=headers, timeout=10)
             r.raise_for_status()
@@ -232,7 +314,7 @@ class ShopifyClient:
             logger.warning(f"Order number fetch failed: {e}")
 
         try:
-            r = requests.get(f"{base}/products.json",
+            r = http_pool.get(f"{base}/products.json",
                              params={"limit": 1, "order": "updated_at desc", "fields": "updated_at"},
                              headers=headers, timeout=10)
             r.raise_for_status()
@@ -291,88 +373,21 @@ class ShopifyClient:
             page_products = []
             for edge in edges:
                 node = edge["node"]
-
-                # Extract TCGPlayer ID from metafields
-                tcg_id = None
-                for mf in (node.get("metafields") or {}).get("edges", []):
-                    if mf["node"]["key"] == "tcgplayer_id":
-                        val = mf["node"]["value"]
-                        if isinstance(val, str) and val.startswith("["):
-                            val = val.strip("[]").replace('"', "").replace("'", "")
-                        try:
-                            tcg_id = int(val) if val else None
-                        except (ValueError, TypeError):
-                            tcg_id = None
-                        break
-
-                # Era is the authoritative custom.era metafield — read it, never infer.
-                era = (node.get("era_mf") or {}).get("value") or None
-
-                tags = node.get("tags", [])
-                tags_csv = ", ".join(tags) if isinstance(tags, list) else (tags or "")
-                image_url = ((node.get("featuredImage") or {}).get("url")) or None
-                is_damaged = (
-                    "damaged" in [t.lower() for t in (tags if isinstance(tags, list) else [])]
-                    or "[DAMAGED]" in node.get("title", "").upper()
-                )
-
-                def _variant_row(variant):
-                    # Shopify variant.title is the joined option values
-                    # ("Crimson", "Crimson / Small"). It's "Default Title" for
-                    # single-variant products — treat that as no label so the
-                    # store picker only shows real differentiators.
-                    v_title = (variant.get("title") or "").strip()
-                    variant_label = "" if v_title.lower() == "default title" else v_title
-                    inv_item_id = None
-                    unit_cost = None
-                    if variant.get("inventoryItem"):
-                        inv_item_id = variant["inventoryItem"]["id"].split("/")[-1]
-                        cost_data = variant["inventoryItem"].get("unitCost")
-                        if cost_data and cost_data.get("amount"):
-                            try:
-                                unit_cost = float(cost_data["amount"])
-                            except (ValueError, TypeError):
-                                pass
-                    return {
-                        "product_gid":        node["id"],
-                        "shopify_product_id": int(node["id"].split("/")[-1]),
-                        "title":              node["title"],
-                        "handle":             node["handle"],
-                        "status":             node.get("status", "ACTIVE"),
-                        "variant_id":         int(variant["id"].split("/")[-1]),
-                        "variant_label":      variant_label,
-                        "shopify_price":      float(variant["price"]),
-                        "shopify_qty":        variant["inventoryQuantity"],
-                        "sku":                variant.get("sku"),
-                        "barcode":            variant.get("barcode"),
-                        "inventory_item_id":  inv_item_id,
-                        "committed":          _extract_committed(variant),
-                        "tcgplayer_id":       tcg_id,
-                        "is_damaged":         is_damaged,
-                        "tags_csv":           tags_csv,
-                        "unit_cost":          unit_cost,
-                        "image_url":          image_url,
-                        "era":                era,
-                    }
-
-                for var_edge in node["variants"]["edges"]:
-                    page_products.append(_variant_row(var_edge["node"]))
-
+                mf_nodes = [e["node"] for e in (node.get("metafields") or {}).get("edges", [])]
+                variants = [e["node"] for e in node["variants"]["edges"]]
                 # Products with more variants than the inline page (e.g. dice
                 # with 30+ colors) would otherwise be truncated to the first 10,
                 # so those variants never reach inventory_product_cache and are
                 # unselectable in the store-link picker. Page through the rest.
                 v_pageinfo = node["variants"].get("pageInfo") or {}
                 if v_pageinfo.get("hasNextPage"):
-                    for variant in self._iter_remaining_variants(
-                            node["id"], v_pageinfo.get("endCursor")):
-                        page_products.append(_variant_row(variant))
+                    variants.extend(self._iter_remaining_variants(
+                        node["id"], v_pageinfo.get("endCursor")))
+                page_products.extend(_product_rows(node, mf_nodes, variants))
 
             has_next = data["products"]["pageInfo"]["hasNextPage"]
             cursor = data["products"]["pageInfo"].get("endCursor") if has_next else None
             yield page_products, has_next
-            if has_next:
-                time.sleep(0.3)
 
     def _iter_remaining_variants(self, product_gid: str, after_cursor: str):
         """Page through a single product's variants beyond the inline first
@@ -403,8 +418,48 @@ class ShopifyClient:
                 yield edge["node"]
             pinfo = vconn.get("pageInfo") or {}
             after_cursor = pinfo.get("endCursor") if pinfo.get("hasNextPage") else None
-            if after_cursor:
-                time.sleep(0.3)
+
+    def fetch_product_rows(self, product_id) -> list[dict] | None:
+        """
+        One product's cache rows (same shape as iter_products_pages), or None
+        if the product no longer exists or is archived. A single-product query
+        — what webhook-driven cache patches use instead of a catalog re-pull.
+        """
+        gid = product_id if str(product_id).startswith("gid://") \
+            else f"gid://shopify/Product/{product_id}"
+        query = """
+        query($id: ID!) {
+          product(id: $id) {
+            id title handle status tags
+            featuredImage { url }
+            variants(first: 100) {
+              pageInfo { hasNextPage endCursor }
+              edges { node { id title price sku barcode inventoryQuantity
+                inventoryItem { id
+                  unitCost { amount }
+                  inventoryLevels(first: 1) {
+                    edges { node { quantities(names: ["committed"]) { name quantity } } }
+                  }
+                }
+              } }
+            }
+            metafields(namespace: "tcg", first: 5) {
+              edges { node { key value } }
+            }
+            era_mf: metafield(namespace: "custom", key: "era") { value }
+          }
+        }
+        """
+        node = self._gql(query, {"id": gid}).get("product")
+        # iter_products_pages only lists active + draft products
+        if not node or node.get("status") not in ("ACTIVE", "DRAFT"):
+            return None
+        variants = [e["node"] for e in node["variants"]["edges"]]
+        v_pageinfo = node["variants"].get("pageInfo") or {}
+        if v_pageinfo.get("hasNextPage"):
+            variants.extend(self._iter_remaining_variants(gid, v_pageinfo.get("endCursor")))
+        mf_nodes = [e["node"] for e in (node.get("metafields") or {}).get("edges", [])]
+        return _product_rows(node, mf_nodes, variants)
 
     def get_all_products(self, batch_size: int = 100) -> list[dict]:
         """Convenience wrapper — returns flat list of all product dicts."""
@@ -414,6 +469,118 @@ class ShopifyClient:
         logger.info(f"Fetched {len(products)} variants from Shopify")
         return products
 
+    # ─── Bulk operations export ─────────────────────────────────────────────
+
+    def run_products_bulk_export(self, query_filter: str | None = "status:active OR status:draft",
+                                 poll_interval: float = 3.0, timeout: float = 1800) -> str | None:
+        """
+        Export every product (same product / variant / inventoryItem /
+        metafield shape as iter_products_pages) with bulkOperationRunQuery and
+        block until Shopify finishes. Returns the JSONL result URL, or None
+        when the export matched nothing.
+
+        Bulk operations run server-side outside the GraphQL cost budget: one
+        pass regardless of variant counts, no per-product follow-ups, and no
+        throttle pressure on the interactive tools sharing the token.
+
+        Bulk queries can't nest connections more than two deep, so committed
+        qty comes from inventoryLevel(locationId:) at the primary location
+        rather than inventoryLevels(first: 1).
+
+        Raises ShopifyError if the operation can't start (e.g. another bulk
+        query is already running on the shop) or ends in any state other
+        than COMPLETED.
+        """
+        location_id = self.get_location_id()
+        products_args = f"(query: {json.dumps(query_filter)})" if query_filter else ""
+        bulk_query = """
+        {
+          products%s {
+            edges {
+              node {
+                id title handle status tags
+                featuredImage { url }
+                era_mf: metafield(namespace: "custom", key: "era") { value }
+                metafields(namespace: "tcg") {
+                  edges { node { id key value } }
+                }
+                variants {
+                  edges { node { id title price sku barcode inventoryQuantity
+                    inventoryItem { id
+                      unitCost { amount }
+                      inventoryLevel(locationId: %s) {
+                        quantities(names: ["committed"]) { name quantity }
+                      }
+                    }
+                  } }
+                }
+              }
+            }
+          }
+        }
+        """ % (products_args, json.dumps(location_id))
+        try:
+            return run_bulk_query(self._gql, bulk_query,
+                                  poll_interval=poll_interval, timeout=timeout)
+        except BulkOperationError as e:
+            raise ShopifyError(str(e)) from e
+
+    @staticmethod
+    def iter_bulk_jsonl(url: str):
+        """Stream a bulk-operation result file, yielding one parsed object per
+        line. The file is never held in memory."""
+        return iter_bulk_jsonl(url)
+
+    def iter_bulk_product_pages(self, url: str | None, batch_size: int = 100):
+        """
+        Re-assemble a run_products_bulk_export JSONL stream into the same
+        (page_products, has_more) pages iter_products_pages yields, so callers
+        can swap one reader for the other.
+
+        The file is flat: a product line, then its metafield and variant lines
+        tagged with __parentId. Only the product being assembled and the
+        current page are held in memory.
+        """
+        if not url:
+            return
+
+        page: list[dict] = []
+        product = None
+        metafields: list[dict] = []
+        variants: list[dict] = []
+        pending = None  # a full page held back until we know if more follow
+
+        def _flush_product():
+            if product is not None:
+                page.extend(_product_rows(product, metafields, variants))
+
+        n_products = 0
+        for obj in self.iter_bulk_jsonl(url):
+            parent = obj.get("__parentId")
+            if parent is None:
+                _flush_product()
+                product, metafields, variants = obj, [], []
+                n_products += 1
+                if n_products > 1 and (n_products - 1) % batch_size == 0:
+                    if pending is not None:
+                        yield pending, True
+                    pending, page = page, []
+            elif product is not None and parent == product["id"]:
+                if "/ProductVariant/" in obj.get("id", ""):
+                    variants.append(obj)
+                else:
+                    metafields.append(obj)
+        _flush_product()
+
+        if pending is not None:
+            if page:
+                yield pending, True
+                yield page, False
+            else:
+                yield pending, False
+        elif page:
+            yield page, False
+
 
     # ─── Location ───────────────────────────────────────────────────────────────
 
@@ -581,6 +748,13 @@ class ShopifyClient:
             raise ShopifyError(f"Tags add failed: {errors}")
         return data
 
+    def batch_writer(self):
+        """A shopify_batch.BatchWriter over this client: queue many price /
+        tag / metafield writes and flush() them grouped by product in a few
+        aliased requests, with a result per queued item. Prefer it over
+        update_variant_price_gql in loops."""
+        return BatchWriter(self._gql)
+
     def update_variant_price_gql(self, product_gid: str, variant_gid: str, new_price: float) -> dict:
         """Update a variant price via GraphQL bulk mutation (used by ingestion)."""
         mutation = """
@@ -873,7 +1047,7 @@ class ShopifyClient:
 
         # Step 2: POST bytes (S3-style multipart)
         files = {"file": (filename, file_bytes, mime_type)}
-        r = requests.post(upload_url, data=params, files=files, timeout=60)
+        r = http_pool.post(upload_url, data=params, files=files, timeout=60)
         if not r.ok:
             raise ShopifyError(f"staged upload failed: {r.status_code} {r.text[:200]}")
 
@@ -0,0 +1,104 @@
+"""
+shared/shopify_fanout.py — Run independent Shopify-bound calls concurrently
+within the shop's GraphQL cost budget.
+
+Sweeps like the VIP refresh (one Klaviyo push per customer, each reading
+the customer from Shopify) and the customer order sync spent almost all of
+their time waiting on sockets, one call after another. The helpers here
+overlap that waiting on a small thread pool:
+
+    for gid, result, err in fan_out(_push_vip_to_klaviyo, ids):
+        ...
+
+    for page in prefetch_pages(fetch_page):      # fetch_page(cursor) -> (items, next_cursor)
+        ...
+
+Concurrency is bounded twice: by the worker count (SHOPIFY_FANOUT_WORKERS,
+default 8) and — for every GraphQL request the workers make — by
+shopify_throttle's cost bucket, which blocks a request until the shop has
+the points for it. So raising the worker count can't push the shop into
+THROTTLED; it only helps while there is budget to spend. The caller's
+shopify_throttle.priority() carries over into the workers.
+
+Threads rather than asyncio: every Shopify helper in the repo (shopify_gql,
+ShopifyClient, the Klaviyo client, db) is synchronous and thread-safe, so a
+pool reuses them unchanged instead of needing an async twin of each.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from shopify_throttle import current_priority, priority
+
+FANOUT_WORKERS = int(os.getenv("SHOPIFY_FANOUT_WORKERS", "8"))
+
+
+def fan_out(fn, items, *, workers: int = None):
+    """
+    Call fn(item) for every item on up to `workers` threads. Yields
+    (item, result, error) in completion order — error is the exception
+    fn raised (result None) or None. `items` may be a lazy iterable; at
+    most 2 × workers calls are queued at a time.
+    """
+    workers = max(1, workers or FANOUT_WORKERS)
+    prio = current_priority()
+
+    def run(item):
+        with priority(prio):
+            return fn(item)
+
+    it = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def fill():
+            while len(pending) < workers * 2:
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                pending[pool.submit(run, item)] = item
+
+        fill()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                item = pending.pop(fut)
+                err = fut.exception()
+                yield item, (None if err else fut.result()), err
+            fill()
+
+
+def prefetch_pages(fetch_page, cursor=None):
+    """
+    Walk a cursor-paginated query, fetching page N+1 while the caller
+    handles page N. fetch_page(cursor) -> (items, next_cursor); the walk
+    stops when next_cursor is falsy. Yields each page's items.
+    """
+    prio = current_priority()
+    result = {}
+
+    def fetch(c):
+        with priority(prio):
+            try:
+                result["page"] = fetch_page(c)
+            except BaseException as e:    # re-raised on the caller's thread
+                result["error"] = e
+
+    fetch(cursor)
+    while True:
+        if "error" in result:
+            raise result.pop("error")
+        items, next_cursor = result.pop("page")
+        t = None
+        if next_cursor:
+            t = threading.Thread(target=fetch, args=(next_cursor,), daemon=True)
+            t.start()
+        try:
+            yield items
+        finally:
+            if t is not None:
+                t.join()
+        if t is None:
+            return
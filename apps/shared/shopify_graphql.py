@@ -8,6 +8,8 @@ import os
 import time
 import requests
 
+from shopify_throttle import gql_post
+
 _SHOPIFY_TOKEN = os.environ.get("SHOPIFY_TOKEN")
 _SHOPIFY_STORE = os.environ.get("SHOPIFY_STORE")
 _GRAPHQL_ENDPOINT = f"https://{_SHOPIFY_STORE}/admin/api/2025-10/graphql.json" if _SHOPIFY_STORE else ""
@@ -24,17 +26,12 @@ def shopify_gql(query: str, variables=None):
     }
     payload = {"query": query, "variables": variables or {}}
 
+    # Throttling is paced by shopify_throttle against the cost bucket; this
+    # loop only retries transport failures and 5xx.
     for attempt in range(6):
         try:
-            resp = requests.post(
-                _GRAPHQL_ENDPOINT, headers=headers, json=payload, timeout=_PER_CALL_TIMEOUT
-            )
-            resp.raise_for_status()
-            data = resp.json()
+            data = gql_post(_GRAPHQL_ENDPOINT, headers, payload, timeout=_PER_CALL_TIMEOUT)
             if data.get("errors"):
-                messages = " ".join(e.get("message", "") for e in data["errors"])
-                if "Throttled" in messages or "throttle" in messages.lower():
-                    raise requests.HTTPError("Throttled")
                 raise RuntimeError(f"GraphQL errors: {data['errors']}")
             return data
         except (requests.Timeout, requests.ConnectionError, requests.HTTPError):
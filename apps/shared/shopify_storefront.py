@@ -7,6 +7,7 @@ Used by kiosk/ for creating carts + checkout URLs via the headless "Kiosk" chann
 import os
 import time
 import requests
+import http_pool
 
 _STOREFRONT_TOKEN = os.environ.get("SHOPIFY_STOREFRONT_TOKEN")
 _SHOPIFY_STORE = os.environ.get("SHOPIFY_STORE")
@@ -26,7 +27,7 @@ def storefront_gql(query: str, variables=None):
 
     for attempt in range(4):
         try:
-            resp = requests.post(
+            resp = http_pool.post(
                 _STOREFRONT_ENDPOINT, headers=headers, json=payload, timeout=_PER_CALL_TIMEOUT
             )
             resp.raise_for_status()
@@ -0,0 +1,222 @@
+"""
+shared/shopify_throttle.py — Cost-aware scheduling for Shopify Admin GraphQL.
+
+Shopify meters GraphQL with a leaky bucket of query-cost points per
+app + shop: every response carries
+
+    extensions.cost = {requestedQueryCost, actualQueryCost,
+                       throttleStatus: {maximumAvailable, currentlyAvailable, restoreRate}}
+
+and a request whose requested cost exceeds what's currently available comes
+back THROTTLED. Instead of fixed sleeps or backoff on the "Throttled"
+string, every GraphQL caller in the repo posts through gql_post(), which
+keeps a process-wide model of that bucket per shop:
+
+  - before sending, the caller waits until the modeled bucket holds the
+    query's estimated cost (learned per query text from requestedQueryCost)
+    plus a priority reserve, and reserves it while in flight;
+  - every response resets the model from the authoritative throttleStatus,
+    which also accounts for other processes spending the same bucket
+    (price updater + VIP sweep + kiosk all share one app token);
+  - a THROTTLED response (or HTTP 429) is retried once the model says the
+    points have restored, never on a fixed timer.
+
+Priorities: "interactive" requests (kiosk, checkout, operator clicks) may
+drain the bucket; "default" keeps RESERVE["default"] of capacity free for
+them; "background" (catalog refreshes, sweeps, nightly runners) keeps
+RESERVE["background"] free. Lower priorities also yield while any higher
+priority request is waiting. The process default comes from
+SHOPIFY_GQL_PRIORITY; wrap background work in `with priority("background"):`.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import http_pool
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "default", "background")
+# Fraction of the bucket each priority leaves untouched for the ones above it
+RESERVE = {"interactive": 0.0, "default": 0.1, "background": 0.3}
+
+_DEFAULT_CAPACITY = 1000.0     # Standard plan until the first response says otherwise
+_DEFAULT_RESTORE = 50.0        # points / second
+_DEFAULT_COST_ESTIMATE = 50.0  # unseen query
+_MAX_THROTTLE_RETRIES = 6
+_MAX_TRACKED_QUERIES = 512
+
+_local = threading.local()
+
+
+def _process_priority() -> str:
+    p = os.getenv("SHOPIFY_GQL_PRIORITY", "default").lower().strip()
+    return p if p in PRIORITIES else "default"
+
+
+@contextlib.contextmanager
+def priority(name: str):
+    """Run the enclosed GraphQL calls (this thread only) at `name` priority."""
+    if name not in PRIORITIES:
+        raise ValueError(f"unknown priority {name!r}")
+    prev = getattr(_local, "priority", None)
+    _local.priority = name
+    try:
+        yield
+    finally:
+        _local.priority = prev
+
+
+def current_priority() -> str:
+    return getattr(_local, "priority", None) or _process_priority()
+
+
+class CostBucket:
+    """Thread-safe model of one shop's GraphQL cost bucket."""
+
+    def __init__(self):
+        self.capacity = _DEFAULT_CAPACITY
+        self.restore_rate = _DEFAULT_RESTORE
+        self.available = _DEFAULT_CAPACITY
+        self._stamp = time.monotonic()
+        self._inflight = 0.0
+        self._estimates: dict[str, float] = {}
+        self._waiting = {p: 0 for p in PRIORITIES}
+        self._cond = threading.Condition()
+
+    def _restore(self):
+        now = time.monotonic()
+        self.available = min(self.capacity,
+                             self.available + (now - self._stamp) * self.restore_rate)
+        self._stamp = now
+
+    def estimate(self, key: str) -> float:
+        with self._cond:
+            return min(self._estimates.get(key, _DEFAULT_COST_ESTIMATE), self.capacity)
+
+    def acquire(self, cost: float, prio: str) -> None:
+        """Block until `cost` points (plus the priority reserve) are modeled
+        as available and no higher-priority request is waiting; reserve them."""
+        higher = PRIORITIES[:PRIORITIES.index(prio)]
+        with self._cond:
+            self._waiting[prio] += 1
+            try:
+                while True:
+                    self._restore()
+                    need = min(self.capacity, cost + RESERVE[prio] * self.capacity)
+                    blocked = any(self._waiting[p] for p in higher)
+                    if not blocked and self.available >= need:
+                        self.available -= cost
+                        self._inflight += cost
+                        return
+                    deficit = max(need - self.available, 0.0)
+                    self._cond.wait(timeout=min(max(deficit / self.restore_rate, 0.02), 2.0))
+            finally:
+                self._waiting[prio] -= 1
+                self._cond.notify_all()
+
+    def release(self, cost: float) -> None:
+        """Give back a reservation for a request that never reached Shopify."""
+        with self._cond:
+            self._inflight = max(0.0, self._inflight - cost)
+            self.available = min(self.capacity, self.available + cost)
+            self._cond.notify_all()
+
+    def record(self, key: str, reserved: float, cost_ext: dict | None) -> None:
+        """Settle a finished request against the response's cost extension."""
+        with self._cond:
+            self._inflight = max(0.0, self._inflight - reserved)
+            if cost_ext:
+                requested = cost_ext.get("requestedQueryCost")
+                if requested is not None:
+                    if len(self._estimates) >= _MAX_TRACKED_QUERIES and key not in self._estimates:
+                        self._estimates.clear()
+                    prev = self._estimates.get(key)
+                    self._estimates[key] = float(requested) if prev is None \
+                        else 0.7 * prev + 0.3 * float(requested)
+                status = cost_ext.get("throttleStatus") or {}
+                if status:
+                    self.capacity = float(status.get("maximumAvailable") or self.capacity)
+                    self.restore_rate = float(status.get("restoreRate") or self.restore_rate)
+                    # Shopify's number is authoritative; keep other in-flight
+                    # reservations from this process subtracted.
+                    self.available = float(status.get("currentlyAvailable", self.available)) - self._inflight
+                    self._stamp = time.monotonic()
+            self._cond.notify_all()
+
+    def drain(self, seconds: float) -> None:
+        """Model an empty bucket for `seconds` (HTTP 429 Retry-After)."""
+        with self._cond:
+            self.available = -seconds * self.restore_rate
+            self._stamp = time.monotonic()
+
+
+_buckets: dict[str, CostBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(url: str) -> CostBucket:
+    host = urlparse(url).netloc
+    with _buckets_lock:
+        b = _buckets.get(host)
+        if b is None:
+            b = _buckets[host] = CostBucket()
+        return b
+
+
+def _query_key(query: str) -> str:
+    return hashlib.sha1((query or "").encode("utf-8")).hexdigest()
+
+
+def _is_throttled(body: dict) -> bool:
+    for err in body.get("errors") or []:
+        if not isinstance(err, dict):
+            continue
+        if (err.get("extensions") or {}).get("code") == "THROTTLED":
+            return True
+        if "throttled" in (err.get("message") or "").lower():
+            return True
+    return False
+
+
+def gql_post(url: str, headers: dict, payload: dict, *, timeout: float = 30,
+             priority: str = None) -> dict:
+    """
+    POST a GraphQL payload under the shop's cost budget and return the parsed
+    response body (data / errors / extensions untouched). HTTP errors other
+    than 429 are raised via raise_for_status() like a bare requests.post
+    caller would; THROTTLED responses are retried internally and only
+    returned if they persist.
+    """
+    prio = priority or current_priority()
+    bucket = bucket_for(url)
+    key = _query_key(payload.get("query"))
+    body = {}
+    for attempt in range(_MAX_THROTTLE_RETRIES + 1):
+        cost = bucket.estimate(key)
+        bucket.acquire(cost, prio)
+        try:
+            resp = http_pool.post(url, headers=headers, json=payload, timeout=timeout)
+        except Exception:
+            bucket.release(cost)
+            raise
+        if resp.status_code == 429:
+            bucket.release(cost)
+            retry_after = float(resp.headers.get("Retry-After") or 1.0)
+            bucket.drain(retry_after)
+            logger.warning(f"Shopify GraphQL 429 — backing off {retry_after:.1f}s")
+            continue
+        if resp.status_code >= 400:
+            bucket.release(cost)
+            resp.raise_for_status()
+        body = resp.json()
+        bucket.record(key, cost, (body.get("extensions") or {}).get("cost"))
+        if not _is_throttled(body):
+            return body
+        logger.info(f"Shopify GraphQL throttled (attempt {attempt + 1}) — waiting for restore")
+    return body
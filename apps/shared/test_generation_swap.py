@@ -0,0 +1,113 @@
+"""
+scrydex_generation.swap_generation when the swap lock is never granted: the
+generation must be aborted — scrydex_sync_log rows written during the run
+reset, scrydex_price_cache_next dropped, the generation marked aborted — and
+LockNotAvailable re-raised.
+Run with: python test_generation_swap.py
+Uses an in-memory fake connection; no database needed.
+"""
+import sys
+sys.path.insert(0, ".")
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import psycopg2.errors
+
+import scrydex_generation
+
+STARTED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+RUN_EXPANSIONS = [("pokemon", "sv1"), ("pokemon", "sv2")]
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.sql = ""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.sql = " ".join(sql.split())
+        self.log.append((self.sql, params))
+        if self.sql.startswith("LOCK TABLE"):
+            raise psycopg2.errors.LockNotAvailable("canceling statement due to lock timeout")
+
+    def fetchone(self):
+        if "FROM scrydex_cache_generation" in self.sql:
+            return (STARTED_AT,)
+        return None
+
+    def fetchall(self):
+        if self.sql.startswith("UPDATE scrydex_sync_log"):
+            return list(RUN_EXPANSIONS)
+        return []
+
+
+class FakeConn:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append(("COMMIT", None))
+
+    def rollback(self):
+        self.log.append(("ROLLBACK", None))
+
+
+class FakeDB:
+    def __init__(self):
+        self.log = []
+
+    @contextmanager
+    def get_conn(self):
+        yield FakeConn(self.log)
+
+
+PASS = FAIL = 0
+
+
+def check(label, ok):
+    global PASS, FAIL
+    print(f"{'✅' if ok else '❌'} {label}")
+    if ok:
+        PASS += 1
+    else:
+        FAIL += 1
+
+
+scrydex_generation.SWAP_LOCK_RETRIES = 2
+scrydex_generation.time.sleep = lambda s: None
+fake = FakeDB()
+try:
+    scrydex_generation.swap_generation(fake, 7)
+    raised = False
+except psycopg2.errors.LockNotAvailable:
+    raised = True
+
+stmts = [sql for sql, _ in fake.log]
+check("LockNotAvailable re-raised", raised)
+check("lock attempted SWAP_LOCK_RETRIES times",
+      sum(s.startswith("LOCK TABLE") for s in stmts) == 2)
+check("no rename ran", not any("RENAME TO" in s for s in stmts))
+check("sync log rows from the run reset",
+      any(s.startswith("UPDATE scrydex_sync_log SET content_hash = NULL, next_sync_at = NULL")
+          for s in stmts)
+      and any(p == (STARTED_AT,) for s, p in fake.log if s.startswith("UPDATE scrydex_sync_log")))
+check("next table dropped",
+      f"DROP TABLE IF EXISTS {scrydex_generation.NEXT_TABLE}" in stmts)
+check("search docs rebuilt from live for each run expansion",
+      [p for s, p in fake.log if s.startswith("INSERT INTO scrydex_search_doc")] == RUN_EXPANSIONS)
+check("generation marked aborted",
+      any(s.startswith("UPDATE scrydex_cache_generation SET status = 'aborted'")
+          and "swap lock not granted" in p[0] for s, p in fake.log))
+check("abort committed", stmts[-1] == "COMMIT")
+
+print(f"\n{PASS}/{PASS+FAIL} passed")
+sys.exit(1 if FAIL else 0)
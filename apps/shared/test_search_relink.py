@@ -0,0 +1,78 @@
+"""
+Card search vs. direct cache writes: a re-linked card must come back from
+search with its new tcgplayer_id, and a card removed from the cache must stop
+coming back at all.
+Run with: DATABASE_URL=... python test_search_relink.py
+Everything runs in one transaction that is rolled back — nothing is kept.
+"""
+import sys
+sys.path.insert(0, ".")
+
+import db
+from price_cache import PriceCache
+from scrydex_nightly import refresh_search_docs
+
+GAME, EXPANSION, SID = "pokemon", "zz-relink-test", "zz-relink-test-1"
+NAME = "Zzrelinktest Pikachu"
+OLD_TCG, NEW_TCG = 990000001, 990000002
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _hit_tcg_ids(pc):
+    return {
+        "search_cards": [c.get("tcgPlayerId") for c in pc.search_cards(NAME)],
+        "_search_card_ids": [h["tcgplayer_id"] for h in pc._search_card_ids(NAME)],
+    }
+
+
+PASS = FAIL = 0
+
+
+def check(label, got, expected):
+    global PASS, FAIL
+    ok = all(v == expected for v in got.values())
+    print(f"{'✅' if ok else '❌'} {label}: {got}" + ("" if ok else f"  (expected {expected})"))
+    if ok:
+        PASS += 1
+    else:
+        FAIL += 1
+
+
+db.init_pool()
+pc = PriceCache(db, game=GAME)
+try:
+    with db.transaction() as cur:
+        cur.execute("""
+            INSERT INTO scrydex_price_cache (
+                game, scrydex_id, tcgplayer_id, expansion_id, expansion_name,
+                product_type, product_name, card_number, variant, condition,
+                price_type, market_price
+            ) VALUES (%s, %s, %s, %s, 'Relink Test', 'card', %s, '1', 'normal', 'NM', 'raw', 1.00)
+        """, (GAME, SID, OLD_TCG, EXPANSION, NAME))
+        refresh_search_docs(cur, GAME, EXPANSION)
+        check("linked", _hit_tcg_ids(pc), [OLD_TCG])
+
+        # Same statement as ingestion's /api/scrydex/link — no doc refresh.
+        db.execute(
+            "UPDATE scrydex_price_cache SET tcgplayer_id = %s WHERE scrydex_id = %s AND variant = %s",
+            (NEW_TCG, SID, "normal"),
+        )
+        check("re-linked", _hit_tcg_ids(pc), [NEW_TCG])
+
+        cur.execute("DELETE FROM scrydex_price_cache WHERE game = %s AND scrydex_id = %s",
+                    (GAME, SID))
+        check("deleted (before doc refresh)", _hit_tcg_ids(pc), [])
+        refresh_search_docs(cur, GAME, EXPANSION)
+        cur.execute("SELECT COUNT(*) AS n FROM scrydex_search_doc WHERE game = %s AND scrydex_id = %s",
+                    (GAME, SID))
+        n = cur.fetchone()["n"]
+        check("doc purged", {"docs": n}, 0)
+        raise _Rollback
+except _Rollback:
+    pass
+
+print(f"\n{PASS}/{PASS+FAIL} passed")
+sys.exit(1 if FAIL else 0)
@@ -3,15 +3,22 @@ Shared webhook signature verification middleware.
 
 Validates X-Flow-Secret header on incoming Shopify Flow webhooks.
 Used by both screening/ and vip/ services.
+
+verify_shopify_hmac checks X-Shopify-Hmac-Sha256 on native Shopify webhook
+subscriptions (product/inventory/order topics) against SHOPIFY_WEBHOOK_SECRET.
 """
 
 import os
+import hmac
+import base64
+import hashlib
 from flask import request, abort
 from dotenv import load_dotenv
 
 load_dotenv()
 
 FLOW_SECRET = os.environ.get("VIP_FLOW_SECRET", "")
+SHOPIFY_WEBHOOK_SECRET = os.environ.get("SHOPIFY_WEBHOOK_SECRET", "")
 
 # Paths that don't require auth (health checks)
 SAFE_PATHS = {"/vip/ping", "/screening/ping"}
@@ -38,3 +45,14 @@ def verify_flow_signature(safe_paths=None):
         data = request.get_json(silent=True) or {}
         if not (isinstance(data.get("order_id"), str) and data["order_id"].startswith("gid://shopify/Order/")):
             abort(400)
+
+
+def verify_shopify_hmac(raw_body: bytes, header_signature: str) -> bool:
+    """Constant-time compare of the X-Shopify-Hmac-Sha256 header against the
+    base64 HMAC-SHA256 of the raw request body."""
+    if not SHOPIFY_WEBHOOK_SECRET or not header_signature:
+        return False
+    computed = base64.b64encode(
+        hmac.new(SHOPIFY_WEBHOOK_SECRET.encode("utf-8"), raw_body, hashlib.sha256).digest()
+    ).decode("utf-8")
+    return hmac.compare_digest(computed, header_signature)
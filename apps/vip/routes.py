@@ -331,10 +331,14 @@ def sweep_vips():
 
     from service import sweep_vips_page
 
-    processed, next_cursor = sweep_vips_page(
-        page_size=page_size,
-        cursor=cursor,
-    )
+    from shopify_throttle import priority
+
+    # Sweeps are bulk housekeeping; yield the GraphQL budget to live traffic.
+    with priority("background"):
+        processed, next_cursor = sweep_vips_page(
+            page_size=page_size,
+            cursor=cursor,
+        )
 
     return jsonify({
         "ok": True,
@@ -118,6 +118,7 @@ def normalize_tier(t):
     return "VIP0"
 
 from shopify_graphql import shopify_gql as _base_shopify_gql, shopify_metafields_set as _base_metafields_set, gid_numeric
+from shopify_fanout import fan_out
 
 def shopify_gql(query: str, variables=None):
     """Debug/dry-run wrapper around the shared Shopify GraphQL client."""
@@ -799,13 +800,14 @@ def sweep_vips_page(*, page_size: int = 25, cursor: str | None = None):
     cs = data["data"]["customers"]
     ids = [e["node"]["id"] for e in cs["edges"]]
 
+    # Customers are independent: push them concurrently (bounded by the
+    # fan-out pool and the Shopify cost bucket) instead of one by one.
     processed = 0
-    for gid in ids:
-        try:
-            _push_vip_to_klaviyo(gid)
+    for gid, _, err in fan_out(_push_vip_to_klaviyo, ids):
+        if err is None:
             processed += 1
-        except Exception as e:
-            print(f"[VIP SWEEP] error gid={gid}: {e}", flush=True)
+        else:
+            print(f"[VIP SWEEP] error gid={gid}: {err}", flush=True)
 
     next_cursor = cs["pageInfo"]["endCursor"] if cs["pageInfo"]["hasNextPage"] else None
     return processed, next_cursor